@@ -0,0 +1,387 @@
+"""
+Vectorized alert rule engine
+Evaluates configurable rules over the stored weekly history of every AOI
+in one batched pass, incrementally, with deduplication and suppression
+"""
+
+import json
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import atomic_write, write_json
+from config import ALERT_CONFIG, ALERT_RULES, DATA_DIR
+from materialized_views import load_series, load_views
+
+
+ALERTS_DIR = DATA_DIR / 'alerts'
+COLUMNS = ('ndvi_mean', 'change_pct', 'loss_ha')
+
+
+def threshold_alert(change_pct: Optional[float], basis: str = 'week_over_week') -> Optional[Dict]:
+    """
+    Single-result percentage change alert
+
+    Args:
+        change_pct: NDVI change in percent
+        basis: What the change is measured against
+
+    Returns:
+        Dict: Alert record, or None when below ALERT_CONFIG['vegetation_loss_threshold']
+    """
+    if change_pct is None or abs(change_pct) <= ALERT_CONFIG['vegetation_loss_threshold']:
+        return None
+    return {
+        'triggered': True,
+        'type': 'vegetation_loss' if change_pct < 0 else 'vegetation_gain',
+        'basis': basis,
+        'change_percentage': change_pct,
+        'message': f"⚠️ {abs(change_pct):.2f}% vegetation change detected!"
+    }
+
+
+def week_index(days: np.ndarray) -> np.ndarray:
+    """ISO weeks since 1969-12-29 (a Monday) of datetime64[D] dates"""
+    return (days.astype('datetime64[D]').astype(np.int64) + 3) // 7
+
+
+class HistoryTable:
+    """
+    Weekly history of many AOIs as dense (aoi, week) float32 matrices
+
+    Columns are consecutive ISO weeks (named by their Monday), whatever
+    weekday each AOI was analyzed on, so rolling windows count weeks.
+    Missing weeks are NaN, so every rule is a whole-matrix numpy operation;
+    'dates' holds the datetime64[D] analysis date of each cell (NaT where missing).
+    """
+
+    def __init__(self, aois: List[str], weeks: List[str], columns: Dict[str, np.ndarray],
+                 dates: np.ndarray):
+        self.aois = list(aois)
+        self.weeks = list(weeks)
+        self.columns = columns
+        self.dates = dates
+
+    @classmethod
+    def from_series(cls, series: List[Dict]) -> 'HistoryTable':
+        """
+        Build from materialized series views ({'district', 'weekly': [...]})
+
+        Of several points of an AOI in one ISO week the latest date is kept.
+        """
+        aois = [s['district'] for s in series]
+        points = [p for s in series for p in s['weekly']]
+        rows = np.repeat(np.arange(len(series)), [len(s['weekly']) for s in series])
+        days = np.array([p['date'] for p in points], dtype='datetime64[D]')
+        weeks = week_index(days)
+        first = int(weeks.min()) if len(weeks) else 0
+        n_weeks = int(weeks.max()) - first + 1 if len(weeks) else 0
+        mondays = np.arange(first, first + n_weeks) * 7 - 3
+        week_names = [str(day) for day in mondays.astype('datetime64[D]')]
+
+        # Last point of every (aoi, week) cell in date order wins
+        cells = rows * n_weeks + (weeks - first)
+        order = np.lexsort((days, cells))
+        keep = order[np.append(cells[order][1:] != cells[order][:-1], True)] if len(order) else order
+        rows, cols = np.divmod(cells[keep], max(n_weeks, 1))
+
+        shape = (len(aois), n_weeks)
+        dates = np.full(shape, np.datetime64('NaT'), dtype='datetime64[D]')
+        dates[rows, cols] = days[keep]
+        columns = {}
+        for name in COLUMNS:
+            values = np.array([p.get(name) for p in points], dtype=np.float64)
+            columns[name] = np.full(shape, np.nan, dtype=np.float32)
+            columns[name][rows, cols] = values[keep]
+        return cls(aois, week_names, columns, dates)
+
+    def weekdays(self) -> np.ndarray:
+        """int8 (aoi, week) weekday (0 = Monday) of each analysis date, -1 where missing"""
+        if not self.weeks:
+            return np.full(self.dates.shape, -1, dtype=np.int8)
+        mondays = np.datetime64(self.weeks[0], 'D') + 7 * np.arange(len(self.weeks))
+        weekday = (self.dates - mondays).astype(np.int64)
+        return np.where(np.isnat(self.dates), -1, weekday).astype(np.int8)
+
+    def since(self, start: int) -> 'HistoryTable':
+        """Table of weeks [start:]"""
+        return HistoryTable(self.aois, self.weeks[start:],
+                            {name: values[:, start:] for name, values in self.columns.items()},
+                            self.dates[:, start:])
+
+
+def _align(aois: List[str], first_week: np.datetime64, cells: np.ndarray,
+           target_aois: List[str], target_week: np.datetime64, n_weeks: int) -> np.ndarray:
+    """An int8 (aoi, week) matrix moved onto another AOI/week grid, -1 elsewhere"""
+    out = np.full((len(target_aois), n_weeks), -1, dtype=np.int8)
+    index = {aoi: i for i, aoi in enumerate(aois)}
+    pairs = [(row, index[aoi]) for row, aoi in enumerate(target_aois) if aoi in index]
+    shift = int((first_week - target_week).astype(np.int64)) // 7
+    lo, hi = max(0, shift), min(n_weeks, shift + cells.shape[1])
+    if pairs and lo < hi:
+        rows, source = np.array(pairs).T
+        out[rows, lo:hi] = cells[source, lo - shift:hi - shift]
+    return out
+
+
+# ----------------------------------------------------------------------
+# Rules: each maps a table to (fired, value) boolean/float (aoi, week) matrices
+# ----------------------------------------------------------------------
+
+def rule_threshold(table: HistoryTable, rule: Dict):
+    """Week-over-week percentage change beyond a threshold"""
+    change = table.columns['change_pct']
+    with np.errstate(invalid='ignore'):
+        if rule.get('direction', 'loss') == 'loss':
+            fired = change < -rule['threshold']
+        else:
+            fired = np.abs(change) > rule['threshold']
+    return fired, change
+
+
+def rule_zscore(table: HistoryTable, rule: Dict):
+    """NDVI far below the mean of the preceding rolling window"""
+    values = table.columns['ndvi_mean'].astype(np.float64)
+    window = rule['window']
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    # Prefix sums with a leading zero column: window sums are differences
+    zeros = np.zeros((values.shape[0], 1))
+    csum = np.concatenate([zeros, np.cumsum(filled, axis=1)], axis=1)
+    csq = np.concatenate([zeros, np.cumsum(filled ** 2, axis=1)], axis=1)
+    cnt = np.concatenate([zeros, np.cumsum(valid, axis=1)], axis=1)
+
+    t = np.arange(values.shape[1])
+    lo = np.maximum(t - window, 0)
+    n = cnt[:, t] - cnt[:, lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (csum[:, t] - csum[:, lo]) / n
+        var = (csq[:, t] - csq[:, lo]) / n - mean ** 2
+        std = np.sqrt(np.maximum(var, 0.0))
+        z = (values - mean) / np.maximum(std, rule['min_std'])
+        fired = (n >= rule['min_periods']) & (z < -rule['z'])
+    return fired, z.astype(np.float32)
+
+
+def rule_consecutive_decline(table: HistoryTable, rule: Dict):
+    """NDVI lower than the previous observation for N weeks in a row"""
+    values = table.columns['ndvi_mean']
+    run = np.zeros(values.shape, dtype=np.int32)
+    current = np.zeros(values.shape[0], dtype=np.int32)
+    last = np.full(values.shape[0], np.nan, dtype=np.float32)
+    # Sequential in time only; each step is vectorized across all AOIs
+    for t in range(values.shape[1]):
+        column = values[:, t]
+        observed = ~np.isnan(column)
+        with np.errstate(invalid='ignore'):
+            declined = observed & (column < last)
+        current = np.where(declined, current + 1, np.where(observed, 0, current))
+        last = np.where(observed, column, last)
+        run[:, t] = current
+    fired = (run >= rule['weeks']) & ~np.isnan(values)
+    return fired, run.astype(np.float32)
+
+
+def rule_hotspot_area(table: HistoryTable, rule: Dict):
+    """Significant-loss area at or above a minimum"""
+    area = table.columns['loss_ha']
+    with np.errstate(invalid='ignore'):
+        fired = area >= rule['min_hectares']
+    return fired, area
+
+
+RULE_TYPES = {
+    'threshold': rule_threshold,
+    'zscore': rule_zscore,
+    'consecutive_decline': rule_consecutive_decline,
+    'hotspot_area': rule_hotspot_area,
+}
+
+
+def rule_lookback(rule: Dict) -> int:
+    """Weeks of history a rule needs before the first evaluated week"""
+    if rule['type'] == 'zscore':
+        return rule['window']
+    if rule['type'] == 'consecutive_decline':
+        return 2 * rule['weeks']  # Room for gaps in the weekly record
+    return 0
+
+
+class AlertEngine:
+    """
+    Incremental, deduplicated evaluation of ALERT_RULES
+
+    The weekday evaluated for every AOI and week is kept as a compact int8
+    matrix in data/alerts/evaluated.npz and the last firing per AOI and
+    rule in data/alerts/state.json, so each run only emits alerts for new
+    or late rows and a rule that keeps firing is suppressed for 'suppress_weeks'.
+    """
+
+    def __init__(self, rules: Optional[List[Dict]] = None, state_dir: Optional[Path] = None):
+        self.rules = rules or ALERT_RULES
+        for rule in self.rules:
+            if rule['type'] not in RULE_TYPES:
+                raise ValueError(f"Unknown alert rule type: {rule['type']}")
+        self.state_dir = Path(state_dir or ALERTS_DIR)
+        self.state = self._load_state()
+        self.evaluated = self._load_evaluated()
+
+    def _new_cells(self, table: HistoryTable, incremental: bool) -> np.ndarray:
+        """(aoi, week) cells not evaluated yet, including rows that arrived late"""
+        new = ~np.isnat(table.dates)
+        if not incremental or not table.weeks:
+            return new
+        if self.evaluated is not None:
+            seen = _align(*self.evaluated, table.aois, np.datetime64(table.weeks[0], 'D'), len(table.weeks))
+            new &= table.weekdays() != seen
+        legacy = self.state.get('last_date')  # Global watermark of older state files
+        if legacy:
+            new &= table.dates > np.datetime64(legacy, 'D')
+        return new
+
+    def _mark_evaluated(self, table: HistoryTable):
+        """Record every analysis date of the table as evaluated"""
+        if not table.weeks:
+            return
+        first = np.datetime64(table.weeks[0], 'D')
+        if self.evaluated is None:
+            self.evaluated = (table.aois, first, table.weekdays())
+            return
+        aois, old_first, old = self.evaluated
+        known = set(table.aois)
+        merged_aois = table.aois + [aoi for aoi in aois if aoi not in known]
+        start = min(first, old_first)
+        end = max(first + 7 * len(table.weeks), old_first + 7 * old.shape[1])
+        n_weeks = int((end - start).astype(np.int64)) // 7
+        merged = _align(aois, old_first, old, merged_aois, start, n_weeks)
+        current = _align(table.aois, first, table.weekdays(), merged_aois, start, n_weeks)
+        self.evaluated = (merged_aois, start, np.where(current >= 0, current, merged))
+
+    def evaluate(self, table: HistoryTable, incremental: bool = True) -> List[Dict]:
+        """
+        Evaluate every rule over the table
+
+        Args:
+            table: History of all AOIs
+            incremental: Only emit alerts for AOI weeks not evaluated before
+
+        Returns:
+            List[Dict]: New alerts ('district', 'date', 'rule', 'severity', 'value', 'message')
+        """
+        new = self._new_cells(table, incremental)
+        new_weeks = np.flatnonzero(new.any(axis=0))
+        if not len(new_weeks):
+            return []
+        first_new = int(new_weeks[0])
+
+        # Rules only need a bounded lookback before the first new week
+        start = max(0, first_new - max(rule_lookback(rule) for rule in self.rules))
+        window = table.since(start)
+        offset = first_new - start
+
+        alerts = []
+        for rule in self.rules:
+            fired, value = RULE_TYPES[rule['type']](window, rule)
+            fired = fired[:, offset:] & new[:, first_new:]
+            alerts.extend(self._emit(window.since(offset), rule, fired, value[:, offset:]))
+
+        self._mark_evaluated(table)
+        self.state.pop('last_date', None)  # Older rows were covered by the global watermark
+        alerts.sort(key=lambda a: (a['date'], a['district'], a['rule']))
+        return alerts
+
+    def _emit(self, table: HistoryTable, rule: Dict, fired: np.ndarray, value: np.ndarray) -> List[Dict]:
+        """Apply dedupe/suppression to a fired matrix and build alert records"""
+        name = rule['name']
+        # Same week is always deduplicated; firings within suppress_weeks of
+        # the last one (before or after it, for late rows) are dropped
+        gap = 7 * rule.get('suppress_weeks', 0)
+        days = np.where(np.isnat(table.dates), 0, table.dates.astype(np.int64))
+
+        last_fired = self.state['last_fired'].setdefault(name, {})
+        stored = np.array([last_fired.get(aoi, '') for aoi in table.aois], dtype='datetime64[D]')
+        stored = np.where(np.isnat(stored), -10**9, stored.astype(np.int64))
+        fired = fired & (np.abs(days - stored[:, np.newaxis]) > gap)
+
+        # Suppression is sequential in time, vectorized across AOIs
+        emitted = fired
+        if gap:
+            # Week-major copies keep each step's column contiguous
+            fired_weeks, day_weeks = np.ascontiguousarray(fired.T), np.ascontiguousarray(days.T)
+            emitted_weeks = np.zeros_like(fired_weeks)
+            previous = np.full(len(table.aois), -10**9)
+            for t in np.flatnonzero(fired_weeks.any(axis=1)).tolist():
+                emit = fired_weeks[t] & (day_weeks[t] - previous > gap)
+                emitted_weeks[t] = emit
+                previous = np.where(emit, day_weeks[t], previous)
+            emitted = emitted_weeks.T
+
+        latest = np.where(emitted, days, -10**9).max(axis=1, initial=-10**9)
+        for row in np.flatnonzero(latest > stored).tolist():
+            last_fired[table.aois[row]] = str(np.datetime64(int(latest[row]), 'D'))
+
+        rows, cols = np.nonzero(emitted)
+        values = value[rows, cols].astype(float).tolist()
+        dates = table.dates[rows, cols].astype(str).tolist()
+        severity = rule.get('severity', 'warning')
+        return [{
+            'district': table.aois[row],
+            'date': date,
+            'rule': name,
+            'type': rule['type'],
+            'severity': severity,
+            'value': v,
+            'message': rule['message'].format(value=v, **rule),
+        } for row, date, v in zip(rows.tolist(), dates, values)]
+
+    def save(self, alerts: Optional[List[Dict]] = None):
+        """Persist state and append new alerts to data/alerts/alerts.jsonl"""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        if alerts:
+            with open(self.state_dir / 'alerts.jsonl', 'a') as f:
+                for alert in alerts:
+                    f.write(json.dumps(alert) + '\n')
+        if self.evaluated is not None:
+            aois, first, weekdays = self.evaluated
+            with atomic_write(self.state_dir / 'evaluated.npz', 'wb') as f:
+                np.savez(f, aois=np.array(aois, dtype=str), first=np.array(first), weekdays=weekdays)
+        write_json(self.state_dir / 'state.json', self.state, indent=2)
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_dir / 'state.json', 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault('last_fired', {})
+        return state
+
+    def _load_evaluated(self) -> Optional[Tuple[List[str], np.datetime64, np.ndarray]]:
+        """(aois, first week, int8 weekday matrix) of evaluated cells"""
+        legacy = self.state.pop('evaluated', None)  # {aoi: {week: date}} of older state files
+        try:
+            with np.load(self.state_dir / 'evaluated.npz') as saved:
+                return saved['aois'].tolist(), saved['first'][()], saved['weekdays']
+        except (OSError, ValueError, KeyError):
+            pass
+        if not legacy:
+            return None
+        table = HistoryTable.from_series([
+            {'district': aoi, 'weekly': [{'date': date} for date in weeks.values()]}
+            for aoi, weeks in legacy.items()
+        ])
+        return (table.aois, np.datetime64(table.weeks[0], 'D'), table.weekdays()) if table.weeks else None
+
+
+def evaluate_stored_history(data_dir: Optional[Path] = None, incremental: bool = True) -> List[Dict]:
+    """Run the engine over the materialized series of every district and persist the new alerts"""
+    views = load_views(data_dir)
+    if views is None:
+        return []
+    table = HistoryTable.from_series([load_series(d, data_dir) for d in views['manifest']['districts']])
+    state_dir = Path(data_dir) / 'alerts' if data_dir else None
+    engine = AlertEngine(state_dir=state_dir)
+    alerts = engine.evaluate(table, incremental=incremental)
+    engine.save(alerts)
+    return alerts
@@ -0,0 +1,60 @@
+"""
+Atomic file writes
+The complete file is written under a per-writer temporary name (process and
+thread id, so concurrent writers of the same file never share one) and
+renamed into place, so readers see the old file or the new one, never a
+partial write
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Union
+
+
+def temp_path(path: Path) -> Path:
+    """Per-writer temporary file name next to path"""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+@contextmanager
+def atomic_write(path: Union[str, Path], mode: str = 'w') -> Iterator[IO]:
+    """
+    Open a temporary file that replaces path when the block completes
+
+    Parent directories are created. If the block raises, path is left
+    untouched and the temporary file is removed.
+
+    Args:
+        path: File to replace
+        mode: 'w' for text, 'wb' for bytes
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(path)
+    try:
+        with open(tmp, mode) as f:
+            yield f
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def write_json(path: Union[str, Path], data, **kwargs):
+    """Atomically replace a JSON file; kwargs go to json.dump"""
+    with atomic_write(path) as f:
+        json.dump(data, f, **kwargs)
+
+
+def write_text(path: Union[str, Path], text: str):
+    """Atomically replace a text file"""
+    with atomic_write(path) as f:
+        f.write(text)
+
+
+def write_bytes(path: Union[str, Path], data: bytes):
+    """Atomically replace a binary file"""
+    with atomic_write(path, 'wb') as f:
+        f.write(data)
@@ -0,0 +1,479 @@
+"""
+Lazy band-math expressions
+Builds a small expression graph for per-pixel band math (indices,
+differences, thresholds, masks) and evaluates it in one fused pass over row
+blocks, with preallocated float32 buffers reused in place and reductions
+fed straight from each block instead of from full-size temporaries
+"""
+
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import LOCAL_ENGINE_CONFIG
+
+
+# Element-wise operations and the NumPy ufunc that evaluates each
+_UFUNCS = {
+    'add': np.add,
+    'subtract': np.subtract,
+    'multiply': np.multiply,
+    'divide': np.true_divide,
+    'negative': np.negative,
+    'less': np.less,
+    'less_equal': np.less_equal,
+    'greater': np.greater,
+    'greater_equal': np.greater_equal,
+    'and': np.logical_and,
+    'or': np.logical_or,
+    'not': np.logical_not,
+    'isnan': np.isnan,
+    'isinf': np.isinf,
+}
+_BOOL_OPS = {'less', 'less_equal', 'greater', 'greater_equal', 'and', 'or', 'not', 'isnan', 'isinf'}
+
+# Branch-free NaN handling on float32 bit patterns: masked stores and
+# boolean indexing branch per pixel and are several times slower
+_QUIET_NAN_BITS = np.uint32(0x7FC00000)  # OR-ing these in makes any float32 a NaN
+_ALL_BITS = np.uint32(0xFFFFFFFF)
+
+
+class Expr:
+    """
+    Node of a band-math expression graph
+
+    Built with band(), const() and the arithmetic, comparison and logical
+    operators; nothing is computed until a Program evaluates it. Python
+    numbers mix in as float32 constants, and constant sub-expressions are
+    folded as Python would fold them, so index formulas evaluate exactly
+    like their NumPy equivalent.
+    """
+
+    __slots__ = ('op', 'args', 'value', 'dtype', 'key')
+
+    def __init__(self, op: str, args: Tuple['Expr', ...] = (), value=None, dtype=np.float32):
+        self.op = op
+        self.args = args
+        self.value = value
+        self.dtype = np.dtype(dtype)
+        # Structural identity, so repeated sub-expressions are computed once
+        self.key = (op, value, self.dtype.char) + tuple(arg.key for arg in args)
+
+    def __repr__(self):
+        if self.op == 'band':
+            return f"band({self.value[0]!r})"
+        if self.op == 'const':
+            return repr(self.value)
+        return f"{self.op}({', '.join(map(repr, self.args))})"
+
+    def _binary(self, op: str, other, reverse: bool = False) -> 'Expr':
+        other = _as_expr(other)
+        left, right = (other, self) if reverse else (self, other)
+        if left.op == 'const' and right.op == 'const' and op not in _BOOL_OPS:
+            return const(_PY_OPS[op](left.value, right.value))
+        return Expr(op, (left, right), dtype=bool if op in _BOOL_OPS else np.float32)
+
+    def __add__(self, other):
+        return self._binary('add', other)
+
+    def __radd__(self, other):
+        return self._binary('add', other, reverse=True)
+
+    def __sub__(self, other):
+        return self._binary('subtract', other)
+
+    def __rsub__(self, other):
+        return self._binary('subtract', other, reverse=True)
+
+    def __mul__(self, other):
+        return self._binary('multiply', other)
+
+    def __rmul__(self, other):
+        return self._binary('multiply', other, reverse=True)
+
+    def __truediv__(self, other):
+        return self._binary('divide', other)
+
+    def __rtruediv__(self, other):
+        return self._binary('divide', other, reverse=True)
+
+    def __neg__(self):
+        if self.op == 'const':
+            return const(-self.value)
+        return Expr('negative', (self,))
+
+    def __lt__(self, other):
+        return self._binary('less', other)
+
+    def __le__(self, other):
+        return self._binary('less_equal', other)
+
+    def __gt__(self, other):
+        return self._binary('greater', other)
+
+    def __ge__(self, other):
+        return self._binary('greater_equal', other)
+
+    def __and__(self, other):
+        return self._binary('and', other)
+
+    def __or__(self, other):
+        return self._binary('or', other)
+
+    def __invert__(self):
+        return Expr('not', (self,), dtype=bool)
+
+
+_PY_OPS = {
+    'add': lambda a, b: a + b,
+    'subtract': lambda a, b: a - b,
+    'multiply': lambda a, b: a * b,
+    'divide': lambda a, b: a / b,
+}
+
+
+def _as_expr(value) -> Expr:
+    return value if isinstance(value, Expr) else const(value)
+
+
+def band(name: str, scale: Optional[float] = None, dtype=np.float32) -> Expr:
+    """
+    Input raster, converted to float32 (times scale) as it is loaded
+
+    A dtype of bool loads the raster as a mask (non-zero = True).
+    """
+    if np.dtype(dtype) == np.bool_:
+        return Expr('band', value=(name, None), dtype=bool)
+    return Expr('band', value=(name, None if scale is None else float(scale)))
+
+
+def const(value: float) -> Expr:
+    """Scalar constant, applied as float32"""
+    return Expr('const', value=float(value))
+
+
+def isnan(expr: Expr) -> Expr:
+    """True where the value is NaN"""
+    return Expr('isnan', (expr,), dtype=bool)
+
+
+def set_nan(expr: Expr, condition: Expr) -> Expr:
+    """The expression with NaN where condition is True"""
+    return Expr('set_nan', (expr, condition))
+
+
+def finite(expr: Expr) -> Expr:
+    """The expression with infinities (e.g. division by zero) turned into NaN"""
+    return set_nan(expr, Expr('isinf', (expr,), dtype=bool))
+
+
+def masked(expr: Expr, mask: Expr) -> Expr:
+    """The expression with NaN where the boolean mask is False"""
+    return set_nan(expr, ~mask)
+
+
+# ----------------------------------------------------------------------
+# Reducers, fed one block at a time
+# ----------------------------------------------------------------------
+
+class Scratch:
+    """Block-sized work buffers shared by the reducers of one pass, grown on demand"""
+
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name: str, size: int, dtype) -> np.ndarray:
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.size < size:
+            buffer = self.buffers[name] = np.empty(size, dtype=dtype)
+        return buffer[:size]
+
+
+def _flat(block: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(block, dtype=np.float32).reshape(-1)
+
+
+def _nan_to_zero(values: np.ndarray, scratch: Scratch) -> Tuple[int, np.ndarray]:
+    """Number of non-NaN values of a flat float32 block, and the block with NaN set to 0"""
+    valid = scratch.get('valid', values.size, bool)
+    np.isnan(values, out=valid)
+    np.logical_not(valid, out=valid)
+    keep = scratch.get('keep', values.size, np.uint32)
+    np.multiply(valid, _ALL_BITS, out=keep)
+    zeroed = scratch.get('zeroed', values.size, np.float32)
+    np.bitwise_and(values.view(np.uint32), keep, out=zeroed.view(np.uint32))
+    return int(np.count_nonzero(valid)), zeroed
+
+
+class Summary:
+    """
+    Count, sum, sum of squares, extrema and optional histogram of the
+    non-NaN values, in the mergeable summary format of local_engine
+
+    Histogram counts equal np.histogram of the values clipped into
+    value_range; they are taken from the sorted block (NaN sorts last,
+    out-of-range values land in the end bins), which is several times
+    faster at thousands of bins.
+    """
+
+    def __init__(self, bins: Optional[int] = None, value_range: Tuple[float, float] = (-1.0, 1.0)):
+        self.bins = bins
+        self.value_range = value_range
+        self.count = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.histogram = np.zeros(bins, dtype=np.int64) if bins else None
+        self._edges = None
+
+    def update(self, block: np.ndarray, scratch: Scratch):
+        values = _flat(block)
+        if self.bins:
+            valid = self._sorted_valid(values, scratch)
+            count = valid.size
+        else:
+            count, valid = _nan_to_zero(values, scratch)
+        if not count:
+            return
+        wide = scratch.get('wide', valid.size, np.float64)
+        np.copyto(wide, valid)
+        self.count += count
+        self.sum += float(wide.sum())
+        self.sumsq += float(np.dot(wide, wide))
+        if not self.bins:
+            self.min = min(self.min, float(np.fmin.reduce(values)))
+            self.max = max(self.max, float(np.fmax.reduce(values)))
+            return
+
+        self.min = min(self.min, float(valid[0]))
+        self.max = max(self.max, float(valid[-1]))
+        if self._edges is None:
+            # Interior edges exactly as np.histogram computes them for this dtype
+            self._edges = np.histogram_bin_edges(valid[:0], self.bins, self.value_range)[1:-1]
+        below = np.searchsorted(valid, self._edges, side='left')
+        self.histogram += np.diff(below, prepend=0, append=count)
+
+    @staticmethod
+    def _sorted_valid(values: np.ndarray, scratch: Scratch) -> np.ndarray:
+        missing = scratch.get('valid', values.size, bool)
+        count = values.size - int(np.count_nonzero(np.isnan(values, out=missing)))
+        ordered = scratch.get('sorted', values.size, np.float32)
+        np.copyto(ordered, values)
+        ordered.sort()
+        return ordered[:count]
+
+    def result(self) -> Dict:
+        summary = {'count': self.count, 'sum': self.sum, 'sumsq': self.sumsq,
+                   'min': self.min, 'max': self.max}
+        if self.bins:
+            summary['histogram'] = self.histogram
+        return summary
+
+
+class CountSum:
+    """Count and sum of the non-NaN values"""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+
+    def update(self, block: np.ndarray, scratch: Scratch):
+        count, zeroed = _nan_to_zero(_flat(block), scratch)
+        self.count += count
+        self.sum += float(zeroed.sum(dtype=np.float64))
+
+    def result(self) -> Tuple[int, float]:
+        return self.count, self.sum
+
+
+class Count:
+    """Number of True pixels of a boolean expression"""
+
+    def __init__(self):
+        self.count = 0
+
+    def update(self, block: np.ndarray, scratch: Scratch):
+        self.count += int(np.count_nonzero(block))
+
+    def result(self) -> int:
+        return self.count
+
+
+# ----------------------------------------------------------------------
+# Compiled programs
+# ----------------------------------------------------------------------
+
+def _as_rows(array: np.ndarray) -> np.ndarray:
+    """2-D (rows, columns) view of a raster, blocks are taken along rows"""
+    array = np.asarray(array)
+    if array.ndim == 2:
+        return array
+    if array.ndim < 2:
+        return array.reshape(-1, 1)
+    return array.reshape(-1, array.shape[-1])
+
+
+class Program:
+    """
+    Compiled band-math graph with named outputs
+
+    Compiling removes repeated sub-expressions, orders the nodes and assigns
+    each one a buffer slot by liveness: a slot is released after the last
+    use of its value, so later nodes overwrite their operands in place and
+    the whole graph runs in a handful of block-sized buffers.
+
+    Args:
+        outputs: Output name -> expression
+        block_pixels: Pixels per evaluated block, defaults to
+            LOCAL_ENGINE_CONFIG['block_pixels']
+    """
+
+    def __init__(self, outputs: Dict[str, Expr], block_pixels: Optional[int] = None):
+        self.block_pixels = block_pixels or LOCAL_ENGINE_CONFIG['block_pixels']
+        self.output_names = list(outputs)
+
+        nodes: Dict[tuple, Expr] = {}
+        order: List[Expr] = []
+
+        def visit(expr: Expr) -> Expr:
+            if expr.key in nodes:
+                return nodes[expr.key]
+            args = tuple(visit(arg) for arg in expr.args)
+            node = expr if args == expr.args else Expr(expr.op, args, expr.value, expr.dtype)
+            nodes[expr.key] = node
+            order.append(node)
+            return node
+
+        results = {name: visit(expr) for name, expr in outputs.items()}
+        self.bands = sorted({node.value[0] for node in order if node.op == 'band'})
+
+        # Last step reading each node; outputs stay live to the end of the block
+        last_use = {}
+        for step, node in enumerate(order):
+            for arg in node.args:
+                last_use[id(arg)] = step
+        for node in results.values():
+            last_use[id(node)] = len(order)
+
+        free: Dict[str, List[int]] = {}
+        slot_dtypes: List[np.dtype] = []
+        slot_of: Dict[int, int] = {}
+        self.steps = []
+        for step, node in enumerate(order):
+            if node.op == 'const':
+                continue
+            # Operands whose value dies here can be overwritten by this node
+            for arg in dict.fromkeys(node.args):
+                if id(arg) in slot_of and last_use[id(arg)] == step:
+                    free.setdefault(slot_dtypes[slot_of[id(arg)]].char, []).append(slot_of[id(arg)])
+            pool = free.get(node.dtype.char)
+            if pool:
+                slot = pool.pop()
+            else:
+                slot = len(slot_dtypes)
+                slot_dtypes.append(node.dtype)
+            slot_of[id(node)] = slot
+            operands = tuple(
+                ('const', np.float32(arg.value)) if arg.op == 'const' else ('slot', slot_of[id(arg)])
+                for arg in node.args
+            )
+            self.steps.append((node.op, node.value, operands, slot))
+
+        self.slot_dtypes = slot_dtypes
+        self.outputs = {name: (slot_of[id(node)] if node.op != 'const' else None, node)
+                        for name, node in results.items()}
+
+    def __repr__(self):
+        return (f"Program({len(self.output_names)} outputs, {len(self.steps)} steps, "
+                f"{len(self.slot_dtypes)} buffers)")
+
+    def blocks(self, arrays: Dict[str, np.ndarray]) -> Iterator[Tuple[slice, Dict[str, np.ndarray]]]:
+        """
+        Evaluate the graph block by block
+
+        The yielded arrays are views of reused buffers, valid until the next
+        block is requested.
+
+        Args:
+            arrays: Band name -> raster, every raster of the same shape
+
+        Yields:
+            (row slice, output name -> (block rows, columns) array)
+        """
+        missing = [name for name in self.bands if name not in arrays]
+        if missing:
+            raise ValueError(f"Missing bands: {missing}")
+        inputs = {name: _as_rows(arrays[name]) for name in self.bands}
+        rows, cols = next(iter(inputs.values())).shape if inputs else (0, 0)
+        block_rows = max(1, self.block_pixels // max(cols, 1))
+        buffers = [np.empty((min(block_rows, rows), cols), dtype=dtype) for dtype in self.slot_dtypes]
+        nan_bits = np.empty((min(block_rows, rows), cols), dtype=np.uint32)
+
+        for start in range(0, rows, block_rows):
+            stop = min(start + block_rows, rows)
+            view = buffers if stop - start == block_rows else [buf[:stop - start] for buf in buffers]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                for op, value, operands, slot in self.steps:
+                    out = view[slot]
+                    if op == 'band':
+                        source = inputs[value[0]][start:stop]
+                        if out.dtype == np.bool_:
+                            np.not_equal(source, 0, out=out)
+                        elif value[1] is not None:
+                            np.multiply(source, np.float32(value[1]), out=out, dtype=np.float32)
+                        else:
+                            np.copyto(out, source, casting='unsafe')
+                        continue
+                    args = [view[ref] if kind == 'slot' else ref for kind, ref in operands]
+                    if op == 'set_nan':
+                        bits = nan_bits[:stop - start]
+                        np.multiply(args[1], _QUIET_NAN_BITS, out=bits)
+                        np.bitwise_or(args[0].view(np.uint32), bits, out=out.view(np.uint32))
+                    else:
+                        _UFUNCS[op](*args, out=out)
+            yield slice(start, stop), {
+                name: view[slot] if slot is not None else np.full((stop - start, cols), node.value, np.float32)
+                for name, (slot, node) in self.outputs.items()
+            }
+
+    def evaluate(self, arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Evaluate every output as a full raster
+
+        Float outputs are written into one (output, y, x) stack.
+
+        Args:
+            arrays: Band name -> raster
+
+        Returns:
+            Dict[str, np.ndarray]: Output name -> raster in the input shape
+        """
+        shape = np.shape(arrays[self.bands[0]]) if self.bands else ()
+        floats = [name for name in self.output_names if self.outputs[name][1].dtype != np.bool_]
+        stack = np.empty((len(floats),) + shape, dtype=np.float32)
+        results = {name: stack[i] for i, name in enumerate(floats)}
+        for name in self.output_names:
+            if name not in results:
+                results[name] = np.empty(shape, dtype=bool)
+        rows = {name: _as_rows(values) for name, values in results.items()}
+        for block, values in self.blocks(arrays):
+            for name, block_values in values.items():
+                rows[name][block] = block_values
+        return results
+
+    def reduce(self, arrays: Dict[str, np.ndarray], reducers: Dict[str, object]) -> Dict[str, object]:
+        """
+        Feed outputs block by block into reducers, no full-size outputs
+
+        Args:
+            arrays: Band name -> raster
+            reducers: Output name -> reducer (Summary, CountSum, Count)
+
+        Returns:
+            Dict[str, object]: Output name -> reducer result
+        """
+        scratch = Scratch()
+        for _, values in self.blocks(arrays):
+            for name, reducer in reducers.items():
+                reducer.update(values[name], scratch)
+        return {name: reducer.result() for name, reducer in reducers.items()}
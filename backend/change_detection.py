@@ -0,0 +1,221 @@
+"""
+Per-pixel change-point detection over the NDVI cube
+Finds the most significant abrupt NDVI drop in every pixel's weekly series
+(CUSUM / single mean-shift test) with NumPy-batched blocks across a process pool
+"""
+
+import numpy as np
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import CHANGE_CONFIG
+from ndvi_cube import NDVICube
+
+
+# Output rasters written next to the cube, one value per pixel
+OUTPUTS = {
+    'break_layer': np.int16,  # Index of the first layer after the break, -1 if none
+    'magnitude': np.float32,  # Mean NDVI after minus mean before (negative = loss)
+    'score': np.float32,  # Noise-normalized break statistic
+}
+
+
+def detect_breaks_block(series: np.ndarray, min_segment: int, min_drop: float,
+                        min_score: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Detect the strongest NDVI drop for a block of pixel series
+
+    For every candidate break k the series splits into before/after segments.
+    Segment sums and counts come from cumulative sums along time, so all
+    candidates for all pixels are scored at once:
+
+        score(k) = (mean_before - mean_after) * sqrt(n1 * n2 / n) / sigma
+
+    where sigma is a robust noise estimate from the median absolute
+    first difference. The break with the highest score wins.
+
+    Args:
+        series: (time, pixels) float32 NDVI with NaN for no data
+        min_segment: Valid observations required on each side of a break
+        min_drop: Minimum NDVI drop to report
+        min_score: Minimum score to report
+
+    Returns:
+        Tuple of (break_layer int16, magnitude float32, score float32) per pixel
+    """
+    n_time, n_pixels = series.shape
+    break_layer = np.full(n_pixels, -1, dtype=np.int16)
+    magnitude = np.full(n_pixels, np.nan, dtype=np.float32)
+    score = np.zeros(n_pixels, dtype=np.float32)
+    if n_time < 2 * min_segment:
+        return break_layer, magnitude, score
+
+    valid = ~np.isnan(series)
+    values = np.where(valid, series, np.float32(0))
+
+    counts = np.cumsum(valid, axis=0, dtype=np.float32)
+    sums = np.cumsum(values, axis=0, dtype=np.float32)
+    total_n = counts[-1]
+    total_s = sums[-1]
+
+    # Candidate k: first "after" layer, so "before" covers layers [0, k)
+    n1 = counts[:-1]
+    s1 = sums[:-1]
+    n2 = total_n - n1
+    s2 = total_s - s1
+
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)  # All-NaN pixels
+
+        drop = s1 / n1 - s2 / n2
+        weight = np.sqrt(n1 * n2 / np.maximum(total_n, 1))
+
+        # Robust noise estimate from week-to-week differences
+        sigma = 1.4826 * np.nanmedian(np.abs(np.diff(series, axis=0)), axis=0) / np.sqrt(2)
+        sigma = np.where(np.isfinite(sigma) & (sigma > 1e-3), sigma, np.float32(1e-3))
+
+        stat = drop * weight / sigma
+        stat[(n1 < min_segment) | (n2 < min_segment)] = -np.inf
+        stat[~np.isfinite(stat)] = -np.inf
+
+    best = np.argmax(stat, axis=0)
+    columns = np.arange(n_pixels)
+    best_stat = stat[best, columns]
+    best_drop = drop[best, columns]
+
+    detected = (best_stat >= min_score) & (best_drop >= min_drop)
+    break_layer[detected] = best[detected] + 1
+    magnitude[detected] = -best_drop[detected]
+    score[detected] = best_stat[detected]
+    return break_layer, magnitude, score
+
+
+def _process_rows(cube_path: str, out_dir: str, start: int, stop: int,
+                  row_start: int, row_stop: int, params: Dict) -> int:
+    """Worker: detect breaks for a row range, writing into the output memmaps"""
+    cube = NDVICube(Path(cube_path))
+    rows, cols = cube.shape
+    outputs = _open_outputs(Path(out_dir), (rows, cols), mode='r+')
+
+    rows_slice = slice(row_start, row_stop)
+    block = cube.read_window(start, stop, rows_slice)
+    series = block.reshape(block.shape[0], -1)
+
+    break_layer, magnitude, score = detect_breaks_block(series, **params)
+    shape = (row_stop - row_start, cols)
+    outputs['break_layer'][rows_slice] = break_layer.reshape(shape)
+    outputs['magnitude'][rows_slice] = magnitude.reshape(shape)
+    outputs['score'][rows_slice] = score.reshape(shape)
+    for array in outputs.values():
+        array.flush()
+    return row_stop - row_start
+
+
+def _open_outputs(out_dir: Path, shape: Tuple[int, int], mode: str) -> Dict[str, np.memmap]:
+    """Create ('w+') or open ('r+', 'r') the output .npy memmaps"""
+    outputs = {}
+    for name, dtype in OUTPUTS.items():
+        path = out_dir / f"{name}.npy"
+        if mode == 'w+':
+            outputs[name] = np.lib.format.open_memmap(path, mode=mode, dtype=dtype, shape=shape)
+        else:
+            outputs[name] = np.load(path, mmap_mode=mode)
+    return outputs
+
+
+def detect_breaks(cube: NDVICube, start_date: Optional[str] = None,
+                  end_date: Optional[str] = None, workers: Optional[int] = None,
+                  out_dir: Optional[Path] = None) -> Dict:
+    """
+    Run change-point detection over every pixel of a cube
+
+    Work is split into row blocks of about CHANGE_CONFIG['block_pixels'] pixels.
+    Each worker opens the cube and the output rasters as memmaps itself, so
+    no pixel arrays are pickled between processes.
+
+    Args:
+        cube: NDVI cube to analyze
+        start_date: First layer date included (default: first layer)
+        end_date: Last layer date included (default: last layer)
+        workers: Process count, None = CHANGE_CONFIG['workers'] / all cores, 1 = serial
+        out_dir: Directory for output rasters (default: <cube>/breaks)
+
+    Returns:
+        Dict with 'break_layer', 'magnitude', 'score' memmaps,
+        'break_dates' (layer index -> date) and 'out_dir'
+    """
+    start, stop = cube.time_range(start_date, end_date)
+    out_dir = Path(out_dir or cube.path / 'breaks')
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    rows, cols = cube.shape
+    outputs = _open_outputs(out_dir, (rows, cols), mode='w+')
+    outputs['break_layer'][:] = -1
+    outputs['magnitude'][:] = np.nan
+    outputs['score'][:] = 0
+    for array in outputs.values():
+        array.flush()
+    del outputs
+
+    params = {
+        'min_segment': CHANGE_CONFIG['min_segment_weeks'],
+        'min_drop': CHANGE_CONFIG['min_drop'],
+        'min_score': CHANGE_CONFIG['min_score'],
+    }
+    block_rows = max(1, CHANGE_CONFIG['block_pixels'] // max(cols, 1))
+    blocks = [(r, min(r + block_rows, rows)) for r in range(0, rows, block_rows)]
+
+    if workers is None:
+        workers = CHANGE_CONFIG['workers'] or os.cpu_count() or 1
+    workers = max(1, min(workers, len(blocks)))
+
+    print(f"🔎 Detecting breaks: {rows}x{cols} pixels, {stop - start} layers, "
+          f"{len(blocks)} blocks, {workers} worker(s)")
+
+    if stop > start:
+        jobs = [(str(cube.path), str(out_dir), start, stop, r0, r1, params) for r0, r1 in blocks]
+        if workers == 1:
+            for job in jobs:
+                _process_rows(*job)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_process_rows, *zip(*jobs)))
+
+    results = _open_outputs(out_dir, (rows, cols), mode='r')
+    # Break layers are relative to the analyzed window
+    results['break_dates'] = cube.dates[start:stop]
+    results['out_dir'] = out_dir
+    return results
+
+
+def summarize_breaks(results: Dict, pixel_area_hectares: float = 0.01) -> List[Dict]:
+    """
+    Summarize detected breaks by date
+
+    Returns:
+        List[Dict]: One entry per break date with pixel count, area and mean magnitude
+    """
+    break_layer = np.asarray(results['break_layer'])
+    magnitude = np.asarray(results['magnitude'])
+    dates = results['break_dates']
+
+    detected = break_layer >= 0
+    if not detected.any():
+        return []
+
+    layers = break_layer[detected].astype(np.int64)
+    counts = np.bincount(layers, minlength=len(dates))
+    sums = np.bincount(layers, weights=magnitude[detected], minlength=len(dates))
+
+    summary = []
+    for layer in np.nonzero(counts)[0]:
+        summary.append({
+            'date': dates[layer],
+            'pixels': int(counts[layer]),
+            'area_hectares': float(counts[layer] * pixel_area_hectares),
+            'mean_magnitude': float(sums[layer] / counts[layer]),
+        })
+    return summary
@@ -1,21 +1,38 @@
 #!/usr/bin/env python3
 """
 Simple CLI tool for quick vegetation monitoring checks
+
+Earth Engine (and the numeric stack) is only imported by the commands that
+run an analysis; --history, --alerts and --compare --cached work from
+stored results, without credentials. --near queries the loss-event store
+(NumPy, no Earth Engine).
 """
 
 import argparse
+import contextlib
 import sys
 from datetime import datetime
 from pathlib import Path
 
 try:
-    from vegetation_monitor import VegetationMonitor
     from config import DISTRICTS
+    from instrumentation import profile_run, span, start_trace, write_prometheus, write_trace
 except ImportError:
     print("Error: Could not import modules. Make sure you're in the correct directory.")
     sys.exit(1)
 
 
+def load_monitor():
+    """Authenticated VegetationMonitor, imported on first use"""
+    try:
+        from vegetation_monitor import VegetationMonitor
+    except ImportError as e:
+        print(f"Error: Could not import the analysis modules ({e}). "
+              "Make sure you're in the correct directory and Earth Engine is installed.")
+        sys.exit(1)
+    return VegetationMonitor()
+
+
 def format_alert(results):
     """Format alert message"""
     if 'alert' not in results or not results['alert']['triggered']:
@@ -30,7 +47,7 @@ def format_alert(results):
 
 def quick_check(district=None):
     """Quick check with minimal output"""
-    monitor = VegetationMonitor()
+    monitor = load_monitor()
 
     districts_to_check = [district] if district else list(DISTRICTS.keys())
 
@@ -41,6 +58,11 @@ def quick_check(district=None):
         try:
             results = monitor.analyze_district(dist)
 
+            if results.get('status') == 'no_imagery':
+                print(f"\n📍 {dist}:")
+                print("   ⏭️  No imagery for the current week")
+                continue
+
             ndvi = results['current_week']['ndvi_mean']
             change = results['change']['ndvi_change_mean']
             prev = results['previous_week']['ndvi_mean']
@@ -60,7 +82,7 @@ def quick_check(district=None):
 
 def detailed_report(district):
     """Detailed report for specific district"""
-    monitor = VegetationMonitor()
+    monitor = load_monitor()
 
     try:
         results = monitor.analyze_district(district)
@@ -70,21 +92,46 @@ def detailed_report(district):
         sys.exit(1)
 
 
-def compare_districts():
-    """Compare both districts side by side"""
-    monitor = VegetationMonitor()
-
-    print("🌳 District Comparison")
-    print("=" * 60)
+def analyze_all():
+    """Live analysis of every district, skipping failures and weeks without imagery"""
+    monitor = load_monitor()
 
     results = {}
     for district in DISTRICTS.keys():
         try:
-            results[district] = monitor.analyze_district(district)
+            district_results = monitor.analyze_district(district)
         except Exception as e:
             print(f"❌ Error analyzing {district}: {e}")
             continue
 
+        if district_results.get('status') == 'no_imagery':
+            print(f"⏭️  No imagery for {district} this week")
+            continue
+        results[district] = district_results
+    return results
+
+
+def cached_results():
+    """Latest stored result of every district (no Earth Engine)"""
+    from materialized_views import load_views
+
+    views = load_views(Path(__file__).parent.parent / 'data')
+    if views is None:
+        print("📂 No stored results; run an analysis first")
+        return {}
+    latest = views['latest']
+    for district, data in latest.items():
+        print(f"📂 {district}: stored result for {data.get('analysis_date')}")
+    return {d: r for d, r in latest.items() if d in DISTRICTS and r.get('status', 'ok') == 'ok'}
+
+
+def compare_districts(cached=False):
+    """Compare both districts side by side"""
+    print("🌳 District Comparison")
+    print("=" * 60)
+
+    results = cached_results() if cached else analyze_all()
+
     if len(results) < 2:
         print("❌ Could not compare districts")
         return
@@ -132,7 +179,7 @@ def list_history():
     for i, file in enumerate(files[:10], 1):  # Show last 10
         timestamp = file.stem.split('_', 1)[1]
         try:
-            dt = datetime.strptime(timestamp, "%Y%m%d_%H%M%S")
+            dt = datetime.strptime(timestamp[:15], "%Y%m%d_%H%M%S")
             print(f"{i:2d}. {dt.strftime('%Y-%m-%d %H:%M:%S')} - {file.name}")
         except ValueError:
             print(f"{i:2d}. {file.name}")
@@ -141,6 +188,64 @@ def list_history():
         print(f"\n... and {len(files) - 10} more files")
 
 
+def evaluate_alerts(full=False, evidence=False):
+    """Evaluate the alert rules over the stored history"""
+    from alert_engine import evaluate_stored_history
+
+    alerts = evaluate_stored_history(incremental=not full)
+
+    print("🚨 Alert Rules")
+    print("=" * 60)
+    if not alerts:
+        print("✓ No new alerts")
+        return
+
+    for alert in alerts:
+        icon = "🔴" if alert['severity'] == 'critical' else "🟠"
+        print(f"{icon} {alert['date']} {alert['district']:12s} [{alert['rule']}] {alert['message']}")
+    print(f"\n{len(alerts)} new alert(s)")
+
+    if evidence:
+        build_evidence(alerts)
+
+
+def build_evidence(alerts):
+    """Fetch before/after evidence chips for alerts and write one bundle per alert"""
+    from evidence import EvidenceCollector
+
+    collector = EvidenceCollector(load_monitor())
+    summary = collector.build_bundles(alerts)
+
+    print(f"\n📸 Evidence: {summary['chips']} chips ({summary['cached']} cached, {summary['fetched']} fetched, "
+          f"{summary['failed']} failed) in {summary['seconds']:.1f}s with {collector.workers} workers")
+    for path in summary['bundles']:
+        print(f"   {path}")
+
+
+def loss_events_near(lon, lat, radius_km, since=None):
+    """List stored loss events within a radius of a point"""
+    from loss_events import LossEventStore
+
+    store = LossEventStore()
+    events = store.within_radius(lon, lat, radius_km, start=since)
+
+    print(f"🌳 Loss events within {radius_km:g} km of ({lon:.4f}, {lat:.4f})"
+          + (f" since {since}" if since else ""))
+    print("=" * 60)
+    if not events:
+        nearest = store.nearest(lon, lat, start=since)
+        print("✓ No loss events" + (f" (nearest: {nearest[0]['distance_km']:.1f} km, "
+                                    f"{nearest[0]['date']})" if nearest else ""))
+        return
+
+    for event in events[:20]:
+        print(f"   {event['date']} {event['aoi']:12s} {event['area_hectares']:8.1f} ha "
+              f"at {event['distance_km']:5.2f} km")
+    if len(events) > 20:
+        print(f"\n... and {len(events) - 20} more events")
+    print(f"\n{len(events)} event(s), {sum(e['area_hectares'] for e in events):.1f} ha in total")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Rajasthan Green Cover Monitoring CLI',
@@ -151,7 +256,12 @@ Examples:
   %(prog)s --quick --district Jodhpur  # Quick check one district
   %(prog)s --detailed Jodhpur   # Detailed report for Jodhpur
   %(prog)s --compare            # Compare both districts
+  %(prog)s --compare --cached   # Compare the latest stored results (no Earth Engine)
   %(prog)s --history            # List historical analyses
+  %(prog)s --alerts             # Evaluate alert rules over new history
+  %(prog)s --alerts --evidence  # ... and fetch before/after chips for the new alerts
+  %(prog)s --near 73.02 26.28 --radius 2 --since 2024-03-01   # Stored loss events near a point
+  %(prog)s --quick --profile --trace --metrics   # Profile, trace and export metrics
         """
     )
 
@@ -186,6 +296,69 @@ Examples:
         help='List historical analysis files'
     )
 
+    parser.add_argument(
+        '--alerts',
+        action='store_true',
+        help='Evaluate alert rules over stored history (new weeks only)'
+    )
+
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help='With --alerts, re-evaluate the whole history'
+    )
+
+    parser.add_argument(
+        '--evidence',
+        action='store_true',
+        help='With --alerts, fetch before/after evidence chips for new alerts to data/evidence'
+    )
+
+    parser.add_argument(
+        '--cached',
+        action='store_true',
+        help='With --compare, use the latest stored results instead of a live analysis'
+    )
+
+    parser.add_argument(
+        '--near',
+        nargs=2,
+        type=float,
+        metavar=('LON', 'LAT'),
+        help='List stored loss events near a point (data/loss_events.sqlite3)'
+    )
+
+    parser.add_argument(
+        '--radius',
+        type=float,
+        default=2.0,
+        help='With --near, search radius in km (default: 2)'
+    )
+
+    parser.add_argument(
+        '--since',
+        metavar='YYYY-MM-DD',
+        help='With --near, only events on or after this date'
+    )
+
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Write cProfile and collapsed-stack (flame graph) files for the run to data/profiles'
+    )
+
+    parser.add_argument(
+        '--trace',
+        action='store_true',
+        help='Write a JSON trace of the run stages to data/traces (chrome://tracing, Perfetto)'
+    )
+
+    parser.add_argument(
+        '--metrics',
+        action='store_true',
+        help='Write stage timings and Earth Engine request counters to data/metrics/cli.prom'
+    )
+
     args = parser.parse_args()
 
     # If no arguments, show help
@@ -193,18 +366,29 @@ Examples:
         parser.print_help()
         sys.exit(0)
 
+    command = ('history' if args.history else 'alerts' if args.alerts else 'near' if args.near
+               else 'quick' if args.quick else 'detailed' if args.detailed
+               else 'compare' if args.compare else None)
+    if args.trace:
+        start_trace()
+
     # Execute commands
     try:
-        if args.history:
-            list_history()
-        elif args.quick:
-            quick_check(args.district)
-        elif args.detailed:
-            detailed_report(args.detailed)
-        elif args.compare:
-            compare_districts()
-        else:
-            parser.print_help()
+        with profile_run() if args.profile else contextlib.nullcontext(), span(f'cli.{command}'):
+            if args.history:
+                list_history()
+            elif args.alerts:
+                evaluate_alerts(args.full, args.evidence)
+            elif args.near:
+                loss_events_near(*args.near, args.radius, args.since)
+            elif args.quick:
+                quick_check(args.district)
+            elif args.detailed:
+                detailed_report(args.detailed)
+            elif args.compare:
+                compare_districts(args.cached)
+            else:
+                parser.print_help()
 
     except KeyboardInterrupt:
         print("\n\n❌ Interrupted by user")
@@ -212,6 +396,11 @@ Examples:
     except Exception as e:
         print(f"\n❌ Error: {e}")
         sys.exit(1)
+    finally:
+        if args.metrics:
+            print(f"📈 Metrics written to {write_prometheus('cli')}")
+        if args.trace:
+            print(f"🧭 Trace written to {write_trace()}")
 
 
 if __name__ == "__main__":
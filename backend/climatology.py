@@ -0,0 +1,288 @@
+"""
+Seasonal NDVI climatology baseline
+Per-AOI (and optionally per-pixel) week-of-year NDVI median and IQR over
+past years, so alerts compare a week against its seasonal normal instead
+of the previous week
+"""
+
+import json
+import warnings
+import numpy as np
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from atomic_io import write_json
+from config import CLIMATOLOGY_CONFIG, DATA_DIR
+
+
+CLIMATOLOGY_DIR = DATA_DIR / 'climatology'
+WEEKS = 52
+
+
+def week_of_year(date: str) -> int:
+    """ISO week of a 'YYYY-MM-DD' date, with week 53 folded into 52"""
+    return min(datetime.strptime(date, '%Y-%m-%d').isocalendar()[1], WEEKS)
+
+
+def week_key(date: str) -> str:
+    """'<ISO year>-W<week>' of a date; the climatology keeps one observation per key"""
+    return f"{datetime.strptime(date, '%Y-%m-%d').isocalendar()[0]}-W{week_of_year(date):02d}"
+
+
+def _week_distance(a: int, b: int) -> int:
+    """Circular distance between two weeks of the year"""
+    d = abs(a - b) % WEEKS
+    return min(d, WEEKS - d)
+
+
+class Climatology:
+    """
+    Week-of-year NDVI baseline of one AOI
+
+    Stores the weekly AOI mean observations and, per week of the year, the
+    median and interquartile range of the observations within
+    CLIMATOLOGY_CONFIG['window_weeks'] of it. Adding an observation only
+    recomputes the weeks it falls into.
+    """
+
+    def __init__(self, district_name: str, path: Optional[Path] = None):
+        self.district = district_name
+        self.path = Path(path or CLIMATOLOGY_DIR / f"{district_name.lower()}.json")
+        self.config = CLIMATOLOGY_CONFIG
+        self.observations: Dict[str, float] = {}
+        self.weeks: Dict[int, Dict] = {}
+
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.observations = data['observations']
+            self.weeks = {int(week): stats for week, stats in data['weeks'].items()}
+
+    @property
+    def available(self) -> bool:
+        return bool(self.weeks)
+
+    def add_observations(self, observations: Dict[str, float]):
+        """
+        Add weekly AOI mean NDVI values ('YYYY-MM-DD' -> NDVI)
+
+        A week of a year holds at most one observation: a value replaces any
+        stored one of the same ISO year and week, so re-analyzing a week
+        never weights it twice.
+        """
+        by_key = {}
+        for date, value in sorted(observations.items()):
+            if value is not None:
+                by_key[week_key(date)] = (date, value)
+        if not by_key:
+            return
+        self.observations = {d: v for d, v in self.observations.items() if week_key(d) not in by_key}
+        observations = dict(by_key.values())
+        self.observations.update(observations)
+
+        window = self.config['window_weeks']
+        touched = {
+            week for date in observations for week in range(1, WEEKS + 1)
+            if _week_distance(week, week_of_year(date)) <= window
+        }
+        by_week: Dict[int, List[float]] = {}
+        for date, value in self.observations.items():
+            by_week.setdefault(week_of_year(date), []).append(value)
+
+        for week in touched:
+            samples = [v for w, values in by_week.items()
+                       if _week_distance(w, week) <= window for v in values]
+            p25, median, p75 = np.percentile(samples, [25, 50, 75])
+            self.weeks[week] = {
+                'median': float(median),
+                'p25': float(p25),
+                'p75': float(p75),
+                'n': len(samples),
+            }
+
+    def baseline(self, date: str) -> Optional[Dict]:
+        """Baseline statistics for the week of a date, None if too few samples"""
+        stats = self.weeks.get(week_of_year(date))
+        if stats is None or stats['n'] < self.config['min_samples']:
+            return None
+        return stats
+
+    def anomaly(self, date: str, ndvi: float) -> Optional[Dict]:
+        """
+        Departure of an NDVI value from its seasonal normal
+
+        Returns:
+            Dict with 'week', 'baseline_median', 'iqr', 'z' (robust z-score,
+            IQR / 1.349 as sigma) and 'departure_pct', or None without a baseline
+        """
+        stats = self.baseline(date)
+        if stats is None:
+            return None
+        iqr = stats['p75'] - stats['p25']
+        sigma = max(iqr / 1.349, self.config['min_sigma'])
+        departure = ndvi - stats['median']
+        return {
+            'week': week_of_year(date),
+            'baseline_median': stats['median'],
+            'iqr': iqr,
+            'z': departure / sigma,
+            'departure_pct': departure / stats['median'] * 100 if stats['median'] else None,
+        }
+
+    def save(self):
+        # Concurrent sessions may save the same district
+        write_json(self.path, {
+            'district': self.district,
+            'observations': dict(sorted(self.observations.items())),
+            'weeks': {str(week): stats for week, stats in sorted(self.weeks.items())},
+        }, indent=2)
+
+
+def fetch_weekly_means(monitor, district_name: str, start_date: str, end_date: str) -> Dict[str, float]:
+    """
+    Weekly AOI mean NDVI from Earth Engine in a single request
+
+    Each week is a median composite reduced at CLIMATOLOGY_CONFIG['scale']
+    meters; weeks without scenes are omitted.
+
+    Args:
+        monitor: VegetationMonitor (for the collection filters and mask)
+        district_name: Key in config.DISTRICTS
+        start_date: First week start, 'YYYY-MM-DD'
+        end_date: End of the period, 'YYYY-MM-DD'
+
+    Returns:
+        Dict[str, float]: Week end date -> mean NDVI
+    """
+    import ee
+
+    bbox = monitor.districts[district_name]['bbox']
+    region = ee.Geometry.Rectangle(bbox)
+    collection = monitor.get_collection(bbox, start_date, end_date)
+    start = ee.Date(start_date)
+    weeks = (datetime.strptime(end_date, '%Y-%m-%d') - datetime.strptime(start_date, '%Y-%m-%d')).days // 7
+
+    def week_mean(i):
+        week_start = start.advance(ee.Number(i).multiply(7), 'day')
+        week_end = week_start.advance(7, 'day')
+        scenes = collection.filterDate(week_start, week_end)
+        composite = scenes.median()
+        if monitor.vegetation_mask is not None:
+            composite = monitor.vegetation_mask.apply(composite, bbox)
+        mean = composite.normalizedDifference(['B8', 'B4']).reduceRegion(
+            reducer=ee.Reducer.mean(),
+            geometry=region,
+            scale=CLIMATOLOGY_CONFIG['scale'],
+            maxPixels=1e9
+        ).get('nd')
+        return ee.List([week_end.format('YYYY-MM-dd'), ee.Algorithms.If(scenes.size().gt(0), mean, None)])
+
+    pairs = ee.List.sequence(0, weeks - 1).map(week_mean).getInfo()
+    return {date: value for date, value in pairs if value is not None}
+
+
+def build_climatology(monitor, district_name: str, years: Optional[int] = None) -> Climatology:
+    """
+    Compute (or extend) an AOI's baseline from the past years of imagery
+
+    Only the weeks not yet observed are fetched, so re-running after an
+    interruption or to add a year is cheap.
+    """
+    years = years or CLIMATOLOGY_CONFIG['years']
+    climatology = Climatology(district_name)
+    end = datetime.now() - timedelta(days=7)
+    start = end - timedelta(weeks=WEEKS * years)
+
+    # Only the spans before the first and after the last stored observation
+    spans = [(start, end)]
+    if climatology.observations:
+        first = datetime.strptime(min(climatology.observations), '%Y-%m-%d')
+        last = datetime.strptime(max(climatology.observations), '%Y-%m-%d')
+        spans = [(start, first - timedelta(days=7)), (last, end)]
+
+    for span_start, span_end in spans:
+        if (span_end - span_start).days < 7:
+            continue
+        print(f"📅 Building {district_name} climatology {span_start.date()} to {span_end.date()}...")
+        observations = fetch_weekly_means(monitor, district_name,
+                                          span_start.strftime('%Y-%m-%d'), span_end.strftime('%Y-%m-%d'))
+        climatology.add_observations(observations)
+        climatology.save()
+        print(f"✓ {len(observations)} weekly observations added ({climatology.path})")
+    return climatology
+
+
+# ----------------------------------------------------------------------
+# Per-pixel baseline from a local NDVI cube
+# ----------------------------------------------------------------------
+
+def pixel_baseline(cube, out_dir: Optional[Path] = None, block_rows: int = 256) -> Dict[str, np.ndarray]:
+    """
+    Per-pixel week-of-year median and IQR from an NDVICube
+
+    Stored quantized like the cube (int16, cube.scale, cube.nodata) as
+    (52, rows, cols) memmaps in <cube>/climatology.
+
+    Returns:
+        Dict[str, np.ndarray]: 'median' and 'iqr' int16 memmaps
+    """
+    out_dir = Path(out_dir or cube.path / 'climatology')
+    out_dir.mkdir(parents=True, exist_ok=True)
+    shape = (WEEKS,) + tuple(cube.shape)
+    out = {
+        name: np.lib.format.open_memmap(out_dir / f"{name}.npy", mode='w+', dtype=np.int16, shape=shape)
+        for name in ('median', 'iqr')
+    }
+
+    layer_weeks = np.array([week_of_year(date) for date in cube.dates])
+    window = CLIMATOLOGY_CONFIG['window_weeks']
+    distance = np.abs(layer_weeks[np.newaxis] - np.arange(1, WEEKS + 1)[:, np.newaxis]) % WEEKS
+    in_window = np.minimum(distance, WEEKS - distance) <= window  # (week, layer)
+
+    for rows, block in cube.iter_row_blocks(0, len(cube), block_rows):
+        for week in range(WEEKS):
+            layers = block[in_window[week]]
+            if len(layers) < CLIMATOLOGY_CONFIG['min_samples']:
+                out['median'][week, rows] = cube.nodata
+                out['iqr'][week, rows] = cube.nodata
+                continue
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', category=RuntimeWarning)  # All-NaN pixels
+                p25, median, p75 = np.nanpercentile(layers, [25, 50, 75], axis=0)
+            out['median'][week, rows] = cube.encode(median)
+            out['iqr'][week, rows] = cube.encode(p75 - p25)
+
+    for array in out.values():
+        array.flush()
+    return out
+
+
+def load_pixel_baseline(cube) -> Optional[Dict[str, np.ndarray]]:
+    """Memory-mapped per-pixel baseline of a cube, None if not built"""
+    paths = {name: cube.path / 'climatology' / f"{name}.npy" for name in ('median', 'iqr')}
+    if not all(path.exists() for path in paths.values()):
+        return None
+    return {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+
+
+def pixel_anomaly(cube, baseline: Dict[str, np.ndarray], ndvi: np.ndarray, date: str) -> np.ndarray:
+    """Per-pixel robust z-score of an NDVI raster against the baseline (NaN where unknown)"""
+    week = week_of_year(date) - 1
+    median = cube.decode(baseline['median'][week])
+    sigma = np.maximum(cube.decode(baseline['iqr'][week]) / 1.349, CLIMATOLOGY_CONFIG['min_sigma'])
+    return (np.asarray(ndvi, dtype=np.float32) - median) / sigma
+
+
+def main():
+    """Build or extend the climatology of every district"""
+    from config import DISTRICTS
+    from vegetation_monitor import VegetationMonitor
+
+    monitor = VegetationMonitor()
+    for district_name in DISTRICTS:
+        build_climatology(monitor, district_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@
 Configuration file for Rajasthan Green Cover Monitoring System
 """
 
+from pathlib import Path
+
 # District Boundaries (approximate bounding boxes)
 # Format: [min_lon, min_lat, max_lon, max_lat]
 
@@ -34,21 +36,230 @@ NDVI_THRESHOLDS = {
     "very_dense": 0.8
 }
 
+# Spectral indices computed from each weekly composite in a single request
+INDEX_CONFIG = {
+    "indices": ["NDVI", "SAVI", "NDMI", "EVI"],  # NDVI is always computed
+    "reflectance_scale": 0.0001,  # Sentinel-2 SR digital numbers to reflectance
+    "savi_l": 0.5,  # SAVI soil brightness correction factor
+}
+
 # Alert Settings
 ALERT_CONFIG = {
     "vegetation_loss_threshold": 5,  # % loss to trigger alert
     "min_area_hectares": 0.1,  # Minimum area to consider (hectares)
 }
 
+# Rules evaluated over the stored weekly history of every AOI (alert_engine.py)
+# Messages are formatted with the rule's own keys plus the triggering value
+ALERT_RULES = [
+    {
+        "name": "weekly_drop",
+        "type": "threshold",
+        "threshold": ALERT_CONFIG["vegetation_loss_threshold"],  # % week-over-week
+        "direction": "loss",
+        "severity": "warning",
+        "suppress_weeks": 2,
+        "message": "NDVI changed {value:+.1f}% week over week",
+    },
+    {
+        "name": "ndvi_zscore",
+        "type": "zscore",
+        "window": 12,  # Weeks in the rolling reference window
+        "min_periods": 6,
+        "z": 2.5,
+        "min_std": 0.005,
+        "severity": "warning",
+        "suppress_weeks": 4,
+        "message": "NDVI {value:.1f} standard deviations from its {window}-week mean",
+    },
+    {
+        "name": "sustained_decline",
+        "type": "consecutive_decline",
+        "weeks": 4,
+        "severity": "critical",
+        "suppress_weeks": 4,
+        "message": "NDVI declined {value:.0f} weeks in a row",
+    },
+    {
+        "name": "loss_hotspot",
+        "type": "hotspot_area",
+        "min_hectares": 50,
+        "severity": "critical",
+        "suppress_weeks": 2,
+        "message": "{value:.1f} ha of significant vegetation loss",
+    },
+]
+
+# Seasonal baseline: alerts compare a week with its week-of-year normal
+# instead of the previous week when enough past years are available
+CLIMATOLOGY_CONFIG = {
+    "enabled": True,
+    "years": 5,  # Past years used to build the baseline
+    "window_weeks": 1,  # Observations within +/- this many weeks of the year are pooled
+    "min_samples": 6,  # Fewer pooled observations -> no baseline for that week
+    "anomaly_z": 2.0,  # |robust z| above which an anomaly alert fires
+    "min_sigma": 0.01,  # Floor on the baseline spread (NDVI units)
+    "scale": 100,  # Reduction scale in meters for the baseline weekly means
+}
+
+# Vegetation-capable mask (pixels that can hold trees)
+# Water, built-up and barren pixels are masked out before any statistics
+MASK_CONFIG = {
+    "enabled": True,
+    "source": "worldcover",  # 'worldcover', 'max_ndvi' or 'combined'
+    "worldcover_collection": "ESA/WorldCover/v200",
+    "excluded_classes": [50, 60, 70, 80],  # Built-up, bare/sparse, snow/ice, water
+    "max_ndvi_threshold": 0.15,  # Long-term max NDVI below this cannot hold trees
+    "max_ndvi_years": 3,  # Years of imagery used for the long-term max NDVI
+    "asset_root": None,  # e.g. 'projects/<project>/assets/masks' to export masks as assets
+}
+
 # Time Settings
 ANALYSIS_INTERVAL_DAYS = 7  # Weekly analysis
 HISTORICAL_MONTHS = 6  # How far back to analyze
 
+# Monitoring daemon ('monitor serve')
+DAEMON_CONFIG = {
+    "interval_days": ANALYSIS_INTERVAL_DAYS,  # Default interval per AOI
+    "aoi_intervals": {},  # Per-AOI overrides in days, e.g. {"Jodhpur": 3.5}
+    "min_job_gap_seconds": 60,  # Spacing between jobs to avoid quota bursts
+    "retry_minutes": 60,  # First retry delay after a failed job (doubles per failure)
+    "max_retry_hours": 24,  # Cap on the retry delay
+}
+
 # Color Maps for Visualization
 NDVI_COLORS = {
     "palette": ['#d73027', '#fc8d59', '#fee08b', '#d9ef8b', '#91cf60', '#1a9850']
 }
 
+# Local storage for results and caches
+DATA_DIR = Path(__file__).parent.parent / 'data'
+
+# Local raster engine (offline analysis on NumPy rasters)
+LOCAL_ENGINE_CONFIG = {
+    "workers": None,  # Process pool size, None = all cores, 1 = serial
+    "tile_rows": 512,  # Rows per tile handed to a worker
+    "min_parallel_pixels": 4_000_000,  # Smaller rasters run serially
+    "histogram_bins": 4000,  # Bins over [-1, 1] for merged percentiles
+    "block_pixels": 65_536,  # Pixels per fused band-math block (band_math.py), bounds temporaries
+}
+
+# Local Sentinel-2 L2A SAFE ingestion
+SAFE_CONFIG = {
+    "bands": ["B02", "B04", "B08", "B11"],  # Bands read for the configured indices
+    "scl_band": "SCL",  # Scene classification, resampled to 10 m for cloud masking
+    "cache_crops": True,  # Keep decoded AOI crops as memory-mapped .npy files
+    "resolution": 10,  # AOI grid pixel size in meters; all granules are warped onto it
+    "crs": None,  # AOI grid CRS, None = UTM zone of the AOI centre
+}
+
+# Local weekly compositing (per-pixel SCL masking)
+COMPOSITE_CONFIG = {
+    "method": "median",  # 'median' (tiled, NaN-aware) or 'greenest' (streaming)
+    # SCL classes masked out: no data, saturated, cloud shadow,
+    # cloud medium/high probability, thin cirrus, snow
+    "scl_exclude": [0, 1, 3, 8, 9, 10, 11],
+    "tile_rows": 256,  # Rows per tile for the median stack
+}
+
+# Per-pixel NDVI time-series cube (quantized int16, memory-mapped)
+CUBE_CONFIG = {
+    "scale": 10000,  # Stored value = round(NDVI * scale)
+    "nodata": -32768,  # Sentinel for NaN (clouds, masked pixels)
+    "chunk_weeks": 52,  # Layers per chunk file
+}
+
+# SQLite job queue shared by 'monitor worker' processes
+QUEUE_CONFIG = {
+    "path": DATA_DIR / 'jobs.sqlite3',
+    "lease_seconds": 600,  # A job is reclaimed if its worker misses heartbeats this long
+    "heartbeat_seconds": 60,  # Lease renewal interval while a job runs
+    "max_attempts": 3,  # Attempts before a job is marked failed
+    "poll_seconds": 10,  # Idle worker poll interval
+    "retry_delay_seconds": 6 * 3600,  # Wait before re-running a week that had no imagery yet
+    "imagery_wait_days": 5,  # No imagery this long after a week ends is final
+}
+
+# Read-only HTTP results API
+API_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8600,
+    "refresh_seconds": 1.0,  # How often the results signature is re-checked
+    "gzip_min_bytes": 512,  # Smaller responses are sent uncompressed
+    "range_cache_size": 256,  # History/trend query responses kept per results version
+    "listen_backlog": 128,  # Pending connections; the stdlib default of 5 drops bursts (1 s SYN retry)
+}
+
+# Trend chart series
+TREND_CONFIG = {
+    "max_points": 400,  # LTTB point budget per chart, bounds the payload at any history length
+    "default_period": "weekly",  # 'weekly', 'monthly' or 'season'
+}
+
+# Earth Engine record/replay cassettes (enabled with EE_CASSETTE=<name> and EE_CASSETTE_MODE)
+CASSETTE_CONFIG = {
+    "dir": DATA_DIR / 'cassettes',  # One sub-directory per cassette name
+    "mode": "replay",  # Default when EE_CASSETTE_MODE is unset: 'record' or 'replay'
+    "latency_scale": 1.0,  # Replayed delay = recorded latency x scale (0 = no delay)
+}
+
+# Stage timings, Earth Engine request counters and profiling (instrumentation.py)
+METRICS_CONFIG = {
+    "namespace": "rajasthan_monitor",  # Prometheus metric name prefix
+    "buckets": [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120],  # Seconds
+    "textfile_dir": DATA_DIR / 'metrics',  # <job>.prom Prometheus textfiles (node_exporter collector)
+    "textfile_interval": 15,  # Min seconds between dashboard textfile writes (node_exporter scrape period)
+    "trace_dir": DATA_DIR / 'traces',  # Per-run JSON traces (--trace)
+    "profile_dir": DATA_DIR / 'profiles',  # cProfile and collapsed-stack files (--profile)
+    "sample_interval": 0.005,  # Stack sampler period in seconds
+}
+
+# Per-pixel change-point detection over the NDVI cube
+CHANGE_CONFIG = {
+    "min_segment_weeks": 4,  # Valid observations required on each side of a break
+    "min_drop": 0.1,  # Minimum NDVI drop (before mean - after mean)
+    "min_score": 5.0,  # Minimum noise-normalized break statistic
+    "block_pixels": 32_768,  # Pixels per vectorized block (bounds memory)
+    "workers": None,  # Process pool size, None = all cores, 1 = serial
+}
+
+# Synthetic Sentinel-2 scenes for offline load and scale tests (synthetic_scenes.py)
+SYNTHETIC_CONFIG = {
+    "dir": DATA_DIR / 'synthetic',  # One sub-directory per AOI
+    "bands": ["B4", "B8", "SCL"],  # Add "B2" / "B11" for EVI / NDMI
+    "field_cell": 64,  # Pixels per cell of the low-resolution vegetation and cloud fields
+    "block_rows": 512,  # Rows rendered per job (fixed, so output does not depend on workers)
+    "clearings_per_aoi": 3,  # Injected clearing events per AOI
+    "clearing_pixels": [400, 40_000],  # Size range of a clearing (4 to 400 ha at 10 m)
+    "cloudy_fraction": 0.25,  # Share of scenes with heavy (30-90%) cloud
+    "shadow_offset": 40,  # Cloud shadow displacement in pixels
+    "workers": None,  # Process pool size, None = all cores, 1 = serial
+}
+
+# Spatio-temporal store of extracted loss events (loss_events.py)
+LOSS_EVENTS_CONFIG = {
+    "path": DATA_DIR / 'loss_events.sqlite3',
+    "ndvi_drop": 0.1,  # NDVI decrease that marks a loss pixel (as local_engine.LOSS_THRESHOLD)
+    "min_area_hectares": 0.5,  # Smaller loss patches are not stored
+    "max_events_per_week": 5000,  # Largest events kept per AOI and week
+    "cell_levels": [0.01, 0.05, 0.25, 1.0],  # Aggregation cell sizes in degrees (~1 km to ~100 km)
+    "cell_weeks": [1, 13, 52],  # Time buckets of the cell rollups (each divides the next)
+    "max_cells": 2500,  # Cell budget when aggregate() picks a level
+    "nearest_start_km": 1,  # First search radius of nearest()
+    "nearest_max_km": 200,
+}
+
+# Before/after evidence chips for alerts (evidence.py)
+EVIDENCE_CONFIG = {
+    "dir": DATA_DIR / 'evidence',  # chips/ (content-addressed cache) and bundles/
+    "chip_pixels": 256,  # Chip width and height in pixels
+    "chip_scale": 10,  # Meters per pixel (coarser when a hotspot does not fit)
+    "workers": 16,  # Concurrent chip requests (Earth Engine allows ~40 per user)
+    "max_hotspots_per_alert": 50,  # Largest loss events of the alert's week
+    "rgb_vis": {"bands": ["B4", "B3", "B2"], "min": 0, "max": 3000},
+    "ndvi_vis": {"min": -0.2, "max": 0.8, "palette": NDVI_COLORS["palette"]},
+}
+
 # Export Settings
 EXPORT_CONFIG = {
     "format": "GeoTIFF",
@@ -8,7 +8,11 @@ import json
 import os
 from pathlib import Path
 
+from ee_cassette import install_from_env
+from instrumentation import instrument_ee, traced
 
+
+@traced('ee_auth')
 def initialize_earth_engine():
     """
     Initialize Earth Engine with appropriate authentication method
@@ -17,7 +21,13 @@ def initialize_earth_engine():
     1. Streamlit secrets (for cloud deployment)
     2. Local credentials (for local development)
     3. Raises error if neither available
+
+    With EE_CASSETTE set, requests go through a record/replay cassette
+    (see ee_cassette); replaying needs no credentials. Every request is
+    counted and timed (see instrumentation).
     """
+    install_from_env()
+    instrument_ee()
 
     # Try Streamlit secrets first (for cloud deployment)
     try:
@@ -56,6 +66,7 @@ def initialize_earth_engine():
 
 def is_authenticated():
     """Check if Earth Engine is authenticated"""
+    install_from_env()
     try:
         ee.Initialize()
         # Try a simple operation to verify
@@ -0,0 +1,280 @@
+"""
+Earth Engine record/replay cassettes
+Captures every Earth Engine request (computeValue, getMapId, computePixels,
+getAlgorithms) with its response and latency, keyed by a hash of the
+canonical expression graph, and serves them back without credentials or
+network
+
+    EE_CASSETTE=weekly EE_CASSETTE_MODE=record python cli.py --quick --district Jodhpur
+    EE_CASSETTE=weekly python cli.py --quick --district Jodhpur       # Replay, offline
+    EE_CASSETTE=weekly EE_CASSETTE_LATENCY_SCALE=0 streamlit run ../frontend/app.py
+
+While a cassette is active, analysis windows end on the date it was
+recorded (see analysis_now), so replayed requests hash to the same keys.
+"""
+
+import atexit
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from atomic_io import write_json
+from config import CASSETTE_CONFIG
+
+
+MODES = ('record', 'replay')
+PATCHED = ('computeValue', 'getMapId', 'computePixels', 'getAlgorithms')
+
+_active: Optional['Cassette'] = None
+
+
+class CassetteMiss(KeyError):
+    """A replayed request that was never recorded"""
+
+
+def canonical(value: Any) -> Any:
+    """JSON-ready form of request arguments, with ee objects serialized to their graphs"""
+    import ee
+
+    if isinstance(value, ee.ComputedObject):
+        return ee.serializer.encode(value, for_cloud_api=True)
+    if isinstance(value, dict):
+        return {str(k): canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(v) for v in value]
+    return value
+
+
+def request_key(method: str, args: tuple, kwargs: Dict) -> str:
+    """
+    Cassette key of a request
+
+    SHA-256 of the method name and the arguments with every expression
+    graph serialized, as JSON with sorted keys, so an identical computation
+    built again in another process maps to the same key.
+    """
+    payload = json.dumps({'method': method, 'args': canonical(list(args)), 'kwargs': canonical(kwargs)},
+                         sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _encode_response(method: str, response: Any) -> Any:
+    if method == 'getMapId':
+        # The tile fetcher is a client object; keep what rebuilds it
+        response = dict(response)
+        fetcher = response.pop('tile_fetcher', None)
+        if fetcher is not None:
+            response['url_format'] = fetcher.url_format
+    elif method == 'computePixels':
+        response = {'base64': base64.b64encode(response).decode('ascii')}
+    return response
+
+
+def _decode_response(method: str, response: Any) -> Any:
+    if method == 'getMapId' and 'url_format' in response:
+        import ee
+
+        response = dict(response)
+        response['tile_fetcher'] = ee.data.TileFetcher(response.pop('url_format'),
+                                                       map_name=response.get('mapid'))
+    elif method == 'computePixels':
+        response = base64.b64decode(response['base64'])
+    return response
+
+
+class Cassette:
+    """
+    One recorded session of Earth Engine requests
+
+    Stored as data/cassettes/<name>/cassette.json (name, recording date,
+    client version, Cloud project) plus one responses/<key[:2]>/<key>.json
+    file per distinct request, holding the response (or error) and its
+    latency.
+    """
+
+    def __init__(self, name: str, mode: Optional[str] = None, root: Optional[Path] = None,
+                 latency_scale: Optional[float] = None):
+        mode = mode or CASSETTE_CONFIG['mode']
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode} (expected one of {MODES})")
+        self.name = name
+        self.mode = mode
+        self.path = Path(root or CASSETTE_CONFIG['dir']) / name
+        self.latency_scale = CASSETTE_CONFIG['latency_scale'] if latency_scale is None else latency_scale
+        self.stats = {'recorded': 0, 'replayed': 0, 'missed': 0, 'latency_seconds': 0.0}
+        self._originals: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+        meta_file = self.path / 'cassette.json'
+        if meta_file.exists():
+            with open(meta_file, 'r') as f:
+                self.meta = json.load(f)
+        elif mode == 'replay':
+            raise FileNotFoundError(f"No cassette at {self.path}; record it first with EE_CASSETTE_MODE=record")
+        else:
+            import ee
+
+            self.meta = {
+                'name': name,
+                'as_of': datetime.now().strftime('%Y-%m-%d'),
+                'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'ee_version': getattr(ee, '__version__', None),
+            }
+            self.path.mkdir(parents=True, exist_ok=True)
+            write_json(meta_file, self.meta)
+
+    @property
+    def as_of(self) -> datetime:
+        """Frozen 'now' of the recording"""
+        return datetime.strptime(self.meta['as_of'], '%Y-%m-%d')
+
+    def _response_file(self, key: str) -> Path:
+        return self.path / 'responses' / key[:2] / f"{key}.json"
+
+    def _wrap(self, method: str, original):
+        import ee
+
+        def recorded(*args, **kwargs):
+            key = request_key(method, args, kwargs)
+            if self.mode == 'replay':
+                return self._replay(method, key)
+
+            start = time.perf_counter()
+            try:
+                response = original(*args, **kwargs)
+            except ee.EEException as e:
+                self._record(method, key, {'error': str(e)}, time.perf_counter() - start)
+                raise
+            self._record(method, key, {'response': _encode_response(method, response)},
+                         time.perf_counter() - start)
+            return response
+
+        return recorded
+
+    def _record(self, method: str, key: str, entry: Dict, latency: float):
+        import ee
+
+        entry.update({'method': method, 'latency': latency})
+        write_json(self._response_file(key), entry)
+        if not self.meta.get('project'):
+            # Known once Initialize has run; replay initializes with the same project
+            self.meta['project'] = getattr(ee.data, '_cloud_api_user_project', None)
+            if self.meta['project']:
+                write_json(self.path / 'cassette.json', self.meta)
+        with self._lock:
+            self.stats['recorded'] += 1
+            self.stats['latency_seconds'] += latency
+
+    def _replay(self, method: str, key: str):
+        import ee
+
+        try:
+            with open(self._response_file(key), 'r') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.stats['missed'] += 1
+            raise CassetteMiss(f"{method} request {key[:12]} is not in cassette '{self.name}'; "
+                               f"re-record it with EE_CASSETTE_MODE=record") from None
+
+        delay = entry['latency'] * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.stats['replayed'] += 1
+            self.stats['latency_seconds'] += delay
+
+        if 'error' in entry:
+            raise ee.EEException(entry['error'])
+        return _decode_response(method, entry['response'])
+
+    def install(self):
+        """Route the ee client's requests through this cassette"""
+        import ee
+
+        for method in PATCHED:
+            self._originals[method] = getattr(ee.data, method)
+            setattr(ee.data, method, self._wrap(method, self._originals[method]))
+
+        if self.mode == 'replay':
+            # Skip credentials: the only request Initialize makes is the replayed getAlgorithms
+            original_initialize = ee.Initialize
+            self._originals['Initialize'] = original_initialize
+
+            def initialize(credentials=None, *args, **kwargs):
+                from google.auth.credentials import AnonymousCredentials
+                if not args and self.meta.get('project'):
+                    kwargs.setdefault('project', self.meta['project'])
+                original_initialize(AnonymousCredentials(), *args, **kwargs)
+
+            ee.Initialize = initialize
+
+    def uninstall(self):
+        """Restore the original ee client functions"""
+        import ee
+
+        for method, original in self._originals.items():
+            if method == 'Initialize':
+                ee.Initialize = original
+            else:
+                setattr(ee.data, method, original)
+        self._originals = {}
+
+    def summary(self) -> str:
+        stats = self.stats
+        return (f"📼 Cassette '{self.name}' ({self.mode}, as of {self.meta['as_of']}): "
+                f"{stats['recorded']} recorded, {stats['replayed']} replayed, {stats['missed']} missing, "
+                f"{stats['latency_seconds']:.2f}s Earth Engine latency")
+
+
+def use_cassette(name: str, mode: Optional[str] = None, root: Optional[Path] = None,
+                 latency_scale: Optional[float] = None) -> Cassette:
+    """
+    Activate a cassette for the rest of the process
+
+    Args:
+        name: Cassette name (directory under CASSETTE_CONFIG['dir'])
+        mode: 'record' or 'replay' (default: CASSETTE_CONFIG['mode'])
+        root: Cassette directory (default: CASSETTE_CONFIG['dir'])
+        latency_scale: Replayed delay multiplier (default: CASSETTE_CONFIG['latency_scale'])
+
+    Returns:
+        Cassette: The active cassette
+    """
+    global _active
+    if _active is not None:
+        _active.uninstall()
+    _active = Cassette(name, mode, root, latency_scale)
+    _active.install()
+    return _active
+
+
+def install_from_env() -> Optional[Cassette]:
+    """Activate the cassette named by EE_CASSETTE (once per process), if set"""
+    name = os.environ.get('EE_CASSETTE')
+    if not name:
+        return None
+    if _active is not None and _active.name == name:
+        return _active
+
+    scale = os.environ.get('EE_CASSETTE_LATENCY_SCALE')
+    cassette = use_cassette(name, os.environ.get('EE_CASSETTE_MODE'),
+                            latency_scale=float(scale) if scale else None)
+    atexit.register(lambda: print(cassette.summary()))
+    print(f"📼 Earth Engine cassette '{name}' active ({cassette.mode})")
+    return cassette
+
+
+def active_cassette() -> Optional[Cassette]:
+    return _active
+
+
+def analysis_now() -> datetime:
+    """Current time for analysis windows: the recording date while a cassette is active"""
+    return _active.as_of if _active is not None else datetime.now()
@@ -0,0 +1,309 @@
+"""
+Before/after evidence chips for loss alerts
+Fetches small RGB and NDVI chips around every hotspot of an alert's week
+with concurrent computePixels requests, keeps them in a content-addressed
+cache and writes one bundle manifest per alert
+
+    data/evidence/chips/<key[:2]>/<key>.png                   # Fetched once, ever
+    data/evidence/bundles/<district>_<date>_<rule>.json       # Hotspots -> chip paths
+
+A chip's key is a hash of everything that determines its pixels: the
+scenes of the composite, the window and grid, and the visualization, so
+a rerun (or another alert over the same scenes) never re-downloads it.
+
+    collector = EvidenceCollector(monitor)
+    collector.build_bundles(evaluate_stored_history())
+"""
+
+import hashlib
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import write_bytes
+from config import DISTRICTS, EVIDENCE_CONFIG, SATELLITE_CONFIG
+from instrumentation import count, span
+
+
+PHASES = ('before', 'after')
+KINDS = ('rgb', 'ndvi')
+METERS_PER_DEGREE = 111_320
+
+
+def alert_windows(date: str) -> Dict[str, Tuple[str, str]]:
+    """Composite windows of an alert week, as analyze_district builds them"""
+    end = datetime.strptime(date, '%Y-%m-%d')
+    week_start = (end - timedelta(days=7)).strftime('%Y-%m-%d')
+    return {
+        'before': ((end - timedelta(days=14)).strftime('%Y-%m-%d'), week_start),
+        'after': (week_start, date),
+    }
+
+
+def chip_window(hotspot: Dict, pixels: int, scale: float) -> List[float]:
+    """
+    Square chip window (in meters) centred on a hotspot
+
+    The window grows (coarser pixels) when the hotspot bbox would not fit
+    with a margin, and is snapped to the pixel grid so the same hotspot
+    always maps to the same window.
+
+    Returns:
+        [min_lon, min_lat, max_lon, max_lat]
+    """
+    lon = hotspot.get('lon', (hotspot['bbox'][0] + hotspot['bbox'][2]) / 2)
+    lat = hotspot.get('lat', (hotspot['bbox'][1] + hotspot['bbox'][3]) / 2)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    extent_m = max((hotspot['bbox'][2] - hotspot['bbox'][0]) * METERS_PER_DEGREE * cos_lat,
+                   (hotspot['bbox'][3] - hotspot['bbox'][1]) * METERS_PER_DEGREE)
+    scale = max(scale, extent_m * 1.5 / pixels)
+
+    step_lat = scale / METERS_PER_DEGREE
+    step_lon = step_lat / cos_lat
+    min_lon = round((lon - pixels / 2 * step_lon) / step_lon) * step_lon
+    min_lat = round((lat - pixels / 2 * step_lat) / step_lat) * step_lat
+    return [round(v, 7) for v in (min_lon, min_lat, min_lon + pixels * step_lon, min_lat + pixels * step_lat)]
+
+
+def pixel_grid(window: List[float], pixels: int) -> Dict:
+    """computePixels grid for a window (EPSG:4326, north up)"""
+    return {
+        'dimensions': {'width': pixels, 'height': pixels},
+        'affineTransform': {
+            'scaleX': (window[2] - window[0]) / pixels, 'shearX': 0, 'translateX': window[0],
+            'shearY': 0, 'scaleY': -(window[3] - window[1]) / pixels, 'translateY': window[3],
+        },
+        'crsCode': 'EPSG:4326',
+    }
+
+
+def chip_key(spec: Dict) -> str:
+    """Content address of a chip: SHA-256 of what determines its pixels"""
+    payload = json.dumps({
+        'collection': SATELLITE_CONFIG['collection'],
+        'cloud_cover_max': SATELLITE_CONFIG['cloud_cover_max'],
+        'scenes': sorted(spec['scenes']),
+        'window': spec['window'],
+        'pixels': spec['pixels'],
+        'kind': spec['kind'],
+        'vis': spec['vis'],
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class EvidenceCollector:
+    """
+    Build before/after evidence bundles for alerts
+
+    Chip requests for every alert in a call share one thread pool, so a few
+    hundred hotspots take one request latency per EVIDENCE_CONFIG['workers']
+    chips instead of one per chip. Cached chips cost no request, identical
+    chips are requested once, and a failed chip is recorded in the bundle
+    (and retried by the next run) without failing the others.
+    """
+
+    def __init__(self, monitor=None, evidence_dir: Optional[Path] = None,
+                 workers: Optional[int] = None, evidence_config: Optional[Dict] = None):
+        """
+        Args:
+            monitor: VegetationMonitor used to build composites (only needed to fetch)
+            evidence_dir: Root of chips/ and bundles/ (default: EVIDENCE_CONFIG['dir'])
+            workers: Concurrent requests (default: EVIDENCE_CONFIG['workers'])
+        """
+        self.config = evidence_config or EVIDENCE_CONFIG
+        self.monitor = monitor
+        self.dir = Path(evidence_dir or self.config['dir'])
+        self.workers = max(1, workers or self.config['workers'])
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def chip_path(self, key: str) -> Path:
+        return self.dir / 'chips' / key[:2] / f'{key}.png'
+
+    def _store(self, key: str, data: bytes) -> Path:
+        path = self.chip_path(key)
+        write_bytes(path, data)  # Two runs may fetch the same chip
+        return path
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    def _fetch(self, spec: Dict) -> bytes:
+        """One chip as PNG bytes (a single computePixels request)"""
+        import ee
+        from spectral_indices import compute_indices
+
+        start, end = spec['dates']
+        image = self.monitor.get_sentinel2_image(spec['window'], start, end)
+        if spec['kind'] == 'ndvi':
+            image = compute_indices(image, ['NDVI'])
+        with span('evidence_chip', kind=spec['kind']):
+            return ee.data.computePixels({
+                'expression': image.visualize(**spec['vis']),
+                'fileFormat': 'PNG',
+                'grid': pixel_grid(spec['window'], spec['pixels']),
+            })
+
+    def _fetch_to_cache(self, key: str, spec: Dict) -> Tuple[str, Optional[str]]:
+        try:
+            self._store(key, self._fetch(spec))
+            count('evidence_chips_total', help='Evidence chips', source='fetched')
+            return key, None
+        except Exception as e:
+            count('evidence_chips_total', help='Evidence chips', source='failed')
+            return key, str(e)
+
+    def _probe(self, district: str, date: str) -> Dict[str, List[str]]:
+        return self.monitor.probe_scenes(DISTRICTS[district]['bbox'], alert_windows(date))
+
+    # ------------------------------------------------------------------
+    # Bundles
+    # ------------------------------------------------------------------
+
+    def alert_hotspots(self, alert: Dict, store=None) -> List[Dict]:
+        """Largest loss events of the alert's district and week, from the loss-event store"""
+        from loss_events import LossEventStore
+
+        store = store or LossEventStore()
+        date = alert_date(alert)
+        start = (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=6)).strftime('%Y-%m-%d')
+        events = store.in_bbox(DISTRICTS[alert['district']]['bbox'], start, date, aoi=alert['district'])
+        events.sort(key=lambda event: -event['area_hectares'])
+        return events[:self.config['max_hotspots_per_alert']]
+
+    def chip_specs(self, hotspot: Dict, windows: Dict, scenes: Dict) -> Dict[str, Dict[str, Dict]]:
+        """Phase -> kind -> chip spec (with 'key') for one hotspot"""
+        window = chip_window(hotspot, self.config['chip_pixels'], self.config['chip_scale'])
+        specs = {}
+        for phase in PHASES:
+            specs[phase] = {}
+            for kind in KINDS:
+                spec = {
+                    'kind': kind,
+                    'dates': list(windows[phase]),
+                    'scenes': scenes.get(phase, []),
+                    'window': window,
+                    'pixels': self.config['chip_pixels'],
+                    'vis': self.config[f'{kind}_vis'],
+                }
+                spec['key'] = chip_key(spec)
+                specs[phase][kind] = spec
+        return specs
+
+    def build_bundles(self, alerts: List[Dict], hotspots: Optional[Dict[int, List[Dict]]] = None,
+                      store=None) -> Dict:
+        """
+        Fetch the chips of every alert concurrently and write one bundle per alert
+
+        Args:
+            alerts: Alerts with 'district' and 'date' (alert_engine) or 'analysis_date'
+            hotspots: Alert index -> hotspots (loss-event dicts); default: alert_hotspots()
+            store: LossEventStore to read hotspots from
+
+        Returns:
+            Dict with 'bundles' (paths) and chip counts 'chips', 'cached',
+            'fetched', 'failed', plus 'seconds'
+        """
+        started = time.perf_counter()
+        if hotspots is None:
+            hotspots = {i: self.alert_hotspots(alert, store) for i, alert in enumerate(alerts)}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # One scene probe per district and week; the scene IDs are part of every chip key
+            weeks = sorted({(alert['district'], alert_date(alert)) for alert in alerts})
+            scenes = dict(zip(weeks, pool.map(lambda week: self._probe(*week), weeks)))
+
+            specs, pending = {}, {}
+            for i, alert in enumerate(alerts):
+                week = (alert['district'], alert_date(alert))
+                windows = alert_windows(week[1])
+                specs[i] = [self.chip_specs(hotspot, windows, scenes[week]) for hotspot in hotspots.get(i, [])]
+                for chips in specs[i]:
+                    for spec in (chips[phase][kind] for phase in PHASES for kind in KINDS):
+                        key = spec['key']
+                        if spec['scenes'] and key not in pending and not self.chip_path(key).exists():
+                            pending[key] = spec
+
+            unique = {spec['key'] for chips in specs.values() for hotspot in chips
+                      for phase in hotspot.values() for spec in phase.values() if spec['scenes']}
+            count('evidence_chips_total', len(unique) - len(pending), help='Evidence chips', source='cached')
+            errors = {key: error for key, error in
+                      pool.map(lambda item: self._fetch_to_cache(*item), pending.items()) if error}
+
+        bundles = [
+            self._write_bundle(alert, hotspots.get(i, []), specs[i],
+                               scenes[(alert['district'], alert_date(alert))], errors)
+            for i, alert in enumerate(alerts)
+        ]
+        return {
+            'bundles': bundles,
+            'chips': len(unique),
+            'cached': len(unique) - len(pending),
+            'fetched': len(pending) - len(errors),
+            'failed': len(errors),
+            'seconds': time.perf_counter() - started,
+        }
+
+    def _write_bundle(self, alert: Dict, hotspots: List[Dict], specs: List[Dict], scenes: Dict,
+                      errors: Dict[str, str]) -> Path:
+        date = alert_date(alert)
+        entries = []
+        for hotspot, chips in zip(hotspots, specs):
+            entry = {key: hotspot.get(key) for key in ('id', 'date', 'bbox', 'lon', 'lat', 'area_hectares',
+                                                       'ndvi_change')}
+            entry['window'] = chips['before']['rgb']['window']
+            entry['chips'] = {}
+            for phase in PHASES:
+                entry['chips'][phase] = {}
+                for kind in KINDS:
+                    spec = chips[phase][kind]
+                    if not spec['scenes']:
+                        chip = {'error': 'no_imagery'}
+                    elif spec['key'] in errors:
+                        chip = {'error': errors[spec['key']]}
+                    else:
+                        chip = {'path': self.chip_path(spec['key']).relative_to(self.dir).as_posix()}
+                    entry['chips'][phase][kind] = {'key': spec['key'], **chip}
+            entries.append(entry)
+
+        bundle = {
+            'alert': alert,
+            'district': alert['district'],
+            'date': date,
+            'windows': alert_windows(date),
+            'scenes': scenes,
+            'chip_pixels': self.config['chip_pixels'],
+            'hotspots': entries,
+            'created': datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        path = self.dir / 'bundles' / f"{alert['district']}_{date}_{alert.get('rule', 'alert')}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(bundle, f, indent=2)
+        return path
+
+
+def alert_date(alert: Dict) -> str:
+    """Analysis date of an alert_engine alert or a stored analysis alert"""
+    return alert.get('date') or alert['analysis_date']
+
+
+def load_bundle(path: Path) -> Dict:
+    """A bundle manifest with chip paths resolved against the evidence directory"""
+    path = Path(path)
+    with open(path, 'r') as f:
+        bundle = json.load(f)
+    root = path.parent.parent
+    for hotspot in bundle['hotspots']:
+        for phase in hotspot['chips'].values():
+            for chip in phase.values():
+                if 'path' in chip:
+                    chip['path'] = str(root / chip['path'])
+    return bundle
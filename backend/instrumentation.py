@@ -0,0 +1,383 @@
+"""
+Hot-path instrumentation
+Stage spans, counters and latency histograms for the analysis pipeline,
+exported as Prometheus text and as an optional Chrome/Perfetto JSON trace,
+plus a cProfile and collapsed-stack profiler for a whole run
+
+    with span('probe_scenes', district='Jodhpur'):
+        ...
+
+    @traced('save_results')
+    def save_results(...):
+        ...
+
+Only the standard library is used, so importing this module is cheap
+everywhere (CLI, workers, dashboard, results API).
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import write_text
+from config import METRICS_CONFIG
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_histograms: Dict[str, Dict[LabelKey, List]] = {}  # [bucket counts..., sum, count]
+_help: Dict[str, str] = {}
+_trace: Optional[List[Dict]] = None
+_trace_origin = time.perf_counter()
+_textfile_written: Dict[Path, float] = {}  # Last write_prometheus per path (monotonic)
+_local = threading.local()
+
+
+def _labels(labels: Dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _metric(name: str) -> str:
+    return f"{METRICS_CONFIG['namespace']}_{name}"
+
+
+def count(name: str, value: float = 1, help: str = '', **labels):
+    """Increase a counter"""
+    name = _metric(name)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+        if help:
+            _help.setdefault(name, help)
+
+
+def observe(name: str, value: float, help: str = '', **labels):
+    """Record a value (seconds) in a histogram with METRICS_CONFIG['buckets']"""
+    name = _metric(name)
+    buckets = METRICS_CONFIG['buckets']
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        key = _labels(labels)
+        state = series.get(key)
+        if state is None:
+            state = series[key] = [0] * len(buckets) + [0.0, 0]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+        if help:
+            _help.setdefault(name, help)
+
+
+@contextmanager
+def span(stage: str, **labels):
+    """
+    Time a stage
+
+    Observes stage_seconds{stage=...} and, while a trace is being
+    recorded, adds a complete event nested under the enclosing span.
+    """
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(stage)
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        observe('stage_seconds', elapsed, help='Duration of pipeline stages', stage=stage)
+        if failed:
+            count('stage_errors_total', help='Pipeline stages that raised', stage=stage)
+        if _trace is not None:
+            event = {
+                'name': stage,
+                'cat': stack[0] if stack else stage,
+                'ph': 'X',
+                'ts': (start - _trace_origin) * 1e6,
+                'dur': elapsed * 1e6,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': dict(labels, error=True) if failed else labels,
+            }
+            with _lock:
+                _trace.append(event)
+
+
+def traced(stage: Optional[str] = None):
+    """Decorator form of span (stage defaults to the function name)"""
+    def decorator(func):
+        name = stage or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ----------------------------------------------------------------------
+# Earth Engine request hooks
+# ----------------------------------------------------------------------
+
+EE_METHODS = ('computeValue', 'getMapId', 'computePixels', 'getAlgorithms')
+
+
+def _response_bytes(response) -> int:
+    if isinstance(response, bytes):  # computePixels
+        return len(response)
+    try:
+        return len(json.dumps(response, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _instrument_retries():
+    """Count the retryable responses of googleapiclient's retry loop"""
+    try:
+        from googleapiclient import http
+    except ImportError:
+        return
+    original = getattr(http, '_should_retry_response', None)
+    if original is None or getattr(original, '_instrumented', False):
+        return
+
+    def should_retry(resp_status, content, *args, **kwargs):
+        retry = original(resp_status, content, *args, **kwargs)
+        if retry:
+            count('ee_retries_total', help='Retryable Earth Engine responses (retried up to num_retries)',
+                  status=resp_status)
+        return retry
+
+    should_retry._instrumented = True
+    http._should_retry_response = should_retry
+
+
+def instrument_ee():
+    """
+    Count and time every Earth Engine request
+
+    Wraps the ee.data request functions (outside any active cassette, so
+    replayed latency is measured too). Exports ee_requests_total,
+    ee_request_seconds, ee_response_bytes_total and ee_errors_total, whose
+    'kind' is 'rate_limited' for requests still rate limited after the
+    client's retries. The retries themselves happen inside googleapiclient,
+    below ee.data: ee_retries_total counts every response its retry loop
+    treats as retryable (429, 5xx, rate-limit 403), by status; when the
+    retries run out the last one is counted too.
+    """
+    import ee
+
+    _instrument_retries()
+    for method in EE_METHODS:
+        original = getattr(ee.data, method)
+        if getattr(original, '_instrumented', False):
+            continue
+
+        def wrapper(*args, _original=original, _method=method, **kwargs):
+            start = time.perf_counter()
+            try:
+                with span(f'ee.{_method}'):
+                    response = _original(*args, **kwargs)
+            except Exception as e:
+                kind = 'rate_limited' if '429' in str(e) or 'Too Many Requests' in str(e) else 'error'
+                count('ee_errors_total', help='Failed Earth Engine requests', method=_method, kind=kind)
+                raise
+            finally:
+                count('ee_requests_total', help='Earth Engine requests', method=_method)
+                observe('ee_request_seconds', time.perf_counter() - start,
+                        help='Earth Engine request latency', method=_method)
+            count('ee_response_bytes_total', _response_bytes(response),
+                  help='Serialized Earth Engine response size', method=_method)
+            return response
+
+        wrapper._instrumented = True
+        setattr(ee.data, method, wrapper)
+
+
+# ----------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------
+
+def _format_labels(key: LabelKey, extra: Tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        k + '="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for k, v in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def prometheus_text() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for name, series in sorted(_counters.items()):
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+        buckets = METRICS_CONFIG['buckets']
+        for name, series in sorted(_histograms.items()):
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, state in sorted(series.items()):
+                for bound, bucket_count in zip(buckets, state):
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {bucket_count}")
+                lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {state[-1]}")
+                lines.append(f"{name}_sum{_format_labels(key)} {state[-2]:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {state[-1]}")
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(job: str = 'cli', path: Optional[Path] = None,
+                     min_interval: float = 0.0) -> Optional[Path]:
+    """
+    Write the metrics as a node_exporter textfile (atomically)
+
+    Args:
+        job: File name under METRICS_CONFIG['textfile_dir'] ('<job>.prom')
+        path: Explicit output path instead
+        min_interval: Skip the write if this process wrote the file less
+            than this many seconds ago (for callers on a hot path)
+
+    Returns:
+        Path: The written file, or None if throttled
+    """
+    path = Path(path or Path(METRICS_CONFIG['textfile_dir']) / f"{job}.prom")
+    now = time.monotonic()
+    with _lock:
+        if min_interval and now - _textfile_written.get(path, -min_interval) < min_interval:
+            return None
+        _textfile_written[path] = now
+    write_text(path, prometheus_text())  # Concurrent threads and processes may write the same job
+    return path
+
+
+def reset():
+    """Drop all recorded metrics"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def start_trace():
+    """Record span events from now on (kept in memory until write_trace)"""
+    global _trace, _trace_origin
+    with _lock:
+        _trace = []
+        _trace_origin = time.perf_counter()
+
+
+def write_trace(path: Optional[Path] = None) -> Optional[Path]:
+    """
+    Write the recorded span events as a Chrome trace (chrome://tracing, Perfetto)
+
+    Returns:
+        Path: The written file, or None if no trace was started
+    """
+    global _trace
+    with _lock:
+        events, _trace = _trace, None
+    if events is None:
+        return None
+    path = Path(path or Path(METRICS_CONFIG['trace_dir']) / f"trace_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return path
+
+
+# ----------------------------------------------------------------------
+# Whole-run profiling
+# ----------------------------------------------------------------------
+
+class StackSampler:
+    """
+    Sampling profiler producing collapsed stacks
+
+    A daemon thread samples every other thread's stack at a fixed interval;
+    the output ('frame;frame;frame count' per line) feeds flamegraph.pl or
+    speedscope directly.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or METRICS_CONFIG['sample_interval']
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path: Path):
+        with open(path, 'w') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+
+@contextmanager
+def profile_run(prefix: Optional[Path] = None):
+    """
+    Profile everything in the block
+
+    Writes <prefix>.prof (cProfile, for pstats / snakeviz) and
+    <prefix>.collapsed (sampled collapsed stacks, for flame graphs).
+
+    Args:
+        prefix: Output path without suffix (default: METRICS_CONFIG['profile_dir']/profile_<time>)
+    """
+    prefix = Path(prefix or Path(METRICS_CONFIG['profile_dir']) / f"profile_{time.strftime('%Y%m%d_%H%M%S')}")
+    prefix.parent.mkdir(parents=True, exist_ok=True)
+    profiler = cProfile.Profile()
+    sampler = StackSampler()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield prefix
+    finally:
+        profiler.disable()
+        sampler.stop()
+        profiler.dump_stats(str(prefix.with_suffix('.prof')))
+        sampler.write(prefix.with_suffix('.collapsed'))
+        print(f"🔥 Profile saved to {prefix}.prof and {prefix}.collapsed")
@@ -0,0 +1,356 @@
+"""
+SQLite-backed job queue for horizontally scaled analysis workers
+One job per AOI and week, with leases and heartbeats so jobs held by
+crashed workers are reclaimed, and idempotent result writes
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+from config import QUEUE_CONFIG
+from result_types import AnalysisResult, decode_result, encode_result
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    aoi TEXT NOT NULL,
+    week TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE (aoi, week)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, lease_expires);
+CREATE TABLE IF NOT EXISTS results (
+    aoi TEXT NOT NULL,
+    week TEXT NOT NULL,
+    job_id INTEGER NOT NULL,
+    result BLOB NOT NULL,
+    written REAL NOT NULL,
+    PRIMARY KEY (aoi, week)
+);
+"""
+
+
+class LeaseLost(Exception):
+    """The worker no longer holds the lease on its job"""
+
+
+class JobQueue:
+    """
+    Job queue in a SQLite database in WAL mode
+
+    Job states: pending -> running -> done | failed. A running job whose
+    lease expires (its worker stopped heartbeating) is claimable again. A
+    deferred pending job keeps lease_expires as the time it becomes claimable.
+    Every connection is short-lived, so many processes on one machine or a
+    shared filesystem can use the same database.
+    """
+
+    def __init__(self, path: Optional[Path] = None, queue_config: Optional[Dict] = None):
+        self.config = queue_config or QUEUE_CONFIG
+        self.path = Path(path or self.config['path'])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit mode: write transactions are opened explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, aoi: str, week: str) -> bool:
+        """Add a job; returns False if the AOI/week job already exists"""
+        return self.enqueue_many([(aoi, week)]) == 1
+
+    def enqueue_many(self, jobs: Iterable[tuple]) -> int:
+        """Add (aoi, week) jobs in one transaction; returns the number added"""
+        now = time.time()
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT OR IGNORE INTO jobs (aoi, week, created, updated) VALUES (?, ?, ?, ?)',
+                [(aoi, week, now, now) for aoi, week in jobs]
+            )
+            conn.execute('COMMIT')
+            return conn.total_changes - before
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """
+        Lease the next available job
+
+        Pending jobs (once their deferral has passed) and running jobs with
+        expired leases are eligible, oldest week first. Jobs out of attempts
+        are marked failed instead.
+
+        Returns:
+            Dict: The claimed job row, or None if nothing is available
+        """
+        with self._connect() as conn:
+            while True:
+                now = time.time()
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute(
+                    """SELECT * FROM jobs
+                       WHERE (status = 'pending' AND (lease_expires IS NULL OR lease_expires <= ?))
+                          OR (status = 'running' AND lease_expires < ?)
+                       ORDER BY week, id LIMIT 1""",
+                    (now, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+
+                if row['attempts'] >= self.config['max_attempts']:
+                    conn.execute(
+                        """UPDATE jobs SET status = 'failed', lease_owner = NULL,
+                           error = COALESCE(error, 'lease expired'), updated = ?
+                           WHERE id = ?""",
+                        (now, row['id'])
+                    )
+                    conn.execute('COMMIT')
+                    continue
+
+                conn.execute(
+                    """UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ?,
+                       attempts = attempts + 1, updated = ? WHERE id = ?""",
+                    (worker_id, now + self.config['lease_seconds'], now, row['id'])
+                )
+                conn.execute('COMMIT')
+                job = dict(row)
+                job['attempts'] += 1
+                return job
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extend a lease; returns False if the worker no longer holds it"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET lease_expires = ?, updated = ?
+                   WHERE id = ? AND lease_owner = ? AND status = 'running'""",
+                (now + self.config['lease_seconds'], now, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job: Dict, worker_id: str, result: Union[Dict, AnalysisResult]) -> bool:
+        """
+        Store a job result and mark the job done
+
+        The write is idempotent: the first result for an AOI/week wins, so a
+        job re-run after a lease expiry can never overwrite or duplicate it.
+        Only the current lease owner may complete a job. Results are stored
+        in the result_types binary codec, without image handles.
+
+        Returns:
+            bool: True if this call stored the result
+
+        Raises:
+            LeaseLost: The job is no longer running under worker_id's lease
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute(
+                """UPDATE jobs SET status = 'done', lease_owner = NULL, error = NULL, updated = ?
+                   WHERE id = ? AND lease_owner = ? AND status = 'running'""",
+                (now, job['id'], worker_id)
+            )
+            if cursor.rowcount != 1:
+                conn.execute('ROLLBACK')
+                raise LeaseLost(f"Lease on job {job['id']} is held by another worker")
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO results (aoi, week, job_id, result, written) VALUES (?, ?, ?, ?, ?)',
+                (job['aoi'], job['week'], job['id'], encode_result(result), now)
+            )
+            stored = cursor.rowcount == 1
+            conn.execute('COMMIT')
+            return stored
+
+    def fail(self, job: Dict, worker_id: str, error: str):
+        """Release a failed job for retry, or mark it failed when out of attempts"""
+        now = time.time()
+        status = 'failed' if job['attempts'] >= self.config['max_attempts'] else 'pending'
+        with self._connect() as conn:
+            conn.execute(
+                """UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL,
+                   error = ?, updated = ? WHERE id = ? AND lease_owner = ?""",
+                (status, error[:1000], now, job['id'], worker_id)
+            )
+
+    def defer(self, job: Dict, worker_id: str, delay: float, reason: str):
+        """
+        Release a job to be run again after a delay, without using up an attempt
+
+        For jobs that ran fine but could not produce a final result yet (no
+        imagery for the week so far).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """UPDATE jobs SET status = 'pending', lease_owner = NULL, lease_expires = ?,
+                   attempts = attempts - 1, error = ?, updated = ?
+                   WHERE id = ? AND lease_owner = ? AND status = 'running'""",
+                (now + delay, reason, now, job['id'], worker_id)
+            )
+
+    def get_result(self, aoi: str, week: str) -> Optional[Dict]:
+        """Stored result for an AOI/week, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT result FROM results WHERE aoi = ? AND week = ?', (aoi, week)
+            ).fetchone()
+        if row is None:
+            return None
+        if isinstance(row['result'], bytes):
+            return decode_result(row['result']).to_dict()
+        return json.loads(row['result'])  # Written before the binary codec
+
+    def stats(self) -> Dict[str, int]:
+        """Job counts by status"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status').fetchall()
+        counts = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        counts.update({row['status']: row['n'] for row in rows})
+        return counts
+
+
+def imagery_final(week: str, wait_days: Optional[float] = None) -> bool:
+    """Whether a week ended long enough ago that missing imagery will not arrive any more"""
+    wait_days = QUEUE_CONFIG['imagery_wait_days'] if wait_days is None else wait_days
+    ended = datetime.strptime(week, '%Y-%m-%d')
+    return datetime.now() - ended >= timedelta(days=wait_days)
+
+
+def default_worker_id() -> str:
+    """host:pid identifier for lease ownership"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class _Heartbeat:
+    """Background lease renewal while a job runs"""
+
+    def __init__(self, queue: JobQueue, job: Dict, worker_id: str, interval: float):
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(queue, job['id'], worker_id, interval), daemon=True
+        )
+
+    def _run(self, queue: JobQueue, job_id: int, worker_id: str, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                if not queue.heartbeat(job_id, worker_id):
+                    self.lost.set()
+                    return
+            except sqlite3.Error as e:
+                print(f"⚠️  Heartbeat failed: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(queue: Optional[JobQueue] = None, worker_id: Optional[str] = None,
+               exit_when_idle: bool = False, max_jobs: Optional[int] = None,
+               analyze=None) -> int:
+    """
+    Pull and execute analyze_district jobs until stopped
+
+    Results and loss events are written before the job is marked done (both
+    writes are idempotent), so a crash in between only re-runs the job. A
+    week without imagery yet is deferred by QUEUE_CONFIG['retry_delay_seconds']
+    until QUEUE_CONFIG['imagery_wait_days'] after it ended.
+
+    Args:
+        queue: Job queue (default: QUEUE_CONFIG['path'])
+        worker_id: Lease owner name (default: host:pid)
+        exit_when_idle: Return when no job is available instead of polling
+        max_jobs: Stop after this many jobs
+        analyze: Callable (aoi, week) -> result dict; defaults to a warm
+            VegetationMonitor.analyze_district
+
+    Returns:
+        int: Number of jobs executed
+    """
+    queue = queue or JobQueue()
+    worker_id = worker_id or default_worker_id()
+
+    if analyze is None:
+        from vegetation_monitor import VegetationMonitor
+        from results_store import save_results
+        from loss_events import store_loss_events
+        monitor = VegetationMonitor()
+
+        def analyze(aoi, week):
+            return monitor.analyze_district(aoi, as_of=week)
+    else:
+        save_results = None
+
+    print(f"👷 Worker {worker_id} started ({queue.path})")
+    executed = 0
+    while max_jobs is None or executed < max_jobs:
+        job = queue.claim(worker_id)
+        if job is None:
+            if exit_when_idle:
+                break
+            time.sleep(queue.config['poll_seconds'])
+            continue
+
+        print(f"▶️  {job['aoi']} week ending {job['week']} (attempt {job['attempts']})")
+        try:
+            with _Heartbeat(queue, job, worker_id, queue.config['heartbeat_seconds']) as heartbeat:
+                results = analyze(job['aoi'], job['week'])
+            if heartbeat.lost.is_set():
+                raise LeaseLost(f"Lease on job {job['id']} was lost")
+
+            if results.get('status') == 'no_imagery' and not imagery_final(job['week']):
+                delay = queue.config['retry_delay_seconds']
+                queue.defer(job, worker_id, delay, 'no imagery yet')
+                print(f"⏳ {job['aoi']} {job['week']} has no imagery yet; retrying in {delay / 3600:.1f} h")
+                executed += 1
+                continue
+
+            if save_results is not None:
+                save_results({job['aoi']: results})
+                store_loss_events(results)
+            if queue.complete(job, worker_id, results):
+                print(f"✓ {job['aoi']} {job['week']} done")
+            else:
+                print(f"✓ {job['aoi']} {job['week']} already stored by another worker")
+        except LeaseLost as e:
+            print(f"⚠️  {e}; result discarded")
+        except Exception as e:
+            print(f"✗ {job['aoi']} {job['week']} failed: {e}")
+            queue.fail(job, worker_id, str(e))
+        executed += 1
+
+    return executed
@@ -0,0 +1,178 @@
+"""
+Local per-pixel compositing with SCL cloud and shadow masking
+Local equivalent of the Earth Engine collection.median() weekly composite
+"""
+
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+from config import COMPOSITE_CONFIG
+from tile_executor import TileExecutor
+
+
+SCL_BAND = 'SCL'
+
+
+def scl_valid(scl: np.ndarray) -> np.ndarray:
+    """Boolean raster, True where the scene classification is clear land"""
+    return ~np.isin(scl, COMPOSITE_CONFIG['scl_exclude'])
+
+
+def _check_grid(scene: Dict[str, np.ndarray], shape, index: int):
+    """Scenes of a composite must be on one AOI grid (see safe_reader.read_scenes)"""
+    for band, array in scene.items():
+        if np.shape(array) != shape:
+            raise ValueError(
+                f"Scene {index} band {band} has shape {np.shape(array)}, expected {shape}: "
+                f"composite scenes must share one AOI grid (mosaic granules with safe_reader.read_scenes)"
+            )
+
+
+def _median_tile(arrays: Dict[str, np.ndarray], n_scenes: int,
+                 bands: List[str]) -> Dict[str, np.ndarray]:
+    """NaN-aware per-pixel median of one row tile across all scenes"""
+    valid = np.stack([scl_valid(arrays[f'{i}:{SCL_BAND}']) for i in range(n_scenes)])
+    rows, cols = valid.shape[1:]
+
+    count = valid.sum(axis=0, dtype=np.intp)
+    # Sorting puts NaN last, so the median of k clear values sits at (k-1)//2 and k//2
+    lower = np.maximum((count - 1) // 2, 0)[np.newaxis]
+    upper = (count // 2)[np.newaxis]
+    never_clear = count == 0
+
+    out = {}
+    stack = np.empty((n_scenes, rows, cols), dtype=np.float32)
+    for band in bands:
+        for i in range(n_scenes):
+            stack[i] = arrays[f'{i}:{band}']
+        stack[~valid] = np.nan
+        stack.sort(axis=0)
+        median = np.take_along_axis(stack, lower, axis=0)[0]
+        median += np.take_along_axis(stack, upper, axis=0)[0]
+        median *= 0.5
+        median[never_clear] = np.nan
+        out[band] = median
+    out['count'] = count.astype(np.uint16)
+    return out
+
+
+def median_composite(scenes: List[Dict[str, np.ndarray]], bands: Optional[List[str]] = None,
+                     executor: Optional[TileExecutor] = None) -> Dict[str, np.ndarray]:
+    """
+    Per-pixel NaN-aware median of a week's scenes
+
+    Cloud, shadow and no-data pixels (per SCL) are excluded before the
+    median. The scene stack is built one row tile at a time, so only
+    n_scenes x tile_rows x cols values are held per band.
+
+    Args:
+        scenes: Band rasters of each scene (same AOI grid), each with an 'SCL' band
+        bands: Bands to composite, defaults to every non-SCL band of the first scene
+        executor: Optional TileExecutor to spread tiles over processes
+
+    Returns:
+        Dict[str, np.ndarray]: Band -> float32 composite (NaN where never clear),
+        plus 'count' with the number of clear observations per pixel
+    """
+    if not scenes:
+        raise ValueError("No scenes to composite")
+    bands = bands or [band for band in scenes[0] if band != SCL_BAND]
+
+    arrays = {}
+    shape = np.shape(scenes[0][SCL_BAND])
+    for i, scene in enumerate(scenes):
+        _check_grid(scene, shape, i)
+        for band in bands + [SCL_BAND]:
+            if band not in scene:
+                raise ValueError(f"Scene {i} is missing band {band}")
+            arrays[f'{i}:{band}'] = scene[band]
+
+    if executor is None:
+        with TileExecutor(tile_rows=COMPOSITE_CONFIG['tile_rows']) as executor:
+            tiles = executor.map(_median_tile, arrays, n_scenes=len(scenes), bands=bands)
+    else:
+        tiles = executor.map(_median_tile, arrays, n_scenes=len(scenes), bands=bands)
+    return {key: np.concatenate([tile[key] for tile in tiles]) for key in tiles[0]}
+
+
+def greenest_composite(scenes: Iterable[Dict[str, np.ndarray]],
+                       bands: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Streaming greenest-pixel (max NDVI) composite
+
+    Scenes are consumed one at a time, so memory stays at one scene plus the
+    running composite regardless of how many scenes the week has.
+
+    Args:
+        scenes: Iterable of band rasters with 'B4', 'B8' and 'SCL'
+        bands: Bands to keep, defaults to every non-SCL band of the first scene
+
+    Returns:
+        Dict[str, np.ndarray]: Band -> float32 composite (NaN where never clear),
+        plus 'count' with the number of clear observations per pixel
+    """
+    out = None
+    best_ndvi = None
+
+    for i, scene in enumerate(scenes):
+        if out is None:
+            bands = bands or [band for band in scene if band != SCL_BAND]
+            shape = scene[SCL_BAND].shape
+            out = {band: np.full(shape, np.nan, dtype=np.float32) for band in bands}
+            out['count'] = np.zeros(shape, dtype=np.uint16)
+            best_ndvi = np.full(shape, -np.inf, dtype=np.float32)
+        _check_grid(scene, shape, i)
+
+        valid = scl_valid(scene[SCL_BAND])
+        nir = np.asarray(scene['B8'], dtype=np.float32)
+        red = np.asarray(scene['B4'], dtype=np.float32)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ndvi = (nir - red) / (nir + red)
+
+        better = valid & (ndvi > best_ndvi)
+        best_ndvi[better] = ndvi[better]
+        for band in bands:
+            out[band][better] = np.asarray(scene[band])[better]
+        out['count'] += valid
+
+    if out is None:
+        raise ValueError("No scenes to composite")
+    return out
+
+
+def composite(scenes: Iterable[Dict[str, np.ndarray]], method: Optional[str] = None,
+              bands: Optional[List[str]] = None,
+              executor: Optional[TileExecutor] = None) -> Dict[str, np.ndarray]:
+    """Composite scenes with COMPOSITE_CONFIG['method'] unless overridden"""
+    method = method or COMPOSITE_CONFIG['method']
+    if method == 'median':
+        return median_composite(list(scenes), bands, executor)
+    if method == 'greenest':
+        return greenest_composite(scenes, bands)
+    raise ValueError(f"Unknown composite method: {method}")
+
+
+def weekly_composite(safe_dir, bbox: List[float], start_date: str, end_date: str,
+                     method: Optional[str] = None,
+                     executor: Optional[TileExecutor] = None) -> Dict[str, np.ndarray]:
+    """
+    Composite all local SAFE products of a week for an AOI
+
+    Every pass is first mosaicked onto one AOI grid, so the composite only
+    ever combines rasters of the same pixels.
+
+    Args:
+        safe_dir: Directory containing .SAFE products
+        bbox: [min_lon, min_lat, max_lon, max_lat]
+        start_date: Start date in 'YYYY-MM-DD' format
+        end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        method: 'median' or 'greenest'
+
+    Returns:
+        Dict[str, np.ndarray]: Composite bands ready for LocalRasterEngine
+    """
+    # Imported here so compositing synthetic/in-memory scenes does not need GDAL
+    from safe_reader import aoi_grid, read_scenes
+
+    scenes = read_scenes(safe_dir, bbox, start_date, end_date, grid=aoi_grid(bbox))
+    return composite(scenes, method, executor=executor)
@@ -0,0 +1,236 @@
+"""
+Local raster engine
+Runs the week-over-week analysis on local NumPy band rasters, producing the
+same result structure as VegetationMonitor.analyze_district without Earth Engine
+"""
+
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import band_math
+from config import SATELLITE_CONFIG, LOCAL_ENGINE_CONFIG
+from alert_engine import threshold_alert
+from spectral_indices import index_exprs, resolve_indices, required_bands
+from tile_executor import TileExecutor
+
+
+# NDVI drop that counts a pixel as vegetation loss (same as the EE path)
+LOSS_THRESHOLD = -0.1
+
+# Value range covered by the percentile histograms (indices are clipped into it)
+HISTOGRAM_RANGE = (-1.0, 1.0)
+
+
+@lru_cache(maxsize=None)
+def _tile_program(index_names: Tuple[str, ...], has_mask: bool) -> band_math.Program:
+    """
+    Fused program for the current, previous and change rasters of every index
+    plus the NDVI loss mask, NaN where excluded by the vegetation mask
+    """
+    current = index_exprs(index_names, 'current:')
+    previous = index_exprs(index_names, 'previous:')
+    mask = band_math.band('mask', dtype=bool) if has_mask else None
+
+    outputs = {}
+    for name in index_names:
+        cur, prev = current[name], previous[name]
+        if mask is not None:
+            cur, prev = band_math.masked(cur, mask), band_math.masked(prev, mask)
+        outputs[f'current:{name}'] = cur
+        outputs[f'previous:{name}'] = prev
+        outputs[f'change:{name}'] = cur - prev
+    outputs['loss'] = outputs['change:NDVI'] < LOSS_THRESHOLD
+    return band_math.Program(outputs)
+
+
+def _analyze_tile(arrays: Dict[str, np.ndarray], index_names: List[str],
+                  bins: int) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Partial aggregates for one tile
+
+    Sums, counts, extrema and histograms can be added across tiles, so the
+    parent merges them into exact means/extrema and histogram percentiles.
+    Index, change and loss rasters are never materialized: each block of
+    the fused program is fed straight into the reducers.
+    """
+    program = _tile_program(tuple(index_names), 'mask' in arrays)
+    reducers = {'loss': band_math.Count()}
+    for name in index_names:
+        reducers[f'current:{name}'] = band_math.Summary(bins, HISTOGRAM_RANGE)
+        reducers[f'previous:{name}'] = band_math.CountSum()
+        reducers[f'change:{name}'] = band_math.Summary(None)
+    reduced = program.reduce(arrays, reducers)
+
+    partials = {}
+    for name in index_names:
+        prev_count, prev_sum = reduced[f'previous:{name}']
+        partials[name] = {
+            'current': reduced[f'current:{name}'],
+            'previous_count': prev_count,
+            'previous_sum': prev_sum,
+            'change': reduced[f'change:{name}'],
+        }
+    partials['NDVI']['loss_pixels'] = reduced['loss']
+    return partials
+
+
+def _merge_summaries(summaries: List[Dict]) -> Dict:
+    merged = {
+        'count': sum(s['count'] for s in summaries),
+        'sum': sum(s['sum'] for s in summaries),
+        'sumsq': sum(s['sumsq'] for s in summaries),
+        'min': min(s['min'] for s in summaries),
+        'max': max(s['max'] for s in summaries),
+    }
+    if 'histogram' in summaries[0]:
+        merged['histogram'] = np.sum([s['histogram'] for s in summaries], axis=0)
+    return merged
+
+
+def _histogram_percentiles(histogram: np.ndarray, percentiles: List[float]) -> List[Optional[float]]:
+    """Percentiles from a merged histogram (bin-centre resolution)"""
+    total = histogram.sum()
+    if total == 0:
+        return [None] * len(percentiles)
+    edges = np.linspace(*HISTOGRAM_RANGE, len(histogram) + 1)
+    centres = (edges[:-1] + edges[1:]) / 2
+    cumulative = np.cumsum(histogram)
+    return [float(centres[np.searchsorted(cumulative, total * p / 100.0)]) for p in percentiles]
+
+
+class LocalRasterEngine:
+    """Vectorized vegetation analysis over local band rasters"""
+
+    def __init__(self, index_names: Optional[List[str]] = None, workers: Optional[int] = None):
+        self.index_names = resolve_indices(index_names)
+        self.scale = SATELLITE_CONFIG['scale']
+        self.executor = TileExecutor(workers=workers)
+
+    def close(self):
+        """Release the worker pool"""
+        self.executor.close()
+
+    @property
+    def pixel_area_hectares(self) -> float:
+        """Area of one pixel in hectares"""
+        return (self.scale * self.scale) / 10000.0
+
+    def calculate_indices(self, bands: Dict[str, np.ndarray],
+                          mask: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Calculate all configured indices in one pass
+
+        Args:
+            bands: Band name -> raster of Sentinel-2 digital numbers
+            mask: Optional boolean raster, False where pixels are excluded
+
+        Returns:
+            Dict[str, np.ndarray]: Index name -> float32 raster, NaN where masked
+        """
+        exprs = index_exprs(self.index_names)
+        if mask is not None:
+            bands = {**bands, 'mask': mask}
+            exprs = {name: band_math.masked(expr, band_math.band('mask', dtype=bool))
+                     for name, expr in exprs.items()}
+        return band_math.Program(exprs).evaluate(bands)
+
+    def analyze_arrays(self, district_name: str,
+                       current_bands: Dict[str, np.ndarray],
+                       previous_bands: Dict[str, np.ndarray],
+                       current_period: Tuple[str, str],
+                       previous_period: Tuple[str, str],
+                       mask: Optional[np.ndarray] = None) -> Dict:
+        """
+        Analyze vegetation change between two local composites
+
+        Rasters are processed in row tiles (in parallel for large AOIs) and the
+        per-tile partial aggregates are merged here. Percentiles come from a
+        merged histogram with LOCAL_ENGINE_CONFIG['histogram_bins'] bins.
+
+        Args:
+            district_name: Name of the AOI
+            current_bands: Band rasters of the current week composite
+            previous_bands: Band rasters of the previous week composite
+            current_period: (start, end) dates of the current week
+            previous_period: (start, end) dates of the previous week
+            mask: Optional vegetation-capable mask (see vegetation_mask)
+
+        Returns:
+            Dict containing analysis results in the analyze_district format
+        """
+        needed = required_bands(self.index_names)
+        arrays = {}
+        for band in needed:
+            arrays[f'current:{band}'] = current_bands[band]
+            arrays[f'previous:{band}'] = previous_bands[band]
+        if mask is not None:
+            arrays['mask'] = mask
+
+        partials = self.executor.map(
+            _analyze_tile, arrays,
+            index_names=self.index_names,
+            bins=LOCAL_ENGINE_CONFIG['histogram_bins']
+        )
+
+        indices = {}
+        for name in self.index_names:
+            tiles = [partial[name] for partial in partials]
+            current = _merge_summaries([t['current'] for t in tiles])
+            change = _merge_summaries([t['change'] for t in tiles])
+            previous_count = sum(t['previous_count'] for t in tiles)
+            previous_sum = sum(t['previous_sum'] for t in tiles)
+
+            indices[name] = {
+                'current_mean': current['sum'] / current['count'] if current['count'] else None,
+                'current_median': _histogram_percentiles(current['histogram'], [50])[0],
+                'previous_mean': previous_sum / previous_count if previous_count else None,
+                'change_mean': change['sum'] / change['count'] if change['count'] else None,
+                'change_min': change['min'] if change['count'] else None,
+                'change_max': change['max'] if change['count'] else None,
+            }
+            if name == 'NDVI':
+                ndvi_current = current
+                loss_pixels = sum(t['loss_pixels'] for t in tiles)
+
+        ndvi_std = None
+        if ndvi_current['count']:
+            mean = ndvi_current['sum'] / ndvi_current['count']
+            ndvi_std = float(np.sqrt(max(ndvi_current['sumsq'] / ndvi_current['count'] - mean * mean, 0.0)))
+        p10, p50, p90 = _histogram_percentiles(ndvi_current['histogram'], [10, 50, 90])
+
+        results = {
+            'district': district_name,
+            'analysis_date': current_period[1],
+            'current_week': {
+                'start': current_period[0],
+                'end': current_period[1],
+                'ndvi_mean': indices['NDVI']['current_mean'],
+                'ndvi_std': ndvi_std,
+                'ndvi_p10': p10,
+                'ndvi_median': p50,
+                'ndvi_p90': p90,
+            },
+            'previous_week': {
+                'start': previous_period[0],
+                'end': previous_period[1],
+                'ndvi_mean': indices['NDVI']['previous_mean'],
+            },
+            'change': {
+                'ndvi_change_mean': indices['NDVI']['change_mean'],
+                'ndvi_change_min': indices['NDVI']['change_min'],
+                'ndvi_change_max': indices['NDVI']['change_max'],
+                'vegetation_loss_area_hectares': loss_pixels * self.pixel_area_hectares,
+            },
+            'indices': indices,
+            'vegetation_mask': 'local' if mask is not None else None,
+        }
+
+        change_mean = results['change']['ndvi_change_mean']
+        previous_mean = results['previous_week']['ndvi_mean']
+        if change_mean is not None and previous_mean:
+            alert = threshold_alert(change_mean / previous_mean * 100)
+            if alert is not None:
+                results['alert'] = alert
+
+        return results
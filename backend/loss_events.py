@@ -0,0 +1,563 @@
+"""
+Spatio-temporal store of detected vegetation loss events
+Every extracted loss polygon (hotspot) is one row, indexed by a SQLite
+R*Tree over its bbox and a B-tree over its day, so bbox / radius +
+date-range queries, nearest-event lookups and per-cell aggregation for
+zoomed-out map views stay in milliseconds over millions of events
+
+    store = LossEventStore()
+    store.add_events(extract_loss_events(results['images']['ndvi_change'], 'Jodhpur', '2024-06-10'))
+    store.within_radius(73.02, 26.28, radius_km=2, start='2024-03-01')
+"""
+
+import json
+import math
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import DISTRICTS, LOSS_EVENTS_CONFIG, SATELLITE_CONFIG
+
+
+EARTH_RADIUS_KM = 6371.0088
+EPOCH = date(1970, 1, 1)
+# Day bounds used when a query has no date range
+MIN_DAY, MAX_DAY = -10**6, 10**6
+# 1970-01-01 was a Thursday: week n starts on the Monday at day 7n - 3
+WEEK_OFFSET = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    aoi TEXT NOT NULL,
+    date TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    min_lon REAL NOT NULL,
+    min_lat REAL NOT NULL,
+    max_lon REAL NOT NULL,
+    max_lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    lat REAL NOT NULL,
+    area_hectares REAL NOT NULL,
+    ndvi_change REAL,
+    source TEXT,
+    geometry TEXT,
+    UNIQUE (aoi, date, min_lon, min_lat, max_lon, max_lat)
+);
+CREATE INDEX IF NOT EXISTS events_day ON events (day);
+CREATE INDEX IF NOT EXISTS events_aoi_day ON events (aoi, day);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_rtree USING rtree (
+    id, min_lon, max_lon, min_lat, max_lat
+);
+CREATE TABLE IF NOT EXISTS event_cells (
+    level INTEGER NOT NULL,
+    span INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    cx INTEGER NOT NULL,
+    cy INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    area_hectares REAL NOT NULL,
+    PRIMARY KEY (level, span, bucket, cx, cy)
+) WITHOUT ROWID;
+"""
+
+EVENT_COLUMNS = ('id, aoi, date, min_lon, min_lat, max_lon, max_lat, lon, lat, '
+                 'area_hectares, ndvi_change, source')
+
+
+def day_number(value: Optional[str], default: int) -> int:
+    """Days since 1970-01-01 of a 'YYYY-MM-DD' date (default when None)"""
+    if value is None:
+        return default
+    return (datetime.strptime(value, '%Y-%m-%d').date() - EPOCH).days
+
+
+def week_number(day: int) -> int:
+    """Monday-based week index of a day number"""
+    return (day + WEEK_OFFSET) // 7
+
+
+def week_buckets(first_week: int, last_week: int, spans: List[int]) -> Dict[int, List[Tuple[int, int]]]:
+    """
+    Cover a week range with the fewest aligned buckets
+
+    A bucket of span s holds weeks [b * s, (b + 1) * s). Spans must each
+    divide the next (e.g. 1, 13, 52) and include 1.
+
+    Returns:
+        Dict span -> [(first bucket, last bucket)] contiguous bucket ranges
+    """
+    spans = sorted(spans, reverse=True)
+    ranges: Dict[int, List[Tuple[int, int]]] = {}
+    week = first_week
+    while week <= last_week:
+        span = next(s for s in spans if week % s == 0 and week + s - 1 <= last_week)
+        bucket = week // span
+        span_ranges = ranges.setdefault(span, [])
+        if span_ranges and span_ranges[-1][1] == bucket - 1:
+            span_ranges[-1] = (span_ranges[-1][0], bucket)
+        else:
+            span_ranges.append((bucket, bucket))
+        week += span
+    return ranges
+
+
+def morton_key(lon: float, lat: float, bits: int = 16) -> int:
+    """Z-order key interleaving quantized longitude and latitude bits"""
+    x = int((lon + 180.0) / 360.0 * ((1 << bits) - 1))
+    y = int((lat + 90.0) / 180.0 * ((1 << bits) - 1))
+    key = 0
+    for bit in range(bits):
+        key |= ((x >> bit) & 1) << (2 * bit) | ((y >> bit) & 1) << (2 * bit + 1)
+    return key
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    """Great-circle distance in km (scalars or NumPy arrays)"""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def distance_to_bbox_km(lon: float, lat: float, boxes) -> np.ndarray:
+    """Distance from a point to the nearest point of each bbox (0 inside)"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    nearest_lon = np.clip(lon, boxes[:, 0], boxes[:, 2])
+    nearest_lat = np.clip(lat, boxes[:, 1], boxes[:, 3])
+    return haversine_km(lon, lat, nearest_lon, nearest_lat)
+
+
+def radius_bbox(lon: float, lat: float, radius_km: float) -> List[float]:
+    """
+    Bbox enclosing a great circle of radius_km, for the R*Tree prefilter
+
+    The longitude extent is that of the circle's widest point, which lies
+    poleward of the centre: asin(sin(r) / cos(lat)) rather than
+    r / cos(lat). Circles containing a pole span all longitudes.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angle)
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    ratio = math.sin(angle) / math.cos(math.radians(lat)) if abs(lat) < 90 else 2.0
+    if min_lat <= -90.0 or max_lat >= 90.0 or angle >= math.pi / 2 or ratio >= 1.0:
+        return [-180.0, min_lat, 180.0, max_lat]
+    dlon = math.degrees(math.asin(ratio))
+    # Pad by a relative 1e-9 so points on the circle survive float rounding
+    pad = 1e-9 * max(dlat, dlon)
+    return [lon - dlon - pad, min_lat - pad, lon + dlon + pad, max_lat + pad]
+
+
+def districts_bbox(districts: Optional[Iterable[str]] = None) -> List[float]:
+    """Union of the bboxes of configured districts (default: all)"""
+    boxes = [DISTRICTS[name]['bbox'] for name in (districts or DISTRICTS)]
+    return [min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes)]
+
+
+def _event(row: sqlite3.Row) -> Dict:
+    return {
+        'id': row['id'],
+        'aoi': row['aoi'],
+        'date': row['date'],
+        'bbox': [row['min_lon'], row['min_lat'], row['max_lon'], row['max_lat']],
+        'lon': row['lon'],
+        'lat': row['lat'],
+        'area_hectares': row['area_hectares'],
+        'ndvi_change': row['ndvi_change'],
+        'source': row['source'],
+    }
+
+
+class LossEventStore:
+    """
+    Loss events in a SQLite database in WAL mode
+
+    Tables:
+        events          one row per event (bbox, centroid, area, date, GeoJSON)
+        events_rtree    R*Tree over event bboxes
+        event_cells     event counts and area per grid cell and time bucket at each
+                        LOSS_EVENTS_CONFIG['cell_levels'] size and 'cell_weeks' span,
+                        kept current on insert
+
+    Range queries go through the R*Tree or the day index, whichever is
+    more selective. Events are deduplicated on (aoi, date, bbox), so
+    re-extracting a week is harmless.
+    """
+
+    def __init__(self, path: Optional[Path] = None, events_config: Optional[Dict] = None):
+        self.config = events_config or LOSS_EVENTS_CONFIG
+        self.path = Path(path or self.config['path'])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit mode: write transactions are opened explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def add_events(self, events: Iterable[Dict]) -> int:
+        """
+        Insert events in one transaction
+
+        Args:
+            events: Dicts with 'aoi', 'date', 'bbox' [min_lon, min_lat, max_lon, max_lat],
+                'area_hectares' and optionally 'lon'/'lat' (centroid, default: bbox
+                centre), 'ndvi_change', 'source' and 'geometry' (GeoJSON)
+
+        Returns:
+            int: Number of new events (duplicates are skipped)
+        """
+        rows = []
+        for event in events:
+            min_lon, min_lat, max_lon, max_lat = event['bbox']
+            geometry = event.get('geometry')
+            rows.append((
+                event['aoi'], event['date'], day_number(event['date'], 0),
+                min_lon, min_lat, max_lon, max_lat,
+                event.get('lon', (min_lon + max_lon) / 2), event.get('lat', (min_lat + max_lat) / 2),
+                event['area_hectares'], event.get('ndvi_change'), event.get('source'),
+                json.dumps(geometry, separators=(',', ':')) if geometry is not None else None,
+            ))
+        if not rows:
+            return 0
+        # Spatially close events get adjacent rowids, so range queries read fewer pages
+        rows.sort(key=lambda row: morton_key(row[7], row[8]))
+
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            (last_id,) = conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()
+            conn.executemany(
+                """INSERT OR IGNORE INTO events (aoi, date, day, min_lon, min_lat, max_lon, max_lat,
+                   lon, lat, area_hectares, ndvi_change, source, geometry)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+            (added,) = conn.execute('SELECT COUNT(*) FROM events WHERE id > ?', (last_id,)).fetchone()
+            conn.execute(
+                """INSERT INTO events_rtree
+                   SELECT id, min_lon, max_lon, min_lat, max_lat FROM events WHERE id > ?""",
+                (last_id,)
+            )
+            for level, size in enumerate(self.config['cell_levels']):
+                for span in self.config['cell_weeks']:
+                    # Cells are keyed by event centroid; days are positive so / floors
+                    conn.execute(
+                        """INSERT INTO event_cells (level, span, bucket, cx, cy, events, area_hectares)
+                           SELECT ?, ?, (day + ?) / 7 / ?, CAST((lon + 180.0) / ? AS INTEGER),
+                                  CAST((lat + 90.0) / ? AS INTEGER), COUNT(*), SUM(area_hectares)
+                           FROM events WHERE id > ? GROUP BY 3, 4, 5
+                           ON CONFLICT (level, span, bucket, cx, cy) DO UPDATE SET
+                               events = events + excluded.events,
+                               area_hectares = area_hectares + excluded.area_hectares""",
+                        (level, span, WEEK_OFFSET, span, size, size, last_id)
+                    )
+            conn.execute('COMMIT')
+        return added
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+    def in_bbox(self, bbox: List[float], start: Optional[str] = None, end: Optional[str] = None,
+                **filters) -> List[Dict]:
+        """
+        Events intersecting a bbox within a date range, newest first
+
+        Args:
+            bbox: [min_lon, min_lat, max_lon, max_lat]
+            start: First date included ('YYYY-MM-DD'), None = no lower bound
+            end: Last date included, None = no upper bound
+            aoi: Only events of this AOI
+            min_area_hectares: Only events at least this large
+            limit: Maximum number of events
+        """
+        return [_event(row) for row in self._query(bbox, start, end, **filters)]
+
+    def _query(self, bbox: List[float], start: Optional[str] = None, end: Optional[str] = None,
+               aoi: Optional[str] = None, min_area_hectares: Optional[float] = None,
+               limit: Optional[int] = None) -> List[sqlite3.Row]:
+        """Rows of in_bbox"""
+        start_day, end_day = day_number(start, MIN_DAY), day_number(end, MAX_DAY)
+        columns = ', '.join('e.' + c for c in EVENT_COLUMNS.split(', '))
+        window = [bbox[0], bbox[2], bbox[1], bbox[3]]
+        # Exact filters on the events columns (the R*Tree stores float32 bounds rounded outwards)
+        where = ('e.max_lon >= ? AND e.min_lon <= ? AND e.max_lat >= ? AND e.min_lat <= ?'
+                 ' AND e.day BETWEEN ? AND ?')
+        params = [*window, start_day, end_day]
+        if aoi is not None:
+            where += ' AND e.aoi = ?'
+            params.append(aoi)
+        if min_area_hectares is not None:
+            where += ' AND e.area_hectares >= ?'
+            params.append(min_area_hectares)
+
+        with self._connect() as conn:
+            if self._day_index_first(conn, bbox, start_day, end_day):
+                sql = f'SELECT {columns} FROM events e WHERE {where}'
+            else:
+                sql = f"""SELECT {columns} FROM events_rtree r CROSS JOIN events e ON e.id = r.id
+                          WHERE r.max_lon >= ? AND r.min_lon <= ? AND r.max_lat >= ? AND r.min_lat <= ?
+                            AND {where}"""
+                params = window + params
+            sql += ' ORDER BY e.day DESC, e.id'
+            if limit is not None:
+                sql += ' LIMIT ?'
+                params.append(limit)
+            return conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _day_index_first(conn: sqlite3.Connection, bbox: List[float], start_day: int, end_day: int) -> bool:
+        """
+        Whether the day index is more selective than the R*Tree for a query
+
+        Compares the share of the configured districts' area covered by the
+        bbox with the share of the stored date span covered by the range.
+        """
+        stored = _day_span(conn)
+        if stored is None:
+            return False
+        first, last = stored
+        days = max(0, min(end_day, last) - max(start_day, first) + 1) / (last - first + 1)
+
+        extent = districts_bbox()
+        width = max(0.0, min(bbox[2], extent[2]) - max(bbox[0], extent[0]))
+        height = max(0.0, min(bbox[3], extent[3]) - max(bbox[1], extent[1]))
+        area = width * height / ((extent[2] - extent[0]) * (extent[3] - extent[1]))
+        return days < area
+
+    def within_radius(self, lon: float, lat: float, radius_km: float, start: Optional[str] = None,
+                      end: Optional[str] = None, **filters) -> List[Dict]:
+        """
+        Events within radius_km of a point (distance to the event's bbox), nearest first
+
+        Each event gets 'distance_km'. Other filters are those of in_bbox.
+        """
+        rows = self._query(radius_bbox(lon, lat, radius_km), start, end, **filters)
+        if not rows:
+            return []
+        # Rows are bbox-prefiltered; exact distances for all of them at once
+        distances = distance_to_bbox_km(lon, lat, [row[3:7] for row in rows])
+        events = []
+        for i in np.argsort(distances, kind='stable'):
+            if distances[i] > radius_km:
+                break
+            event = _event(rows[i])
+            event['distance_km'] = float(distances[i])
+            events.append(event)
+        return events
+
+    def nearest(self, lon: float, lat: float, k: int = 1, start: Optional[str] = None,
+                end: Optional[str] = None, max_km: Optional[float] = None, **filters) -> List[Dict]:
+        """
+        The k events nearest to a point
+
+        Searches rings of doubling radius from LOSS_EVENTS_CONFIG['nearest_start_km']
+        until k events lie inside the ring, so dense areas stay cheap.
+
+        Args:
+            max_km: Give up beyond this distance (default: LOSS_EVENTS_CONFIG['nearest_max_km'])
+        """
+        max_km = max_km or self.config['nearest_max_km']
+        radius = min(self.config['nearest_start_km'], max_km)
+        while True:
+            events = self.within_radius(lon, lat, radius, start, end, **filters)
+            if len(events) >= k or radius >= max_km:
+                return events[:k]
+            radius = min(radius * 2, max_km)
+
+    def aggregate(self, bbox: Optional[List[float]] = None, start: Optional[str] = None,
+                  end: Optional[str] = None, max_cells: Optional[int] = None,
+                  level: Optional[int] = None) -> Dict:
+        """
+        Event counts and loss area per grid cell, for zoomed-out map views
+
+        Reads the precomputed event_cells rollups at the finest level with at
+        most max_cells cells over the bbox. The date range is widened to the
+        Monday-based weeks containing start and end and covered with the
+        fewest 'cell_weeks' buckets, so long ranges read few rows per cell.
+
+        Args:
+            bbox: Area shown (default: all configured districts)
+            start: First date included
+            end: Last date included
+            max_cells: Cell budget (default: LOSS_EVENTS_CONFIG['max_cells'])
+            level: Index into LOSS_EVENTS_CONFIG['cell_levels'] instead of choosing
+
+        Returns:
+            Dict with 'cell_degrees' and 'cells': [{'bbox', 'events', 'area_hectares'}]
+        """
+        bbox = bbox or districts_bbox()
+        sizes = self.config['cell_levels']
+        if level is None:
+            max_cells = max_cells or self.config['max_cells']
+            level = len(sizes) - 1
+            for i, size in enumerate(sizes):
+                if _cell_range(bbox, size, 0)[1] * _cell_range(bbox, size, 1)[1] <= max_cells:
+                    level = i
+                    break
+        size = sizes[level]
+        (x0, nx), (y0, ny) = _cell_range(bbox, size, 0), _cell_range(bbox, size, 1)
+
+        with self._connect() as conn:
+            stored = _day_span(conn)
+            if stored is None:
+                return {'cell_degrees': size, 'cells': []}
+            first_week = week_number(max(day_number(start, MIN_DAY), stored[0]))
+            last_week = week_number(min(day_number(end, MAX_DAY), stored[1]))
+
+            parts, params = [], []
+            for weeks, ranges in week_buckets(first_week, last_week, self.config['cell_weeks']).items():
+                for first, last in ranges:
+                    parts.append("""SELECT cx, cy, events, area_hectares FROM event_cells
+                                    WHERE level = ? AND span = ? AND bucket BETWEEN ? AND ?
+                                      AND cx BETWEEN ? AND ? AND cy BETWEEN ? AND ?""")
+                    params += [level, weeks, first, last, x0, x0 + nx - 1, y0, y0 + ny - 1]
+            rows = conn.execute(
+                f"""SELECT cx, cy, SUM(events) AS events, SUM(area_hectares) AS area
+                    FROM ({' UNION ALL '.join(parts)}) GROUP BY cx, cy""",
+                params
+            ).fetchall() if parts else []
+
+        cells = [{
+            'bbox': [row['cx'] * size - 180.0, row['cy'] * size - 90.0,
+                     (row['cx'] + 1) * size - 180.0, (row['cy'] + 1) * size - 90.0],
+            'events': row['events'],
+            'area_hectares': row['area'],
+        } for row in rows]
+        return {'cell_degrees': size, 'cells': cells}
+
+    def district_summary(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Dict]:
+        """Event count and loss area per configured district within a date range"""
+        start_day, end_day = day_number(start, MIN_DAY), day_number(end, MAX_DAY)
+        summary = {}
+        with self._connect() as conn:
+            for name in DISTRICTS:
+                row = conn.execute(
+                    """SELECT COUNT(*), COALESCE(SUM(area_hectares), 0.0) FROM events
+                       WHERE aoi = ? AND day BETWEEN ? AND ?""",
+                    (name, start_day, end_day)
+                ).fetchone()
+                summary[name] = {'events': row[0], 'area_hectares': row[1]}
+        return summary
+
+    def geometry(self, event_id: int) -> Optional[Dict]:
+        """GeoJSON geometry of an event, if one was stored"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT geometry FROM events WHERE id = ?', (event_id,)).fetchone()
+        return json.loads(row['geometry']) if row and row['geometry'] else None
+
+
+def _day_span(conn: sqlite3.Connection) -> Optional[Tuple[int, int]]:
+    """(first, last) day number of the stored events, None if empty"""
+    # Separate subqueries so each is a single index seek
+    first, last = conn.execute(
+        'SELECT (SELECT MIN(day) FROM events), (SELECT MAX(day) FROM events)'
+    ).fetchone()
+    return None if first is None else (first, last)
+
+
+def _cell_range(bbox: List[float], size: float, axis: int) -> Tuple[int, int]:
+    """(first cell index, cell count) of a bbox along longitude (0) or latitude (1)"""
+    origin = 180.0 if axis == 0 else 90.0
+    first = int((bbox[axis] + origin) // size)
+    last = int((bbox[axis + 2] + origin) // size)
+    return first, last - first + 1
+
+
+def extract_loss_events(ndvi_change, district_name: str, date: str,
+                        scale: Optional[float] = None, max_events: Optional[int] = None) -> List[Dict]:
+    """
+    Vectorize the loss pixels of a week into events on Earth Engine
+
+    Connected pixels whose NDVI dropped by more than LOSS_EVENTS_CONFIG['ndvi_drop']
+    become one event with its bounding box, area and mean NDVI change
+    (reduceToVectors, one request). Events smaller than
+    LOSS_EVENTS_CONFIG['min_area_hectares'] are dropped.
+
+    Args:
+        ndvi_change: ee.Image with the week's NDVI change (results['images']['ndvi_change'])
+        district_name: AOI name in config.DISTRICTS
+        date: Analysis date of the week ('YYYY-MM-DD')
+        scale: Vectorization scale in meters (default: SATELLITE_CONFIG['scale'])
+        max_events: Largest number of events returned (default: LOSS_EVENTS_CONFIG['max_events_per_week'])
+
+    Returns:
+        List[Dict]: Events ready for LossEventStore.add_events
+    """
+    import ee
+
+    config = LOSS_EVENTS_CONFIG
+    region = ee.Geometry.Rectangle(DISTRICTS[district_name]['bbox'])
+    loss = ndvi_change.lt(-config['ndvi_drop']).selfMask()
+    vectors = loss.addBands([ee.Image.pixelArea().divide(10000), ndvi_change]).reduceToVectors(
+        geometry=region,
+        scale=scale or SATELLITE_CONFIG['scale'],
+        geometryType='bb',
+        eightConnected=True,
+        labelProperty='loss',
+        reducer=ee.Reducer.sum().combine(ee.Reducer.mean(), sharedInputs=False),
+        maxPixels=1e10,
+    )
+    vectors = vectors.filter(ee.Filter.gte('sum', config['min_area_hectares'])) \
+                     .sort('sum', False).limit(max_events or config['max_events_per_week'])
+
+    events = []
+    for feature in vectors.getInfo()['features']:
+        ring = feature['geometry']['coordinates'][0]
+        lons, lats = [p[0] for p in ring], [p[1] for p in ring]
+        events.append({
+            'aoi': district_name,
+            'date': date,
+            'bbox': [min(lons), min(lats), max(lons), max(lats)],
+            'area_hectares': feature['properties']['sum'],
+            'ndvi_change': feature['properties'].get('mean'),
+            'source': 'ee.reduceToVectors',
+            'geometry': feature['geometry'],
+        })
+    return events
+
+
+def record_loss_events(result, store: Optional['LossEventStore'] = None) -> int:
+    """
+    Extract and store the loss events of one analyze_district result
+
+    Called by the weekly runs (scheduler, queue workers) after the result is
+    saved; results without statistics or image handles are skipped.
+
+    Returns:
+        int: Number of new events
+    """
+    if result.get('status', 'ok') != 'ok' or 'images' not in result:
+        return 0
+    events = extract_loss_events(result['images']['ndvi_change'], result['district'],
+                                 result['analysis_date'])
+    return (store or LossEventStore()).add_events(events)
+
+
+def store_loss_events(result, store: Optional['LossEventStore'] = None) -> int:
+    """record_loss_events for the weekly runs: failures are reported, never raised"""
+    try:
+        added = record_loss_events(result, store)
+    except Exception as e:
+        print(f"⚠️  {result.get('district')}: loss events not extracted: {e}")
+        return 0
+    if added:
+        print(f"🗺️  {result['district']}: {added} loss event(s) stored")
+    return added
@@ -0,0 +1,262 @@
+"""
+Materialized dashboard views
+Compact, ready-to-render artifacts updated incrementally after every
+results write, so dashboard first paint does not scan the result history
+
+    data/views/manifest.json          # Districts, record count, update time
+    data/views/latest.json            # Latest result per district + derived fields
+    data/views/alerts.json            # Active alerts and recent alert history
+    data/views/series/<district>.json # Weekly points and monthly rollups
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from atomic_io import write_json
+from config import DATA_DIR, NDVI_THRESHOLDS
+from instrumentation import traced
+from result_types import export_dict
+
+
+VIEWS_DIRNAME = 'views'
+LOCK_FILE = '.lock'
+RECENT_ALERTS = 200
+
+
+def vegetation_density(ndvi: Optional[float]) -> str:
+    """Density class of an NDVI value (Dense / Moderate / Sparse / Low)"""
+    if ndvi is None:
+        return "Low"
+    if ndvi > NDVI_THRESHOLDS['dense']:
+        return "Dense"
+    if ndvi > NDVI_THRESHOLDS['moderate']:
+        return "Moderate"
+    if ndvi > NDVI_THRESHOLDS['sparse']:
+        return "Sparse"
+    return "Low"
+
+
+def percent_change(change: Optional[float], previous: Optional[float]) -> Optional[float]:
+    """Change as a percentage of the previous value, None if undefined"""
+    if change is None or not previous:
+        return None
+    return change / previous * 100
+
+
+def views_dir(data_dir: Optional[Path] = None) -> Path:
+    return Path(data_dir or DATA_DIR) / VIEWS_DIRNAME
+
+
+def _read_json(path: Path, default):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+@contextmanager
+def _locked(directory: Path):
+    """
+    Exclusive lock on the views of a data directory
+
+    Held across each read-modify-write, so concurrent saves from threads
+    and processes are applied one after the other instead of overwriting
+    each other's updates.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_FILE, 'a+') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10 s
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _weekly_point(result: Dict) -> Optional[Dict]:
+    ndvi_mean = result.get('current_week', {}).get('ndvi_mean')
+    if ndvi_mean is None:
+        return None
+    change = result.get('change', {})
+    return {
+        'date': result['analysis_date'],
+        'ndvi_mean': ndvi_mean,
+        'ndvi_median': result['current_week'].get('ndvi_median'),
+        'change_pct': percent_change(change.get('ndvi_change_mean'),
+                                     result.get('previous_week', {}).get('ndvi_mean')),
+        'loss_ha': change.get('vegetation_loss_area_hectares'),
+    }
+
+
+def _monthly_rollup(month: str, weekly: List[Dict]) -> Dict:
+    values = [p['ndvi_mean'] for p in weekly if p['date'].startswith(month)]
+    return {
+        'month': month,
+        'count': len(values),
+        'sum': sum(values),
+        'min': min(values),
+        'max': max(values),
+        'ndvi_mean': sum(values) / len(values),
+    }
+
+
+def _update_series(series: Dict, point: Dict):
+    """Upsert a weekly point and recompute only its month's rollup"""
+    weekly = [p for p in series['weekly'] if p['date'] != point['date']]
+    weekly.append(point)
+    weekly.sort(key=lambda p: p['date'])
+    series['weekly'] = weekly
+
+    month = point['date'][:7]
+    monthly = [m for m in series['monthly'] if m['month'] != month]
+    monthly.append(_monthly_rollup(month, weekly))
+    monthly.sort(key=lambda m: m['month'])
+    series['monthly'] = monthly
+
+
+def derived_fields(result: Dict) -> Dict:
+    """Values the dashboard would otherwise compute on every render"""
+    return {
+        'change_percentage': percent_change(
+            result.get('change', {}).get('ndvi_change_mean'),
+            result.get('previous_week', {}).get('ndvi_mean')
+        ),
+        'vegetation_density': vegetation_density(result.get('current_week', {}).get('ndvi_median')),
+    }
+
+
+@traced('update_views')
+def update_views(results: Dict[str, Dict], data_dir: Optional[Path] = None,
+                 timestamp: Optional[str] = None):
+    """
+    Fold one results write into the views
+
+    Only the views of the written districts are touched; the result
+    history is never rescanned. A district's latest result is only
+    replaced by one with the same or a later analysis_date, so results
+    saved out of week order (parallel workers, backfills) never move it back.
+
+    Args:
+        results: District name -> analyze_district result
+        data_dir: Results directory (default: config.DATA_DIR)
+        timestamp: Result file timestamp (default: now)
+    """
+    directory = views_dir(data_dir)
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    with _locked(directory):
+        _fold(directory, results, timestamp)
+
+
+def _fold(directory: Path, results: Dict[str, Dict], timestamp: str):
+    """update_views body; the caller holds the views lock"""
+    manifest = _read_json(directory / 'manifest.json', {'districts': [], 'records': 0})
+    latest = _read_json(directory / 'latest.json', {})
+    alerts = _read_json(directory / 'alerts.json', {'active': [], 'recent': []})
+
+    for district, result in results.items():
+        result = export_dict(result)
+        if result.get('status') == 'no_new_data':
+            continue
+        result['timestamp'] = timestamp
+        result['view'] = derived_fields(result)
+        current = latest.get(district)
+        if current is None or result.get('analysis_date', '') >= current.get('analysis_date', ''):
+            latest[district] = result
+
+        point = _weekly_point(result)
+        if point is not None:
+            series_path = directory / 'series' / f'{district}.json'
+            series = _read_json(series_path, {'district': district, 'weekly': [], 'monthly': []})
+            _update_series(series, point)
+            write_json(series_path, series, separators=(',', ':'))
+
+        alert = result.get('alert') or {}
+        if alert.get('triggered'):
+            alerts['recent'].insert(0, {'district': district,
+                                        'analysis_date': result['analysis_date'], **alert})
+            del alerts['recent'][RECENT_ALERTS:]
+
+        if district not in manifest['districts']:
+            manifest['districts'].append(district)
+
+    alerts['active'] = [
+        {'district': d, 'analysis_date': r['analysis_date'], **r['alert']}
+        for d, r in sorted(latest.items())
+        if (r.get('alert') or {}).get('triggered')
+    ]
+    manifest['records'] += 1
+    manifest['updated'] = timestamp
+
+    write_json(directory / 'latest.json', latest, separators=(',', ':'))
+    write_json(directory / 'alerts.json', alerts, separators=(',', ':'))
+    # Manifest last: its presence means the other views are complete
+    write_json(directory / 'manifest.json', manifest, separators=(',', ':'))
+
+
+def rebuild_views(data_dir: Optional[Path] = None):
+    """Rebuild every view from the full result history"""
+    # Imported here: results_store imports this module to update views on save
+    from results_store import list_result_files, load_all_results
+
+    directory = views_dir(data_dir)
+    if not directory.exists() and not list_result_files(data_dir):
+        return  # Nothing to rebuild; readers must not create the views directory
+    with _locked(directory):
+        for path in [directory / 'manifest.json', directory / 'latest.json',
+                     directory / 'alerts.json', *directory.glob('series/*.json')]:
+            path.unlink(missing_ok=True)
+
+        for data in load_all_results(data_dir):
+            timestamp = data.pop('timestamp')
+            _fold(directory, data, timestamp)
+
+
+def load_views(data_dir: Optional[Path] = None, rebuild_missing: bool = True) -> Optional[Dict]:
+    """
+    Views needed for dashboard first paint
+
+    Returns:
+        Dict with 'manifest', 'latest' and 'alerts', or None if no results exist
+    """
+    directory = views_dir(data_dir)
+    if not (directory / 'manifest.json').exists() and rebuild_missing:
+        rebuild_views(data_dir)  # Results written before views existed
+    manifest = _read_json(directory / 'manifest.json', None)
+    if manifest is None:
+        return None
+    return {
+        'manifest': manifest,
+        'latest': _read_json(directory / 'latest.json', {}),
+        'alerts': _read_json(directory / 'alerts.json', {'active': [], 'recent': []}),
+    }
+
+
+def load_series(district: str, data_dir: Optional[Path] = None) -> Dict:
+    """Weekly points and monthly rollups of one district"""
+    return _read_json(views_dir(data_dir) / 'series' / f'{district}.json',
+                      {'district': district, 'weekly': [], 'monthly': []})
+
+
+if __name__ == "__main__":
+    rebuild_views()
+    print(f"✓ Dashboard views rebuilt in {views_dir()}")
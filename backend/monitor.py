@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Monitoring service entry point
+
+    python backend/monitor.py serve     # Long-running scheduler daemon
+    python backend/monitor.py enqueue   # Queue per-week jobs for workers
+    python backend/monitor.py worker    # Pull and run queued jobs (run many)
+    python backend/monitor.py api       # Read-only HTTP results API
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from config import DISTRICTS
+
+
+def serve(args):
+    """Run the scheduler daemon"""
+    from scheduler import MonitorDaemon, read_status
+
+    if args.status:
+        status = read_status(args.district)
+        print(f"Queue depth: {status['queue_depth']} due, {status['scheduled']} scheduled")
+        if status['unscheduled']:
+            print(f"   Not yet scheduled: {', '.join(status['unscheduled'])}")
+        if status['running']:
+            print(f"   Running: {status['running']}")
+        for entry in status['upcoming']:
+            print(f"   {entry['district']:12s} next run {entry['next_run']}")
+        return
+    MonitorDaemon(districts=args.district).serve()
+
+
+def enqueue(args):
+    """Queue one job per district and week"""
+    from job_queue import JobQueue
+
+    end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else datetime.now()
+    weeks = [(end - timedelta(weeks=i)).strftime('%Y-%m-%d') for i in range(args.weeks)]
+    districts = args.district or list(DISTRICTS.keys())
+
+    queue = JobQueue()
+    added = queue.enqueue_many((district, week) for district in districts for week in weeks)
+    print(f"✓ Queued {added} new job(s), {len(districts) * len(weeks) - added} already present")
+    print(f"   Queue: {queue.stats()}")
+
+
+def worker(args):
+    """Run a queue worker"""
+    from job_queue import JobQueue, run_worker
+
+    queue = JobQueue()
+    if args.status:
+        print(f"Queue: {queue.stats()}")
+        return
+    executed = run_worker(queue, exit_when_idle=args.once, max_jobs=args.max_jobs)
+    print(f"✓ Worker executed {executed} job(s)")
+
+
+def api(args):
+    """Run the HTTP results API"""
+    from results_api import serve as serve_api
+
+    serve_api(host=args.host, port=args.port, verbose=args.verbose)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Rajasthan Green Cover Monitoring service',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s serve                      # Schedule all districts
+  %(prog)s serve --district Jodhpur   # Schedule one district
+  %(prog)s serve --status             # Show queue depth and exit
+  %(prog)s enqueue --weeks 4          # Queue the last 4 weeks for all districts
+  %(prog)s worker                     # Run a worker (start one per core/host)
+  %(prog)s worker --once              # Drain the queue and exit
+  %(prog)s api --port 8600            # Serve stored results over HTTP
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command')
+
+    serve_parser = subparsers.add_parser('serve', help='Run the monitoring daemon')
+    serve_parser.add_argument(
+        '--district',
+        action='append',
+        choices=list(DISTRICTS.keys()),
+        help='District to schedule (repeatable, default: all)'
+    )
+    serve_parser.add_argument(
+        '--status',
+        action='store_true',
+        help='Print the queue depth from persisted state and exit'
+    )
+    serve_parser.set_defaults(func=serve)
+
+    enqueue_parser = subparsers.add_parser('enqueue', help='Queue per-week analysis jobs')
+    enqueue_parser.add_argument(
+        '--district',
+        action='append',
+        choices=list(DISTRICTS.keys()),
+        help='District to queue (repeatable, default: all)'
+    )
+    enqueue_parser.add_argument(
+        '--weeks',
+        type=int,
+        default=1,
+        help='Number of weeks to queue, counting back from --end (default: 1)'
+    )
+    enqueue_parser.add_argument(
+        '--end',
+        help='End date of the latest week, YYYY-MM-DD (default: today)'
+    )
+    enqueue_parser.set_defaults(func=enqueue)
+
+    worker_parser = subparsers.add_parser('worker', help='Run a job queue worker')
+    worker_parser.add_argument(
+        '--once',
+        action='store_true',
+        help='Exit when the queue is empty instead of polling'
+    )
+    worker_parser.add_argument(
+        '--max-jobs',
+        type=int,
+        help='Exit after this many jobs'
+    )
+    worker_parser.add_argument(
+        '--status',
+        action='store_true',
+        help='Print job counts by status and exit'
+    )
+    worker_parser.set_defaults(func=worker)
+
+    api_parser = subparsers.add_parser('api', help='Serve stored results over HTTP')
+    api_parser.add_argument('--host', help='Bind address (default: API_CONFIG host)')
+    api_parser.add_argument('--port', type=int, help='Port (default: API_CONFIG port)')
+    api_parser.add_argument('--verbose', action='store_true', help='Log every request')
+    api_parser.set_defaults(func=api)
+
+    args = parser.parse_args()
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        sys.exit(0)
+
+    try:
+        args.func(args)
+    except KeyboardInterrupt:
+        print("\n\n❌ Interrupted by user")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Per-pixel NDVI time-series data cube
+Stores each week's NDVI as a quantized int16 layer in chunked,
+memory-mapped (time, y, x) files with a NaN sentinel
+"""
+
+import numpy as np
+import json
+import os
+import warnings
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import CUBE_CONFIG, DATA_DIR, DISTRICTS
+
+
+CUBE_DIR = DATA_DIR / 'cube'
+META_FILE = 'meta.json'
+DATES_FILE = 'dates.txt'
+
+
+class NDVICube:
+    """
+    Chunked int16 NDVI cube on disk
+
+    Layout of a cube directory:
+        meta.json           shape, bbox, scale, nodata, chunk size
+        dates.txt           one layer date per line (append-only)
+        chunk_00000.int16   raw memmap of shape (chunk_weeks, y, x)
+
+    A layer is written into the next free slot of the last chunk and then
+    committed by appending its date, so appends cost O(1) regardless of
+    history length.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / META_FILE, 'r') as f:
+            self.meta = json.load(f)
+
+        self.shape = tuple(self.meta['shape'])
+        self.bbox = self.meta.get('bbox')
+        self.scale = self.meta['scale']
+        self.nodata = self.meta['nodata']
+        self.chunk_weeks = self.meta['chunk_weeks']
+        self.dates = self._read_dates()
+        self._chunks: Dict[int, np.memmap] = {}
+
+    @classmethod
+    def create(cls, path: Path, shape: Tuple[int, int], bbox: Optional[List[float]] = None,
+               chunk_weeks: Optional[int] = None) -> 'NDVICube':
+        """
+        Create an empty cube
+
+        Args:
+            path: Cube directory
+            shape: (rows, cols) of every layer
+            bbox: [min_lon, min_lat, max_lon, max_lat] covered by the layers
+            chunk_weeks: Layers per chunk file
+
+        Returns:
+            NDVICube: The new cube
+        """
+        path = Path(path)
+        if (path / META_FILE).exists():
+            raise ValueError(f"Cube already exists at {path}")
+        path.mkdir(parents=True, exist_ok=True)
+
+        meta = {
+            'shape': [int(shape[0]), int(shape[1])],
+            'bbox': bbox,
+            'scale': CUBE_CONFIG['scale'],
+            'nodata': CUBE_CONFIG['nodata'],
+            'chunk_weeks': chunk_weeks or CUBE_CONFIG['chunk_weeks'],
+            'dtype': 'int16',
+            'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with open(path / META_FILE, 'w') as f:
+            json.dump(meta, f, indent=2)
+        (path / DATES_FILE).touch()
+
+        return cls(path)
+
+    @classmethod
+    def open_or_create(cls, path: Path, shape: Tuple[int, int],
+                       bbox: Optional[List[float]] = None) -> 'NDVICube':
+        """Open an existing cube or create it with the given shape"""
+        path = Path(path)
+        if (path / META_FILE).exists():
+            cube = cls(path)
+            if cube.shape != tuple(shape):
+                raise ValueError(f"Cube at {path} has shape {cube.shape}, not {tuple(shape)}")
+            return cube
+        return cls.create(path, shape, bbox)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the stored layers"""
+        return len(self) * self.shape[0] * self.shape[1] * 2
+
+    # ------------------------------------------------------------------
+    # Quantization
+    # ------------------------------------------------------------------
+
+    def encode(self, ndvi: np.ndarray) -> np.ndarray:
+        """Quantize NDVI to int16, NaN and +-inf -> nodata sentinel"""
+        ndvi = np.asarray(ndvi, dtype=np.float32)
+        valid = np.isfinite(ndvi)  # Before clipping, which would turn inf into the range ends
+        scaled = np.multiply(ndvi, self.scale, dtype=np.float32)
+        np.clip(scaled, -32767, 32767, out=scaled)
+        np.rint(scaled, out=scaled)
+        out = np.full(ndvi.shape, self.nodata, dtype=np.int16)
+        out[valid] = scaled[valid]
+        return out
+
+    def decode(self, values: np.ndarray) -> np.ndarray:
+        """Dequantize int16 values to float32 NDVI, nodata -> NaN"""
+        out = values.astype(np.float32)
+        out /= self.scale
+        out[values == self.nodata] = np.nan
+        return out
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def append(self, ndvi: np.ndarray, date: str):
+        """
+        Append one week's NDVI layer
+
+        Args:
+            ndvi: Float NDVI raster of the cube's shape (NaN for no data)
+            date: Layer date in 'YYYY-MM-DD' format, later than the last layer
+        """
+        if ndvi.shape != self.shape:
+            raise ValueError(f"Layer shape {ndvi.shape} does not match cube shape {self.shape}")
+        datetime.strptime(date, '%Y-%m-%d')
+        if self.dates and date <= self.dates[-1]:
+            raise ValueError(f"Layer date {date} is not after last layer {self.dates[-1]}")
+
+        index = len(self.dates)
+        chunk = self._chunk(index // self.chunk_weeks, writable=True)
+        chunk[index % self.chunk_weeks] = self.encode(ndvi)
+        chunk.flush()
+
+        # Commit point: the layer only exists once its date is recorded
+        with open(self.path / DATES_FILE, 'a') as f:
+            f.write(date + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.dates.append(date)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def pixel_history(self, row: int, col: int) -> Tuple[List[str], np.ndarray]:
+        """
+        Full NDVI history of a single pixel
+
+        Returns:
+            Tuple of (dates, float32 NDVI values with NaN for no data)
+        """
+        values = np.empty(len(self), dtype=np.int16)
+        for chunk_index, start, stop in self._chunk_ranges(0, len(self)):
+            chunk = self._chunk(chunk_index)
+            offset = chunk_index * self.chunk_weeks
+            values[start:stop] = chunk[start - offset:stop - offset, row, col]
+        return list(self.dates), self.decode(values)
+
+    def pixel_history_at(self, lon: float, lat: float) -> Tuple[List[str], np.ndarray]:
+        """NDVI history of the pixel containing a clicked lon/lat location"""
+        row, col = self.pixel_index(lon, lat)
+        return self.pixel_history(row, col)
+
+    def pixel_index(self, lon: float, lat: float) -> Tuple[int, int]:
+        """Row/column of the pixel containing lon/lat"""
+        if not self.bbox:
+            raise ValueError("Cube has no bbox; use pixel_history(row, col)")
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        if not (min_lon <= lon <= max_lon and min_lat <= lat <= max_lat):
+            raise ValueError(f"Location ({lon}, {lat}) is outside the cube bbox")
+
+        rows, cols = self.shape
+        row = int((max_lat - lat) / (max_lat - min_lat) * rows)
+        col = int((lon - min_lon) / (max_lon - min_lon) * cols)
+        return min(row, rows - 1), min(col, cols - 1)
+
+    def time_range(self, start_date: Optional[str] = None,
+                   end_date: Optional[str] = None) -> Tuple[int, int]:
+        """Layer index range [start, stop) for an inclusive date window"""
+        start = 0
+        stop = len(self.dates)
+        if start_date:
+            start = next((i for i, d in enumerate(self.dates) if d >= start_date), stop)
+        if end_date:
+            stop = next((i for i, d in enumerate(self.dates) if d > end_date), stop)
+        return start, max(start, stop)
+
+    def read_window(self, start: int, stop: int, rows: slice = slice(None)) -> np.ndarray:
+        """
+        Read layers [start, stop) for a block of rows as float32
+
+        Returns:
+            np.ndarray: (time, rows, cols) NDVI with NaN for no data
+        """
+        row_count = len(range(*rows.indices(self.shape[0])))
+        out = np.empty((stop - start, row_count, self.shape[1]), dtype=np.int16)
+        for chunk_index, lo, hi in self._chunk_ranges(start, stop):
+            chunk = self._chunk(chunk_index)
+            offset = chunk_index * self.chunk_weeks
+            out[lo - start:hi - start] = chunk[lo - offset:hi - offset, rows]
+        return self.decode(out)
+
+    def iter_row_blocks(self, start: int, stop: int, block_rows: int = 256):
+        """Yield (row_slice, float32 block) over the cube in row blocks"""
+        for row in range(0, self.shape[0], block_rows):
+            rows = slice(row, min(row + block_rows, self.shape[0]))
+            yield rows, self.read_window(start, stop, rows)
+
+    def window_stats(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                     stats: Sequence[str] = ('mean', 'min', 'max', 'std', 'count'),
+                     block_rows: int = 256) -> Dict[str, np.ndarray]:
+        """
+        Per-pixel statistics over a time window, vectorized across the time axis
+
+        Processed in row blocks so memory stays bounded for district-size cubes.
+
+        Args:
+            start_date: First date included (default: first layer)
+            end_date: Last date included (default: last layer)
+            stats: Any of 'mean', 'median', 'min', 'max', 'std', 'count'
+            block_rows: Rows decoded per block
+
+        Returns:
+            Dict[str, np.ndarray]: Statistic name -> float32 (rows, cols) raster
+        """
+        reducers = {
+            'mean': np.nanmean,
+            'median': np.nanmedian,
+            'min': np.nanmin,
+            'max': np.nanmax,
+            'std': np.nanstd,
+        }
+        unknown = [s for s in stats if s not in reducers and s != 'count']
+        if unknown:
+            raise ValueError(f"Unknown statistics: {unknown}")
+
+        start, stop = self.time_range(start_date, end_date)
+        out = {name: np.full(self.shape, np.nan, dtype=np.float32) for name in stats}
+        if stop == start:
+            if 'count' in out:
+                out['count'][:] = 0
+            return out
+
+        with np.errstate(invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)  # All-NaN pixels
+            for rows, block in self.iter_row_blocks(start, stop, block_rows):
+                for name in stats:
+                    if name == 'count':
+                        out[name][rows] = np.count_nonzero(~np.isnan(block), axis=0)
+                    else:
+                        out[name][rows] = reducers[name](block, axis=0)
+        return out
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _read_dates(self) -> List[str]:
+        dates_path = self.path / DATES_FILE
+        if not dates_path.exists():
+            return []
+        with open(dates_path, 'r') as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def _chunk_path(self, chunk_index: int) -> Path:
+        return self.path / f"chunk_{chunk_index:05d}.int16"
+
+    def _chunk(self, chunk_index: int, writable: bool = False) -> np.memmap:
+        chunk = self._chunks.get(chunk_index)
+        if chunk is not None and (not writable or chunk.mode == 'r+'):
+            return chunk
+
+        path = self._chunk_path(chunk_index)
+        shape = (self.chunk_weeks,) + self.shape
+        if not path.exists():
+            chunk = np.memmap(path, dtype=np.int16, mode='w+', shape=shape)
+        else:
+            chunk = np.memmap(path, dtype=np.int16, mode='r+' if writable else 'r', shape=shape)
+
+        self._chunks[chunk_index] = chunk
+        return chunk
+
+    def _chunk_ranges(self, start: int, stop: int):
+        """Yield (chunk_index, lo, hi) covering global layer range [start, stop)"""
+        index = start
+        while index < stop:
+            chunk_index = index // self.chunk_weeks
+            hi = min(stop, (chunk_index + 1) * self.chunk_weeks)
+            yield chunk_index, index, hi
+            index = hi
+
+
+def district_cube_path(district_name: str) -> Path:
+    """Default cube directory for a district"""
+    return CUBE_DIR / district_name.lower()
+
+
+def open_district_cube(district_name: str, shape: Optional[Tuple[int, int]] = None) -> NDVICube:
+    """
+    Open the NDVI cube for a district, creating it when a shape is given
+
+    Args:
+        district_name: Key in config.DISTRICTS
+        shape: (rows, cols) of the district rasters, required to create a new cube
+
+    Returns:
+        NDVICube: The district cube
+    """
+    if district_name not in DISTRICTS:
+        raise ValueError(f"District {district_name} not found")
+
+    path = district_cube_path(district_name)
+    if shape is None:
+        return NDVICube(path)
+    return NDVICube.open_or_create(path, shape, DISTRICTS[district_name]['bbox'])
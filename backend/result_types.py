@@ -0,0 +1,425 @@
+"""
+Typed analysis results
+Slotted dataclasses for analyze_district results, with image handles kept
+out of serialization, and a versioned compact binary codec. JSON remains the
+export format (to_dict / to_json); the binary form is for bulk storage of
+many results (job queue, caches).
+"""
+
+import json
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+
+def _slotted(cls):
+    """
+    Recreate a dataclass with __slots__ for its fields
+
+    dataclass(slots=True) needs Python 3.10. Defaults live in the generated
+    __init__, so the class attributes holding them (which would clash with
+    the slots) are left out of the new class.
+    """
+    fields = tuple(cls.__dataclass_fields__)
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in fields and key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = fields
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_slotted
+@dataclass
+class CurrentWeek:
+    start: Optional[str] = None
+    end: Optional[str] = None
+    ndvi_mean: Optional[float] = None
+    ndvi_std: Optional[float] = None
+    ndvi_p10: Optional[float] = None
+    ndvi_median: Optional[float] = None
+    ndvi_p90: Optional[float] = None
+
+
+@_slotted
+@dataclass
+class PreviousWeek:
+    start: Optional[str] = None
+    end: Optional[str] = None
+    ndvi_mean: Optional[float] = None
+
+
+@_slotted
+@dataclass
+class Change:
+    ndvi_change_mean: Optional[float] = None
+    ndvi_change_min: Optional[float] = None
+    ndvi_change_max: Optional[float] = None
+    vegetation_loss_area_hectares: Optional[float] = None
+
+
+@_slotted
+@dataclass
+class IndexStats:
+    current_mean: Optional[float] = None
+    current_median: Optional[float] = None
+    previous_mean: Optional[float] = None
+    change_mean: Optional[float] = None
+    change_min: Optional[float] = None
+    change_max: Optional[float] = None
+
+
+SECTIONS = {'current_week': CurrentWeek, 'previous_week': PreviousWeek, 'change': Change}
+
+
+def _section(cls, data: Optional[Dict]):
+    return None if data is None else cls(**{name: data.get(name) for name in cls.__dataclass_fields__})
+
+
+def _section_dict(section) -> Optional[Dict]:
+    if section is None:
+        return None
+    return {name: getattr(section, name) for name in section.__dataclass_fields__}
+
+
+@_slotted
+@dataclass
+class AnalysisResult:
+    """
+    One AOI/week analysis result
+
+    Optional sections are None when absent (e.g. 'no_imagery' results have
+    no statistics). Keys this class does not know are kept in 'extra' and
+    written back by to_dict, so nothing is lost converting a stored dict.
+
+    'images' holds ee.Image handles, or a zero-argument callable building
+    them on first access (get_images); it is never serialized.
+
+    Results also support read/write dict-style access by the keys of the
+    analyze_district format (result['current_week']['ndvi_mean'],
+    result.get('alert'), 'alert' in result, result['images']), so code
+    written against result dicts keeps working. Sections are returned as
+    fresh dicts; assign a whole section to change it.
+    """
+
+    district: str
+    analysis_date: Optional[str] = None
+    status: str = 'ok'
+    scenes: Optional[Dict[str, List[str]]] = None
+    current_week: Optional[CurrentWeek] = None
+    previous_week: Optional[PreviousWeek] = None
+    change: Optional[Change] = None
+    indices: Optional[Dict[str, IndexStats]] = None
+    vegetation_mask: Optional[str] = None
+    alert: Optional[Dict] = None
+    anomaly: Optional[Dict] = None
+    extra: Optional[Dict[str, Any]] = None
+    images: Union[Dict, Callable[[], Dict], None] = field(default=None, repr=False, compare=False)
+
+    def get_images(self) -> Optional[Dict]:
+        """Image handles, built on first access when given as a callable"""
+        if callable(self.images):
+            self.images = self.images()
+        return self.images
+
+    def __getitem__(self, key: str):
+        if key == 'images':
+            images = self.get_images()
+            if images is None:
+                raise KeyError(key)
+            return images
+        if key in self.__dataclass_fields__ and key != 'extra':
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            if key in SECTIONS:
+                return _section_dict(value)
+            if key == 'indices':
+                return {name: _section_dict(stats) for name, stats in value.items()}
+            return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key in SECTIONS:
+            value = _section(SECTIONS[key], value)
+        elif key == 'indices' and value is not None:
+            value = {name: _section(IndexStats, stats) for name, stats in value.items()}
+        if key in self.__dataclass_fields__ and key != 'extra':
+            setattr(self, key, value)
+        else:
+            self.extra = {**(self.extra or {}), key: value}
+
+    def __contains__(self, key: str) -> bool:
+        if key == 'images':
+            return self.images is not None  # Without building them
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AnalysisResult':
+        """From an analyze_district (or stored JSON) result dict"""
+        known = cls.__dataclass_fields__
+        extra = {key: value for key, value in data.items() if key not in known}
+        indices = data.get('indices')
+        return cls(
+            district=data.get('district'),
+            analysis_date=data.get('analysis_date'),
+            status=data.get('status', 'ok'),
+            scenes=data.get('scenes'),
+            current_week=_section(CurrentWeek, data.get('current_week')),
+            previous_week=_section(PreviousWeek, data.get('previous_week')),
+            change=_section(Change, data.get('change')),
+            indices=None if indices is None else {name: _section(IndexStats, stats)
+                                                  for name, stats in indices.items()},
+            vegetation_mask=data.get('vegetation_mask'),
+            alert=data.get('alert'),
+            anomaly=data.get('anomaly'),
+            extra=extra or None,
+            images=data.get('images'),
+        )
+
+    def to_dict(self) -> Dict:
+        """JSON-ready dict in the analyze_district format, without image handles"""
+        data = {'district': self.district, 'analysis_date': self.analysis_date, 'status': self.status}
+        if self.scenes is not None:
+            data['scenes'] = self.scenes
+        for name in SECTIONS:
+            section = getattr(self, name)
+            if section is not None:
+                data[name] = _section_dict(section)
+        if self.indices is not None:
+            data['indices'] = {name: _section_dict(stats) for name, stats in self.indices.items()}
+        for name in ('vegetation_mask', 'alert', 'anomaly'):
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+
+def export_dict(result: Union[AnalysisResult, Dict]) -> Dict:
+    """JSON-ready form of a result dict or AnalysisResult, without image handles"""
+    if isinstance(result, AnalysisResult):
+        return result.to_dict()
+    return {key: value for key, value in result.items() if key != 'images'}
+
+
+# ----------------------------------------------------------------------
+# Binary codec
+# ----------------------------------------------------------------------
+#
+# Container: MAGIC, version (u8), record count (u32), string table (u32
+# count, then u16 length + UTF-8 each), records. Every string in a record is
+# a u32 index into the table (0xFFFFFFFF = None), so district names, dates
+# and index names are stored once per buffer and shared by decoded results.
+# Record: flags (u16) then the present parts in flag order; floats are f64
+# (NaN = None); sections without a fixed schema (alert, anomaly, extra) are
+# u32 length + compact JSON. All integers little-endian.
+
+MAGIC = b'RTMR'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBI')
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_HEAD = struct.Struct('<HIII')      # flags, district, analysis_date, status
+_SCENE = struct.Struct('<IH')       # name, count (then count x u32)
+_CURRENT = struct.Struct('<II5d')
+_PREVIOUS = struct.Struct('<IId')
+_CHANGE = struct.Struct('<4d')
+_INDEX = struct.Struct('<I6d')
+_NONE = 0xFFFFFFFF
+_NAN = float('nan')
+
+# Flag bits, in record order
+F_SCENES, F_CURRENT, F_PREVIOUS, F_CHANGE, F_INDICES, F_MASK, F_ALERT, F_ANOMALY, F_EXTRA = \
+    (1 << i for i in range(9))
+_JSON_PARTS = ((F_ALERT, 'alert'), (F_ANOMALY, 'anomaly'), (F_EXTRA, 'extra'))
+
+
+class _Strings(dict):
+    """String table being built: string -> index"""
+
+    def ref(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NONE
+        index = self.get(value)
+        if index is None:
+            index = self[value] = len(self)
+        return index
+
+
+def _f(value: Optional[float]) -> float:
+    return _NAN if value is None else value
+
+
+def _put_record(out: bytearray, result: AnalysisResult, strings: _Strings):
+    ref = strings.ref
+    flags = 0
+    for bit, part in ((F_SCENES, result.scenes), (F_CURRENT, result.current_week),
+                      (F_PREVIOUS, result.previous_week), (F_CHANGE, result.change),
+                      (F_INDICES, result.indices), (F_MASK, result.vegetation_mask)):
+        if part is not None:
+            flags |= bit
+    for bit, name in _JSON_PARTS:
+        if getattr(result, name):
+            flags |= bit
+
+    out += _HEAD.pack(flags, ref(result.district), ref(result.analysis_date), ref(result.status))
+    if flags & F_SCENES:
+        out += _U8.pack(len(result.scenes))
+        for name, ids in result.scenes.items():
+            out += _SCENE.pack(ref(name), len(ids))
+            out += struct.pack(f'<{len(ids)}I', *[ref(scene_id) for scene_id in ids])
+    if flags & F_CURRENT:
+        week = result.current_week
+        out += _CURRENT.pack(ref(week.start), ref(week.end), _f(week.ndvi_mean), _f(week.ndvi_std),
+                             _f(week.ndvi_p10), _f(week.ndvi_median), _f(week.ndvi_p90))
+    if flags & F_PREVIOUS:
+        week = result.previous_week
+        out += _PREVIOUS.pack(ref(week.start), ref(week.end), _f(week.ndvi_mean))
+    if flags & F_CHANGE:
+        change = result.change
+        out += _CHANGE.pack(_f(change.ndvi_change_mean), _f(change.ndvi_change_min),
+                            _f(change.ndvi_change_max), _f(change.vegetation_loss_area_hectares))
+    if flags & F_INDICES:
+        out += _U8.pack(len(result.indices))
+        for name, stats in result.indices.items():
+            out += _INDEX.pack(ref(name), _f(stats.current_mean), _f(stats.current_median),
+                               _f(stats.previous_mean), _f(stats.change_mean),
+                               _f(stats.change_min), _f(stats.change_max))
+    if flags & F_MASK:
+        out += _U32.pack(ref(result.vegetation_mask))
+    for bit, name in _JSON_PARTS:
+        if flags & bit:
+            raw = json.dumps(getattr(result, name), separators=(',', ':')).encode('utf-8')
+            out += _U32.pack(len(raw))
+            out += raw
+
+
+def encode_results(results: Iterable[Union[AnalysisResult, Dict]]) -> bytes:
+    """
+    Encode results (dicts or AnalysisResult) in the binary format
+
+    Returns:
+        bytes: Header, string table and records
+    """
+    records = bytearray()
+    strings = _Strings()
+    count = 0
+    for result in results:
+        if not isinstance(result, AnalysisResult):
+            result = AnalysisResult.from_dict(result)
+        _put_record(records, result, strings)
+        count += 1
+
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, count))
+    out += _U32.pack(len(strings))
+    for value in strings:
+        raw = value.encode('utf-8')
+        out += _U16.pack(len(raw))
+        out += raw
+    out += records
+    return bytes(out)
+
+
+def decode_results(data: bytes) -> List[AnalysisResult]:
+    """
+    Decode bytes from encode_results
+
+    Raises:
+        ValueError: Not an encoded buffer, or written by another codec version
+    """
+    if len(data) < _HEADER.size or data[:4] != MAGIC:
+        raise ValueError("Not an encoded results buffer")
+    magic, version, count = _HEADER.unpack_from(data, 0)
+    if version != VERSION:
+        raise ValueError(f"Unsupported results codec version {version} (expected {VERSION})")
+
+    offset = _HEADER.size
+    (n_strings,) = _U32.unpack_from(data, offset)
+    offset += 4
+    table = []
+    for _ in range(n_strings):
+        (length,) = _U16.unpack_from(data, offset)
+        offset += 2
+        table.append(data[offset:offset + length].decode('utf-8'))
+        offset += length
+    table = tuple(table)
+
+    def s(index: int) -> Optional[str]:
+        return None if index == _NONE else table[index]
+
+    def floats(values) -> List[Optional[float]]:
+        return [v if v == v else None for v in values]  # NaN -> None
+
+    results = []
+    for _ in range(count):
+        flags, district, date, status = _HEAD.unpack_from(data, offset)
+        offset += _HEAD.size
+        result = AnalysisResult(s(district), s(date), s(status))
+
+        if flags & F_SCENES:
+            n = data[offset]
+            offset += 1
+            scenes = {}
+            for _ in range(n):
+                name, ids = _SCENE.unpack_from(data, offset)
+                offset += _SCENE.size
+                scenes[table[name]] = [table[i] for i in struct.unpack_from(f'<{ids}I', data, offset)]
+                offset += 4 * ids
+            result.scenes = scenes
+        if flags & F_CURRENT:
+            start, end, *values = _CURRENT.unpack_from(data, offset)
+            offset += _CURRENT.size
+            result.current_week = CurrentWeek(s(start), s(end), *floats(values))
+        if flags & F_PREVIOUS:
+            start, end, mean = _PREVIOUS.unpack_from(data, offset)
+            offset += _PREVIOUS.size
+            result.previous_week = PreviousWeek(s(start), s(end), mean if mean == mean else None)
+        if flags & F_CHANGE:
+            result.change = Change(*floats(_CHANGE.unpack_from(data, offset)))
+            offset += _CHANGE.size
+        if flags & F_INDICES:
+            n = data[offset]
+            offset += 1
+            indices = {}
+            for _ in range(n):
+                name, *values = _INDEX.unpack_from(data, offset)
+                offset += _INDEX.size
+                indices[table[name]] = IndexStats(*floats(values))
+            result.indices = indices
+        if flags & F_MASK:
+            (mask,) = _U32.unpack_from(data, offset)
+            offset += 4
+            result.vegetation_mask = s(mask)
+        for bit, name in _JSON_PARTS:
+            if flags & bit:
+                (length,) = _U32.unpack_from(data, offset)
+                offset += 4
+                setattr(result, name, json.loads(data[offset:offset + length]))
+                offset += length
+        results.append(result)
+    return results
+
+
+def encode_result(result: Union[AnalysisResult, Dict]) -> bytes:
+    return encode_results([result])
+
+
+def decode_result(data: bytes) -> AnalysisResult:
+    return decode_results(data)[0]
@@ -0,0 +1,355 @@
+"""
+Read-only HTTP API over stored analysis results
+Serves precomputed JSON (latest per AOI, history, active alerts) with
+ETag revalidation and gzip, without touching Earth Engine
+
+    GET /aois                              # AOI names
+    GET /latest                            # Latest result of every AOI
+    GET /latest/<aoi>                      # Latest result of one AOI
+    GET /history/<aoi>?start=YYYY-MM-DD&end=YYYY-MM-DD
+    GET /trend/<aoi>?period=weekly|monthly|season&start=&end=&points=N
+    GET /alerts                            # AOIs whose latest result has an alert
+    GET /metrics                           # Prometheus metrics of this process
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from config import API_CONFIG, TREND_CONFIG
+from instrumentation import count, observe, prometheus_text
+from results_store import load_all_results, results_signature
+from trend_series import PERIODS, build_trend
+
+
+class Response:
+    """
+    A serialized JSON body with its gzip form and ETags
+
+    Each representation has its own strong ETag, as the two bodies differ
+    byte for byte.
+    """
+
+    __slots__ = ('status', 'body', 'gzip_body', 'etag', 'gzip_etag')
+
+    def __init__(self, payload, status: int = 200):
+        self.status = status
+        self.body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha1(self.body).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+        if len(self.body) >= API_CONFIG['gzip_min_bytes']:
+            self.gzip_body = gzip.compress(self.body, compresslevel=6)
+        else:
+            self.gzip_body = None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match evaluation (RFC 9110 13.1.2)
+
+    The header is '*' or a comma-separated list of entity tags; weak
+    comparison applies, so W/"x" matches "x".
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """True if an Accept-Encoding header allows gzip (q > 0, directly or via '*')"""
+    codings = {}
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings.get('gzip', codings.get('x-gzip', codings.get('*', 0.0))) > 0
+
+
+def history_entry(result: Dict, timestamp: str) -> Dict:
+    """Compact per-week record of one stored district result"""
+    current = result.get('current_week', {})
+    change = result.get('change', {})
+    alert = result.get('alert') or {}
+    return {
+        'analysis_date': result.get('analysis_date'),
+        'timestamp': timestamp,
+        'status': result.get('status', 'ok'),
+        'ndvi_mean': current.get('ndvi_mean'),
+        'ndvi_median': current.get('ndvi_median'),
+        'previous_ndvi_mean': result.get('previous_week', {}).get('ndvi_mean'),
+        'ndvi_change_mean': change.get('ndvi_change_mean'),
+        'vegetation_loss_area_hectares': change.get('vegetation_loss_area_hectares'),
+        'alert': alert.get('type') if alert.get('triggered') else None,
+    }
+
+
+class ResultsSnapshot:
+    """All responses for one version of the stored results"""
+
+    def __init__(self, signature: str, data_dir: Optional[Path] = None):
+        self.signature = signature
+        self.latest: Dict[str, Dict] = {}
+        history: Dict[str, Dict[str, Dict]] = {}
+
+        for data in load_all_results(data_dir):
+            timestamp = data.pop('timestamp')
+            for district, result in data.items():
+                if not isinstance(result, dict) or result.get('status') == 'no_new_data':
+                    continue
+                # Latest week wins, later files win for a re-analyzed week
+                current = self.latest.get(district)
+                if current is None or result.get('analysis_date', '') >= current.get('analysis_date', ''):
+                    self.latest[district] = result
+                history.setdefault(district, {})[result.get('analysis_date') or timestamp] = \
+                    history_entry(result, timestamp)
+
+        self.history = {d: [weeks[k] for k in sorted(weeks)] for d, weeks in history.items()}
+        self.history_dates = {d: [e['analysis_date'] or '' for e in h] for d, h in self.history.items()}
+
+        alerts = [
+            {'district': d, 'analysis_date': r.get('analysis_date'), **r['alert']}
+            for d, r in sorted(self.latest.items())
+            if (r.get('alert') or {}).get('triggered')
+        ]
+        self.responses: Dict[str, Response] = {
+            '/aois': Response(sorted(self.latest)),
+            '/latest': Response(self.latest),
+            '/alerts': Response(alerts),
+        }
+        for district, result in self.latest.items():
+            self.responses[f'/latest/{district}'] = Response(result)
+            self.responses[f'/history/{district}'] = Response(self.history.get(district, []))
+
+        self._query_cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key: tuple, build) -> Response:
+        """Parameterized responses, LRU-cached per snapshot"""
+        with self._lock:
+            if key in self._query_cache:
+                self._query_cache.move_to_end(key)
+                return self._query_cache[key]
+
+        response = build()
+
+        with self._lock:
+            self._query_cache[key] = response
+            while len(self._query_cache) > API_CONFIG['range_cache_size']:
+                self._query_cache.popitem(last=False)
+        return response
+
+    def history_range(self, district: str, start: Optional[str], end: Optional[str]) -> Response:
+        """History between two dates (inclusive)"""
+        dates = self.history_dates[district]
+        lo = bisect_left(dates, start) if start else 0
+        hi = bisect_right(dates, end) if end else len(dates)
+        return Response(self.history[district][lo:hi])
+
+    def trend(self, district: str, period: str, start: Optional[str], end: Optional[str],
+              max_points: int) -> Response:
+        """Rolled-up, downsampled NDVI trend"""
+        points = [{'date': e['analysis_date'], 'ndvi_mean': e['ndvi_mean']}
+                  for e in self.history[district] if e['analysis_date']]
+        trend = build_trend(points, period, start, end, max_points)
+        trend['district'] = district
+        return Response(trend)
+
+    def resolve(self, path: str, query: Dict[str, List[str]]) -> Response:
+        """Response for a request path"""
+        path = unquote(path.rstrip('/')) or '/'
+        for prefix in ('/history/', '/trend/'):
+            if path.startswith(prefix):
+                district = path[len(prefix):]
+                if district not in self.history:
+                    return Response({'error': f"Unknown AOI: {district}"}, 404)
+                break
+        else:
+            prefix = None
+
+        if prefix is not None:
+            start = query.get('start', [None])[0]
+            end = query.get('end', [None])[0]
+            for value in (start, end):
+                if value is not None:
+                    try:
+                        datetime.strptime(value, '%Y-%m-%d')
+                    except ValueError:
+                        return Response({'error': f"Invalid date: {value}"}, 400)
+
+        if prefix == '/history/' and (start or end):
+            return self._cached(('history', district, start, end),
+                                lambda: self.history_range(district, start, end))
+
+        if prefix == '/trend/':
+            period = query.get('period', [TREND_CONFIG['default_period']])[0]
+            if period not in PERIODS:
+                return Response({'error': f"Invalid period: {period}"}, 400)
+            try:
+                max_points = int(query.get('points', [TREND_CONFIG['max_points']])[0])
+            except ValueError:
+                return Response({'error': "points must be an integer"}, 400)
+            max_points = min(max(max_points, 3), TREND_CONFIG['max_points'])
+            return self._cached(('trend', district, period, start, end, max_points),
+                                lambda: self.trend(district, period, start, end, max_points))
+
+        response = self.responses.get(path)
+        if response is None:
+            return Response({'error': f"Not found: {path}"}, 404)
+        return response
+
+
+class ResultsCache:
+    """Current snapshot, rebuilt when the results signature changes"""
+
+    def __init__(self, data_dir: Optional[Path] = None):
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._snapshot = ResultsSnapshot(results_signature(data_dir), data_dir)
+
+    def snapshot(self) -> ResultsSnapshot:
+        now = time.monotonic()
+        if now - self._checked < API_CONFIG['refresh_seconds']:
+            return self._snapshot
+        # One thread rebuilds; the others keep serving the old snapshot
+        if self._lock.acquire(blocking=False):
+            try:
+                signature = results_signature(self.data_dir)
+                if signature != self._snapshot.signature:
+                    self._snapshot = ResultsSnapshot(signature, self.data_dir)
+                self._checked = now
+            finally:
+                self._lock.release()
+        return self._snapshot
+
+
+class ResultsHandler(BaseHTTPRequestHandler):
+    """GET/HEAD handler serving precomputed responses"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'RajasthanResults/1.0'
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body: bool):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        if url.path == '/metrics':
+            self._send_metrics(send_body)
+            return
+        response = self.server.cache.snapshot().resolve(url.path, parse_qs(url.query))
+        count('api_requests_total', help='Results API requests', status=response.status)
+
+        body, etag = response.body, response.etag
+        use_gzip = response.gzip_body is not None and accepts_gzip(self.headers.get('Accept-Encoding'))
+        if use_gzip:
+            body, etag = response.gzip_body, response.gzip_etag
+
+        if response.status == 200 and etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            observe('api_request_seconds', time.perf_counter() - start, help='Results API response time')
+            return
+
+        self.send_response(response.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if response.status == 200:
+            self.send_header('ETag', etag)
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+        observe('api_request_seconds', time.perf_counter() - start, help='Results API response time')
+
+    def _send_metrics(self, send_body: bool):
+        """Prometheus exposition of this process's metrics (never cached)"""
+        body = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ResultsServer(ThreadingHTTPServer):
+    """Threading server with a listen backlog sized for bursts of viewers"""
+
+    request_queue_size = API_CONFIG['listen_backlog']
+
+
+def create_server(host: Optional[str] = None, port: Optional[int] = None,
+                  data_dir: Optional[Path] = None, verbose: bool = False) -> ThreadingHTTPServer:
+    """Build the API server (call serve_forever() to run it)"""
+    server = ResultsServer(
+        (host or API_CONFIG['host'], port if port is not None else API_CONFIG['port']),
+        ResultsHandler
+    )
+    server.daemon_threads = True
+    server.cache = ResultsCache(data_dir)
+    server.verbose = verbose
+    return server
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None,
+          data_dir: Optional[Path] = None, verbose: bool = False):
+    """Run the API until interrupted"""
+    server = create_server(host, port, data_dir, verbose)
+    address, bound_port = server.server_address[:2]
+    print(f"🌐 Results API listening on http://{address}:{bound_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("✓ Results API stopped")
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,158 @@
+"""
+Stored analysis results
+Reads and writes the analysis_*.json files in the data directory
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from atomic_io import temp_path, write_text
+from config import DATA_DIR
+from instrumentation import traced
+from materialized_views import update_views
+from result_types import AnalysisResult, export_dict
+
+
+RESULTS_PATTERN = 'analysis_*.json'
+VERSION_FILE = 'results.version'
+
+
+def list_result_files(data_dir: Optional[Path] = None) -> List[Path]:
+    """Analysis result files, newest first"""
+    data_dir = Path(data_dir or DATA_DIR)
+    if not data_dir.exists():
+        return []
+    return sorted(data_dir.glob(RESULTS_PATTERN), reverse=True)
+
+
+def find_latest_result(district_name: str, data_dir: Optional[Path] = None) -> Optional[Dict]:
+    """
+    Stored result with the latest analysis_date for a district
+
+    Files are written when a job finishes, not in week order (parallel
+    workers, backfills), so the newest file is not necessarily the latest
+    week. Of results for the same week the newest file wins.
+
+    Args:
+        district_name: District key, e.g. 'Jodhpur'
+        data_dir: Results directory (default: config.DATA_DIR)
+
+    Returns:
+        Dict: The stored district result, or None if there is none
+    """
+    latest = None
+    for file in list_result_files(data_dir):
+        try:
+            with open(file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        result = data.get(district_name)
+        if not isinstance(result, dict) or result.get('status') == 'no_new_data':
+            continue
+        if latest is None or result.get('analysis_date', '') > latest.get('analysis_date', ''):
+            latest = result
+    return latest
+
+
+def load_all_results(data_dir: Optional[Path] = None) -> List[Dict]:
+    """
+    Every stored result file, oldest first
+
+    Returns:
+        List[Dict]: District name -> result, plus 'timestamp' from the file name
+    """
+    results = []
+    for file in reversed(list_result_files(data_dir)):
+        try:
+            with open(file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        data['timestamp'] = file.stem.split('_', 1)[1]
+        results.append(data)
+    return results
+
+
+def results_signature(data_dir: Optional[Path] = None) -> str:
+    """
+    Cheap fingerprint of the stored results
+
+    Changes whenever save_results writes (version marker) or result files
+    are added or removed by other means, so readers can cache derived data.
+    """
+    data_dir = Path(data_dir or DATA_DIR)
+    try:
+        version = (data_dir / VERSION_FILE).read_text().strip()
+    except OSError:
+        version = '0'
+    files = list_result_files(data_dir)
+    newest = files[0].name if files else ''
+    return f"{version}:{len(files)}:{newest}"
+
+
+def _bump_version(data_dir: Path):
+    write_text(data_dir / VERSION_FILE, str(time.time_ns()))
+
+
+def _write_new_file(data_dir: Path, data: Dict):
+    """
+    Write a new analysis_<timestamp>.json file, never replacing an existing one
+
+    The timestamp has microseconds; the complete file is hard-linked into
+    place, which fails instead of overwriting if another writer took the
+    name, and the next free suffix is tried.
+
+    Returns:
+        (written file, its timestamp)
+    """
+    tmp = temp_path(data_dir / '.analysis')
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    try:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        for attempt in range(1000):
+            timestamp = stamp if attempt == 0 else f"{stamp}_{attempt}"
+            output_file = data_dir / f'analysis_{timestamp}.json'
+            try:
+                os.link(tmp, output_file)
+                return output_file, timestamp
+            except FileExistsError:
+                continue
+        raise FileExistsError(f"No free result file name for {stamp} in {data_dir}")
+    finally:
+        tmp.unlink()
+
+
+@traced('save_results')
+def save_results(results: Dict[str, Union[Dict, AnalysisResult]], data_dir: Optional[Path] = None) -> Path:
+    """
+    Save per-district results as a new timestamped JSON file
+
+    Every call writes its own file, also when several processes or threads
+    save within the same second.
+
+    Results may be dicts or AnalysisResult objects; live ee.Image handles
+    are never written. The dashboard views
+    are updated from the same results.
+
+    Args:
+        results: District name -> analyze_district result
+        data_dir: Results directory (default: config.DATA_DIR)
+
+    Returns:
+        Path: The written file
+    """
+    data_dir = Path(data_dir or DATA_DIR)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    json_results = {district: export_dict(data) for district, data in results.items()}
+
+    output_file, timestamp = _write_new_file(data_dir, json_results)
+    update_views(json_results, data_dir, timestamp)
+    _bump_version(data_dir)
+    return output_file
@@ -0,0 +1,371 @@
+"""
+Windowed band-selective reader for local Sentinel-2 L2A SAFE products
+Reads only the bands the analysis needs, only for the AOI window, warps
+every granule onto one common AOI grid (an AOI usually spans several MGRS
+tiles) and caches decoded crops as memory-mapped .npy files
+"""
+
+import numpy as np
+import hashlib
+import json
+import math
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.transform import Affine
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds, transform as window_transform
+
+from atomic_io import atomic_write
+from config import SAFE_CONFIG, DATA_DIR
+
+
+CACHE_DIR = DATA_DIR / 'cache' / 'safe'
+
+# IMG_DATA/R10m/T43RDM_20240105T053221_B04_10m.jp2
+BAND_FILE_PATTERN = re.compile(r'_(B\d{2}|B8A|SCL)_(\d{2})m\.jp2$')
+SENSING_PATTERN = re.compile(r'_MSIL2A_(\d{8}T\d{6})_')
+
+# band_id of the BOA_ADD_OFFSET entries in MTD_MSIL2A.xml
+BAND_IDS = ['B01', 'B02', 'B03', 'B04', 'B05', 'B06', 'B07', 'B08', 'B8A', 'B09', 'B10', 'B11', 'B12']
+
+# Bump when the crop contents change, so stale cached crops are not reused
+CROP_VERSION = 2
+
+
+class AOIGrid(NamedTuple):
+    """Common pixel grid of an AOI that every granule is warped onto"""
+    crs: str
+    transform: Affine
+    width: int
+    height: int
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    def key(self) -> list:
+        return [self.crs, [round(v, 6) for v in self.transform[:6]], self.width, self.height]
+
+
+def ee_band_name(band: str) -> str:
+    """SAFE band name to the Earth Engine name used by the index engine (B04 -> B4)"""
+    if band.startswith('B') and band[1:].isdigit():
+        return f"B{int(band[1:])}"
+    return band
+
+
+def utm_crs(lon: float, lat: float) -> str:
+    """CRS of the UTM zone containing a point (the MGRS tiling uses these zones)"""
+    zone = int((lon + 180) // 6) % 60 + 1
+    return f"EPSG:{(32600 if lat >= 0 else 32700) + zone}"
+
+
+def aoi_grid(bbox: List[float], resolution: Optional[float] = None,
+             crs: Optional[str] = None) -> AOIGrid:
+    """
+    Pixel grid covering an AOI
+
+    The grid is snapped to multiples of the resolution, so in the UTM zone
+    of the granules it lines up with their 10 m pixels.
+
+    Args:
+        bbox: [min_lon, min_lat, max_lon, max_lat]
+        resolution: Pixel size in meters, defaults to SAFE_CONFIG['resolution']
+        crs: Grid CRS, defaults to SAFE_CONFIG['crs'] or the UTM zone of the AOI centre
+
+    Returns:
+        AOIGrid: CRS, transform and size of the grid
+    """
+    resolution = resolution or SAFE_CONFIG['resolution']
+    crs = crs or SAFE_CONFIG['crs'] or utm_crs((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
+    left, bottom, right, top = transform_bounds('EPSG:4326', crs, *bbox)
+    left = math.floor(left / resolution) * resolution
+    bottom = math.floor(bottom / resolution) * resolution
+    right = math.ceil(right / resolution) * resolution
+    top = math.ceil(top / resolution) * resolution
+    return AOIGrid(
+        crs=crs,
+        transform=Affine(resolution, 0.0, left, 0.0, -resolution, top),
+        width=int(round((right - left) / resolution)),
+        height=int(round((top - bottom) / resolution)),
+    )
+
+
+class SafeProduct:
+    """A Sentinel-2 L2A .SAFE product directory"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.name = self.path.name.replace('.SAFE', '')
+        self.band_files = self._index_band_files()
+        if not self.band_files:
+            raise ValueError(f"No band files found in {self.path}")
+
+    @property
+    def sensing_time(self) -> Optional[str]:
+        """Datatake sensing time 'YYYYMMDDTHHMMSS', shared by all granules of one pass"""
+        match = SENSING_PATTERN.search(self.name)
+        return match.group(1) if match else None
+
+    @property
+    def sensing_date(self) -> Optional[str]:
+        """Sensing date as 'YYYY-MM-DD' (from the product name)"""
+        match = SENSING_PATTERN.search(self.name)
+        if not match:
+            return None
+        return datetime.strptime(match.group(1), '%Y%m%dT%H%M%S').strftime('%Y-%m-%d')
+
+    def _index_band_files(self) -> Dict[str, Dict[int, Path]]:
+        """Band -> {resolution in m: JP2 path}"""
+        files: Dict[str, Dict[int, Path]] = {}
+        for jp2 in self.path.glob('GRANULE/*/IMG_DATA/R*m/*.jp2'):
+            match = BAND_FILE_PATTERN.search(jp2.name)
+            if match:
+                files.setdefault(match.group(1), {})[int(match.group(2))] = jp2
+        return files
+
+    def band_path(self, band: str) -> Path:
+        """Finest-resolution file for a band"""
+        if band not in self.band_files:
+            raise ValueError(f"Band {band} not found in {self.name}")
+        resolutions = self.band_files[band]
+        return resolutions[min(resolutions)]
+
+    def boa_offsets(self) -> Dict[str, int]:
+        """
+        BOA_ADD_OFFSET per band from MTD_MSIL2A.xml
+
+        Processing baseline 04.00 and later store reflectance x 10000 minus
+        the offset (-1000), while S2_SR_HARMONIZED and older baselines do not;
+        products without the entry have no offset.
+        """
+        offsets = {}
+        metadata = self.path / 'MTD_MSIL2A.xml'
+        if not metadata.exists():
+            return offsets
+        try:
+            root = ET.parse(metadata).getroot()
+        except ET.ParseError:
+            return offsets
+        for element in root.iter():
+            if element.tag.endswith('BOA_ADD_OFFSET') and element.get('band_id') is not None:
+                band_id = int(element.get('band_id'))
+                if band_id < len(BAND_IDS):
+                    offsets[BAND_IDS[band_id]] = int(float(element.text))
+        return offsets
+
+    def read_aoi(self, bbox: List[float], bands: Optional[List[str]] = None,
+                 include_scl: bool = True) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Read the requested bands of this product on the AOI grid
+
+        Pixels of the AOI outside this granule are 0 (SCL no data); use
+        mosaic() / read_scenes() to fill them from the neighbouring granules.
+
+        Args:
+            bbox: [min_lon, min_lat, max_lon, max_lat]
+            bands: SAFE band names, defaults to SAFE_CONFIG['bands']
+            include_scl: Also read the scene classification band
+
+        Returns:
+            Dict[str, np.ndarray]: EE band name ('B4', 'B8', 'SCL', ...) -> raster,
+            or None if the granule does not intersect the AOI
+        """
+        return mosaic([self], aoi_grid(bbox), bands, include_scl)
+
+    def read_window(self, grid: AOIGrid, bands: Optional[List[str]] = None,
+                    include_scl: bool = True) -> Optional[Tuple[Window, Dict[str, np.ndarray]]]:
+        """
+        Read the part of an AOI grid covered by this granule
+
+        Each band is warped from its own grid onto the AOI grid (nearest for
+        SCL, bilinear for reflectance) through a windowed virtual raster, so
+        nothing outside the AOI is decoded. Reflectance gets the product's
+        BOA_ADD_OFFSET, matching S2_SR_HARMONIZED digital numbers. Decoded
+        crops are cached; repeat reads are memory-mapped .npy loads.
+
+        Args:
+            grid: Common AOI grid (see aoi_grid)
+            bands: SAFE band names, defaults to SAFE_CONFIG['bands']
+            include_scl: Also read the scene classification band
+
+        Returns:
+            (window of the AOI grid, SAFE band name -> raster of the window's shape),
+            or None if the granule does not intersect the AOI
+        """
+        bands = list(bands or SAFE_CONFIG['bands'])
+        if include_scl:
+            bands.append(SAFE_CONFIG['scl_band'])
+
+        reference_band = next((b for b in bands if 10 in self.band_files.get(b, {})), bands[0])
+        with rasterio.open(self.band_path(reference_band)) as reference:
+            window = self._grid_window(grid, reference)
+        if window is None:
+            return None
+
+        cached = self._load_cached(grid, window, bands)
+        if cached is not None:
+            return window, cached
+
+        offsets = self.boa_offsets()
+        shape = (int(window.height), int(window.width))
+        arrays = {}
+        for band in bands:
+            resampling = Resampling.nearest if band == SAFE_CONFIG['scl_band'] else Resampling.bilinear
+            with rasterio.open(self.band_path(band)) as src, WarpedVRT(
+                src,
+                crs=grid.crs,
+                transform=window_transform(window, grid.transform),
+                width=shape[1],
+                height=shape[0],
+                resampling=resampling,
+                src_nodata=0,
+                nodata=0
+            ) as vrt:
+                array = vrt.read(1)
+            offset = offsets.get(band, 0)
+            if offset:
+                # No data stays 0; reflectance below the offset clamps to 0
+                array = np.clip(array.astype(np.int32) + offset, 0, np.iinfo(array.dtype).max).astype(array.dtype)
+            arrays[band] = array
+
+        if SAFE_CONFIG['cache_crops']:
+            return window, self._save_cached(grid, window, arrays)
+        return window, arrays
+
+    def _grid_window(self, grid: AOIGrid, src) -> Optional[Window]:
+        """Window of the AOI grid covered by a raster's footprint"""
+        left, bottom, right, top = transform_bounds(src.crs, grid.crs, *src.bounds)
+        window = from_bounds(left, bottom, right, top, transform=grid.transform)
+        window = window.round_offsets().round_lengths()
+        try:
+            window = window.intersection(Window(0, 0, grid.width, grid.height))
+        except Exception:
+            return None  # rasterio raises WindowError when they do not overlap
+        if window.width < 1 or window.height < 1:
+            return None
+        return window
+
+    def _cache_dir(self, grid: AOIGrid, window: Window) -> Path:
+        raw = json.dumps([CROP_VERSION, grid.key(), [int(window.col_off), int(window.row_off),
+                                                     int(window.width), int(window.height)]])
+        key = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+        return CACHE_DIR / self.name / key
+
+    def _load_cached(self, grid: AOIGrid, window: Window,
+                     bands: List[str]) -> Optional[Dict[str, np.ndarray]]:
+        directory = self._cache_dir(grid, window)
+        paths = {band: directory / f"{band}.npy" for band in bands}
+        if not all(path.exists() for path in paths.values()):
+            return None
+        return {band: np.load(path, mmap_mode='r') for band, path in paths.items()}
+
+    def _save_cached(self, grid: AOIGrid, window: Window,
+                     arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        directory = self._cache_dir(grid, window)
+        directory.mkdir(parents=True, exist_ok=True)
+        for band, array in arrays.items():
+            # Write then rename so a crashed run never leaves a partial crop
+            with atomic_write(directory / f"{band}.npy", 'wb') as f:
+                np.save(f, array)
+        return self._load_cached(grid, window, list(arrays))
+
+
+def find_products(directory: Path, start_date: Optional[str] = None,
+                  end_date: Optional[str] = None) -> List[SafeProduct]:
+    """
+    Find L2A SAFE products in a directory, optionally within [start_date, end_date)
+
+    Returns:
+        List[SafeProduct]: Products sorted by sensing date
+    """
+    products = []
+    for path in sorted(Path(directory).glob('*MSIL2A*.SAFE')):
+        try:
+            product = SafeProduct(path)
+        except ValueError as e:
+            print(f"⚠️  Skipping {path.name}: {e}")
+            continue
+        date = product.sensing_date
+        if start_date and (date is None or date < start_date):
+            continue
+        if end_date and (date is None or date >= end_date):
+            continue
+        products.append(product)
+    return sorted(products, key=lambda p: p.sensing_date or '')
+
+
+def mosaic(products: List[SafeProduct], grid: AOIGrid, bands: Optional[List[str]] = None,
+           include_scl: bool = True) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Mosaic the granules of one pass onto a common AOI grid
+
+    Granules are pasted in order; where they overlap, a pixel is taken from
+    the first granule with data there (SCL, or the first band, non-zero).
+
+    Args:
+        products: Granules of the same datatake
+        grid: Common AOI grid (see aoi_grid)
+        bands: SAFE band names, defaults to SAFE_CONFIG['bands']
+        include_scl: Also read the scene classification band
+
+    Returns:
+        Dict[str, np.ndarray]: EE band name -> raster of grid.shape, or None
+        if no granule intersects the AOI
+    """
+    out = None
+    for product in products:
+        piece = product.read_window(grid, bands, include_scl)
+        if piece is None:
+            continue
+        window, arrays = piece
+        if out is None:
+            out = {band: np.zeros(grid.shape, dtype=array.dtype) for band, array in arrays.items()}
+            data_band = SAFE_CONFIG['scl_band'] if SAFE_CONFIG['scl_band'] in arrays else next(iter(arrays))
+        rows, cols = window.toslices()
+        empty = out[data_band][rows, cols] == 0
+        for band, array in arrays.items():
+            region = out[band][rows, cols]
+            region[empty] = array[empty]
+    if out is None:
+        return None
+    return {ee_band_name(band): array for band, array in out.items()}
+
+
+def read_scenes(directory: Path, bbox: List[float], start_date: str, end_date: str,
+                bands: Optional[List[str]] = None,
+                grid: Optional[AOIGrid] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Yield one AOI mosaic per satellite pass in a date window
+
+    The granules of each datatake (same satellite and sensing time) are
+    mosaicked onto one AOI grid, so every yielded scene covers the same
+    pixels and can be passed straight to the local compositor /
+    LocalRasterEngine. Passes that do not touch the AOI are skipped.
+
+    Args:
+        directory: Directory containing .SAFE products
+        bbox: [min_lon, min_lat, max_lon, max_lat]
+        start_date: Start date in 'YYYY-MM-DD' format
+        end_date: End date in 'YYYY-MM-DD' format (exclusive)
+        bands: SAFE band names, defaults to SAFE_CONFIG['bands']
+        grid: Common AOI grid, defaults to aoi_grid(bbox)
+    """
+    grid = grid or aoi_grid(bbox)
+
+    def datatake(product: SafeProduct):
+        return product.name[:3], product.sensing_time or ''
+
+    products = sorted(find_products(directory, start_date, end_date), key=datatake)
+    for _, granules in groupby(products, key=datatake):
+        scene = mosaic(list(granules), grid, bands)
+        if scene is not None:
+            yield scene
@@ -0,0 +1,278 @@
+"""
+Long-running monitoring daemon
+Keeps one warm Earth Engine session and runs per-AOI analyses on staggered
+schedules, persisting job state across restarts
+"""
+
+import heapq
+import json
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import write_json
+from config import DISTRICTS, DAEMON_CONFIG, DATA_DIR
+from results_store import save_results
+from alert_engine import evaluate_stored_history
+
+
+DAEMON_DIR = DATA_DIR / 'daemon'
+STATE_FILE = DAEMON_DIR / 'state.json'
+STATUS_FILE = DAEMON_DIR / 'status.json'
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+class MonitorDaemon:
+    """Schedule and run per-AOI analyses from a single warm process"""
+
+    def __init__(self, districts: Optional[List[str]] = None, daemon_config: Optional[Dict] = None):
+        self.config = daemon_config or DAEMON_CONFIG
+        self.districts = districts or list(DISTRICTS.keys())
+        unknown = [d for d in self.districts if d not in DISTRICTS]
+        if unknown:
+            raise ValueError(f"Districts not found: {unknown}")
+
+        self.state = self._load_state()
+        self.queue: List[Tuple[float, str]] = []
+        self.running: Optional[str] = None
+        self.started = datetime.now()
+        self._stop = threading.Event()
+        self._monitor = None
+        self._last_job_end = 0.0
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def interval(self, district_name: str) -> timedelta:
+        """Run interval for an AOI"""
+        days = self.config['aoi_intervals'].get(district_name, self.config['interval_days'])
+        return timedelta(days=days)
+
+    def build_queue(self, now: Optional[datetime] = None):
+        """
+        Build the job queue from persisted state
+
+        AOIs without state get first runs spread evenly across one interval,
+        so many AOIs never all fire at once.
+        """
+        now = now or datetime.now()
+        self.queue = []
+        new_districts = [d for d in self.districts if d not in self.state]
+
+        for i, district in enumerate(new_districts):
+            offset = self.interval(district) * i / max(len(new_districts), 1)
+            self.state[district] = {
+                'next_run': (now + offset).strftime(TIME_FORMAT),
+                'last_run': None,
+                'last_status': None,
+                'failures': 0,
+            }
+
+        for district in self.districts:
+            next_run = datetime.strptime(self.state[district]['next_run'], TIME_FORMAT)
+            heapq.heappush(self.queue, (next_run.timestamp(), district))
+        self._save_state()
+
+    def queue_depth(self, now: Optional[float] = None) -> int:
+        """Number of jobs that are due and waiting"""
+        now = now or time.time()
+        return sum(1 for due, _ in self.queue if due <= now)
+
+    def _reschedule(self, district: str, due: float, succeeded: bool):
+        entry = self.state[district]
+        if succeeded:
+            entry['failures'] = 0
+            interval = self.interval(district).total_seconds()
+            # Keep the AOI's phase: next slot after now on its own grid
+            next_due = due + interval
+            while next_due <= time.time():
+                next_due += interval
+        else:
+            entry['failures'] += 1
+            delay = self.config['retry_minutes'] * 60 * 2 ** (entry['failures'] - 1)
+            next_due = time.time() + min(delay, self.config['max_retry_hours'] * 3600)
+
+        entry['next_run'] = datetime.fromtimestamp(next_due).strftime(TIME_FORMAT)
+        heapq.heappush(self.queue, (next_due, district))
+        self._save_state()
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    @property
+    def monitor(self):
+        """Warm VegetationMonitor, authenticated once per daemon lifetime"""
+        if self._monitor is None:
+            from vegetation_monitor import VegetationMonitor
+            self._monitor = VegetationMonitor()
+        return self._monitor
+
+    def run_job(self, district: str) -> str:
+        """Analyze one AOI, store the result and its loss events; returns the result status"""
+        from loss_events import store_loss_events
+
+        results = self.monitor.analyze_district(district, skip_if_unchanged=True, update_baseline=True)
+        status = results.get('status', 'ok')
+        if status != 'no_new_data':
+            output_file = save_results({district: results})
+            print(f"✓ {district}: results saved to {output_file}")
+            store_loss_events(results)
+        else:
+            print(f"⏭️  {district}: no new data")
+        return status
+
+    def evaluate_alerts(self):
+        """Evaluate the alert rules over the stored history once, printing new alerts"""
+        try:
+            alerts = evaluate_stored_history()
+        except Exception as e:
+            print(f"✗ Error evaluating alerts: {e}")
+            return
+        for alert in alerts:
+            print(f"🚨 {alert['district']} {alert['date']}: {alert['message']}")
+
+    def run_pending(self) -> int:
+        """
+        Run every due job, spaced by min_job_gap_seconds; returns jobs run
+
+        Alert rules are evaluated once after the batch if any job stored a
+        new result, not after every AOI.
+        """
+        ran = 0
+        stored = False
+        while self.queue and self.queue[0][0] <= time.time() and not self._stop.is_set():
+            gap = self._last_job_end + self.config['min_job_gap_seconds'] - time.time()
+            if gap > 0 and self._stop.wait(gap):
+                break
+
+            due, district = heapq.heappop(self.queue)
+            self.running = district
+            self._write_status()
+            entry = self.state[district]
+            try:
+                entry['last_status'] = self.run_job(district)
+                stored |= entry['last_status'] != 'no_new_data'
+                succeeded = True
+            except Exception as e:
+                print(f"✗ Error analyzing {district}: {e}")
+                entry['last_status'] = f"error: {e}"
+                succeeded = False
+                # A broken session is rebuilt on the next job
+                self._monitor = None
+            entry['last_run'] = datetime.now().strftime(TIME_FORMAT)
+            self.running = None
+            self._last_job_end = time.time()
+            self._reschedule(district, due, succeeded)
+            ran += 1
+        if stored:
+            self.evaluate_alerts()
+        return ran
+
+    def serve(self):
+        """Run until SIGINT/SIGTERM"""
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        signal.signal(signal.SIGINT, lambda *_: self.stop())
+
+        self.build_queue()
+        print(f"🌳 Monitor daemon started for {len(self.districts)} AOI(s)")
+        for due, district in sorted(self.queue):
+            print(f"   {district:12s} next run {datetime.fromtimestamp(due).strftime(TIME_FORMAT)}")
+
+        while not self._stop.is_set():
+            self.run_pending()
+            self._write_status()
+            if not self.queue:
+                break
+            wait = max(0.0, self.queue[0][0] - time.time())
+            self._stop.wait(min(wait, 60))
+
+        self._save_state()
+        self._write_status()
+        print("✓ Monitor daemon stopped")
+
+    def stop(self):
+        """Ask the serve loop to exit after the current job"""
+        self._stop.set()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def status(self) -> Dict:
+        """Daemon status snapshot (also written to data/daemon/status.json)"""
+        now = time.time()
+        upcoming = sorted(self.queue)[:10]
+        return {
+            'started': self.started.strftime(TIME_FORMAT),
+            'updated': datetime.now().strftime(TIME_FORMAT),
+            'queue_depth': self.queue_depth(now),
+            'scheduled': len(self.queue),
+            'running': self.running,
+            'upcoming': [
+                {'district': d, 'next_run': datetime.fromtimestamp(due).strftime(TIME_FORMAT)}
+                for due, d in upcoming
+            ],
+        }
+
+    def _write_status(self):
+        write_json(STATUS_FILE, self.status(), indent=2)
+
+    def _load_state(self) -> Dict:
+        if not STATE_FILE.exists():
+            return {}
+        try:
+            with open(STATE_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print("⚠️  Could not read daemon state, starting fresh")
+            return {}
+
+    def _save_state(self):
+        write_json(STATE_FILE, self.state, indent=2)
+
+
+def read_status(districts: Optional[List[str]] = None, now: Optional[float] = None) -> Dict:
+    """
+    Queue status from the persisted daemon files, without changing them
+
+    Safe to call while a daemon is running: nothing is rebuilt or written.
+
+    Args:
+        districts: AOIs to report, default: all configured districts
+        now: Reference time (default: now)
+
+    Returns:
+        Dict with 'queue_depth' (due AOIs), 'scheduled', 'unscheduled' (AOIs
+        the daemon has not seen yet), 'running' and 'upcoming' next runs
+    """
+    now = now or time.time()
+    districts = districts or list(DISTRICTS.keys())
+    state, status = {}, {}
+    for path, target in ((STATE_FILE, state), (STATUS_FILE, status)):
+        try:
+            with open(path, 'r') as f:
+                target.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    scheduled = sorted(
+        (datetime.strptime(state[d]['next_run'], TIME_FORMAT).timestamp(), d)
+        for d in districts if d in state
+    )
+    return {
+        'queue_depth': sum(1 for due, _ in scheduled if due <= now),
+        'scheduled': len(scheduled),
+        'unscheduled': [d for d in districts if d not in state],
+        'running': status.get('running'),
+        'updated': status.get('updated'),
+        'upcoming': [
+            {'district': d, 'next_run': datetime.fromtimestamp(due).strftime(TIME_FORMAT)}
+            for due, d in scheduled[:10]
+        ],
+    }
+
@@ -0,0 +1,164 @@
+"""
+Spectral index engine
+Computes a configurable set of vegetation indices (NDVI, SAVI, NDMI, EVI)
+as bands of one image, for Earth Engine images and local NumPy rasters alike
+"""
+
+import numpy as np
+from typing import Callable, Dict, List, Optional
+
+from config import INDEX_CONFIG
+import band_math
+
+
+# Index formulas over reflectance, shared by the Earth Engine and NumPy paths:
+# each is called with band_math expressions for its bands (and the named
+# INDEX_CONFIG constants), and the Earth Engine expression string is
+# rendered from the same graph.
+INDEX_DEFINITIONS = {
+    "NDVI": {
+        "formula": lambda NIR, RED: (NIR - RED) / (NIR + RED),
+        "bands": {"NIR": "B8", "RED": "B4"},
+    },
+    "SAVI": {
+        "formula": lambda NIR, RED, L: (1 + L) * (NIR - RED) / (NIR + RED + L),
+        "bands": {"NIR": "B8", "RED": "B4"},
+        "constants": {"L": "savi_l"},
+    },
+    "NDMI": {
+        "formula": lambda NIR, SWIR1: (NIR - SWIR1) / (NIR + SWIR1),
+        "bands": {"NIR": "B8", "SWIR1": "B11"},
+    },
+    "EVI": {
+        "formula": lambda NIR, RED, BLUE: 2.5 * (NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1),
+        "bands": {"NIR": "B8", "RED": "B4", "BLUE": "B2"},
+    },
+}
+
+EE_OPERATORS = {'add': '+', 'subtract': '-', 'multiply': '*', 'divide': '/'}
+
+
+def resolve_indices(names: Optional[List[str]] = None) -> List[str]:
+    """
+    Resolve the list of indices to compute, NDVI first
+
+    Args:
+        names: Index names, defaults to INDEX_CONFIG['indices']
+
+    Returns:
+        List[str]: Validated index names with NDVI always included
+    """
+    names = list(names or INDEX_CONFIG['indices'])
+    unknown = [name for name in names if name not in INDEX_DEFINITIONS]
+    if unknown:
+        raise ValueError(f"Unknown spectral indices: {unknown}")
+    return ['NDVI'] + [name for name in names if name != 'NDVI']
+
+
+def required_bands(names: Optional[List[str]] = None) -> List[str]:
+    """Sentinel-2 bands needed for a set of indices"""
+    bands = []
+    for name in resolve_indices(names):
+        for band in INDEX_DEFINITIONS[name]['bands'].values():
+            if band not in bands:
+                bands.append(band)
+    return bands
+
+
+def _index_graph(name: str, variable: Callable[[str, str], band_math.Expr]) -> band_math.Expr:
+    """An index formula applied to variable(var, band) for each of its bands"""
+    definition = INDEX_DEFINITIONS[name]
+    args = {var: variable(var, band) for var, band in definition['bands'].items()}
+    args.update({var: INDEX_CONFIG[key] for var, key in definition.get('constants', {}).items()})
+    return definition['formula'](**args)
+
+
+def _render(expr: band_math.Expr) -> str:
+    """Earth Engine expression syntax of an arithmetic band-math graph"""
+    if expr.op == 'band':
+        return expr.value[0]
+    if expr.op == 'const':
+        return repr(expr.value)
+    if expr.op == 'negative':
+        return f"(-{_render(expr.args[0])})"
+    left, right = expr.args
+    return f"({_render(left)} {EE_OPERATORS[expr.op]} {_render(right)})"
+
+
+def index_expression(name: str) -> str:
+    """Earth Engine expression string of an index, over its band variables"""
+    return _render(_index_graph(name, lambda var, band: band_math.band(var)))
+
+
+def compute_indices(image, names: Optional[List[str]] = None):
+    """
+    Compute all requested indices as bands of a single Earth Engine image
+
+    Every index is derived from the same composite, so a single
+    reduceRegion over the result returns statistics for all of them.
+
+    Args:
+        image: Sentinel-2 composite (digital numbers)
+        names: Index names, defaults to INDEX_CONFIG['indices']
+
+    Returns:
+        ee.Image: One band per index, named after the index
+    """
+    import ee
+
+    names = resolve_indices(names)
+    reflectance = image.select(required_bands(names)).multiply(INDEX_CONFIG['reflectance_scale'])
+
+    bands = []
+    for name in names:
+        band_map = {
+            var: reflectance.select(band)
+            for var, band in INDEX_DEFINITIONS[name]['bands'].items()
+        }
+        bands.append(reflectance.expression(index_expression(name), band_map).rename(name))
+
+    return ee.Image.cat(bands)
+
+
+def index_exprs(names: Optional[List[str]] = None, prefix: str = '') -> Dict[str, band_math.Expr]:
+    """
+    Index formulas as band-math expressions over reflectance
+
+    Args:
+        names: Index names, defaults to INDEX_CONFIG['indices']
+        prefix: Prepended to the band names, e.g. 'current:'
+
+    Returns:
+        Dict[str, band_math.Expr]: Index name -> expression, NaN where not finite
+    """
+    scale = INDEX_CONFIG['reflectance_scale']
+    exprs = {}
+    for name in resolve_indices(names):
+        index = _index_graph(name, lambda var, band: band_math.band(prefix + band, scale))
+        # Division by zero (no-data pixels) yields inf; treat as missing
+        exprs[name] = band_math.finite(index)
+    return exprs
+
+
+def compute_index_arrays(bands: Dict[str, np.ndarray],
+                         names: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Compute all requested indices from local band rasters in one pass
+
+    The index formulas are evaluated as one fused band-math program over
+    row blocks (each band is converted to float32 reflectance once per
+    block and shared by every index); results are written into a single
+    (index, y, x) stack.
+
+    Args:
+        bands: Band name -> raster of Sentinel-2 digital numbers
+        names: Index names, defaults to INDEX_CONFIG['indices']
+
+    Returns:
+        Dict[str, np.ndarray]: Index name -> float32 raster (views into one stack)
+    """
+    names = resolve_indices(names)
+    missing = [band for band in required_bands(names) if band not in bands]
+    if missing:
+        raise ValueError(f"Missing bands for {names}: {missing}")
+    return band_math.Program(index_exprs(names)).evaluate(bands)
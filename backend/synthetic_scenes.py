@@ -0,0 +1,455 @@
+"""
+Synthetic Sentinel-2 scenes
+Seeded B4/B8/SCL rasters (optionally B2/B11) for any AOI and week sequence,
+with a seasonal vegetation cycle, clouds and shadows, and injected clearing
+events of known size, location and date. Scenes stream straight into
+memory-mapped .npy files, so district-sized (10^8 pixel) AOIs and thousands
+of small AOIs can be generated for offline load tests and for validating the
+local engine, hotspot detection and alerting against known truth.
+
+Layout of an AOI directory:
+    truth.json          bbox, shape, seed, dates, cloud cover, clearings
+    vegetation.npy      low-resolution vegetation field (0..1)
+    clouds.npy          low-resolution cloud field per date
+    <date>/B4.npy ...   uint16 digital numbers, SCL as uint8
+
+The output is a pure function of the seed, the AOI and the dates: rows are
+generated in fixed blocks with per-block random streams, so any worker count
+writes identical files.
+"""
+
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import SATELLITE_CONFIG, SYNTHETIC_CONFIG
+
+
+TRUTH_FILE = 'truth.json'
+METERS_PER_DEGREE = 111_320.0
+
+# Scene classification values written to SCL
+SCL_SHADOW, SCL_VEGETATION, SCL_BARE, SCL_CLOUD_MEDIUM, SCL_CLOUD_HIGH = 3, 4, 5, 8, 9
+
+SOIL_NDVI = 0.08  # Bare desert soil
+PEAK_DOY = 258  # Mid-September, end of the monsoon
+CLEARED_VEGETATION = 0.8  # Minimum vegetation fraction under a clearing before it happens
+
+
+def weekly_dates(end_date: str, weeks: int) -> List[str]:
+    """'weeks' dates one week apart, oldest first, ending on end_date"""
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    return [(end - timedelta(weeks=w)).strftime('%Y-%m-%d') for w in range(weeks - 1, -1, -1)]
+
+
+def bbox_shape(bbox: List[float], scale: Optional[float] = None) -> Tuple[int, int]:
+    """(rows, cols) of a bbox at the Sentinel-2 pixel size"""
+    scale = scale or SATELLITE_CONFIG['scale']
+    min_lon, min_lat, max_lon, max_lat = bbox
+    rows = (max_lat - min_lat) * METERS_PER_DEGREE / scale
+    cols = (max_lon - min_lon) * METERS_PER_DEGREE * math.cos(math.radians((min_lat + max_lat) / 2)) / scale
+    return max(1, round(rows)), max(1, round(cols))
+
+
+def seasonal_factor(date: str) -> float:
+    """Green-up in [0, 1]: 1 at the post-monsoon peak, 0 in the pre-monsoon low"""
+    doy = datetime.strptime(date, '%Y-%m-%d').timetuple().tm_yday
+    return 0.5 * (1 + math.cos(2 * math.pi * (doy - PEAK_DOY) / 365.25))
+
+
+def _smooth_field(rng: np.random.Generator, shape: Tuple[int, int]) -> np.ndarray:
+    """Spatially correlated noise in [0, 1] (box-blurred white noise)"""
+    field = rng.random(shape)
+    for axis in (0, 1):
+        field = (field + np.roll(field, 1, axis) + np.roll(field, -1, axis)) / 3
+    low, high = field.min(), field.max()
+    return ((field - low) / (high - low or 1)).astype(np.float32)
+
+
+def _upsample(field: np.ndarray, rows: np.ndarray, cols: np.ndarray, cell: int) -> np.ndarray:
+    """Bilinear samples of a low-resolution field at pixel rows x cols"""
+    def axis(coords, size):
+        position = np.clip((coords + 0.5) / cell - 0.5, 0, size - 1)
+        lower = np.floor(position).astype(np.intp)
+        upper = np.minimum(lower + 1, size - 1)
+        return lower, upper, (position - lower).astype(np.float32)
+
+    x0, x1, wx = axis(cols, field.shape[1])
+    y0, y1, wy = axis(rows, field.shape[0])
+    along_x = field[:, x0] * (1 - wx) + field[:, x1] * wx
+    return along_x[y0] * (1 - wy)[:, np.newaxis] + along_x[y1] * wy[:, np.newaxis]
+
+
+def plan_aoi(name: str, bbox: List[float], dates: Sequence[str], seed: int = 0,
+             shape: Optional[Tuple[int, int]] = None,
+             clearings: Optional[int] = None) -> Tuple[Dict, np.ndarray, np.ndarray]:
+    """
+    Draw the ground truth of a synthetic AOI
+
+    Clearings are placed on well-vegetated cells (the vegetation field under
+    them is raised to CLEARED_VEGETATION, so the loss is detectable in every
+    season) and start on one of the dates after the first, so every
+    clearing has a 'before'.
+
+    Args:
+        name: AOI name
+        bbox: [min_lon, min_lat, max_lon, max_lat]
+        dates: Scene dates, oldest first
+        seed: Random seed
+        shape: (rows, cols), defaults to the bbox at 10 m
+        clearings: Number of clearing events (default: SYNTHETIC_CONFIG['clearings_per_aoi'])
+
+    Returns:
+        Tuple of (truth dict, vegetation field, cloud fields)
+    """
+    rng = np.random.default_rng(seed)
+    rows, cols = shape or bbox_shape(bbox)
+    cell = SYNTHETIC_CONFIG['field_cell']
+    field_shape = (math.ceil(rows / cell) + 1, math.ceil(cols / cell) + 1)
+
+    # Mostly sparse desert scrub with greener patches
+    vegetation = _smooth_field(rng, field_shape) ** 2
+    clouds = np.stack([_smooth_field(rng, field_shape) for _ in dates])
+
+    cloud_cover = []
+    for _ in dates:
+        cloudy = rng.random() < SYNTHETIC_CONFIG['cloudy_fraction']
+        cloud_cover.append(float(rng.uniform(0.3, 0.9) if cloudy else rng.uniform(0.0, 0.05)))
+
+    pixel_hectares = SATELLITE_CONFIG['scale'] ** 2 / 10000.0
+    lon_step = (bbox[2] - bbox[0]) / cols
+    lat_step = (bbox[3] - bbox[1]) / rows
+    weights = vegetation.ravel() ** 3
+    events = []
+    n_clearings = SYNTHETIC_CONFIG['clearings_per_aoi'] if clearings is None else clearings
+    if len(dates) > 1:
+        low, high = SYNTHETIC_CONFIG['clearing_pixels']
+        for _ in range(n_clearings):
+            pixels = math.exp(rng.uniform(math.log(low), math.log(high)))
+            height = max(1, min(rows, round(math.sqrt(pixels) * rng.uniform(0.6, 1.4))))
+            width = max(1, min(cols, round(pixels / height)))
+            # Clearings never overlap, so each one's loss is its own
+            for _attempt in range(20):
+                centre = rng.choice(weights.size, p=weights / weights.sum())
+                row = int(np.clip(centre // field_shape[1] * cell - height // 2, 0, rows - height))
+                col = int(np.clip(centre % field_shape[1] * cell - width // 2, 0, cols - width))
+                if not any(row < e['row'] + e['rows'] and e['row'] < row + height and
+                           col < e['col'] + e['cols'] and e['col'] < col + width for e in events):
+                    break
+            else:
+                continue
+            top, left = row // cell, col // cell
+            bottom, right = (row + height) // cell + 2, (col + width) // cell + 2
+            np.maximum(vegetation[top:bottom, left:right], CLEARED_VEGETATION,
+                       out=vegetation[top:bottom, left:right])
+            events.append({
+                'row': row, 'col': col, 'rows': height, 'cols': width,
+                'date': dates[int(rng.integers(1, len(dates)))],
+                'severity': float(rng.uniform(0.7, 0.95)),
+                'pixels': height * width,
+                'area_hectares': height * width * pixel_hectares,
+                # Row 0 is the northern edge
+                'bbox': [bbox[0] + col * lon_step, bbox[3] - (row + height) * lat_step,
+                         bbox[0] + (col + width) * lon_step, bbox[3] - row * lat_step],
+            })
+
+    truth = {
+        'name': name,
+        'bbox': list(bbox),
+        'shape': [rows, cols],
+        'seed': seed,
+        'dates': list(dates),
+        'cloud_cover': cloud_cover,
+        'cloud_thresholds': [float(np.quantile(field, 1 - cover)) if cover > 0 else 1.0
+                             for field, cover in zip(clouds, cloud_cover)],
+        'clearings': events,
+    }
+    return truth, vegetation, clouds
+
+
+@lru_cache(maxsize=64)
+def _load_aoi(aoi_dir: str) -> Tuple[Dict, np.ndarray, np.ndarray]:
+    """Truth and fields of an AOI (cached per worker process)"""
+    path = Path(aoi_dir)
+    return (load_truth(path), np.load(path / 'vegetation.npy'),
+            np.load(path / 'clouds.npy', mmap_mode='r'))
+
+
+def render_rows(truth: Dict, vegetation: np.ndarray, clouds: np.ndarray, date_index: int,
+                row_start: int, row_stop: int, bands: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Band rasters for a block of rows of one scene
+
+    Returns:
+        Dict[str, np.ndarray]: Band name -> uint16 digital numbers ('SCL': uint8)
+    """
+    rows, cols = truth['shape']
+    date = truth['dates'][date_index]
+    cell = SYNTHETIC_CONFIG['field_cell']
+    rng = np.random.default_rng([truth['seed'], date_index, row_start])
+    row_coords = np.arange(row_start, row_stop)
+    col_coords = np.arange(cols)
+
+    def noise(sigma: float) -> np.ndarray:
+        # Triangular (sum of two uniforms), unit variance before scaling;
+        # about twice as fast as Gaussian draws
+        shape = (row_stop - row_start, cols)
+        values = rng.random(shape, dtype=np.float32)
+        values += rng.random(shape, dtype=np.float32)
+        values -= np.float32(1)
+        values *= np.float32(sigma * math.sqrt(6))
+        return values
+
+    veg = _upsample(vegetation, row_coords, col_coords, cell)
+    ndvi = veg * np.float32(0.25 + 0.35 * seasonal_factor(date))
+    ndvi += np.float32(SOIL_NDVI)
+    ndvi += noise(0.015)
+
+    for event in truth['clearings']:
+        top, bottom = max(event['row'], row_start), min(event['row'] + event['rows'], row_stop)
+        if event['date'] <= date and top < bottom:
+            window = ndvi[top - row_start:bottom - row_start, event['col']:event['col'] + event['cols']]
+            window -= np.float32(SOIL_NDVI)
+            window *= np.float32(1 - event['severity'])
+            window += np.float32(SOIL_NDVI)
+    np.clip(ndvi, -0.2, 0.95, out=ndvi)
+
+    # Brighter red over bare sand; NIR follows from the target NDVI
+    red = veg
+    red *= np.float32(-0.22)
+    red += np.float32(0.30)
+    nir = 1 + ndvi
+    nir /= 1 - ndvi
+    nir *= red
+
+    scl = np.where(ndvi >= 0.25, SCL_VEGETATION, SCL_BARE).astype(np.uint8)
+    threshold = truth['cloud_thresholds'][date_index]
+    if threshold < 1.0:
+        density = _upsample(clouds[date_index], row_coords, col_coords, cell)
+        offset = SYNTHETIC_CONFIG['shadow_offset']
+        shadow = _upsample(clouds[date_index], row_coords - offset, col_coords - offset, cell) > threshold
+        cloud = density > threshold
+        shadow &= ~cloud
+        np.multiply(red, np.float32(0.4), out=red, where=shadow)
+        np.multiply(nir, np.float32(0.4), out=nir, where=shadow)
+        scl[shadow] = SCL_SHADOW
+        brightness = density - np.float32(threshold)
+        brightness *= np.float32(0.3)
+        brightness += np.float32(0.35)
+        np.copyto(red, brightness, where=cloud)
+        brightness *= np.float32(1.05)
+        np.copyto(nir, brightness, where=cloud)
+        scl[cloud] = SCL_CLOUD_MEDIUM
+        scl[density > threshold + 0.1] = SCL_CLOUD_HIGH
+
+    reflectance = {'B4': red, 'B8': nir}
+    if 'B2' in bands:
+        reflectance['B2'] = red * np.float32(0.55)
+    if 'B11' in bands:
+        reflectance['B11'] = red * np.float32(0.9) + nir * np.float32(0.35)
+
+    out = {}
+    for band in bands:
+        if band == 'SCL':
+            out[band] = scl
+        else:
+            values = reflectance[band] * np.float32(10000)
+            values += noise(20)
+            np.clip(values, 1, 65535, out=values)
+            out[band] = values.astype(np.uint16)
+    return out
+
+
+def _band_path(aoi_dir: Path, date: str, band: str) -> Path:
+    return aoi_dir / date / f"{band}.npy"
+
+
+def _write_rows(aoi_dir: str, date_index: int, row_start: int, row_stop: int,
+                bands: Tuple[str, ...]) -> int:
+    """Worker: render a row block of one scene into its band memmaps"""
+    truth, vegetation, clouds = _load_aoi(aoi_dir)
+    date = truth['dates'][date_index]
+    block = render_rows(truth, vegetation, clouds, date_index, row_start, row_stop, bands)
+    for band, values in block.items():
+        out = np.load(_band_path(Path(aoi_dir), date, band), mmap_mode='r+')
+        out[row_start:row_stop] = values
+        out.flush()
+        del out
+    return row_stop - row_start
+
+
+def _prepare_aoi(aoi_dir: Path, truth: Dict, vegetation: np.ndarray, clouds: np.ndarray,
+                 bands: Sequence[str]) -> List[Tuple]:
+    """Write truth and fields, allocate the band files, return the row-block jobs"""
+    aoi_dir.mkdir(parents=True, exist_ok=True)
+    with open(aoi_dir / TRUTH_FILE, 'w') as f:
+        json.dump(truth, f, indent=2)
+    np.save(aoi_dir / 'vegetation.npy', vegetation)
+    np.save(aoi_dir / 'clouds.npy', clouds)
+    _load_aoi.cache_clear()
+
+    rows, cols = truth['shape']
+    for date in truth['dates']:
+        (aoi_dir / date).mkdir(exist_ok=True)
+        for band in bands:
+            dtype = np.uint8 if band == 'SCL' else np.uint16
+            np.lib.format.open_memmap(_band_path(aoi_dir, date, band), mode='w+',
+                                      dtype=dtype, shape=(rows, cols))
+
+    block_rows = SYNTHETIC_CONFIG['block_rows']
+    return [(str(aoi_dir), d, r, min(r + block_rows, rows), tuple(bands))
+            for d in range(len(truth['dates'])) for r in range(0, rows, block_rows)]
+
+
+def _run_jobs(jobs: List[Tuple], workers: Optional[int]):
+    if workers is None:
+        workers = SYNTHETIC_CONFIG['workers'] or os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        for job in jobs:
+            _write_rows(*job)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_write_rows, *zip(*jobs), chunksize=max(1, len(jobs) // (workers * 8))))
+
+
+def generate_aois(aois: Dict[str, Dict], dates: Sequence[str], seed: int = 0,
+                  out_dir: Optional[Path] = None, bands: Optional[Sequence[str]] = None,
+                  workers: Optional[int] = None, clearings: Optional[int] = None) -> Dict[str, Path]:
+    """
+    Generate synthetic scenes for many AOIs in one process pool
+
+    Args:
+        aois: AOI name -> {'bbox': [...], optional 'shape': (rows, cols)}
+        dates: Scene dates, oldest first (see weekly_dates)
+        seed: Base seed; each AOI gets its own stream derived from it
+        out_dir: Root directory (default: SYNTHETIC_CONFIG['dir'])
+        bands: Bands to write (default: SYNTHETIC_CONFIG['bands'])
+        workers: Process count, None = SYNTHETIC_CONFIG['workers'] / all cores, 1 = serial
+        clearings: Clearing events per AOI (default: SYNTHETIC_CONFIG['clearings_per_aoi'])
+
+    Returns:
+        Dict[str, Path]: AOI name -> AOI directory
+    """
+    out_dir = Path(out_dir or SYNTHETIC_CONFIG['dir'])
+    bands = list(bands or SYNTHETIC_CONFIG['bands'])
+    unknown = set(bands) - {'B2', 'B4', 'B8', 'B11', 'SCL'}
+    if unknown:
+        raise ValueError(f"Cannot synthesize bands: {sorted(unknown)}")
+
+    directories = {}
+    jobs = []
+    pixels = 0
+    for i, (name, aoi) in enumerate(aois.items()):
+        truth, vegetation, clouds = plan_aoi(name, aoi['bbox'], dates, seed=seed * 1_000_003 + i,
+                                             shape=aoi.get('shape'), clearings=clearings)
+        directories[name] = out_dir / name
+        jobs.extend(_prepare_aoi(directories[name], truth, vegetation, clouds, bands))
+        pixels += truth['shape'][0] * truth['shape'][1] * len(dates)
+
+    print(f"🧪 Generating {len(aois)} AOI(s) x {len(dates)} scene(s), {pixels / 1e6:.1f} Mpx "
+          f"({', '.join(bands)}) in {out_dir}")
+    if jobs:
+        _run_jobs(jobs, workers)
+    return directories
+
+
+def generate_aoi(name: str, bbox: List[float], dates: Sequence[str], seed: int = 0,
+                 shape: Optional[Tuple[int, int]] = None, **kwargs) -> Path:
+    """Generate synthetic scenes for one AOI (see generate_aois)"""
+    return generate_aois({name: {'bbox': bbox, 'shape': shape}}, dates, seed=seed, **kwargs)[name]
+
+
+def grid_aois(count: int, size_degrees: float = 0.05,
+              origin: Tuple[float, float] = (70.0, 24.5)) -> Dict[str, Dict]:
+    """'count' square AOIs on a grid over western Rajasthan"""
+    per_row = math.ceil(math.sqrt(count))
+    aois = {}
+    for i in range(count):
+        lon = origin[0] + (i % per_row) * size_degrees
+        lat = origin[1] + (i // per_row) * size_degrees
+        aois[f'Synthetic{i:05d}'] = {'bbox': [lon, lat, lon + size_degrees, lat + size_degrees]}
+    return aois
+
+
+def load_truth(aoi_dir: Path) -> Dict:
+    """Ground truth of a generated AOI"""
+    with open(Path(aoi_dir) / TRUTH_FILE, 'r') as f:
+        return json.load(f)
+
+
+def load_scene(aoi_dir: Path, date: str, bands: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Band rasters of one generated scene as read-only memmaps
+
+    Band names match safe_reader.read_aoi ('B4', 'B8', 'SCL', ...), so
+    scenes feed local_composite and LocalRasterEngine directly.
+    """
+    scene_dir = Path(aoi_dir) / date
+    paths = [scene_dir / f"{band}.npy" for band in bands] if bands else sorted(scene_dir.glob('*.npy'))
+    return {path.stem: np.load(path, mmap_mode='r') for path in paths}
+
+
+def cleared_pixels(truth: Dict, as_of: str, since: Optional[str] = None,
+                   valid: Optional[np.ndarray] = None) -> int:
+    """
+    Pixels cleared on or before as_of (and after 'since'), for checking detected loss
+
+    Args:
+        truth: Ground truth (load_truth)
+        as_of: Last date included
+        since: Clearings on or before this date are excluded
+        valid: Optional boolean raster; only True pixels are counted (e.g. clear in both scenes)
+    """
+    total = 0
+    for event in truth['clearings']:
+        if event['date'] > as_of or (since is not None and event['date'] <= since):
+            continue
+        if valid is None:
+            total += event['pixels']
+        else:
+            window = valid[event['row']:event['row'] + event['rows'], event['col']:event['col'] + event['cols']]
+            total += int(np.count_nonzero(window))
+    return total
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate synthetic Sentinel-2 scenes')
+    parser.add_argument('--aois', type=int, default=1, help='Number of grid AOIs')
+    parser.add_argument('--district', type=str, help='Generate a configured district at full size instead')
+    parser.add_argument('--shape', type=int, nargs=2, metavar=('ROWS', 'COLS'),
+                        help='Pixels per AOI (default: the bbox at 10 m)')
+    parser.add_argument('--weeks', type=int, default=8)
+    parser.add_argument('--end', type=str, default=datetime.now().strftime('%Y-%m-%d'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bands', nargs='+', help=f"Default: {' '.join(SYNTHETIC_CONFIG['bands'])}")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--out', type=Path)
+    args = parser.parse_args()
+
+    if args.district:
+        from config import DISTRICTS
+        aois = {args.district: {'bbox': DISTRICTS[args.district]['bbox']}}
+    else:
+        aois = grid_aois(args.aois)
+    if args.shape:
+        for aoi in aois.values():
+            aoi['shape'] = tuple(args.shape)
+
+    directories = generate_aois(aois, weekly_dates(args.end, args.weeks), seed=args.seed,
+                                out_dir=args.out, bands=args.bands, workers=args.workers)
+    clearings = sum(len(load_truth(path)['clearings']) for path in directories.values())
+    print(f"✓ {len(directories)} AOI(s) with {clearings} clearing event(s) written")
+
+
+if __name__ == "__main__":
+    main()
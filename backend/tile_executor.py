@@ -0,0 +1,139 @@
+"""
+Tile-sharded process pool for the local raster engine
+Splits rasters into row tiles, hands them to worker processes through
+shared memory or memory-mapped files, and returns per-tile partial results
+"""
+
+import numpy as np
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import LOCAL_ENGINE_CONFIG
+
+
+# Array spec passed to workers instead of the array itself:
+# ('shm', name, shape, dtype) or ('memmap', filename, offset, shape, dtype)
+ArraySpec = Tuple
+
+
+def _array_spec(array: np.ndarray, segments: List[shared_memory.SharedMemory]) -> ArraySpec:
+    """Describe an array so a worker can map it without pickling the data"""
+    if isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap) \
+            and array.flags['C_CONTIGUOUS'] and array.filename:
+        return ('memmap', array.filename, array.offset, array.shape, array.dtype.str)
+
+    array = np.ascontiguousarray(array)
+    segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+    segments.append(segment)
+    return ('shm', segment.name, array.shape, array.dtype.str)
+
+
+def _attach(spec: ArraySpec):
+    """Map an array spec in a worker; returns (array, handle to close)"""
+    if spec[0] == 'memmap':
+        _, filename, offset, shape, dtype = spec
+        return np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape), None
+
+    _, name, shape, dtype = spec
+    # Pool workers share the parent's resource tracker; the parent unlinks
+    segment = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=dtype, buffer=segment.buf), segment
+
+
+def _run_tile(tile_func: Callable, specs: Dict[str, ArraySpec], rows: Tuple[int, int],
+              params: Dict):
+    """Worker entry point: map the inputs, slice one tile and run tile_func"""
+    arrays = {}
+    segments = []
+    array = None
+    try:
+        for key, spec in specs.items():
+            array, segment = _attach(spec)
+            arrays[key] = array[rows[0]:rows[1]]
+            if segment is not None:
+                segments.append(segment)
+        array = None  # Only the tile views stay referenced
+        return tile_func(arrays, **params)
+    finally:
+        # Views must be released before the segments can be closed
+        arrays.clear()
+        for segment in segments:
+            segment.close()
+
+
+class TileExecutor:
+    """
+    Run a per-tile function over row tiles of a set of same-shape rasters
+
+    The pool is created lazily and reused across calls. Small rasters, or
+    workers=1, run serially in-process on array views.
+    """
+
+    def __init__(self, workers: Optional[int] = None, tile_rows: Optional[int] = None,
+                 min_parallel_pixels: Optional[int] = None):
+        if workers is None:
+            workers = LOCAL_ENGINE_CONFIG['workers'] or os.cpu_count() or 1
+        self.workers = max(1, workers)
+        self.tile_rows = tile_rows or LOCAL_ENGINE_CONFIG['tile_rows']
+        self.min_parallel_pixels = (LOCAL_ENGINE_CONFIG['min_parallel_pixels']
+                                    if min_parallel_pixels is None else min_parallel_pixels)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Shut down the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def tiles(self, rows: int) -> List[Tuple[int, int]]:
+        """Row ranges covering a raster"""
+        return [(r, min(r + self.tile_rows, rows)) for r in range(0, rows, self.tile_rows)]
+
+    def map(self, tile_func: Callable, arrays: Dict[str, np.ndarray], **params) -> List:
+        """
+        Apply tile_func to every row tile
+
+        Args:
+            tile_func: Top-level function (arrays: Dict[str, np.ndarray], **params) -> partial
+            arrays: Same-shape rasters (first axis = rows)
+            **params: Extra picklable keyword arguments for tile_func
+
+        Returns:
+            List: Partial results in tile order, for the caller to merge
+        """
+        shapes = {array.shape[:2] for array in arrays.values()}
+        if len(shapes) != 1:
+            raise ValueError(f"Rasters must share a shape, got {sorted(shapes)}")
+        rows, cols = shapes.pop()
+        tiles = self.tiles(rows)
+
+        if self.workers == 1 or len(tiles) == 1 or rows * cols < self.min_parallel_pixels:
+            return [
+                tile_func({key: array[r0:r1] for key, array in arrays.items()}, **params)
+                for r0, r1 in tiles
+            ]
+
+        segments: List[shared_memory.SharedMemory] = []
+        try:
+            specs = {key: _array_spec(array, segments) for key, array in arrays.items()}
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [
+                self._pool.submit(_run_tile, tile_func, specs, tile, params)
+                for tile in tiles
+            ]
+            return [future.result() for future in futures]
+        finally:
+            for segment in segments:
+                segment.close()
+                segment.unlink()
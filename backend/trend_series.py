@@ -0,0 +1,151 @@
+"""
+NDVI trend series for charts
+Weekly, monthly and seasonal rollups plus LTTB downsampling, so a trend
+chart payload stays bounded at any history length
+"""
+
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import TREND_CONFIG
+from instrumentation import traced
+from materialized_views import load_series
+
+
+PERIODS = ('weekly', 'monthly', 'season')
+
+# Indian meteorological seasons by month
+SEASONS = {
+    12: 'winter', 1: 'winter', 2: 'winter',
+    3: 'summer', 4: 'summer', 5: 'summer',
+    6: 'monsoon', 7: 'monsoon', 8: 'monsoon', 9: 'monsoon',
+    10: 'post_monsoon', 11: 'post_monsoon',
+}
+
+
+def period_key(date: str, period: str) -> str:
+    """Bucket key of a 'YYYY-MM-DD' date ('2024-07', '2024-monsoon', ...)"""
+    if period == 'weekly':
+        return date
+    if period == 'monthly':
+        return date[:7]
+    if period == 'season':
+        year, month = int(date[:4]), int(date[5:7])
+        # December belongs to the winter of the following year
+        return f"{year + 1 if month == 12 else year}-{SEASONS[month]}"
+    raise ValueError(f"Unknown period: {period} (expected one of {PERIODS})")
+
+
+def rollup(points: List[Dict], period: str = 'weekly') -> List[Dict]:
+    """
+    Aggregate dated NDVI points into periods
+
+    Args:
+        points: Dicts with 'date' ('YYYY-MM-DD') and 'ndvi_mean', sorted by date
+        period: 'weekly', 'monthly' or 'season'
+
+    Returns:
+        List[Dict]: Per period 'period', 'date' (first date), 'mean', 'min',
+        'max' and 'count', in date order
+    """
+    rows: List[Dict] = []
+    for point in points:
+        value = point.get('ndvi_mean')
+        if value is None:
+            continue
+        key = period_key(point['date'], period)
+        if rows and rows[-1]['period'] == key:
+            row = rows[-1]
+            row['sum'] += value
+            row['count'] += 1
+            row['min'] = min(row['min'], value)
+            row['max'] = max(row['max'], value)
+        else:
+            rows.append({'period': key, 'date': point['date'], 'sum': value,
+                         'count': 1, 'min': value, 'max': value})
+
+    for row in rows:
+        row['mean'] = row.pop('sum') / row['count']
+    return rows
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets point selection
+
+    Keeps the first and last points and, per bucket, the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    average, which preserves peaks and drops that uniform thinning loses.
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points")
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(rows: List[Dict], max_points: int) -> List[Dict]:
+    """LTTB-downsample rollup rows on their mean values"""
+    if len(rows) <= max_points:
+        return rows
+    x = np.array([datetime.strptime(row['date'], '%Y-%m-%d').toordinal() for row in rows], dtype=float)
+    y = np.array([row['mean'] for row in rows], dtype=float)
+    return [rows[i] for i in lttb_indices(x, y, max_points)]
+
+
+def build_trend(points: List[Dict], period: str = 'weekly', start: Optional[str] = None,
+                end: Optional[str] = None, max_points: Optional[int] = None) -> Dict:
+    """
+    Trend series for a date range, ready to plot
+
+    Args:
+        points: Dicts with 'date' and 'ndvi_mean', sorted by date
+        period: 'weekly', 'monthly' or 'season'
+        start: First date to include, 'YYYY-MM-DD'
+        end: Last date to include, 'YYYY-MM-DD'
+        max_points: Point budget (default: TREND_CONFIG['max_points'])
+
+    Returns:
+        Dict with 'period', 'points' (rollup rows), 'total' (rows before
+        downsampling) and 'downsampled'
+    """
+    max_points = max_points or TREND_CONFIG['max_points']
+    points = [p for p in points
+              if (start is None or p['date'] >= start) and (end is None or p['date'] <= end)]
+    rows = rollup(points, period)
+    kept = downsample(rows, max_points)
+    return {
+        'period': period,
+        'points': kept,
+        'total': len(rows),
+        'downsampled': len(kept) < len(rows),
+    }
+
+
+@traced('load_trend')
+def load_trend(district: str, period: str = 'weekly', start: Optional[str] = None,
+               end: Optional[str] = None, max_points: Optional[int] = None,
+               data_dir: Optional[Path] = None) -> Dict:
+    """Trend series of a district from its materialized weekly series view"""
+    trend = build_trend(load_series(district, data_dir)['weekly'], period, start, end, max_points)
+    trend['district'] = district
+    return trend
@@ -0,0 +1,248 @@
+"""
+Vegetation-capable mask for Rajasthan districts
+Excludes water, built-up and barren pixels (city areas, lakes, dune fields)
+so they never enter NDVI statistics or loss counting
+"""
+
+import ee
+import numpy as np
+import hashlib
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import SATELLITE_CONFIG, MASK_CONFIG, DATA_DIR
+from ee_cassette import analysis_now
+
+
+MASK_DIR = DATA_DIR / 'masks'
+REGISTRY_FILE = MASK_DIR / 'registry.json'
+
+
+def mask_key(bbox: List[float], source: str) -> str:
+    """Stable cache key for an AOI bounding box and mask source"""
+    raw = json.dumps({'bbox': [round(v, 6) for v in bbox], 'source': source})
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class VegetationMask:
+    """Build, cache and apply per-AOI vegetation-capable masks"""
+
+    def __init__(self, mask_config: Optional[Dict] = None):
+        self.config = mask_config or MASK_CONFIG
+        self.source = self.config['source']
+        self._cache: Dict[str, ee.Image] = {}
+        self._registry = self._load_registry()
+
+    def get(self, bbox: List[float]) -> ee.Image:
+        """
+        Get the vegetation-capable mask for an AOI
+
+        Uses an exported asset once its export has finished, otherwise the
+        mask expression built from the land-cover product / long-term max NDVI.
+        The image is cached in memory so it is built once per process.
+
+        Args:
+            bbox: [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            ee.Image: Single band mask, 1 where trees can grow, 0 elsewhere
+        """
+        key = mask_key(bbox, self.source)
+        if key not in self._cache:
+            entry = self._registry.get(key)
+            if entry and self._asset_ready(key, entry):
+                self._cache[key] = ee.Image(entry['asset_id']).rename('capable')
+            else:
+                self._cache[key] = self.build(bbox)
+        return self._cache[key]
+
+    def apply(self, image: ee.Image, bbox: List[float]) -> ee.Image:
+        """Mask out pixels that cannot hold vegetation"""
+        return image.updateMask(self.get(bbox))
+
+    def build(self, bbox: List[float]) -> ee.Image:
+        """
+        Build the mask expression for an AOI
+
+        Args:
+            bbox: [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            ee.Image: Mask image clipped to the AOI
+        """
+        region = ee.Geometry.Rectangle(bbox)
+
+        if self.source == 'worldcover':
+            mask = self._worldcover_mask()
+        elif self.source == 'max_ndvi':
+            mask = self._max_ndvi_mask(region)
+        elif self.source == 'combined':
+            mask = self._worldcover_mask().And(self._max_ndvi_mask(region))
+        else:
+            raise ValueError(f"Unknown mask source: {self.source}")
+
+        return mask.rename('capable').clip(region)
+
+    def _worldcover_mask(self) -> ee.Image:
+        """Land-cover based mask: 1 unless the class is excluded"""
+        landcover = ee.ImageCollection(self.config['worldcover_collection']).first().select('Map')
+        excluded = self.config['excluded_classes']
+        return landcover.remap(excluded, [0] * len(excluded), 1)
+
+    def _max_ndvi_mask(self, region: ee.Geometry) -> ee.Image:
+        """Long-term max NDVI mask: pixels that never green up are excluded"""
+        end_date = analysis_now()
+        start_date = end_date - timedelta(days=365 * self.config['max_ndvi_years'])
+
+        collection = ee.ImageCollection(SATELLITE_CONFIG['collection']) \
+            .filterBounds(region) \
+            .filterDate(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')) \
+            .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE',
+                                  SATELLITE_CONFIG['cloud_cover_max']))
+
+        max_ndvi = collection.map(
+            lambda img: img.normalizedDifference(['B8', 'B4'])
+        ).max()
+        return max_ndvi.gte(self.config['max_ndvi_threshold'])
+
+    def export(self, district_name: str, bbox: List[float]) -> Optional[str]:
+        """
+        Export the mask for an AOI as an Earth Engine asset
+
+        The asset is registered as pending; once the export task has
+        succeeded, later runs read the stored asset instead of recomputing
+        the mask.
+
+        Returns:
+            str: Asset ID, or None if no asset_root is configured
+        """
+        asset_root = self.config.get('asset_root')
+        if not asset_root:
+            print("⚠️  MASK_CONFIG['asset_root'] not set, mask will be computed on the fly")
+            return None
+
+        key = mask_key(bbox, self.source)
+        asset_id = f"{asset_root}/vegetation_mask_{district_name.lower()}_{key}"
+
+        task = ee.batch.Export.image.toAsset(
+            image=self.build(bbox).toByte(),
+            description=f"vegetation_mask_{district_name.lower()}",
+            assetId=asset_id,
+            region=ee.Geometry.Rectangle(bbox),
+            scale=SATELLITE_CONFIG['scale'],
+            maxPixels=1e10
+        )
+        task.start()
+
+        self._registry[key] = {
+            'asset_id': asset_id,
+            'district': district_name,
+            'source': self.source,
+            'bbox': bbox,
+            'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'task_id': task.id,
+            'status': 'pending',
+        }
+        self._save_registry()
+        self._cache.pop(key, None)
+
+        print(f"✓ Export started for {district_name}: {asset_id}")
+        return asset_id
+
+    def _asset_ready(self, key: str, entry: Dict) -> bool:
+        """
+        Whether a registered mask asset can be read
+
+        A pending entry is promoted to 'ready' once its export task has
+        completed or the asset exists; failed or cancelled exports are
+        dropped from the registry so the mask is exported again later.
+        """
+        if entry.get('status') == 'ready':
+            return True
+
+        state = None
+        if entry.get('task_id'):
+            try:
+                state = ee.data.getTaskStatus(entry['task_id'])[0].get('state')
+            except ee.EEException:
+                state = None
+        if state in ('FAILED', 'CANCELLED', 'CANCEL_REQUESTED'):
+            print(f"⚠️  Mask export {entry['asset_id']} {state.lower()}, using the mask expression")
+            self._registry.pop(key, None)
+            self._save_registry()
+            return False
+        if state in ('UNSUBMITTED', 'READY', 'RUNNING'):
+            return False
+        if state != 'COMPLETED':
+            try:
+                ee.data.getAsset(entry['asset_id'])
+            except ee.EEException:
+                return False
+
+        entry['status'] = 'ready'
+        self._save_registry()
+        return True
+
+    def _load_registry(self) -> Dict:
+        if not REGISTRY_FILE.exists():
+            return {}
+        try:
+            with open(REGISTRY_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_registry(self):
+        MASK_DIR.mkdir(parents=True, exist_ok=True)
+        with open(REGISTRY_FILE, 'w') as f:
+            json.dump(self._registry, f, indent=2)
+
+
+def local_mask_from_max_ndvi(max_ndvi: np.ndarray, threshold: Optional[float] = None) -> np.ndarray:
+    """
+    Derive a vegetation-capable mask from a long-term max NDVI raster
+
+    Args:
+        max_ndvi: Per-pixel maximum NDVI over several years (NaN for no data)
+        threshold: Minimum max NDVI for a pixel to count as vegetation-capable
+
+    Returns:
+        np.ndarray: Boolean mask, True where trees can grow
+    """
+    if threshold is None:
+        threshold = MASK_CONFIG['max_ndvi_threshold']
+    with np.errstate(invalid='ignore'):
+        return np.asarray(max_ndvi) >= threshold
+
+
+def save_local_mask(bbox: List[float], mask: np.ndarray, source: str = 'max_ndvi') -> Path:
+    """Store a local mask raster as a boolean .npy file"""
+    MASK_DIR.mkdir(parents=True, exist_ok=True)
+    path = MASK_DIR / f"{mask_key(bbox, source)}.npy"
+    np.save(path, np.asarray(mask, dtype=bool))
+    return path
+
+
+def load_local_mask(bbox: List[float], source: str = 'max_ndvi') -> Optional[np.ndarray]:
+    """Load a stored local mask memory-mapped, or None if not cached"""
+    path = MASK_DIR / f"{mask_key(bbox, source)}.npy"
+    if not path.exists():
+        return None
+    return np.load(path, mmap_mode='r')
+
+
+def main():
+    """Export vegetation masks for all districts as Earth Engine assets"""
+    from config import DISTRICTS
+    from ee_auth import initialize_earth_engine
+
+    initialize_earth_engine()
+    masks = VegetationMask()
+    for district_name, district in DISTRICTS.items():
+        masks.export(district_name, district['bbox'])
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,20 @@ Monitors week-over-week green cover changes in Rajasthan districts
 """
 
 import ee
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Tuple, List
-import json
-from pathlib import Path
+from typing import Dict, Tuple, List, Optional
 
-from config import DISTRICTS, SATELLITE_CONFIG, NDVI_THRESHOLDS, ALERT_CONFIG
+from config import (DISTRICTS, SATELLITE_CONFIG, NDVI_THRESHOLDS, MASK_CONFIG,
+                    CLIMATOLOGY_CONFIG)
+from climatology import Climatology
+from alert_engine import threshold_alert
 from ee_auth import initialize_earth_engine
+from ee_cassette import analysis_now
+from instrumentation import span, traced
+from vegetation_mask import VegetationMask
+from spectral_indices import compute_indices, resolve_indices
+from results_store import find_latest_result, save_results
+from result_types import AnalysisResult
 
 
 class VegetationMonitor:
@@ -30,7 +35,9 @@ class VegetationMonitor:
 
         self.districts = DISTRICTS
         self.satellite_config = SATELLITE_CONFIG
+        self.vegetation_mask = VegetationMask() if MASK_CONFIG['enabled'] else None
 
+    @traced('composite')
     def get_sentinel2_image(self, bbox: List[float], start_date: str, end_date: str) -> ee.Image:
         """
         Fetch Sentinel-2 imagery for specified area and date range
@@ -44,15 +51,51 @@ class VegetationMonitor:
             ee.Image: Median composite of Sentinel-2 images
         """
         region = ee.Geometry.Rectangle(bbox)
+        collection = self.get_collection(bbox, start_date, end_date)
 
-        collection = ee.ImageCollection(self.satellite_config['collection']) \
+        # Return median composite to reduce cloud influence
+        return collection.median().clip(region)
+
+    def get_collection(self, bbox: List[float], start_date: str, end_date: str) -> ee.ImageCollection:
+        """
+        Sentinel-2 scenes intersecting an area within a date range
+
+        Args:
+            bbox: [min_lon, min_lat, max_lon, max_lat]
+            start_date: Start date in 'YYYY-MM-DD' format
+            end_date: End date in 'YYYY-MM-DD' format
+
+        Returns:
+            ee.ImageCollection: Filtered by bounds, date and scene cloud cover
+        """
+        region = ee.Geometry.Rectangle(bbox)
+
+        return ee.ImageCollection(self.satellite_config['collection']) \
             .filterBounds(region) \
             .filterDate(start_date, end_date) \
             .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE',
                                   self.satellite_config['cloud_cover_max']))
 
-        # Return median composite to reduce cloud influence
-        return collection.median().clip(region)
+    @traced('probe_scenes')
+    def probe_scenes(self, bbox: List[float], windows: Dict[str, Tuple[str, str]]) -> Dict[str, List[str]]:
+        """
+        List the scenes that would feed each composite (metadata only)
+
+        Fetches only the system:index values, in a single request, so it
+        costs a fraction of an analysis.
+
+        Args:
+            bbox: [min_lon, min_lat, max_lon, max_lat]
+            windows: Name -> (start_date, end_date), e.g. {'current': (...), 'previous': (...)}
+
+        Returns:
+            Dict[str, List[str]]: Name -> sorted scene IDs
+        """
+        scene_ids = ee.Dictionary({
+            name: self.get_collection(bbox, start, end).aggregate_array('system:index')
+            for name, (start, end) in windows.items()
+        }).getInfo()
+        return {name: sorted(ids) for name, ids in scene_ids.items()}
 
     def calculate_ndvi(self, image: ee.Image) -> ee.Image:
         """
@@ -65,22 +108,42 @@ class VegetationMonitor:
         Returns:
             ee.Image: NDVI image with values from -1 to 1
         """
-        nir = image.select('B8')  # Near Infrared band
-        red = image.select('B4')  # Red band
+        return compute_indices(image, ['NDVI'])
 
-        ndvi = nir.subtract(red).divide(nir.add(red)).rename('NDVI')
-        return ndvi
+    @traced('indices')
+    def calculate_indices(self, image: ee.Image) -> ee.Image:
+        """
+        Calculate all configured spectral indices (NDVI, SAVI, NDMI, EVI)
 
-    def analyze_district(self, district_name: str, weeks_back: int = 2) -> Dict:
+        Args:
+            image: Sentinel-2 image
+
+        Returns:
+            ee.Image: One band per index from INDEX_CONFIG
+        """
+        return compute_indices(image)
+
+    @traced('analyze_district')
+    def analyze_district(self, district_name: str, weeks_back: int = 2,
+                         skip_if_unchanged: bool = False, as_of: Optional[str] = None,
+                         update_baseline: bool = False) -> AnalysisResult:
         """
         Analyze vegetation changes for a district
 
         Args:
             district_name: Name of district ('Jodhpur' or 'Bikaner')
             weeks_back: Number of weeks to look back for comparison
+            skip_if_unchanged: Return the last stored result, marked
+                'no_new_data', when no scene changed since it was computed
+            as_of: End date of the current week in 'YYYY-MM-DD' format (default: now,
+                or the recording date while an Earth Engine cassette is active)
+            update_baseline: Add the week's NDVI mean to the climatology baseline
+                (scheduled runs only; weeks with an anomaly alert are never added)
 
         Returns:
-            Dict containing analysis results
+            AnalysisResult (dict-style access by the result keys); 'status' is
+            'ok', 'no_new_data' or 'no_imagery' (no scene in the current week).
+            Its images are only built when first accessed.
         """
         if district_name not in self.districts:
             raise ValueError(f"District {district_name} not found")
@@ -89,7 +152,7 @@ class VegetationMonitor:
         bbox = district['bbox']
 
         # Define time periods
-        end_date = datetime.now()
+        end_date = datetime.strptime(as_of, '%Y-%m-%d') if as_of else analysis_now()
         start_current_week = end_date - timedelta(days=7)
         start_previous_week = end_date - timedelta(days=14)
 
@@ -97,6 +160,24 @@ class VegetationMonitor:
         print(f"   Current week: {start_current_week.date()} to {end_date.date()}")
         print(f"   Previous week: {start_previous_week.date()} to {start_current_week.date()}")
 
+        # Cheap metadata probe before any compositing or reduction
+        scenes = self.probe_scenes(bbox, {
+            'current': (start_current_week.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')),
+            'previous': (start_previous_week.strftime('%Y-%m-%d'), start_current_week.strftime('%Y-%m-%d')),
+        })
+
+        if not scenes['current']:
+            print("   ⏭️  No imagery in the current week, skipping analysis")
+            return AnalysisResult(district_name, end_date.strftime('%Y-%m-%d'), 'no_imagery', scenes)
+
+        if skip_if_unchanged:
+            last_result = find_latest_result(district_name)
+            if last_result is not None and last_result.get('scenes') == scenes:
+                print("   ⏭️  No new scenes since the last stored result, skipping analysis")
+                last_result = AnalysisResult.from_dict(last_result)
+                last_result.status = 'no_new_data'
+                return last_result
+
         # Fetch imagery for both weeks
         current_week_img = self.get_sentinel2_image(
             bbox,
@@ -110,18 +191,25 @@ class VegetationMonitor:
             start_current_week.strftime('%Y-%m-%d')
         )
 
-        # Calculate NDVI for both weeks
-        ndvi_current = self.calculate_ndvi(current_week_img)
-        ndvi_previous = self.calculate_ndvi(previous_week_img)
+        # Drop water, built-up and barren pixels before any statistics
+        if self.vegetation_mask is not None:
+            current_week_img = self.vegetation_mask.apply(current_week_img, bbox)
+            previous_week_img = self.vegetation_mask.apply(previous_week_img, bbox)
 
-        # Calculate change
-        ndvi_change = ndvi_current.subtract(ndvi_previous).rename('NDVI_Change')
+        # Calculate all spectral indices for both weeks from the same composites
+        indices_current = self.calculate_indices(current_week_img)
+        indices_previous = self.calculate_indices(previous_week_img)
+        index_names = resolve_indices()
 
-        # Calculate statistics
+        # Calculate change (band names carry over from the current week)
+        index_change = indices_current.subtract(indices_previous)
+        ndvi_change = index_change.select(['NDVI'], ['NDVI_Change'])
+
+        # Calculate statistics for every index in a single request
         region = ee.Geometry.Rectangle(bbox)
         scale = self.satellite_config['scale']
 
-        stats_current = ndvi_current.reduceRegion(
+        stats_current = indices_current.reduceRegion(
             reducer=ee.Reducer.mean().combine(
                 ee.Reducer.stdDev(), '', True
             ).combine(
@@ -130,16 +218,17 @@ class VegetationMonitor:
             geometry=region,
             scale=scale,
             maxPixels=1e9
-        ).getInfo()
+        )
 
-        stats_previous = ndvi_previous.reduceRegion(
+        # Single-output reducer: keys are the band names
+        stats_previous = indices_previous.reduceRegion(
             reducer=ee.Reducer.mean(),
             geometry=region,
             scale=scale,
             maxPixels=1e9
-        ).getInfo()
+        )
 
-        stats_change = ndvi_change.reduceRegion(
+        stats_change = index_change.reduceRegion(
             reducer=ee.Reducer.mean().combine(
                 ee.Reducer.min(), '', True
             ).combine(
@@ -148,7 +237,7 @@ class VegetationMonitor:
             geometry=region,
             scale=scale,
             maxPixels=1e9
-        ).getInfo()
+        )
 
         # Calculate vegetation loss areas
         vegetation_loss = ndvi_change.lt(-0.1)  # Significant loss threshold
@@ -157,15 +246,41 @@ class VegetationMonitor:
             geometry=region,
             scale=scale,
             maxPixels=1e9
-        ).getInfo()
+        )
+
+        with span('reduce_region', district=district_name):
+            stats = ee.Dictionary({
+                'current': stats_current,
+                'previous': stats_previous,
+                'change': stats_change,
+                'loss': loss_area_pixels,
+            }).getInfo()
+
+        stats_current = stats['current']
+        stats_previous = stats['previous']
+        stats_change = stats['change']
 
         # Convert to hectares (10m pixel = 100 sq m = 0.01 hectares)
-        loss_area_hectares = loss_area_pixels.get('NDVI_Change', 0) * 0.01
+        loss_area_hectares = (stats['loss'].get('NDVI_Change') or 0) * 0.01
+
+        # Per-index statistics
+        indices = {}
+        for name in index_names:
+            indices[name] = {
+                'current_mean': stats_current.get(f'{name}_mean', None),
+                'current_median': stats_current.get(f'{name}_p50', None),
+                'previous_mean': stats_previous.get(name, None),
+                'change_mean': stats_change.get(f'{name}_mean', None),
+                'change_min': stats_change.get(f'{name}_min', None),
+                'change_max': stats_change.get(f'{name}_max', None),
+            }
 
         # Compile results
-        results = {
+        results = AnalysisResult.from_dict({
             'district': district_name,
             'analysis_date': end_date.strftime('%Y-%m-%d'),
+            'status': 'ok',
+            'scenes': scenes,
             'current_week': {
                 'start': start_current_week.strftime('%Y-%m-%d'),
                 'end': end_date.strftime('%Y-%m-%d'),
@@ -178,36 +293,65 @@ class VegetationMonitor:
             'previous_week': {
                 'start': start_previous_week.strftime('%Y-%m-%d'),
                 'end': start_current_week.strftime('%Y-%m-%d'),
-                'ndvi_mean': stats_previous.get('NDVI_mean', None),
+                'ndvi_mean': stats_previous.get('NDVI', None),
             },
             'change': {
-                'ndvi_change_mean': stats_change.get('NDVI_Change_mean', None),
-                'ndvi_change_min': stats_change.get('NDVI_Change_min', None),
-                'ndvi_change_max': stats_change.get('NDVI_Change_max', None),
+                'ndvi_change_mean': stats_change.get('NDVI_mean', None),
+                'ndvi_change_min': stats_change.get('NDVI_min', None),
+                'ndvi_change_max': stats_change.get('NDVI_max', None),
                 'vegetation_loss_area_hectares': loss_area_hectares,
             },
-            'images': {
-                'ndvi_current': ndvi_current,
-                'ndvi_previous': ndvi_previous,
-                'ndvi_change': ndvi_change,
-            }
+            'indices': indices,
+            'vegetation_mask': self.vegetation_mask.source if self.vegetation_mask else None,
+        })
+        # Display/export handles, only built if a caller asks for them
+        results.images = lambda: {
+            'ndvi_current': indices_current.select('NDVI'),
+            'ndvi_previous': indices_previous.select('NDVI'),
+            'ndvi_change': ndvi_change,
+            'indices_current': indices_current,
+            'indices_previous': indices_previous,
         }
 
-        # Check for alerts
-        if results['change']['ndvi_change_mean'] is not None:
-            change_pct = (results['change']['ndvi_change_mean'] /
-                         results['previous_week']['ndvi_mean'] * 100)
-
-            if abs(change_pct) > ALERT_CONFIG['vegetation_loss_threshold']:
+        # Check for alerts: against the seasonal normal when a baseline exists,
+        # otherwise week over week
+        ndvi_mean = results['current_week']['ndvi_mean']
+        climatology = None
+        anomaly = None
+        anomalous = False
+        if CLIMATOLOGY_CONFIG['enabled'] and ndvi_mean is not None:
+            with span('climatology', district=district_name):
+                climatology = Climatology(district_name)
+                anomaly = climatology.anomaly(results['analysis_date'], ndvi_mean)
+
+        if anomaly is not None:
+            results['anomaly'] = anomaly
+            anomalous = abs(anomaly['z']) > CLIMATOLOGY_CONFIG['anomaly_z']
+            if anomalous and anomaly['departure_pct'] is not None:
+                departure = anomaly['departure_pct']
                 results['alert'] = {
                     'triggered': True,
-                    'type': 'vegetation_loss' if change_pct < 0 else 'vegetation_gain',
-                    'change_percentage': change_pct,
-                    'message': f"⚠️ {abs(change_pct):.2f}% vegetation change detected!"
+                    'type': 'vegetation_loss' if departure < 0 else 'vegetation_gain',
+                    'basis': 'climatology',
+                    'change_percentage': departure,
+                    'anomaly_z': anomaly['z'],
+                    'message': (f"⚠️ NDVI {abs(departure):.2f}% {'below' if departure < 0 else 'above'} "
+                                f"the seasonal normal for week {anomaly['week']}!")
                 }
+        elif results['change']['ndvi_change_mean'] is not None and results['previous_week']['ndvi_mean']:
+            alert = threshold_alert(results['change']['ndvi_change_mean'] /
+                                    results['previous_week']['ndvi_mean'] * 100)
+            if alert is not None:
+                results['alert'] = alert
+
+        # Anomalous weeks stay out of the baseline, so it never drifts toward them
+        if update_baseline and climatology is not None and not anomalous:
+            climatology.add_observations({results['analysis_date']: ndvi_mean})
+            climatology.save()
 
         return results
 
+    @traced('get_map_id')
     def generate_map_url(self, image: ee.Image, vis_params: Dict, region: List[float]) -> str:
         """Generate a URL for visualizing the image"""
         map_id = image.getMapId(vis_params)
@@ -219,6 +363,13 @@ class VegetationMonitor:
         print(f"📊 VEGETATION ANALYSIS SUMMARY - {results['district']}")
         print(f"{'='*60}")
         print(f"Analysis Date: {results['analysis_date']}")
+
+        if results.get('status') == 'no_imagery':
+            print("\n⏭️  No Sentinel-2 imagery for the current week")
+            print(f"{'='*60}\n")
+            return
+        if results.get('status') == 'no_new_data':
+            print("\n⏭️  No new scenes since the last run (showing stored result)")
         print(f"\n📈 Current Week NDVI Statistics:")
         print(f"   Mean NDVI: {results['current_week']['ndvi_mean']:.4f}")
         print(f"   Median NDVI: {results['current_week']['ndvi_median']:.4f}")
@@ -234,6 +385,12 @@ class VegetationMonitor:
         print(f"   Max Change: {results['change']['ndvi_change_max']:.4f}")
         print(f"   Vegetation Loss Area: {results['change']['vegetation_loss_area_hectares']:.2f} hectares")
 
+        if results.get('anomaly'):
+            anomaly = results['anomaly']
+            print(f"\n📅 Seasonal Baseline (week {anomaly['week']}):")
+            print(f"   Normal NDVI: {anomaly['baseline_median']:.4f} (IQR {anomaly['iqr']:.4f})")
+            print(f"   Anomaly: z = {anomaly['z']:+.2f}")
+
         if 'alert' in results and results['alert']['triggered']:
             print(f"\n{results['alert']['message']}")
 
@@ -251,26 +408,21 @@ def main():
     results = {}
     for district in ['Jodhpur', 'Bikaner']:
         try:
-            results[district] = monitor.analyze_district(district)
+            results[district] = monitor.analyze_district(district, skip_if_unchanged=True)
             monitor.print_summary(results[district])
         except Exception as e:
             print(f"✗ Error analyzing {district}: {e}")
 
-    # Save results to JSON
-    output_dir = Path('../data')
-    output_dir.mkdir(exist_ok=True)
-
-    # Remove ee.Image objects before JSON serialization
-    json_results = {}
-    for district, data in results.items():
-        json_data = data.copy()
-        json_data.pop('images', None)  # Remove image objects
-        json_results[district] = json_data
-
-    output_file = output_dir / f'analysis_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-    with open(output_file, 'w') as f:
-        json.dump(json_results, f, indent=2)
+    # Only store districts that were actually recomputed
+    new_results = {
+        district: data for district, data in results.items()
+        if data.get('status') != 'no_new_data'
+    }
+    if not new_results:
+        print("✓ No new imagery for any district, nothing to save")
+        return
 
+    output_file = save_results(new_results)
     print(f"✓ Results saved to {output_file}")
 
 
@@ -0,0 +1,522 @@
+"""
+Deterministic in-process stand-in for the Earth Engine client
+Implements the subset of the ee API used by VegetationMonitor on top of
+NumPy rasters, with configurable request latency and AOI pixel counts,
+and counts server round trips
+
+    import fake_ee
+    backend = fake_ee.install(pixels=1_000_000, latency=0.2)
+    from vegetation_monitor import VegetationMonitor   # now uses the fake
+"""
+
+import hashlib
+import struct
+import sys
+import threading
+import time
+import types
+import warnings
+import zlib
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+
+EPOCH = datetime(2017, 1, 1)
+WORLDCOVER_CLASSES = np.array([10, 20, 30, 40, 50, 60, 80, 90], dtype=np.float32)
+
+
+class EEException(Exception):
+    pass
+
+
+def _seed(*parts) -> int:
+    return int(hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:8], 16)
+
+
+class FakeBackend:
+    """Synthetic scenes plus request accounting"""
+
+    def __init__(self, pixels: int = 250_000, latency: float = 0.0,
+                 megapixels_per_second: Optional[float] = None, revisit_days: int = 3, seed: int = 0):
+        side = max(int(np.sqrt(pixels)), 1)
+        self.shape = (side, side)
+        self.latency = latency
+        self.megapixels_per_second = megapixels_per_second
+        self.revisit_days = revisit_days
+        self.seed = seed
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.round_trips = 0
+        self.pixels_reduced = 0
+        self.server_seconds = 0.0
+
+    def round_trip(self, obj):
+        """Evaluate a computed object as one request (thread-safe; latency overlaps)"""
+        with self._lock:
+            self.round_trips += 1
+            before = self.pixels_reduced
+            value = _evaluate(obj, {})
+            delay = self.latency
+            if self.megapixels_per_second:
+                delay += (self.pixels_reduced - before) / 1e6 / self.megapixels_per_second
+            self.server_seconds += delay
+        if delay:
+            time.sleep(delay)
+        return value
+
+    # ------------------------------------------------------------------
+    # Synthetic data
+    # ------------------------------------------------------------------
+
+    def scenes(self, bbox: List[float], start: str, end: str) -> List[Dict]:
+        """Scene metadata on a fixed revisit grid within [start, end)"""
+        start_dt = datetime.strptime(start[:10], '%Y-%m-%d')
+        end_dt = datetime.strptime(end[:10], '%Y-%m-%d')
+        offset = (start_dt - EPOCH).days % self.revisit_days
+        date = start_dt + timedelta(days=(self.revisit_days - offset) % self.revisit_days)
+        scenes = []
+        while date < end_dt:
+            key = _seed(self.seed, tuple(bbox), date.toordinal())
+            acquisition = (date - EPOCH).days // self.revisit_days
+            scenes.append({
+                'system:index': f"{date:%Y%m%dT053221}_{date:%Y%m%dT053221}_T43R{key % 1000:03d}",
+                'date': date,
+                # Every fourth acquisition is heavily clouded, the rest mostly clear
+                'CLOUDY_PIXEL_PERCENTAGE': 30 + key % 60 if acquisition % 4 == 0 else key % 15,
+                'bbox': tuple(bbox),
+            })
+            date += timedelta(days=self.revisit_days)
+        return scenes
+
+    def base_ndvi(self, bbox) -> np.ndarray:
+        """Static per-AOI vegetation field"""
+        rng = np.random.default_rng(_seed(self.seed, tuple(bbox), 'base'))
+        coarse = rng.uniform(0.05, 0.6, size=(8, 8)).astype(np.float32)
+        reps = (-(-self.shape[0] // 8), -(-self.shape[1] // 8))
+        return np.kron(coarse, np.ones(reps, dtype=np.float32))[:self.shape[0], :self.shape[1]]
+
+    def scene_bands(self, scene: Dict) -> Dict[str, np.ndarray]:
+        """Surface reflectance digital numbers for a scene"""
+        rng = np.random.default_rng(_seed(self.seed, scene['system:index']))
+        day = scene['date'].timetuple().tm_yday
+        season = np.float32(0.75 + 0.25 * np.sin((day - 200) / 365 * 2 * np.pi))
+        ndvi = self.base_ndvi(scene['bbox']) * season
+        ndvi += rng.normal(0, 0.02, self.shape).astype(np.float32)
+        red = rng.uniform(800, 1500, self.shape).astype(np.float32)
+        nir = red * (1 + ndvi) / (1 - ndvi)
+        return {'B2': red * 0.8, 'B3': red * 0.9, 'B4': red, 'B8': nir, 'B11': nir * 0.7}
+
+    def landcover(self) -> np.ndarray:
+        rng = np.random.default_rng(_seed(self.seed, 'worldcover'))
+        return rng.choice(WORLDCOVER_CLASSES, size=self.shape, p=[.1, .2, .3, .2, .05, .1, .03, .02])
+
+
+_backend: Optional[FakeBackend] = None
+
+
+def _evaluate(obj, ctx: Dict):
+    if isinstance(obj, ComputedObject):
+        key = id(obj)
+        if key not in ctx:
+            ctx[key] = obj._compute(ctx)
+        return ctx[key]
+    if isinstance(obj, dict):
+        return {k: _evaluate(v, ctx) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_evaluate(v, ctx) for v in obj]
+    return obj
+
+
+class ComputedObject:
+    """Lazy node; evaluated only inside a round trip"""
+
+    def __init__(self, compute):
+        self._compute = compute
+
+    def getInfo(self):
+        # Through ee.data like the real client, so request hooks see it
+        return sys.modules['ee'].data.computeValue(self)
+
+
+# ----------------------------------------------------------------------
+# Geometry, filters, reducers
+# ----------------------------------------------------------------------
+
+class Geometry:
+    def __init__(self, bbox):
+        self.bbox = list(bbox)
+
+    @staticmethod
+    def Rectangle(bbox):
+        return Geometry(bbox)
+
+
+class Filter:
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+    @staticmethod
+    def lt(name, value):
+        return Filter(lambda props: props.get(name, 0) < value)
+
+    @staticmethod
+    def gt(name, value):
+        return Filter(lambda props: props.get(name, 0) > value)
+
+
+class Reducer:
+    def __init__(self, outputs):
+        self.outputs = outputs  # [(suffix, func)]
+
+    @staticmethod
+    def mean():
+        return Reducer([('mean', np.nanmean)])
+
+    @staticmethod
+    def stdDev():
+        return Reducer([('stdDev', np.nanstd)])
+
+    @staticmethod
+    def min():
+        return Reducer([('min', np.nanmin)])
+
+    @staticmethod
+    def max():
+        return Reducer([('max', np.nanmax)])
+
+    @staticmethod
+    def sum():
+        return Reducer([('sum', np.nansum)])
+
+    @staticmethod
+    def percentile(percentiles):
+        return Reducer([(f'p{p}', lambda a, p=p: np.nanpercentile(a, p)) for p in percentiles])
+
+    def combine(self, reducer2, outputPrefix='', sharedInputs=False):
+        return Reducer(self.outputs + reducer2.outputs)
+
+
+# ----------------------------------------------------------------------
+# Images
+# ----------------------------------------------------------------------
+
+def _bands_of(value):
+    """Band dict of an evaluated image or a broadcastable constant"""
+    return value if isinstance(value, dict) else {'constant': np.float32(value)}
+
+
+class Image(ComputedObject):
+    def __init__(self, arg=None, _compute=None):
+        if _compute is None:
+            if isinstance(arg, str):  # Asset: an all-valid mask
+                _compute = lambda ctx: {'b1': np.ones(_backend.shape, dtype=np.float32)}
+            else:
+                value = np.float32(0 if arg is None else arg)
+                _compute = lambda ctx: {'constant': np.full(_backend.shape, value, dtype=np.float32)}
+        super().__init__(_compute)
+
+    @staticmethod
+    def cat(images):
+        def compute(ctx):
+            out = {}
+            for image in images:
+                out.update(_evaluate(image, ctx))
+            return out
+        return Image(_compute=compute)
+
+    def _map(self, func, other=None):
+        def compute(ctx):
+            bands = _evaluate(self, ctx)
+            if other is None:
+                return {name: func(array) for name, array in bands.items()}
+            other_bands = _bands_of(_evaluate(other, ctx))
+            other_values = list(other_bands.values())
+            return {
+                name: func(array, other_bands.get(name, other_values[min(i, len(other_values) - 1)]))
+                for i, (name, array) in enumerate(bands.items())
+            }
+        return Image(_compute=compute)
+
+    def select(self, selectors, names=None):
+        selectors = [selectors] if isinstance(selectors, str) else list(selectors)
+        names = names or selectors
+
+        def compute(ctx):
+            bands = _evaluate(self, ctx)
+            missing = [name for name in selectors if name not in bands]
+            if missing:
+                raise EEException(f"Image.select: Pattern '{missing[0]}' did not match any bands.")
+            return {new: bands[old] for old, new in zip(selectors, names)}
+        return Image(_compute=compute)
+
+    def rename(self, *names):
+        names = list(names[0]) if len(names) == 1 and isinstance(names[0], (list, tuple)) else list(names)
+
+        def compute(ctx):
+            return dict(zip(names, _evaluate(self, ctx).values()))
+        return Image(_compute=compute)
+
+    def multiply(self, other):
+        return self._map(np.multiply, other)
+
+    def subtract(self, other):
+        return self._map(np.subtract, other)
+
+    def lt(self, value):
+        return self._map(lambda a, b: np.where(np.isnan(a), np.nan, (a < b)).astype(np.float32), value)
+
+    def gte(self, value):
+        return self._map(lambda a, b: np.where(np.isnan(a), np.nan, (a >= b)).astype(np.float32), value)
+
+    def And(self, other):
+        return self._map(lambda a, b: ((a > 0) & (b > 0)).astype(np.float32), other)
+
+    def updateMask(self, mask):
+        def compute(ctx):
+            bands = _evaluate(self, ctx)
+            keep = next(iter(_bands_of(_evaluate(mask, ctx)).values()))
+            keep = np.nan_to_num(keep) > 0
+            return {name: np.where(keep, array, np.nan).astype(np.float32) for name, array in bands.items()}
+        return Image(_compute=compute)
+
+    def clip(self, geometry):
+        return self
+
+    def toByte(self):
+        return self
+
+    def normalizedDifference(self, band_names):
+        a, b = band_names
+
+        def compute(ctx):
+            bands = _evaluate(self, ctx)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return {'nd': (bands[a] - bands[b]) / (bands[a] + bands[b])}
+        return Image(_compute=compute)
+
+    def expression(self, expression, band_map):
+        def compute(ctx):
+            namespace = {var: next(iter(_evaluate(image, ctx).values())) for var, image in band_map.items()}
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return {'constant': eval(expression, {'__builtins__': {}}, namespace).astype(np.float32)}
+        return Image(_compute=compute)
+
+    def remap(self, from_values, to_values, defaultValue=None):
+        def compute(ctx):
+            bands = _evaluate(self, ctx)
+            out = {}
+            for name, array in bands.items():
+                result = np.full(array.shape, np.nan if defaultValue is None else defaultValue, dtype=np.float32)
+                for src, dst in zip(from_values, to_values):
+                    result[array == src] = dst
+                out['remapped'] = result
+            return out
+        return Image(_compute=compute)
+
+    def reduceRegion(self, reducer, geometry=None, scale=None, maxPixels=None, **kwargs):
+        def compute(ctx):
+            bands = _evaluate(self, ctx)
+            single = len(reducer.outputs) == 1
+            out = {}
+            for name, array in bands.items():
+                valid = array[~np.isnan(array)]
+                _backend.pixels_reduced += array.size
+                for suffix, func in reducer.outputs:
+                    key = name if single else f"{name}_{suffix}"
+                    out[key] = float(func(valid)) if valid.size else None
+            return out
+        return Dictionary(_compute=compute)
+
+    def visualize(self, bands=None, min=0, max=1, palette=None, **kwargs):
+        """8-bit vis-red / vis-green / vis-blue bands"""
+        def compute(ctx):
+            image = _evaluate(self, ctx)
+            names = [bands] if isinstance(bands, str) else list(bands or image)[:1 if palette else 3]
+            stretched = [np.clip((np.nan_to_num(image[name]) - min) / (max - min), 0, 1) for name in names]
+            if palette:
+                colors = np.array([[int(c.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4)] for c in palette])
+                rgb = colors[np.rint(stretched[0] * (len(colors) - 1)).astype(int)]
+                channels = [rgb[..., i] for i in range(3)]
+            else:
+                channels = [(s * 255).round() for s in (stretched * 3)[:3]]
+            return {name: channel.astype(np.uint8)
+                    for name, channel in zip(('vis-red', 'vis-green', 'vis-blue'), channels)}
+        return Image(_compute=compute)
+
+    def getMapId(self, vis_params=None):
+        return sys.modules['ee'].data.getMapId({'image': self, **(vis_params or {})})
+
+    def getInfo(self):
+        bands = sys.modules['ee'].data.computeValue(self)
+        return {'type': 'Image', 'bands': [{'id': name} for name in bands]}
+
+
+class ImageCollection(ComputedObject):
+    def __init__(self, collection_id=None, bbox=None, dates=None, filters=(), transforms=()):
+        self.collection_id = collection_id or ''
+        self.bbox = bbox
+        self.dates = dates
+        self.filters = filters
+        self.transforms = transforms
+        super().__init__(lambda ctx: [self._image(scene) for scene in self._scene_list()])
+
+    def _derive(self, **changes):
+        state = dict(bbox=self.bbox, dates=self.dates, filters=self.filters, transforms=self.transforms)
+        state.update(changes)
+        return ImageCollection(self.collection_id, **state)
+
+    def _scene_list(self) -> List[Dict]:
+        if self.bbox is None or self.dates is None:
+            raise ValueError("The fake client needs filterBounds and filterDate on Sentinel-2 collections")
+        scenes = _backend.scenes(self.bbox, *self.dates)
+        return [s for s in scenes if all(f.predicate(s) for f in self.filters)]
+
+    def _image(self, scene):
+        if 'WorldCover' in self.collection_id:
+            image = Image(_compute=lambda ctx: {'Map': _backend.landcover()})
+        else:
+            image = Image(_compute=lambda ctx, scene=scene: _backend.scene_bands(scene))
+        for transform in self.transforms:
+            image = transform(image)
+        return image
+
+    def filterBounds(self, geometry):
+        return self._derive(bbox=list(geometry.bbox))
+
+    def filterDate(self, start, end):
+        return self._derive(dates=(start, end))
+
+    def filter(self, flt):
+        return self._derive(filters=self.filters + (flt,))
+
+    def map(self, func):
+        return self._derive(transforms=self.transforms + (func,))
+
+    def _reduce(self, func):
+        def compute(ctx):
+            images = [_evaluate(image, ctx) for image in _evaluate(self, ctx)]
+            if not images:
+                return {}
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', category=RuntimeWarning)  # All-NaN pixels
+                return {
+                    name: func(np.stack([image[name] for image in images]), axis=0).astype(np.float32)
+                    for name in images[0]
+                }
+        return Image(_compute=compute)
+
+    def median(self):
+        return self._reduce(np.nanmedian)
+
+    def max(self):
+        return self._reduce(np.nanmax)
+
+    def first(self):
+        if 'WorldCover' in self.collection_id:
+            return self._image(None)
+        return Image(_compute=lambda ctx: _evaluate(_evaluate(self, ctx)[0], ctx))
+
+    def size(self):
+        return ComputedObject(lambda ctx: len(self._scene_list()))
+
+    def aggregate_array(self, prop):
+        return List(_compute=lambda ctx: [s[prop] for s in self._scene_list()])
+
+
+# ----------------------------------------------------------------------
+# Containers
+# ----------------------------------------------------------------------
+
+class Dictionary(ComputedObject):
+    def __init__(self, values=None, _compute=None):
+        super().__init__(_compute or (lambda ctx: _evaluate(values or {}, ctx)))
+
+    def get(self, key):
+        return ComputedObject(lambda ctx: _evaluate(self, ctx).get(key))
+
+
+class List(ComputedObject):
+    def __init__(self, values=None, _compute=None):
+        super().__init__(_compute or (lambda ctx: _evaluate(list(values or []), ctx)))
+
+
+class Number(ComputedObject):
+    def __init__(self, value):
+        super().__init__(lambda ctx: value)
+
+
+def Initialize(credentials=None, **kwargs):
+    pass
+
+
+def ServiceAccountCredentials(email=None, key_data=None, **kwargs):
+    return None
+
+
+def _compute_value(obj):
+    return _backend.round_trip(obj)
+
+
+def _get_map_id(params):
+    _backend.round_trip(params['image'])
+    fetcher = types.SimpleNamespace(url_format='https://fake-ee/tiles/{z}/{x}/{y}')
+    return {'mapid': 'fake', 'token': '', 'tile_fetcher': fetcher}
+
+
+def _png(rgb: np.ndarray) -> bytes:
+    """Minimal RGB PNG encoder"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    height, width, _ = rgb.shape
+    raw = b''.join(b'\x00' + row.tobytes() for row in rgb.astype(np.uint8))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+def _compute_pixels(params):
+    """PNG of a visualized image, resampled (nearest) to the requested grid dimensions"""
+    bands = _backend.round_trip(params['expression'])
+    dimensions = params['grid']['dimensions']
+    rgb = np.stack([bands[name] for name in ('vis-red', 'vis-green', 'vis-blue')], axis=-1)
+    rows = np.arange(dimensions['height']) * rgb.shape[0] // dimensions['height']
+    cols = np.arange(dimensions['width']) * rgb.shape[1] // dimensions['width']
+    return _png(rgb[rows][:, cols])
+
+
+def _get_algorithms():
+    return {}
+
+
+def get_backend() -> Optional[FakeBackend]:
+    """The installed backend"""
+    return _backend
+
+
+def install(pixels: int = 250_000, latency: float = 0.0, megapixels_per_second: Optional[float] = None,
+            revisit_days: int = 3, seed: int = 0) -> FakeBackend:
+    """
+    Install the fake as the 'ee' module
+
+    Must run before any backend module imports ee. Calling it again swaps
+    the backend (e.g. to change the pixel count) without re-importing.
+
+    Returns:
+        FakeBackend: Holds round_trips / pixels_reduced counters
+    """
+    global _backend
+    _backend = FakeBackend(pixels, latency, megapixels_per_second, revisit_days, seed)
+
+    module = sys.modules.get('ee')
+    if module is None or not getattr(module, '_is_fake', False):
+        module = types.ModuleType('ee')
+        module._is_fake = True
+        for name in ('EEException', 'Geometry', 'Filter', 'Reducer', 'Image', 'ImageCollection', 'Dictionary',
+                     'List', 'Number', 'ComputedObject', 'Initialize', 'ServiceAccountCredentials'):
+            setattr(module, name, globals()[name])
+        module.data = types.SimpleNamespace(computeValue=_compute_value, getMapId=_get_map_id,
+                                            computePixels=_compute_pixels, getAlgorithms=_get_algorithms)
+        sys.modules['ee'] = module
+    return _backend
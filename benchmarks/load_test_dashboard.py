@@ -0,0 +1,437 @@
+"""
+Concurrent-session load test for the dashboard and the results path
+Simulates N viewers arriving at once (an alert just went public) against
+synthetic history of configurable size, and reports render latency
+percentiles, memory per session and duplicate backend work, i.e. calls
+repeated with the same arguments across sessions.
+
+Targets:
+    views   The dashboard's data path (load_views, load_trend, and
+            analyze_district in live mode), one thread per session as the
+            Streamlit server runs sessions
+    app     frontend/app.py itself through Streamlit's AppTest
+    api     The results API over HTTP (results_api.create_server)
+
+    python benchmarks/load_test_dashboard.py --sessions 1 10 50
+    python benchmarks/load_test_dashboard.py --target app --sessions 20 --weeks 520
+    python benchmarks/load_test_dashboard.py --scenario live --sessions 10 --latency 0.3
+    python benchmarks/load_test_dashboard.py --target api --sessions 50 200
+
+Earth Engine is the in-process fake from fake_ee.py, as in run_benchmarks.py.
+"""
+
+import argparse
+import json
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from run_benchmarks import AS_OF, BENCH_DIR, RESULTS_DIR, git_revision, write_history
+
+import numpy as np  # noqa: E402
+import config  # noqa: E402
+import fake_ee  # noqa: E402
+import materialized_views  # noqa: E402
+import results_api  # noqa: E402
+import results_store  # noqa: E402
+import trend_series  # noqa: E402
+
+APP = BENCH_DIR.parent / 'frontend' / 'app.py'
+TARGETS = ('views', 'app', 'api')
+SCENARIOS = ('history', 'live')
+
+# Sidebar choices a viewer cycles through after the first (default) render
+PERIODS = ['weekly', 'monthly', 'season']
+RANGES = {'All': None, 'Last 5 years': 5 * 365, 'Last year': 365, 'Last 3 months': 91}
+
+
+class WorkTracker:
+    """
+    Counts backend calls by function and arguments across all sessions
+
+    A call whose arguments were already seen is duplicate work: with a
+    shared cache it would not have run at all.
+    """
+
+    def __init__(self):
+        self.calls: Dict[tuple, List[float]] = {}  # (name, args) -> [count, seconds, first seconds]
+        self._patched = []
+        self._lock = threading.Lock()
+
+    def wrap(self, owner, attr: str, name: Optional[str] = None, method: bool = False):
+        """Patch owner.attr with a counting wrapper (method=True: ignore self)"""
+        original = getattr(owner, attr)
+        name = name or attr
+
+        def wrapper(*args, **kwargs):
+            key = (name, repr((args[1:] if method else args, sorted(kwargs.items()))))
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    entry = self.calls.get(key)
+                    if entry is None:
+                        self.calls[key] = [1, elapsed, elapsed]
+                    else:
+                        entry[0] += 1
+                        entry[1] += elapsed
+
+        self._patched.append((owner, attr, original))
+        setattr(owner, attr, wrapper)
+
+    def restore(self):
+        for owner, attr, original in reversed(self._patched):
+            setattr(owner, attr, original)
+        self._patched = []
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per function: calls, distinct argument sets, duplicate calls and seconds"""
+        out = {}
+        for (name, _), (calls, seconds, first) in self.calls.items():
+            entry = out.setdefault(name, {'calls': 0, 'unique': 0, 'duplicate_calls': 0,
+                                          'seconds': 0.0, 'duplicate_seconds': 0.0})
+            entry['calls'] += calls
+            entry['unique'] += 1
+            entry['duplicate_calls'] += calls - 1
+            entry['seconds'] += seconds
+            entry['duplicate_seconds'] += seconds - first
+        return out
+
+
+def track_backend() -> WorkTracker:
+    """Tracker wrapping every backend entry point the dashboard and API reach"""
+    from vegetation_monitor import VegetationMonitor
+
+    tracker = WorkTracker()
+    tracker.wrap(materialized_views, 'load_views')
+    tracker.wrap(trend_series, 'load_trend')
+    tracker.wrap(results_store, 'load_all_results')
+    tracker.wrap(results_api.ResultsSnapshot, '__init__', 'ResultsSnapshot', method=True)
+    tracker.wrap(VegetationMonitor, 'analyze_district', method=True)
+    return tracker
+
+
+# ----------------------------------------------------------------------
+# Sessions
+# ----------------------------------------------------------------------
+
+def _choices(rng: random.Random, interaction: int):
+    """Sidebar state of an interaction: defaults first, then random changes"""
+    if interaction == 0:
+        return 'weekly', 'All'
+    return rng.choice(PERIODS), rng.choice(list(RANGES))
+
+
+def _trend_start(trend_range: str) -> Optional[str]:
+    days = RANGES[trend_range]
+    if days is None:
+        return None
+    # Relative to the synthetic history's last week, like 'now' for a live deployment
+    return (datetime.strptime(AS_OF, '%Y-%m-%d') - timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+class ViewsSession:
+    """The data path of one dashboard session (frontend/app.py main())"""
+
+    def __init__(self, data_dir: Path, scenario: str, seed: int):
+        self.data_dir = data_dir
+        self.scenario = scenario
+        self.rng = random.Random(seed)
+        self.districts = list(config.DISTRICTS)
+        self.state = []  # What the session keeps on screen
+
+    def render(self, interaction: int):
+        if self.scenario == 'live':
+            from vegetation_monitor import VegetationMonitor
+            monitor = VegetationMonitor()  # The app builds one per click
+            self.state = [monitor.analyze_district(d) for d in self.districts]
+            return
+
+        period, trend_range = _choices(self.rng, interaction)
+        views = materialized_views.load_views(self.data_dir)
+        latest = views['latest'] if views else {}
+        self.state = [latest.get(d) for d in self.districts] + [
+            trend_series.load_trend(d, period, start=_trend_start(trend_range), data_dir=self.data_dir)
+            for d in self.districts
+        ]
+
+
+class AppSession:
+    """One browser session of frontend/app.py, driven by Streamlit's AppTest"""
+
+    def __init__(self, data_dir: Path, scenario: str, seed: int, timeout: float = 300):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(str(APP), default_timeout=timeout)
+        self.scenario = scenario
+        self.rng = random.Random(seed)
+        self.errors = 0
+
+    def render(self, interaction: int):
+        app = self.app
+        if interaction == 0:
+            app.run()
+            if self.scenario == 'live':
+                app.sidebar.radio[0].set_value('Live Analysis').run()
+        elif self.scenario == 'live':
+            app.button[0].click().run()
+        else:
+            period, trend_range = _choices(self.rng, interaction)
+            app.sidebar.selectbox[0].set_value(period)
+            app.sidebar.selectbox[1].set_value(trend_range)
+            app.run()
+        self.errors += len(app.exception)
+
+
+class ApiSession:
+    """A client of the results API: latest results and both trend charts"""
+
+    def __init__(self, base_url: str, scenario: str, seed: int):
+        self.base_url = base_url
+        self.rng = random.Random(seed)
+        self.etags: Dict[str, str] = {}
+        self.state = []
+
+    def _get(self, path: str) -> bytes:
+        request = urllib.request.Request(self.base_url + path, headers={'Accept-Encoding': 'gzip'})
+        if path in self.etags:
+            request.add_header('If-None-Match', self.etags[path])
+        try:
+            with urllib.request.urlopen(request) as response:
+                self.etags[path] = response.headers.get('ETag', '')
+                return response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return b''
+            raise
+
+    def render(self, interaction: int):
+        period, trend_range = _choices(self.rng, interaction)
+        start = _trend_start(trend_range)
+        query = f"?period={period}" + (f"&start={start}" if start else '')
+        self.state = [self._get('/latest')] + [self._get(f"/trend/{d}{query}") for d in config.DISTRICTS]
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+
+def run_sessions(make_session: Callable[[int], object], sessions: int, interactions: int,
+                 think: float, trace_memory: bool = False) -> Dict:
+    """
+    Run sessions concurrently, all starting together
+
+    Returns:
+        Dict with (interaction, seconds) per render, errors, wall time and (when traced)
+        memory held per session and peak memory
+    """
+    latencies: List[tuple] = []  # (interaction, seconds)
+    errors: List[str] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(sessions)
+    alive = []
+
+    if trace_memory:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    def session(index: int):
+        try:
+            state = make_session(index)
+        except Exception as e:
+            barrier.abort()
+            raise e
+        with lock:
+            alive.append(state)
+        barrier.wait()
+        for interaction in range(interactions):
+            start = time.perf_counter()
+            try:
+                state.render(interaction)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append((interaction, elapsed))
+            if think:
+                time.sleep(think)
+
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()), ThreadPoolExecutor(max_workers=sessions) as pool:
+        for future in [pool.submit(session, i) for i in range(sessions)]:
+            future.result()
+    wall = time.perf_counter() - start
+
+    run = {'latencies': latencies, 'errors': errors, 'wall_seconds': wall}
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        run['mb_per_session'] = (current - baseline) / sessions / 1e6
+        run['peak_mb'] = (peak - baseline) / 1e6
+    # Exceptions the app reported itself (st.exception) instead of raising
+    run['errors'] += [f"app exception x{s.errors}" for s in alive if getattr(s, 'errors', 0)]
+    return run
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(max(values))}
+
+
+def load_test(args, data_dir: Path) -> List[Dict]:
+    """Every session count in args.sessions, each a timed run and a memory run"""
+    server = None
+    if args.target == 'api':
+        server = results_api.create_server(host='127.0.0.1', port=0, data_dir=data_dir)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        make = lambda i: ApiSession(base_url, args.scenario, seed=i)  # noqa: E731
+    elif args.target == 'app':
+        config.DATA_DIR = data_dir  # frontend/app.py reads it on every script run
+        make = lambda i: AppSession(data_dir, args.scenario, seed=i, timeout=args.timeout)  # noqa: E731
+    else:
+        make = lambda i: ViewsSession(data_dir, args.scenario, seed=i)  # noqa: E731
+
+    tracker = track_backend()
+    backend = fake_ee.get_backend()
+    reports = []
+    try:
+        for sessions in args.sessions:
+            tracker.reset()
+            backend.reset_stats()
+            timed = run_sessions(make, sessions, args.interactions, args.think)
+            work = tracker.summary()
+            round_trips = backend.round_trips
+            memory = {} if args.skip_memory else run_sessions(make, sessions, args.interactions,
+                                                              args.think, trace_memory=True)
+
+            renders = len(timed['latencies'])
+            report = {
+                'sessions': sessions,
+                'renders': renders,
+                'wall_seconds': timed['wall_seconds'],
+                'renders_per_second': renders / timed['wall_seconds'] if timed['wall_seconds'] else None,
+                'latency': percentiles([seconds for _, seconds in timed['latencies']]),
+                'first_render': percentiles([seconds for i, seconds in timed['latencies'] if i == 0]),
+                'mb_per_session': memory.get('mb_per_session'),
+                'peak_mb': memory.get('peak_mb'),
+                'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3,
+                'ee_round_trips': round_trips,
+                'backend_work': work,
+                'errors': timed['errors'][:20] + memory.get('errors', [])[:5],
+            }
+            reports.append(report)
+            print_report(report)
+    finally:
+        tracker.restore()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    return reports
+
+
+def print_report(report: Dict):
+    def ms(value):
+        return '-' if value is None else f"{value * 1000:.0f} ms"
+
+    latency = report['latency']
+    memory = '' if report['mb_per_session'] is None else \
+        f", {report['mb_per_session']:.2f} MB/session, {report['peak_mb']:.1f} MB peak"
+    print(f"👥 {report['sessions']} session(s): p50 {ms(latency['p50'])}, p95 {ms(latency['p95'])}, "
+          f"p99 {ms(latency['p99'])}, {report['renders_per_second']:.1f} renders/s{memory}")
+    for name, work in sorted(report['backend_work'].items()):
+        print(f"   {name}: {work['calls']} calls, {work['duplicate_calls']} duplicate "
+              f"({work['duplicate_seconds']:.2f}s of {work['seconds']:.2f}s repeated work)")
+    if report['ee_round_trips']:
+        print(f"   Earth Engine: {report['ee_round_trips']} round trips")
+    if report['errors']:
+        print(f"   ⚠️  {len(report['errors'])} error(s), first: {report['errors'][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent-session dashboard load test')
+    parser.add_argument('--target', choices=TARGETS, default='views')
+    parser.add_argument('--scenario', choices=SCENARIOS, default='history',
+                        help="'history' browses stored results, 'live' clicks Run Analysis")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 50],
+                        help='Concurrent session counts to run (default: 1 10 50)')
+    parser.add_argument('--interactions', type=int, default=3, help='Renders per session (default: 3)')
+    parser.add_argument('--think', type=float, default=0.0, help='Seconds between a session\'s renders')
+    parser.add_argument('--weeks', type=int, default=260, help='Weeks of synthetic history (default: 260)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Fake Earth Engine seconds per round trip')
+    parser.add_argument('--pixels', type=int, default=250_000, help='Fake AOI pixels for live analyses')
+    parser.add_argument('--timeout', type=float, default=300, help='AppTest script run timeout')
+    parser.add_argument('--skip-memory', action='store_true', help='Skip the traced memory run')
+    parser.add_argument('--output', type=Path, help='JSON report path (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    if args.target == 'api' and args.scenario == 'live':
+        parser.error("the results API only serves stored results (use --scenario history)")
+    if args.target == 'app':
+        try:
+            import streamlit.testing.v1  # noqa: F401
+        except ImportError:
+            parser.error("--target app needs streamlit (pip install -r requirements.txt)")
+
+    fake_ee.install(pixels=args.pixels, latency=args.latency)
+    import climatology
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        climatology.CLIMATOLOGY_DIR = data_dir / 'climatology'  # Keep live analyses away from the real baseline files
+        print(f"🗂️  Writing {args.weeks} weeks of synthetic history for {len(config.DISTRICTS)} districts")
+        write_history(data_dir, args.weeks, list(config.DISTRICTS))
+        with redirect_stdout(StringIO()):
+            materialized_views.rebuild_views(data_dir)
+
+        print(f"🚦 Load test: target={args.target}, scenario={args.scenario}, "
+              f"{args.interactions} render(s) per session")
+        reports = load_test(args, data_dir)
+
+    run = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'target': args.target,
+        'scenario': args.scenario,
+        'weeks': args.weeks,
+        'interactions': args.interactions,
+        'think_seconds': args.think,
+        'latency': args.latency,
+        'reports': reports,
+    }
+    output = args.output or RESULTS_DIR / (
+        f"load_{args.target}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{run['git_revision'] or 'nogit'}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"💾 Report saved to {output}")
+    if any(report['errors'] for report in reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
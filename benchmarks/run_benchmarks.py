@@ -0,0 +1,823 @@
+"""
+Offline benchmark suite for the analysis pipeline
+Runs analyze_district (and batches of it) against the in-process fake
+Earth Engine backend, history loading over synthetic result stores,
+the local raster engine and fused against naive band math, at several
+AOI and history sizes, queries over the loss-event store, evidence chip
+fetching and alert rule evaluation over thousands of AOIs. Records wall time, server round trips and peak
+traced memory as JSON so runs can be compared between commits. CLI
+commands that only read stored data are held to a startup-time budget
+and must not import Earth Engine.
+
+    python benchmarks/run_benchmarks.py                        # Full suite
+    python benchmarks/run_benchmarks.py --quick                # Small sizes only
+    python benchmarks/run_benchmarks.py --only history --latency 0.2
+    python benchmarks/run_benchmarks.py --only cli_startup      # EE-free CLI startup budgets
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<baseline>.json
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(BENCH_DIR.parent / 'backend'))
+
+import fake_ee  # noqa: E402
+
+fake_ee.install()  # Before any backend module imports ee
+
+import numpy as np  # noqa: E402
+import config  # noqa: E402
+
+RESULTS_DIR = BENCH_DIR / 'results'
+AS_OF = '2024-06-10'  # Frozen analysis date, so every run sees the same scenes
+
+SIZES = {
+    # Fake AOI pixels for analyze_district
+    'aoi_pixels': [250_000, 1_000_000, 4_000_000],
+    # AOIs x weeks in a batch run
+    'batch': [(4, 1), (4, 4)],
+    # Weeks of stored history (all districts)
+    'history_weeks': [52, 260, 1040],
+    # Raster side length for the local engine
+    'raster_side': [512, 1024, 2048],
+    # Raster side length for naive vs fused band math (NDVI change + loss mask)
+    'band_math_side': [2048, 4096],
+    # Results held in memory / serialized at once
+    'codec_results': [10_000, 50_000],
+    # Synthetic scenes: (AOIs, raster side, weeks)
+    'synthetic': [(64, 512, 4), (1, 8192, 2)],
+    # Stored loss events (five years of weekly extractions)
+    'loss_events': [100_000, 1_000_000],
+    # Hotspots given before/after evidence chips (4 chips each)
+    'evidence_hotspots': [100, 500],
+    # Alert rule evaluation: (AOIs, weeks of history)
+    'alert_history': [(1_000, 260), (10_000, 260)],
+}
+QUICK_SIZES = {
+    'aoi_pixels': [250_000],
+    'batch': [(2, 2)],
+    'history_weeks': [52],
+    'raster_side': [512],
+    'band_math_side': [1024],
+    'codec_results': [10_000],
+    'synthetic': [(16, 256, 4)],
+    'loss_events': [50_000],
+    'evidence_hotspots': [25],
+    'alert_history': [(1_000, 260)],
+}
+
+
+def measure(func: Callable, repeat: int = 3, setup: Optional[Callable] = None) -> Dict:
+    """
+    Time a callable and trace its peak memory
+
+    Timed runs are separate from the traced run, since tracemalloc slows
+    allocation-heavy code. Output printed by the callable is swallowed.
+
+    Args:
+        func: Called with setup()'s return value, or with no arguments
+        repeat: Number of timed runs
+        setup: Untimed per-run preparation
+
+    Returns:
+        Dict with 'wall_seconds' (median), 'wall_min', 'round_trips',
+        'server_seconds' and 'peak_mb' (per run)
+    """
+    backend = fake_ee.get_backend()
+
+    def run():
+        state = setup() if setup else None
+        backend.reset_stats()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func(state) if setup else func()
+            return time.perf_counter() - start
+
+    walls = []
+    for _ in range(repeat):
+        gc.collect()
+        walls.append(run())
+    round_trips, server_seconds = backend.round_trips, backend.server_seconds
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'wall_seconds': statistics.median(walls),
+        'wall_min': min(walls),
+        'round_trips': round_trips,
+        'server_seconds': server_seconds,
+        'peak_mb': peak / 1e6,
+    }
+
+
+# ----------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------
+
+def _monitor(extra_aois: int = 0):
+    """VegetationMonitor on the fake backend, with synthetic AOIs added"""
+    from vegetation_monitor import VegetationMonitor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        monitor = VegetationMonitor()
+    districts = dict(config.DISTRICTS)
+    for i in range(extra_aois):
+        lon, lat = 72.0 + 0.2 * i, 26.0
+        districts[f'Synthetic{i}'] = {'name': f'Synthetic{i}', 'bbox': [lon, lat, lon + 0.1, lat + 0.1]}
+    monitor.districts = districts
+    return monitor
+
+
+def bench_analyze(sizes: Dict, args) -> List[Dict]:
+    results = []
+    for pixels in sizes['aoi_pixels']:
+        fake_ee.install(pixels=pixels, latency=args.latency,
+                        megapixels_per_second=args.megapixels_per_second)
+        monitor = _monitor()
+        metrics = measure(lambda: monitor.analyze_district('Jodhpur', as_of=AS_OF), args.repeat)
+        results.append({'name': f'analyze_district[pixels={pixels}]', **metrics})
+    return results
+
+
+def bench_batch(sizes: Dict, args) -> List[Dict]:
+    results = []
+    pixels = sizes['aoi_pixels'][0]
+    fake_ee.install(pixels=pixels, latency=args.latency, megapixels_per_second=args.megapixels_per_second)
+    for aois, weeks in sizes['batch']:
+        monitor = _monitor(max(aois - len(config.DISTRICTS), 0))
+        names = list(monitor.districts)[:aois]
+        end = datetime.strptime(AS_OF, '%Y-%m-%d')
+        dates = [(end - timedelta(weeks=w)).strftime('%Y-%m-%d') for w in range(weeks)]
+
+        def batch():
+            for date in dates:
+                for name in names:
+                    monitor.analyze_district(name, as_of=date)
+
+        metrics = measure(batch, args.repeat)
+        results.append({'name': f'batch[aois={aois},weeks={weeks},pixels={pixels}]', **metrics})
+    return results
+
+
+def synthetic_result(district: str, date: str, rng: np.random.Generator) -> Dict:
+    """A stored analyze_district result with plausible values"""
+    ndvi = float(rng.uniform(0.15, 0.45))
+    previous = ndvi - float(rng.normal(0, 0.02))
+    start = (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=7)).strftime('%Y-%m-%d')
+    return {
+        'district': district,
+        'analysis_date': date,
+        'status': 'ok',
+        'scenes': {'current': [f'{date}_A'], 'previous': [f'{start}_A']},
+        'current_week': {'start': start, 'end': date, 'ndvi_mean': ndvi, 'ndvi_std': 0.09,
+                         'ndvi_p10': ndvi - 0.1, 'ndvi_median': ndvi, 'ndvi_p90': ndvi + 0.1},
+        'previous_week': {'ndvi_mean': previous},
+        'change': {'ndvi_change_mean': ndvi - previous, 'ndvi_change_min': -0.2, 'ndvi_change_max': 0.2,
+                   'vegetation_loss_area_hectares': float(rng.exponential(10))},
+        'indices': {name: {'current_mean': ndvi, 'previous_mean': previous}
+                    for name in config.INDEX_CONFIG['indices']},
+        'vegetation_mask': 'worldcover',
+    }
+
+
+def write_history(data_dir: Path, weeks: int, districts: List[str]):
+    """One result file per week for every district, oldest first"""
+    rng = np.random.default_rng(weeks)
+    end = datetime.strptime(AS_OF, '%Y-%m-%d')
+    for w in range(weeks, 0, -1):
+        date = end - timedelta(weeks=w - 1)
+        results = {d: synthetic_result(d, date.strftime('%Y-%m-%d'), rng) for d in districts}
+        with open(data_dir / f"analysis_{date:%Y%m%d}_060000.json", 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+def bench_history(sizes: Dict, args) -> List[Dict]:
+    from alert_engine import evaluate_stored_history
+    from materialized_views import load_views, rebuild_views
+    from results_api import ResultsSnapshot
+    from results_store import load_all_results, results_signature
+    from trend_series import load_trend
+
+    districts = list(config.DISTRICTS)
+    results = []
+    for weeks in sizes['history_weeks']:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp)
+            write_history(data_dir, weeks, districts)
+            label = f'weeks={weeks},aois={len(districts)}'
+
+            results.append({'name': f'history.load_all_results[{label}]',
+                            **measure(lambda: load_all_results(data_dir), args.repeat)})
+            results.append({'name': f'history.rebuild_views[{label}]',
+                            **measure(lambda: rebuild_views(data_dir), args.repeat)})
+            results.append({'name': f'history.load_views[{label}]',
+                            **measure(lambda: load_views(data_dir), args.repeat)})
+            results.append({'name': f'history.load_trend[{label}]',
+                            **measure(lambda: [load_trend(d, 'monthly', data_dir=data_dir) for d in districts],
+                                      args.repeat)})
+            results.append({'name': f'history.api_snapshot[{label}]',
+                            **measure(lambda: ResultsSnapshot(results_signature(data_dir), data_dir),
+                                      args.repeat)})
+            results.append({'name': f'history.alert_engine_full[{label}]',
+                            **measure(lambda: evaluate_stored_history(data_dir, incremental=False),
+                                      args.repeat)})
+    return results
+
+
+def bench_local_engine(sizes: Dict, args) -> List[Dict]:
+    from local_engine import LocalRasterEngine
+    from spectral_indices import required_bands
+
+    engine = LocalRasterEngine()
+    results = []
+    try:
+        for side in sizes['raster_side']:
+            backend = fake_ee.FakeBackend(pixels=side * side)
+            scenes = backend.scenes([73.0, 26.0, 73.1, 26.1], '2024-05-27', AS_OF)
+            needed = required_bands(engine.index_names)
+            current = {b: a for b, a in backend.scene_bands(scenes[-1]).items() if b in needed}
+            previous = {b: a for b, a in backend.scene_bands(scenes[0]).items() if b in needed}
+            mask = ~np.isin(backend.landcover(), config.MASK_CONFIG['excluded_classes'])
+
+            metrics = measure(lambda: engine.analyze_arrays(
+                'Synthetic', current, previous, ('2024-06-03', AS_OF), ('2024-05-27', '2024-06-03'), mask
+            ), args.repeat)
+            results.append({'name': f'local_engine[side={side}]', **metrics})
+    finally:
+        engine.close()
+    return results
+
+
+def naive_ndvi_change(current: Dict, previous: Dict, mask: np.ndarray) -> Dict:
+    """
+    Straight NumPy port of calculate_ndvi plus the change and loss-mask logic
+
+    Every step allocates full-size temporaries; the reference for the
+    fused band-math program.
+    """
+    from local_engine import LOSS_THRESHOLD
+
+    scale = config.INDEX_CONFIG['reflectance_scale']
+
+    def ndvi(bands):
+        nir = bands['B8'].astype(np.float32) * scale
+        red = bands['B4'].astype(np.float32) * scale
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = (nir - red) / (nir + red)
+        values[~np.isfinite(values)] = np.nan
+        values[~mask] = np.nan
+        return values
+
+    cur, prev = ndvi(current), ndvi(previous)
+    change = cur - prev
+    loss = change < LOSS_THRESHOLD
+    cur_valid, prev_valid, change_valid = cur[~np.isnan(cur)], prev[~np.isnan(prev)], change[~np.isnan(change)]
+    return {
+        'current_mean': float(cur_valid.mean(dtype=np.float64)),
+        'previous_mean': float(prev_valid.mean(dtype=np.float64)),
+        'change_mean': float(change_valid.mean(dtype=np.float64)),
+        'change_min': float(change_valid.min()),
+        'change_max': float(change_valid.max()),
+        'loss_pixels': int(np.count_nonzero(loss)),
+    }
+
+
+def fused_ndvi_change(program, current: Dict, previous: Dict, mask: np.ndarray) -> Dict:
+    """naive_ndvi_change as one fused band-math program feeding reducers"""
+    import band_math
+
+    arrays = {'mask': mask, **{f'current:{b}': a for b, a in current.items()},
+              **{f'previous:{b}': a for b, a in previous.items()}}
+    reduced = program.reduce(arrays, {
+        'current': band_math.CountSum(), 'previous': band_math.CountSum(),
+        'change': band_math.Summary(), 'loss': band_math.Count(),
+    })
+    change = reduced['change']
+    return {
+        'current_mean': reduced['current'][1] / reduced['current'][0],
+        'previous_mean': reduced['previous'][1] / reduced['previous'][0],
+        'change_mean': change['sum'] / change['count'],
+        'change_min': change['min'],
+        'change_max': change['max'],
+        'loss_pixels': reduced['loss'],
+    }
+
+
+def bench_band_math(sizes: Dict, args) -> List[Dict]:
+    """
+    NDVI change and loss mask: naive full-array NumPy against the fused
+    band-math program (block-sized buffers, reductions fed per block)
+    """
+    import band_math
+    from local_engine import LOSS_THRESHOLD
+    from spectral_indices import index_exprs
+
+    mask_band = band_math.band('mask', dtype=bool)
+    cur = band_math.masked(index_exprs(['NDVI'], 'current:')['NDVI'], mask_band)
+    prev = band_math.masked(index_exprs(['NDVI'], 'previous:')['NDVI'], mask_band)
+    program = band_math.Program({'current': cur, 'previous': prev, 'change': cur - prev,
+                                 'loss': cur - prev < LOSS_THRESHOLD})
+
+    results = []
+    for side in sizes['band_math_side']:
+        backend = fake_ee.FakeBackend(pixels=side * side)
+        scenes = backend.scenes([73.0, 26.0, 73.1, 26.1], '2024-05-27', AS_OF)
+        current = {b: a for b, a in backend.scene_bands(scenes[-1]).items() if b in ('B4', 'B8')}
+        previous = {b: a for b, a in backend.scene_bands(scenes[0]).items() if b in ('B4', 'B8')}
+        mask = ~np.isin(backend.landcover(), config.MASK_CONFIG['excluded_classes'])
+
+        naive = naive_ndvi_change(current, previous, mask)
+        fused = fused_ndvi_change(program, current, previous, mask)
+        mismatched = [key for key in naive if not np.isclose(naive[key], fused[key], rtol=1e-9, atol=0)]
+        if mismatched:
+            raise AssertionError(f"Fused band math differs from the naive port: {mismatched}")
+
+        for name, func in (
+            ('naive', lambda: naive_ndvi_change(current, previous, mask)),
+            ('fused', lambda: fused_ndvi_change(program, current, previous, mask)),
+        ):
+            metrics = measure(func, args.repeat)
+            metrics['pixels_per_second'] = side * side / metrics['wall_min']
+            results.append({'name': f'band_math.{name}[side={side}]', **metrics})
+    return results
+
+
+def bench_codec(sizes: Dict, args) -> List[Dict]:
+    """
+    Typed results and the binary codec against dicts and indented JSON
+
+    The 'hold' entries decode every result and keep them, so their peak_mb
+    is the memory for holding that many results.
+    """
+    from result_types import AnalysisResult, decode_results, encode_results
+
+    rng = np.random.default_rng(0)
+    districts = list(config.DISTRICTS)
+    end = datetime.strptime(AS_OF, '%Y-%m-%d')
+    results = []
+    for n in sizes['codec_results']:
+        typed = [AnalysisResult.from_dict(synthetic_result(
+            districts[i % len(districts)], (end - timedelta(weeks=i // len(districts))).strftime('%Y-%m-%d'), rng
+        )) for i in range(n)]
+        dicts = [result.to_dict() for result in typed]
+        text = json.dumps(dicts, indent=2)
+        blob = encode_results(typed)
+        label = f'results={n}'
+
+        for name, func, size in (
+            ('json_dump_indent', lambda: json.dumps(dicts, indent=2), len(text)),
+            ('binary_encode', lambda: encode_results(typed), len(blob)),
+            ('hold_json_dicts', lambda: json.loads(text), None),
+            ('hold_binary_typed', lambda: decode_results(blob), None),
+        ):
+            metrics = measure(func, args.repeat)
+            if size is not None:
+                metrics['bytes'] = size
+            results.append({'name': f'codec.{name}[{label}]', **metrics})
+    return results
+
+
+def bench_synthetic(sizes: Dict, args) -> List[Dict]:
+    """
+    Synthetic scene generation, and the local engine validated against its truth
+
+    The validation entry reports the NDVI loss area the local engine finds
+    over every week pair (clear pixels only) next to the injected clearings.
+    """
+    from local_composite import scl_valid
+    from local_engine import LocalRasterEngine
+    from synthetic_scenes import cleared_pixels, generate_aois, grid_aois, load_scene, load_truth, weekly_dates
+
+    results = []
+    engine = LocalRasterEngine(index_names=['NDVI'])
+    try:
+        for aois, side, weeks in sizes['synthetic']:
+            label = f'aois={aois},side={side},weeks={weeks}'
+            spec = {name: dict(aoi, shape=(side, side)) for name, aoi in grid_aois(aois).items()}
+            dates = weekly_dates(AS_OF, weeks)
+            with tempfile.TemporaryDirectory() as tmp:
+                directories = {}
+
+                def generate():
+                    directories.update(generate_aois(spec, dates, out_dir=Path(tmp)))
+
+                metrics = measure(generate, args.repeat)
+                metrics['mpx_per_second'] = aois * side * side * weeks / 1e6 / metrics['wall_min']
+                results.append({'name': f'synthetic.generate[{label}]', **metrics})
+
+                found = {'detected_hectares': 0.0, 'truth_hectares': 0.0}
+
+                def validate():
+                    found.update(detected_hectares=0.0, truth_hectares=0.0)
+                    for name, path in directories.items():
+                        truth = load_truth(path)
+                        for previous, current in zip(dates, dates[1:]):
+                            bands, before = load_scene(path, current), load_scene(path, previous)
+                            valid = scl_valid(bands['SCL']) & scl_valid(before['SCL'])
+                            result = engine.analyze_arrays(name, bands, before, (previous, current),
+                                                           (previous, previous), valid)
+                            found['detected_hectares'] += result['change']['vegetation_loss_area_hectares']
+                            found['truth_hectares'] += (cleared_pixels(truth, current, previous, valid)
+                                                        * engine.pixel_area_hectares)
+
+                metrics = measure(validate, args.repeat)
+                results.append({'name': f'synthetic.local_engine_vs_truth[{label}]', **metrics, **found})
+    finally:
+        engine.close()
+    return results
+
+
+def synthetic_loss_events(n: int, weeks: int, rng) -> List[Dict]:
+    """Random loss events over the configured districts, one date per week"""
+    districts = list(config.DISTRICTS)
+    end = datetime.strptime(AS_OF, '%Y-%m-%d')
+    dates = [(end - timedelta(weeks=w)).strftime('%Y-%m-%d') for w in range(weeks)]
+    names = rng.integers(len(districts), size=n)
+    bboxes = np.array([config.DISTRICTS[name]['bbox'] for name in districts])[names]
+    lon = rng.uniform(bboxes[:, 0], bboxes[:, 2])
+    lat = rng.uniform(bboxes[:, 1], bboxes[:, 3])
+    half = rng.uniform(0.0005, 0.003, size=n)  # ~50 m to ~300 m
+    week = rng.integers(weeks, size=n)
+    area = rng.lognormal(1.0, 1.0, size=n) + 0.5
+    return [{
+        'aoi': districts[names[i]], 'date': dates[week[i]],
+        'bbox': [lon[i] - half[i], lat[i] - half[i], lon[i] + half[i], lat[i] + half[i]],
+        'area_hectares': float(area[i]), 'ndvi_change': -0.2,
+    } for i in range(n)]
+
+
+def bench_loss_events(sizes: Dict, args) -> List[Dict]:
+    """
+    Loss-event store: bulk insert, then batches of 100 spatial queries
+
+    Each query entry reports 'ms_per_query' (fastest run) and 'rows' (mean
+    events returned), since large result sets cost time per row returned.
+    """
+    import resource
+
+    from loss_events import LossEventStore
+
+    rng = np.random.default_rng(0)
+    weeks = 260
+    results = []
+    for n in sizes['loss_events']:
+        label = f'events={n}'
+        events = synthetic_loss_events(n, weeks, rng)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = LossEventStore(Path(tmp) / 'loss_events.sqlite3')
+            # Week-sized batches in date order, as extraction writes them; timed once
+            # (not repeated or traced: the store keeps what was inserted)
+            events.sort(key=lambda event: event['date'])
+            batch = n // weeks
+            start = time.perf_counter()
+            for i in range(0, n, batch):
+                store.add_events(events[i:i + batch])
+            wall = time.perf_counter() - start
+            results.append({'name': f'loss_events.insert[{label}]', 'wall_seconds': wall, 'wall_min': wall,
+                            'round_trips': 0, 'server_seconds': 0.0,
+                            'peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3,  # Process high-water mark
+                            'events': store.count()})
+
+            points = [(event['bbox'][0], event['bbox'][1]) for event in events[::max(1, n // 100)]][:100]
+            since = (datetime.strptime(AS_OF, '%Y-%m-%d') - timedelta(weeks=13)).strftime('%Y-%m-%d')
+            year = (datetime.strptime(AS_OF, '%Y-%m-%d') - timedelta(weeks=52)).strftime('%Y-%m-%d')
+            queries = {
+                'radius_2km_13w': lambda lon, lat: store.within_radius(lon, lat, 2, start=since),
+                'radius_10km_13w': lambda lon, lat: store.within_radius(lon, lat, 10, start=since),
+                'bbox_0.1deg_1y': lambda lon, lat: store.in_bbox([lon - 0.05, lat - 0.05, lon + 0.05, lat + 0.05],
+                                                                 start=year),
+                'nearest_5': lambda lon, lat: store.nearest(lon, lat, k=5),
+                'aggregate_all_1y': lambda lon, lat: store.aggregate(start=year)['cells'],
+                'aggregate_0.5deg_all': lambda lon, lat: store.aggregate([lon - 0.25, lat - 0.25,
+                                                                          lon + 0.25, lat + 0.25])['cells'],
+            }
+            for name, query in queries.items():
+                rows = []
+                metrics = measure(lambda: rows.append(sum(len(query(lon, lat)) for lon, lat in points)),
+                                  args.repeat)
+                metrics['ms_per_query'] = metrics['wall_min'] / len(points) * 1000
+                metrics['rows'] = rows[0] / len(points)
+                results.append({'name': f'loss_events.{name}[{label}]', **metrics})
+    return results
+
+
+def synthetic_series(aois: int, weeks: int, rng) -> List[Dict]:
+    """
+    Materialized weekly series of many AOIs, each analyzed on its own weekday
+
+    Steady NDVI with weekly noise and rare clearing, so rules fire on a
+    few percent of AOI weeks rather than on most of them.
+    """
+    end = np.datetime64(AS_OF, 'D')
+    ndvi = rng.uniform(0.3, 0.6, size=(aois, 1)) + rng.normal(0, 0.004, size=(aois, weeks))
+    loss = np.where(rng.random((aois, weeks)) < 0.002, rng.uniform(0, 200, size=(aois, weeks)), 0.0)
+    series = []
+    for a in range(aois):
+        dates = [str(d) for d in end - 7 * np.arange(weeks - 1, -1, -1) - a % 7]
+        change = np.diff(ndvi[a], prepend=np.nan) / ndvi[a] * 100
+        series.append({'district': f'AOI-{a:05d}', 'weekly': [
+            {'date': date, 'ndvi_mean': float(n), 'change_pct': None if np.isnan(c) else float(c),
+             'loss_ha': float(l)}
+            for date, n, c, l in zip(dates, ndvi[a], change, loss[a])
+        ]})
+    return series
+
+
+def bench_alerts(sizes: Dict, args) -> List[Dict]:
+    """
+    Alert engine over many AOIs: table build, full evaluation, incremental
+    runs with nothing and with one new week, and the persisted state size
+    """
+    from alert_engine import AlertEngine, HistoryTable
+
+    rng = np.random.default_rng(0)
+    results = []
+    for aois, weeks in sizes['alert_history']:
+        label = f'aois={aois},weeks={weeks}'
+        series = synthetic_series(aois, weeks + 1, rng)
+        latest = HistoryTable.from_series(series)
+        for s in series:
+            s['weekly'].pop()
+        results.append({'name': f'alerts.from_series[{label}]',
+                        **measure(lambda: HistoryTable.from_series(series), args.repeat)})
+        table = HistoryTable.from_series(series)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            state_dir = Path(tmp)
+            engine = AlertEngine(state_dir=state_dir)
+            alerts = engine.evaluate(table, incremental=False)
+            engine.save(alerts)
+            results.append({'name': f'alerts.evaluate_full[{label}]', **measure(
+                lambda engine: engine.evaluate(table, incremental=False), args.repeat,
+                setup=lambda: AlertEngine(state_dir=state_dir)), 'alerts': len(alerts)})
+
+            # Engines load the saved state, as each scheduler run does
+            results.append({'name': f'alerts.evaluate_unchanged[{label}]', **measure(
+                lambda: AlertEngine(state_dir=state_dir).evaluate(table), args.repeat)})
+            results.append({'name': f'alerts.evaluate_new_week[{label}]', **measure(
+                lambda: AlertEngine(state_dir=state_dir).evaluate(latest), args.repeat),
+                'state_mb': sum(f.stat().st_size for f in state_dir.glob('*')) / 1e6})
+    return results
+
+
+EVIDENCE_LATENCY = 0.2  # Minimum fake seconds per chip request: request concurrency is what is measured
+EVIDENCE_SERIAL_HOTSPOTS = 10
+
+
+def bench_evidence(sizes: Dict, args) -> List[Dict]:
+    """
+    Evidence chips for two alerts' hotspots: concurrent fetch, fully cached rerun,
+    and a small serial (workers=1) baseline
+    """
+    from evidence import EvidenceCollector
+
+    fake_ee.install(pixels=64 * 64, latency=max(args.latency, EVIDENCE_LATENCY))
+    monitor = _monitor()
+    alerts = [{'district': district, 'date': AS_OF, 'rule': 'loss_hotspot'} for district in config.DISTRICTS]
+    rng = np.random.default_rng(0)
+    results = []
+    runs = [(n, None) for n in sizes['evidence_hotspots']] + [(EVIDENCE_SERIAL_HOTSPOTS, 1)]
+    for n, workers in runs:
+        events = synthetic_loss_events(n, 1, rng)
+        hotspots = {i: [e for e in events if e['aoi'] == alert['district']] for i, alert in enumerate(alerts)}
+        with tempfile.TemporaryDirectory() as tmp:
+            collector = EvidenceCollector(monitor, Path(tmp) / 'evidence', workers=workers)
+            label = f'hotspots={n},workers={collector.workers}'
+            summary = {}
+
+            def fresh():
+                shutil.rmtree(collector.dir, ignore_errors=True)
+
+            metrics = measure(lambda _: summary.update(collector.build_bundles(alerts, hotspots)),
+                              1 if workers == 1 else args.repeat, setup=fresh)
+            metrics['chips'] = summary['chips']
+            metrics['chips_per_second'] = summary['chips'] / metrics['wall_min']
+            results.append({'name': f'evidence.fetch[{label}]', **metrics})
+
+            if workers is None:
+                metrics = measure(lambda: summary.update(collector.build_bundles(alerts, hotspots)), args.repeat)
+                metrics['cached'] = summary['cached']
+                results.append({'name': f'evidence.cached_rerun[{label}]', **metrics})
+    return results
+
+
+CLI = BENCH_DIR.parent / 'backend' / 'cli.py'
+# Wall-time budgets (fastest run, interpreter startup included) for commands
+# that only read stored data; none of them may import Earth Engine
+CLI_BUDGETS = {
+    ('--history',): 0.150,
+    ('--compare', '--cached'): None,
+}
+HEAVY_MODULES = ('ee', 'pandas', 'numpy', 'streamlit')
+IMPORT_PROBE = """
+import runpy, sys
+sys.argv = {argv!r}
+try:
+    runpy.run_path({cli!r}, run_name='__main__')
+except SystemExit:
+    pass
+sys.stderr.write(','.join(m for m in {modules!r} if m in sys.modules))
+"""
+
+
+def run_child(command: List[str], cwd: Path) -> Tuple[float, float]:
+    """
+    Run a command to completion (POSIX: os.wait4)
+
+    Returns:
+        (wall seconds, peak RSS in MB of this child alone)
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.DEVNULL)
+    # wait4 reports this child's own rusage, unlike RUSAGE_CHILDREN (largest child ever)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    return wall, usage.ru_maxrss / 1e3
+
+
+def bench_cli_startup(sizes: Dict, args) -> List[Dict]:
+    results = []
+    for argv, budget in CLI_BUDGETS.items():
+        command = [sys.executable, str(CLI), *argv]
+        walls, peaks = [], []
+        for _ in range(max(args.repeat, 5)):
+            wall, peak = run_child(command, CLI.parent)
+            walls.append(wall)
+            peaks.append(peak)
+
+        probe = IMPORT_PROBE.format(argv=[CLI.name, *argv], cli=str(CLI), modules=HEAVY_MODULES)
+        imported = subprocess.run([sys.executable, '-c', probe], cwd=CLI.parent, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.PIPE, text=True).stderr.strip()
+        results.append({
+            'name': f"cli_startup[{' '.join(argv)}]",
+            'wall_seconds': statistics.median(walls),
+            'wall_min': min(walls),
+            'round_trips': 0,
+            'server_seconds': 0.0,
+            'peak_mb': max(peaks),  # Largest run of this command alone
+            'budget_seconds': budget,
+            'heavy_imports': imported.split(',') if imported else [],
+        })
+    return results
+
+
+def budget_failures(run: Dict) -> List[str]:
+    """Startup budget overruns and Earth Engine imports on EE-free paths"""
+    failures = []
+    for result in run['results']:
+        budget = result.get('budget_seconds')
+        if budget is not None and result['wall_min'] > budget:
+            failures.append(f"{result['name']}: {result['wall_min'] * 1000:.0f} ms > {budget * 1000:.0f} ms budget")
+        if 'ee' in result.get('heavy_imports', []):
+            failures.append(f"{result['name']}: imports Earth Engine")
+    return failures
+
+
+SUITES = {
+    'analyze': bench_analyze,
+    'batch': bench_batch,
+    'history': bench_history,
+    'local_engine': bench_local_engine,
+    'band_math': bench_band_math,
+    'codec': bench_codec,
+    'synthetic': bench_synthetic,
+    'loss_events': bench_loss_events,
+    'evidence': bench_evidence,
+    'alerts': bench_alerts,
+    'cli_startup': bench_cli_startup,
+}
+
+
+# ----------------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------------
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Regressions of a run against a baseline run
+
+    A benchmark regresses when its fastest run or peak memory grows by
+    more than the tolerance, or when it makes more round trips. The
+    fastest run is compared since it is the least affected by noise.
+
+    Returns:
+        List[str]: One line per regression
+    """
+    previous = {r['name']: r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        base = previous.get(result['name'])
+        if base is None:
+            continue
+        ratio = result['wall_min'] / base['wall_min'] if base['wall_min'] else 1.0
+        line = (f"{result['name']}: {base['wall_min'] * 1000:.1f} -> "
+                f"{result['wall_min'] * 1000:.1f} ms ({ratio:.2f}x), "
+                f"{base['round_trips']} -> {result['round_trips']} round trips, "
+                f"{base['peak_mb']:.1f} -> {result['peak_mb']:.1f} MB")
+        print(("🔺 " if ratio > 1 + tolerance else "   ") + line)
+        if (ratio > 1 + tolerance or result['round_trips'] > base['round_trips']
+                or result['peak_mb'] > base['peak_mb'] * (1 + tolerance) + 1):
+            regressions.append(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline analysis pipeline benchmarks')
+    parser.add_argument('--only', choices=sorted(SUITES), action='append', help='Run only these suites')
+    parser.add_argument('--quick', action='store_true', help='Smallest sizes only')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark (default: 3)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Fake Earth Engine seconds per round trip (default: 0)')
+    parser.add_argument('--megapixels-per-second', type=float, default=None,
+                        help='Fake server reduction throughput, adds pixel-proportional latency')
+    parser.add_argument('--output', type=Path, help='Result JSON path (default: benchmarks/results/)')
+    parser.add_argument('--compare', type=Path, help='Baseline JSON to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown / memory growth fraction (default: 0.25)')
+    args = parser.parse_args()
+
+    # Keep benchmarks away from the real data directory's climatology files
+    config.CLIMATOLOGY_CONFIG['enabled'] = False
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    run = {
+        'revision': git_revision(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'settings': {'quick': args.quick, 'repeat': args.repeat, 'latency': args.latency,
+                     'megapixels_per_second': args.megapixels_per_second},
+        'results': [],
+    }
+
+    for name in args.only or SUITES:
+        print(f"⏱️  {name}...")
+        for result in SUITES[name](sizes, args):
+            print(f"   {result['name']}: {result['wall_seconds'] * 1000:.1f} ms, "
+                  f"{result['round_trips']} round trips, {result['peak_mb']:.1f} MB peak")
+            run['results'].append(result)
+
+    output = args.output or RESULTS_DIR / f"bench_{datetime.now():%Y%m%d_%H%M%S}_{run['revision'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"💾 Results saved to {output}")
+
+    failed = False
+    failures = budget_failures(run)
+    for failure in failures:
+        print(f"❌ {failure}")
+        failed = True
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        print(f"\n📊 Compared with {baseline.get('revision')} ({args.compare.name}):")
+        regressions = compare(run, baseline, args.tolerance)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regression(s)")
+            failed = True
+        else:
+            print("\n✓ No regressions")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,15 @@ Generates simulated data to demonstrate functionality
 
 import json
 import random
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 
+# Add backend to path
+sys.path.append(str(Path(__file__).parent / 'backend'))
+
+from alert_engine import threshold_alert
+
 
 def generate_demo_data():
     """Generate realistic demo data for testing"""
@@ -79,13 +85,9 @@ def generate_demo_data():
         }
 
         # Add alert if significant change
-        if abs(change_pct) > 5:
-            results[district_name]["alert"] = {
-                "triggered": True,
-                "type": "vegetation_loss" if change_pct < 0 else "vegetation_gain",
-                "change_percentage": round(change_pct, 2),
-                "message": f"⚠️ {abs(change_pct):.2f}% vegetation change detected!"
-            }
+        alert = threshold_alert(round(change_pct, 2))
+        if alert is not None:
+            results[district_name]["alert"] = alert
 
     return results
 
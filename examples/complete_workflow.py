@@ -11,8 +11,8 @@ sys.path.append(str(Path(__file__).parent.parent / 'backend'))
 
 import ee
 from vegetation_monitor import VegetationMonitor
+from results_store import save_results
 from config import DISTRICTS
-import json
 from datetime import datetime
 
 
@@ -107,22 +107,8 @@ def main():
     # Step 7: Export results
     print("\n[Step 7] Exporting results...")
 
-    # Remove image objects for JSON serialization
-    json_results = {}
-    for district, data in results.items():
-        json_data = data.copy()
-        json_data.pop('images', None)
-        json_results[district] = json_data
-
-    # Save to file
-    output_dir = Path(__file__).parent.parent / 'data'
-    output_dir.mkdir(exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = output_dir / f'analysis_{timestamp}.json'
-
-    with open(output_file, 'w') as f:
-        json.dump(json_results, f, indent=2)
+    # Image objects are dropped; dashboard views are updated too
+    output_file = save_results(results)
 
     print(f"✓ Results saved to: {output_file}")
 
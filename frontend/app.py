@@ -8,13 +8,17 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
-import json
 from pathlib import Path
 import sys
 
 # Add backend to path
 sys.path.append(str(Path(__file__).parent.parent / 'backend'))
 
+from config import DATA_DIR, METRICS_CONFIG
+from instrumentation import span, traced, write_prometheus
+from materialized_views import load_views, derived_fields
+from trend_series import load_trend
+
 try:
     import ee
     from vegetation_monitor import VegetationMonitor
@@ -63,23 +67,14 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def load_historical_data():
-    """Load historical analysis results"""
-    data_dir = Path(__file__).parent.parent / 'data'
-    if not data_dir.exists():
-        return []
-
-    results = []
-    for file in sorted(data_dir.glob('analysis_*.json'), reverse=True):
-        try:
-            with open(file, 'r') as f:
-                data = json.load(f)
-                data['timestamp'] = file.stem.split('_', 1)[1]
-                results.append(data)
-        except Exception as e:
-            st.warning(f"Could not load {file.name}: {e}")
-
-    return results
+@traced('dashboard.load_views')
+def load_dashboard_views():
+    """Load the precomputed dashboard views (latest results and alerts)"""
+    try:
+        return load_views(DATA_DIR)
+    except Exception as e:
+        st.warning(f"Could not load dashboard views: {e}")
+        return None
 
 
 def create_ndvi_gauge(ndvi_value, title="NDVI"):
@@ -110,33 +105,34 @@ def create_ndvi_gauge(ndvi_value, title="NDVI"):
     return fig
 
 
-def create_trend_chart(historical_data, district):
-    """Create trend chart for historical NDVI values"""
-    if not historical_data:
-        return None
-
-    dates = []
-    ndvi_values = []
-
-    for record in reversed(historical_data):
-        if district in record:
-            try:
-                date_str = record[district]['analysis_date']
-                ndvi = record[district]['current_week']['ndvi_mean']
-                if ndvi is not None:
-                    dates.append(datetime.strptime(date_str, '%Y-%m-%d'))
-                    ndvi_values.append(ndvi)
-            except (KeyError, ValueError):
-                continue
-
-    if not dates:
+@traced('dashboard.trend_chart')
+def create_trend_chart(trend, district):
+    """Create trend chart from a rolled-up, downsampled trend series"""
+    points = trend.get('points', [])
+    if not points:
         return None
 
-    df = pd.DataFrame({'Date': dates, 'NDVI': ndvi_values})
-
-    fig = px.line(df, x='Date', y='NDVI',
-                  title=f'NDVI Trend - {district}',
-                  markers=True)
+    df = pd.DataFrame({
+        'Date': [datetime.strptime(point['date'], '%Y-%m-%d') for point in points],
+        'NDVI': [point['mean'] for point in points],
+        'Min': [point['min'] for point in points],
+        'Max': [point['max'] for point in points],
+    })
+
+    title = f'NDVI Trend - {district}'
+    if trend['period'] != 'weekly':
+        title += f" ({trend['period']})"
+    if trend['downsampled']:
+        title += f" · {len(points)} of {trend['total']} points"
+
+    # Markers only while they stay readable
+    fig = px.line(df, x='Date', y='NDVI', title=title, markers=len(points) <= 60)
+    if trend['period'] != 'weekly':
+        fig.add_scatter(x=df['Date'], y=df['Max'], mode='lines', line_width=0,
+                        showlegend=False, hoverinfo='skip')
+        fig.add_scatter(x=df['Date'], y=df['Min'], mode='lines', line_width=0,
+                        fill='tonexty', fillcolor='rgba(26,152,80,0.15)',
+                        showlegend=False, hoverinfo='skip')
     fig.update_layout(
         xaxis_title="Date",
         yaxis_title="NDVI",
@@ -149,6 +145,7 @@ def create_trend_chart(historical_data, district):
     return fig
 
 
+@traced('dashboard.render_district')
 def display_district_analysis(district_name, results):
     """Display analysis results for a district"""
     st.subheader(f"📍 {district_name} District")
@@ -157,6 +154,10 @@ def display_district_analysis(district_name, results):
         st.warning(f"No data available for {district_name}")
         return
 
+    if results.get('status') == 'no_imagery':
+        st.info(f"No Sentinel-2 imagery for {district_name} in the week ending {results['analysis_date']}")
+        return
+
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
@@ -166,11 +167,12 @@ def display_district_analysis(district_name, results):
             value=f"{ndvi_current:.4f}" if ndvi_current else "N/A"
         )
 
+    view = results.get('view') or derived_fields(results)
+
     with col2:
         ndvi_change = results['change']['ndvi_change_mean']
-        ndvi_prev = results['previous_week']['ndvi_mean']
-        if ndvi_change and ndvi_prev:
-            change_pct = (ndvi_change / ndvi_prev) * 100
+        change_pct = view['change_percentage']
+        if change_pct is not None:
             st.metric(
                 label="Week Change",
                 value=f"{change_pct:+.2f}%",
@@ -187,25 +189,23 @@ def display_district_analysis(district_name, results):
         )
 
     with col4:
-        ndvi_median = results['current_week']['ndvi_median']
-        vegetation_type = "Dense" if ndvi_median and ndvi_median > 0.6 else \
-                         "Moderate" if ndvi_median and ndvi_median > 0.4 else \
-                         "Sparse" if ndvi_median and ndvi_median > 0.2 else "Low"
         st.metric(
             label="Vegetation Density",
-            value=vegetation_type
+            value=view['vegetation_density']
         )
 
     # Alert box
     if 'alert' in results and results['alert']['triggered']:
         alert_type = results['alert']['type']
         change_pct = results['alert']['change_percentage']
+        reference = ("the seasonal normal for this week"
+                     if results['alert'].get('basis') == 'climatology' else "last week")
 
         if alert_type == 'vegetation_loss':
             st.markdown(f"""
             <div class="danger-alert">
                 <strong>⚠️ ALERT: Significant Vegetation Loss Detected</strong><br>
-                {abs(change_pct):.2f}% decrease in green cover compared to last week.<br>
+                {abs(change_pct):.2f}% decrease in green cover compared to {reference}.<br>
                 This may indicate tree cutting or land clearing activities.
             </div>
             """, unsafe_allow_html=True)
@@ -213,7 +213,7 @@ def display_district_analysis(district_name, results):
             st.markdown(f"""
             <div class="alert-box">
                 <strong>✓ Notice: Vegetation Increase Detected</strong><br>
-                {abs(change_pct):.2f}% increase in green cover compared to last week.
+                {abs(change_pct):.2f}% increase in green cover compared to {reference}.
             </div>
             """, unsafe_allow_html=True)
 
@@ -276,6 +276,18 @@ def main():
         default=["Jodhpur", "Bikaner"]
     )
 
+    trend_period = st.sidebar.selectbox(
+        "Trend Aggregation",
+        ["weekly", "monthly", "season"],
+        format_func=str.capitalize
+    )
+    trend_range = st.sidebar.selectbox(
+        "Trend Range",
+        ["All", "Last 5 years", "Last year", "Last 3 months"]
+    )
+    range_days = {"Last 5 years": 5 * 365, "Last year": 365, "Last 3 months": 91}.get(trend_range)
+    trend_start = (datetime.now() - timedelta(days=range_days)).strftime('%Y-%m-%d') if range_days else None
+
     # Main content
     if analysis_mode == "live_analysis" and EE_AVAILABLE:
         st.info("🔄 Running live satellite analysis... This may take a few minutes.")
@@ -296,16 +308,17 @@ def main():
                 st.info("Make sure you've authenticated with Google Earth Engine")
 
     else:
-        # Load and display historical data
-        historical_data = load_historical_data()
+        # Load precomputed views; first paint does not scan the history
+        data_dir = DATA_DIR
+        views = load_dashboard_views()
 
-        if not historical_data:
+        if not views:
             st.warning("📂 No historical data found. Run a live analysis first.")
         else:
-            st.success(f"📊 Loaded {len(historical_data)} historical records")
+            st.success(f"📊 Loaded {views['manifest']['records']} historical records")
 
             # Display latest results
-            latest = historical_data[0]
+            latest = views['latest']
 
             for district in selected_districts:
                 if district in latest:
@@ -319,13 +332,15 @@ def main():
 
             with col1:
                 if "Jodhpur" in selected_districts:
-                    trend_chart = create_trend_chart(historical_data, "Jodhpur")
+                    trend_chart = create_trend_chart(
+                        load_trend("Jodhpur", trend_period, start=trend_start, data_dir=data_dir), "Jodhpur")
                     if trend_chart:
                         st.plotly_chart(trend_chart, use_container_width=True)
 
             with col2:
                 if "Bikaner" in selected_districts:
-                    trend_chart = create_trend_chart(historical_data, "Bikaner")
+                    trend_chart = create_trend_chart(
+                        load_trend("Bikaner", trend_period, start=trend_start, data_dir=data_dir), "Bikaner")
                     if trend_chart:
                         st.plotly_chart(trend_chart, use_container_width=True)
 
@@ -340,4 +355,11 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    # Streamlit re-runs this script per interaction; metrics accumulate per server process
+    with span('dashboard.rerun'):
+        main()
+    # Reruns happen per widget interaction; the textfile only needs to keep up with scrapes
+    try:
+        write_prometheus('dashboard', min_interval=METRICS_CONFIG['textfile_interval'])
+    except OSError as e:
+        print(f"⚠️  Metrics textfile not written: {e}")
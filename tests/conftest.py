@@ -0,0 +1,9 @@
+"""
+Shared pytest setup: backend modules are imported by name, as the
+scripts in backend/ do
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
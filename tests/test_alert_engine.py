@@ -0,0 +1,65 @@
+"""
+ISO-week history table and incremental evaluation of alert_engine.AlertEngine
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from alert_engine import AlertEngine, HistoryTable
+
+ZSCORE = {'name': 'ndvi_zscore', 'type': 'zscore', 'window': 4, 'min_periods': 4, 'z': 2.0,
+          'min_std': 0.005, 'suppress_weeks': 0, 'message': 'z {value:.1f}'}
+HOTSPOT = {'name': 'loss_hotspot', 'type': 'hotspot_area', 'min_hectares': 50,
+           'suppress_weeks': 0, 'message': '{value:.0f} ha'}
+
+
+def _series(district, first, ndvi, loss=None):
+    start = datetime.strptime(first, '%Y-%m-%d')
+    weekly = []
+    for week, value in enumerate(ndvi):
+        weekly.append({'date': (start + timedelta(weeks=week)).strftime('%Y-%m-%d'), 'ndvi_mean': value,
+                       'change_pct': None, 'loss_ha': (loss or {}).get(week, 0.0)})
+    return {'district': district, 'weekly': weekly}
+
+
+def test_columns_are_iso_weeks_not_distinct_dates(tmp_path):
+    # Jodhpur analyzed on Mondays, Bikaner on Thursdays of the same weeks
+    table = HistoryTable.from_series([
+        _series('Jodhpur', '2024-06-03', [0.40, 0.41, 0.40, 0.41, 0.30]),
+        _series('Bikaner', '2024-06-06', [0.30, 0.30, 0.31, 0.30, 0.30]),
+    ])
+    assert table.weeks == ['2024-06-03', '2024-06-10', '2024-06-17', '2024-06-24', '2024-07-01']
+    assert str(table.dates[1, 0]) == '2024-06-06'
+
+    # The 4-week window holds 4 observations of Jodhpur, not 2
+    alerts = AlertEngine([ZSCORE], state_dir=tmp_path).evaluate(table, incremental=False)
+    assert [(a['district'], a['date']) for a in alerts] == [('Jodhpur', '2024-07-01')]
+
+
+def test_late_rows_are_evaluated(tmp_path):
+    engine = AlertEngine([HOTSPOT], state_dir=tmp_path)
+    jodhpur = _series('Jodhpur', '2024-06-03', [0.4] * 4)
+    bikaner = _series('Bikaner', '2024-06-06', [0.3] * 2)
+    assert engine.evaluate(HistoryTable.from_series([jodhpur, bikaner])) == []
+    engine.save()
+
+    # Bikaner's third week arrives after Jodhpur's later weeks were evaluated
+    bikaner = _series('Bikaner', '2024-06-06', [0.3] * 3, loss={2: 80.0})
+    engine = AlertEngine([HOTSPOT], state_dir=tmp_path)
+    alerts = engine.evaluate(HistoryTable.from_series([jodhpur, bikaner]))
+    assert [(a['district'], a['date']) for a in alerts] == [('Bikaner', '2024-06-20')]
+    engine.save(alerts)
+
+    assert AlertEngine([HOTSPOT], state_dir=tmp_path).evaluate(HistoryTable.from_series([jodhpur, bikaner])) == []
+
+
+def test_legacy_evaluated_state_is_migrated(tmp_path):
+    jodhpur = _series('Jodhpur', '2024-06-03', [0.4] * 3, loss={1: 80.0})
+    weeks = {p['date']: p['date'] for p in jodhpur['weekly']}
+    (tmp_path / 'state.json').write_text(json.dumps({'evaluated': {'Jodhpur': weeks}, 'last_fired': {}}))
+
+    engine = AlertEngine([HOTSPOT], state_dir=tmp_path)
+    assert engine.evaluate(HistoryTable.from_series([jodhpur])) == []
+    engine.save()
+    assert 'evaluated' not in json.loads((tmp_path / 'state.json').read_text())
+    assert (tmp_path / 'evaluated.npz').exists()
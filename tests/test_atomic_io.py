@@ -0,0 +1,28 @@
+"""
+Atomic replacement of files by atomic_io
+"""
+
+import json
+
+import pytest
+
+from atomic_io import atomic_write, write_json
+
+
+def test_write_json_replaces_the_file(tmp_path):
+    path = tmp_path / 'views' / 'latest.json'
+    write_json(path, {'a': 1})
+    write_json(path, {'a': 2}, indent=2)
+    assert json.loads(path.read_text()) == {'a': 2}
+    assert [p.name for p in path.parent.iterdir()] == ['latest.json']
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = tmp_path / 'state.json'
+    write_json(path, {'a': 1})
+    with pytest.raises(ValueError):
+        with atomic_write(path) as f:
+            f.write('{"a": ')
+            raise ValueError('interrupted')
+    assert json.loads(path.read_text()) == {'a': 1}
+    assert [p.name for p in tmp_path.iterdir()] == ['state.json']
@@ -0,0 +1,87 @@
+"""
+Fused band-math programs and block reducers of band_math against NumPy
+"""
+
+import numpy as np
+
+import band_math
+
+
+def _bands(shape=(37, 23), seed=0):
+    rng = np.random.default_rng(seed)
+    red = rng.integers(0, 4000, size=shape).astype(np.uint16)
+    nir = rng.integers(0, 6000, size=shape).astype(np.uint16)
+    red[:3] = nir[:3] = 0  # No-data rows: 0 / 0
+    nir[5, :4] = 0
+    red[5, :2] = 0  # x / 0 and 0 / x
+    mask = rng.random(shape) < 0.8
+    return {'red': red, 'nir': nir, 'mask': mask}
+
+
+def _reference(bands):
+    red = bands['red'].astype(np.float32) * np.float32(1e-4)
+    nir = bands['nir'].astype(np.float32) * np.float32(1e-4)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ndvi = (nir - red) / (nir + red)
+        ratio = nir / red
+    ratio[np.isinf(ratio)] = np.nan
+    return {
+        'ndvi': np.where(bands['mask'], ndvi, np.nan).astype(np.float32),
+        'ratio': ratio,
+        'loss': ndvi < np.float32(-0.1),
+        'scaled': np.float32(2.5) * (nir - np.float32(0.5) * red) + np.float32(1),
+    }
+
+
+def _program(block_pixels):
+    red = band_math.band('red', 1e-4)
+    nir = band_math.band('nir', 1e-4)
+    ndvi = (nir - red) / (nir + red)
+    return band_math.Program({
+        'ndvi': band_math.masked(ndvi, band_math.band('mask', dtype=bool)),
+        'ratio': band_math.finite(nir / red),
+        'loss': ndvi < -0.1,
+        'scaled': 2.5 * (nir - 0.5 * red) + 1,
+    }, block_pixels=block_pixels)
+
+
+def test_evaluate_matches_numpy_across_block_sizes():
+    bands = _bands()
+    expected = _reference(bands)
+    for block_pixels in (1, 50, 23 * 8, 10_000):
+        result = _program(block_pixels).evaluate(bands)
+        for name, values in expected.items():
+            np.testing.assert_array_equal(result[name], values, err_msg=f'{name} at {block_pixels}')
+
+
+def test_reducers_match_numpy():
+    bands = _bands(seed=1)
+    ndvi = _reference(bands)['ndvi']
+    valid = ndvi[~np.isnan(ndvi)].astype(np.float64)
+    reduced = _program(100).reduce(bands, {
+        'ndvi': band_math.Summary(bins=40),
+        'ratio': band_math.CountSum(),
+        'loss': band_math.Count(),
+    })
+
+    summary = reduced['ndvi']
+    assert summary['count'] == valid.size
+    assert np.isclose(summary['sum'], valid.sum()) and np.isclose(summary['sumsq'], (valid ** 2).sum())
+    assert summary['min'] == valid.min() and summary['max'] == valid.max()
+    np.testing.assert_array_equal(summary['histogram'], np.histogram(ndvi[~np.isnan(ndvi)], 40, (-1.0, 1.0))[0])
+
+    ratio = _reference(bands)['ratio']
+    count, total = reduced['ratio']
+    assert count == np.count_nonzero(~np.isnan(ratio)) and np.isclose(total, np.nansum(ratio, dtype=np.float64))
+    assert reduced['loss'] == np.count_nonzero(_reference(bands)['loss'])
+
+    unbinned = _program(100).reduce(bands, {'ndvi': band_math.Summary()})['ndvi']
+    assert (unbinned['count'], unbinned['min'], unbinned['max']) == (valid.size, valid.min(), valid.max())
+
+
+def test_empty_and_all_nan_blocks():
+    bands = {name: np.zeros((4, 5), dtype=np.uint16) for name in ('red', 'nir')}
+    bands['mask'] = np.ones((4, 5), dtype=bool)
+    reduced = _program(5).reduce(bands, {'ndvi': band_math.Summary(bins=10), 'loss': band_math.Count()})
+    assert reduced['ndvi']['count'] == 0 and reduced['ndvi']['histogram'].sum() == 0
+    assert reduced['loss'] == 0
@@ -0,0 +1,73 @@
+"""
+Change-point detection of change_detection against a per-pixel NumPy reference
+"""
+
+import warnings
+
+import numpy as np
+
+from change_detection import detect_breaks, detect_breaks_block, summarize_breaks
+from ndvi_cube import NDVICube
+
+PARAMS = {'min_segment': 4, 'min_drop': 0.1, 'min_score': 5.0}
+
+
+def _reference(x, min_segment, min_drop, min_score):
+    """(break_layer, magnitude) of one pixel series, one candidate break at a time"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        sigma = 1.4826 * np.nanmedian(np.abs(np.diff(x.astype(np.float64)))) / np.sqrt(2)
+    sigma = sigma if np.isfinite(sigma) and sigma > 1e-3 else 1e-3
+    best = (-np.inf, -1, np.nan)
+    for k in range(1, len(x)):
+        before, after = x[:k][~np.isnan(x[:k])], x[k:][~np.isnan(x[k:])]
+        if len(before) < min_segment or len(after) < min_segment:
+            continue
+        drop = before.mean(dtype=np.float64) - after.mean(dtype=np.float64)
+        n = len(before) + len(after)
+        stat = drop * np.sqrt(len(before) * len(after) / n) / sigma
+        if stat > best[0]:
+            best = (stat, k, drop)
+    stat, k, drop = best
+    if stat >= min_score and drop >= min_drop:
+        return k, -drop
+    return -1, np.nan
+
+
+def _series(weeks=30, pixels=200, seed=0):
+    rng = np.random.default_rng(seed)
+    series = 0.6 + rng.normal(0, 0.02, size=(weeks, pixels))
+    breaks = rng.integers(6, weeks - 6, size=pixels)
+    cleared = rng.random(pixels) < 0.5
+    for pixel in np.flatnonzero(cleared):
+        series[breaks[pixel]:, pixel] -= rng.uniform(0.2, 0.4)
+    series[rng.random(series.shape) < 0.15] = np.nan
+    series[:, 0] = np.nan  # Never observed
+    series[:-3, 1] = np.nan  # Too short on both sides
+    return series.astype(np.float32)
+
+
+def test_block_matches_reference():
+    series = _series()
+    break_layer, magnitude, _ = detect_breaks_block(series, **PARAMS)
+    expected = [_reference(series[:, pixel], **PARAMS) for pixel in range(series.shape[1])]
+    np.testing.assert_array_equal(break_layer, [k for k, _ in expected])
+    np.testing.assert_allclose(magnitude, [m for _, m in expected], atol=1e-5)
+    assert (break_layer >= 0).sum() > 50 and break_layer[0] == -1 and break_layer[1] == -1
+
+
+def test_detect_breaks_over_a_cube(tmp_path):
+    series = _series(pixels=8 * 10, seed=1)
+    cube = NDVICube.create(tmp_path / 'cube', (8, 10), chunk_weeks=8)
+    dates = [str(np.datetime64('2024-01-01') + 7 * week) for week in range(len(series))]
+    for layer, date in zip(series, dates):
+        cube.append(layer.reshape(8, 10), date)
+
+    results = detect_breaks(cube, workers=1)
+    stored = cube.decode(cube.encode(series))  # Breaks are detected on quantized values
+    expected = [_reference(stored[:, pixel], **PARAMS) for pixel in range(stored.shape[1])]
+    np.testing.assert_array_equal(np.asarray(results['break_layer']).ravel(), [k for k, _ in expected])
+
+    summary = summarize_breaks(results)
+    assert sum(entry['pixels'] for entry in summary) == sum(k >= 0 for k, _ in expected)
+    assert all(entry['date'] in dates and entry['mean_magnitude'] < -0.1 for entry in summary)
@@ -0,0 +1,23 @@
+"""
+Observation bookkeeping of climatology.Climatology
+"""
+
+from climatology import Climatology, week_key
+
+
+def test_one_observation_per_year_and_week(tmp_path):
+    climatology = Climatology('Jodhpur', tmp_path / 'jodhpur.json')
+    climatology.add_observations({'2024-06-11': 0.40})
+    climatology.add_observations({'2024-06-13': 0.42})  # Same ISO week, re-analyzed
+    climatology.add_observations({'2023-06-13': 0.38, '2024-06-18': 0.44})
+
+    assert climatology.observations == {'2023-06-13': 0.38, '2024-06-13': 0.42, '2024-06-18': 0.44}
+    assert climatology.weeks[24]['n'] == 3
+
+    climatology.save()
+    assert Climatology('Jodhpur', tmp_path / 'jodhpur.json').observations == climatology.observations
+
+
+def test_week_key_uses_the_iso_year():
+    assert week_key('2024-12-30') == '2025-W01'
+    assert week_key('2020-12-31') == '2020-W52'  # Week 53 folded into 52
@@ -0,0 +1,39 @@
+"""
+Prometheus textfile export of instrumentation
+"""
+
+import threading
+
+from instrumentation import count, write_prometheus
+
+
+def test_concurrent_textfile_writes(tmp_path):
+    count('test_writes_total', help='Writes in this test')
+    path = tmp_path / 'dashboard.prom'
+    errors = []
+
+    def write():
+        try:
+            for _ in range(50):
+                write_prometheus(path=path)
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert 'test_writes_total' in path.read_text()
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_textfile_writes_are_throttled(tmp_path):
+    path = tmp_path / 'dashboard.prom'
+    assert write_prometheus(path=path, min_interval=60) == path
+    path.unlink()
+    assert write_prometheus(path=path, min_interval=60) is None
+    assert not path.exists()
+    assert write_prometheus(path=path) == path
@@ -0,0 +1,49 @@
+"""
+Lease handling and deferred retries of job_queue.JobQueue
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from job_queue import JobQueue, LeaseLost, run_worker
+
+
+def _result(aoi, week):
+    return {'district': aoi, 'analysis_date': week, 'current_week': {'ndvi_mean': 0.4}}
+
+
+def test_complete_requires_the_lease(tmp_path):
+    queue = JobQueue(tmp_path / 'queue.db')
+    queue.enqueue('Jodhpur', '2024-06-10')
+    job = queue.claim('worker-a')
+
+    with pytest.raises(LeaseLost):
+        queue.complete(job, 'worker-b', _result('Jodhpur', '2024-06-10'))
+    assert queue.get_result('Jodhpur', '2024-06-10') is None
+    assert queue.stats()['running'] == 1
+
+    assert queue.complete(job, 'worker-a', _result('Jodhpur', '2024-06-10'))
+    assert queue.stats()['done'] == 1
+    with pytest.raises(LeaseLost):
+        queue.complete(job, 'worker-a', _result('Jodhpur', '2024-06-10'))
+
+
+def test_weeks_without_imagery_yet_are_deferred(tmp_path):
+    queue = JobQueue(tmp_path / 'queue.db')
+    recent = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    queue.enqueue_many([('Jodhpur', recent), ('Bikaner', '2024-06-10')])
+
+    def no_imagery(aoi, week):
+        return {'district': aoi, 'analysis_date': week, 'status': 'no_imagery'}
+
+    assert run_worker(queue, 'worker-a', exit_when_idle=True, analyze=no_imagery) == 2
+    # The old week is final; the recent one waits for imagery without using up an attempt
+    assert queue.stats() == {'pending': 1, 'running': 0, 'done': 1, 'failed': 0}
+    assert queue.claim('worker-a') is None
+
+    with sqlite3.connect(queue.path) as conn:
+        conn.execute("UPDATE jobs SET lease_expires = 0 WHERE status = 'pending'")
+    job = queue.claim('worker-a')
+    assert (job['aoi'], job['attempts']) == ('Jodhpur', 1)
@@ -0,0 +1,91 @@
+"""
+SCL-masked median and greenest-pixel composites of local_composite against NumPy
+"""
+
+import warnings
+
+import numpy as np
+import pytest
+
+from config import COMPOSITE_CONFIG
+from local_composite import composite, greenest_composite, median_composite, scl_valid
+from tile_executor import TileExecutor
+
+SHAPE = (37, 23)
+
+
+def _scenes(n=5, seed=0):
+    rng = np.random.default_rng(seed)
+    scenes = []
+    for _ in range(n):
+        scl = rng.choice(np.array([0, 3, 4, 5, 8, 9, 10], dtype=np.uint8), size=SHAPE, p=[.05, .1, .4, .2, .1, .1, .05])
+        scl[:3, :3] = 9  # Never clear
+        scenes.append({
+            'B4': rng.integers(0, 3000, size=SHAPE).astype(np.uint16),
+            'B8': rng.integers(0, 6000, size=SHAPE).astype(np.uint16),
+            'SCL': scl,
+        })
+    scenes[0]['B4'][5, 5] = scenes[0]['B8'][5, 5] = 0  # Clear but 0/0 NDVI
+    return scenes
+
+
+def _clear(scenes):
+    return np.stack([~np.isin(s['SCL'], COMPOSITE_CONFIG['scl_exclude']) for s in scenes])
+
+
+def test_scl_valid():
+    scl = np.arange(12, dtype=np.uint8)
+    np.testing.assert_array_equal(scl_valid(scl), ~np.isin(scl, COMPOSITE_CONFIG['scl_exclude']))
+    assert scl_valid(scl)[[4, 5, 6]].all()
+
+
+@pytest.mark.parametrize('executor', [None, TileExecutor(workers=2, tile_rows=8, min_parallel_pixels=0)],
+                         ids=['default', 'pool'])
+def test_median_matches_nanmedian(executor):
+    scenes = _scenes()
+    clear = _clear(scenes)
+    try:
+        result = median_composite(scenes, executor=executor)
+    finally:
+        if executor is not None:
+            executor.close()
+
+    assert set(result) == {'B4', 'B8', 'count'}
+    np.testing.assert_array_equal(result['count'], clear.sum(axis=0))
+    for band in ('B4', 'B8'):
+        stack = np.stack([s[band] for s in scenes]).astype(np.float32)
+        stack[~clear] = np.nan
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)  # All-NaN pixels
+            expected = np.nanmedian(stack, axis=0)
+        assert result[band].dtype == np.float32
+        np.testing.assert_array_equal(result[band], expected)
+    assert np.isnan(result['B4'][:3, :3]).all()
+
+
+def test_greenest_matches_argmax():
+    scenes = _scenes(seed=1)
+    clear = _clear(scenes)
+    result = greenest_composite(iter(scenes))
+
+    red = np.stack([s['B4'] for s in scenes]).astype(np.float32)
+    nir = np.stack([s['B8'] for s in scenes]).astype(np.float32)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ndvi = (nir - red) / (nir + red)
+    ndvi = np.where(clear & ~np.isnan(ndvi), ndvi, -np.inf)
+    best = ndvi.argmax(axis=0)[np.newaxis]  # First scene wins ties, like the streaming update
+    found = np.take_along_axis(ndvi, best, axis=0)[0] > -np.inf
+
+    np.testing.assert_array_equal(result['count'], clear.sum(axis=0))
+    for band, stack in (('B4', red), ('B8', nir)):
+        expected = np.where(found, np.take_along_axis(stack, best, axis=0)[0], np.nan)
+        np.testing.assert_array_equal(result[band], expected)
+    assert np.isnan(result['B4'][:3, :3]).all()
+
+
+def test_scenes_must_share_a_grid():
+    scenes = _scenes(n=2)
+    scenes[1] = {band: array[:-1] for band, array in scenes[1].items()}
+    for method in ('median', 'greenest'):
+        with pytest.raises(ValueError, match='one AOI grid'):
+            composite(scenes, method)
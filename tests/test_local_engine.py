@@ -0,0 +1,96 @@
+"""
+Local raster analysis of local_engine.LocalRasterEngine against NumPy
+"""
+
+import warnings
+
+import numpy as np
+import pytest
+
+from config import INDEX_CONFIG, LOCAL_ENGINE_CONFIG
+from local_engine import LOSS_THRESHOLD, LocalRasterEngine
+from tile_executor import TileExecutor
+
+PERIODS = (('2024-06-03', '2024-06-10'), ('2024-05-27', '2024-06-03'))
+
+
+def _scenes(shape=(48, 40), seed=0):
+    rng = np.random.default_rng(seed)
+    previous = {'B4': rng.integers(300, 1500, size=shape), 'B8': rng.integers(2000, 5000, size=shape)}
+    current = {band: values.copy() for band, values in previous.items()}
+    current['B8'][10:20, 5:25] //= 3  # Clearing
+    current['B8'][:2] = current['B4'][:2] = 0  # No-data rows in the current week only
+    previous['B4'][40:] = previous['B8'][40:] = 0  # ... and in the previous week only
+    mask = np.ones(shape, dtype=bool)
+    mask[:, :6] = False  # Water
+    mask[30:34] = False  # Built-up
+    return ({b: v.astype(np.uint16) for b, v in current.items()},
+            {b: v.astype(np.uint16) for b, v in previous.items()}, mask)
+
+
+def _ndvi(bands, mask):
+    scale = np.float32(INDEX_CONFIG['reflectance_scale'])
+    red, nir = bands['B4'].astype(np.float32) * scale, bands['B8'].astype(np.float32) * scale
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ndvi = (nir - red) / (nir + red)
+    return np.where(np.isfinite(ndvi) & mask, ndvi, np.nan).astype(np.float32)
+
+
+def _check(result, current, previous, mask, scale):
+    cur, prev = _ndvi(current, mask), _ndvi(previous, mask)
+    change = cur - prev
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        assert np.isclose(result['current_week']['ndvi_mean'], np.nanmean(cur, dtype=np.float64))
+        assert np.isclose(result['current_week']['ndvi_std'], np.nanstd(cur, dtype=np.float64), rtol=1e-5)
+        assert np.isclose(result['previous_week']['ndvi_mean'], np.nanmean(prev, dtype=np.float64))
+        assert np.isclose(result['change']['ndvi_change_mean'], np.nanmean(change, dtype=np.float64))
+    assert result['change']['ndvi_change_min'] == np.nanmin(change)
+    assert result['change']['ndvi_change_max'] == np.nanmax(change)
+    # Histogram percentiles pick the bin of the k-th pixel (no interpolation between pixels)
+    bin_width = 2.0 / LOCAL_ENGINE_CONFIG['histogram_bins']
+    for key, p in (('ndvi_p10', 10), ('ndvi_median', 50), ('ndvi_p90', 90)):
+        expected = np.nanpercentile(cur, p, method='inverted_cdf')
+        assert abs(result['current_week'][key] - expected) <= bin_width
+
+    loss_pixels = np.count_nonzero(change < np.float32(LOSS_THRESHOLD))
+    assert loss_pixels > 0
+    assert np.isclose(result['change']['vegetation_loss_area_hectares'], loss_pixels * scale * scale / 10000)
+
+
+def test_masked_analysis_matches_numpy():
+    current, previous, mask = _scenes()
+    engine = LocalRasterEngine(['NDVI'], workers=1)
+    try:
+        result = engine.analyze_arrays('Test', current, previous, *PERIODS, mask=mask)
+        _check(result, current, previous, mask, engine.scale)
+        assert result['vegetation_mask'] == 'local'
+
+        unmasked = engine.analyze_arrays('Test', current, previous, *PERIODS)
+        _check(unmasked, current, previous, np.ones_like(mask), engine.scale)
+        assert unmasked['change']['vegetation_loss_area_hectares'] >= result['change']['vegetation_loss_area_hectares']
+
+        indices = engine.calculate_indices(current, mask)
+        np.testing.assert_array_equal(indices['NDVI'], _ndvi(current, mask))
+    finally:
+        engine.close()
+
+
+def test_pool_matches_serial():
+    current, previous, mask = _scenes(shape=(70, 40), seed=1)
+    serial = LocalRasterEngine(['NDVI', 'NDMI'], workers=1)
+    pooled = LocalRasterEngine(['NDVI', 'NDMI'], workers=2)
+    pooled.executor = TileExecutor(workers=2, tile_rows=16, min_parallel_pixels=0)
+    current['B11'], previous['B11'] = current['B4'] + 700, previous['B4'] + 700
+    try:
+        expected = serial.analyze_arrays('Test', current, previous, *PERIODS, mask=mask)
+        result = pooled.analyze_arrays('Test', current, previous, *PERIODS, mask=mask)
+        _check(result, current, previous, mask, pooled.scale)
+        for section in ('current_week', 'previous_week', 'change'):
+            assert result[section] == pytest.approx(expected[section], rel=1e-9)
+        assert result['indices'].keys() == expected['indices'].keys()
+        for name, stats in expected['indices'].items():
+            assert result['indices'][name] == pytest.approx(stats, rel=1e-9)
+    finally:
+        serial.close()
+        pooled.close()
@@ -0,0 +1,43 @@
+"""
+Radius queries of loss_events.LossEventStore against brute force
+"""
+
+import numpy as np
+
+from loss_events import LossEventStore, distance_to_bbox_km, radius_bbox, record_loss_events
+
+
+def test_radius_bbox_encloses_the_circle():
+    for lat in (0.0, 26.3, 60.0, 80.0):
+        min_lon, min_lat, max_lon, max_lat = radius_bbox(73.0, lat, 200)
+        bearings = np.radians(np.arange(0, 360, 0.25))
+        # Points on the circle: destination formula on the haversine sphere
+        angle = 200 / 6371.0088
+        lat1 = np.radians(lat)
+        lat2 = np.arcsin(np.sin(lat1) * np.cos(angle) + np.cos(lat1) * np.sin(angle) * np.cos(bearings))
+        lon2 = 73.0 + np.degrees(np.arctan2(np.sin(bearings) * np.sin(angle) * np.cos(lat1),
+                                            np.cos(angle) - np.sin(lat1) * np.sin(lat2)))
+        assert (lon2 >= min_lon).all() and (lon2 <= max_lon).all()
+        assert (np.degrees(lat2) >= min_lat).all() and (np.degrees(lat2) <= max_lat).all()
+
+
+def test_within_radius_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 5000
+    lon = rng.uniform(70.0, 76.0, n)
+    lat = rng.uniform(24.0, 30.0, n)
+    half = rng.uniform(0.0005, 0.003, n)
+    boxes = np.stack([lon - half, lat - half, lon + half, lat + half], axis=1)
+    store = LossEventStore(tmp_path / 'events.sqlite3')
+    store.add_events({'aoi': 'Jodhpur', 'date': '2024-06-10', 'bbox': box.tolist(), 'area_hectares': 1.0}
+                     for box in boxes)
+
+    for radius in (5, 50, 200):
+        expected = int((distance_to_bbox_km(73.0, 27.0, boxes) <= radius).sum())
+        assert len(store.within_radius(73.0, 27.0, radius)) == expected
+
+
+def test_record_loss_events_skips_results_without_images(tmp_path):
+    store = LossEventStore(tmp_path / 'events.sqlite3')
+    assert record_loss_events({'district': 'Jodhpur', 'status': 'no_imagery'}, store) == 0
+    assert record_loss_events({'district': 'Jodhpur', 'status': 'ok', 'analysis_date': '2024-06-10'}, store) == 0
@@ -0,0 +1,52 @@
+"""
+Quantization and windowed statistics of ndvi_cube.NDVICube against NumPy
+"""
+
+import warnings
+
+import numpy as np
+
+from ndvi_cube import NDVICube
+
+
+def _layers(weeks, shape=(9, 7), seed=0):
+    rng = np.random.default_rng(seed)
+    layers = rng.uniform(-1, 1, size=(weeks,) + shape).astype(np.float32)
+    layers[rng.random(layers.shape) < 0.2] = np.nan
+    layers[:, 0, 0] = np.nan  # A pixel that is never observed
+    return layers
+
+
+def test_encode_round_trip_and_non_finite_values(tmp_path):
+    cube = NDVICube.create(tmp_path / 'cube', (1, 6))
+    ndvi = np.array([[0.12344, -0.5, np.nan, np.inf, -np.inf, 1.5]], dtype=np.float32)
+    encoded = cube.encode(ndvi)
+    assert encoded.tolist() == [[1234, -5000, cube.nodata, cube.nodata, cube.nodata, 15000]]
+
+    decoded = cube.decode(encoded)
+    assert np.array_equal(np.isnan(decoded), ~np.isfinite(ndvi))
+    finite = np.isfinite(ndvi)
+    assert np.allclose(decoded[finite], np.rint(ndvi[finite] * cube.scale) / cube.scale)
+
+
+def test_window_stats_match_numpy(tmp_path):
+    layers = _layers(10)
+    dates = [f'2024-01-{day:02d}' for day in range(1, 11)]
+    cube = NDVICube.create(tmp_path / 'cube', layers.shape[1:], chunk_weeks=4)  # Windows span chunks
+    for layer, date in zip(layers, dates):
+        cube.append(layer, date)
+
+    reference = cube.decode(cube.encode(layers))[2:9]
+    stats = cube.window_stats(dates[2], dates[8], stats=('mean', 'median', 'min', 'max', 'std', 'count'),
+                              block_rows=4)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        for name, reducer in (('mean', np.nanmean), ('median', np.nanmedian), ('min', np.nanmin),
+                              ('max', np.nanmax), ('std', np.nanstd)):
+            np.testing.assert_allclose(stats[name], reducer(reference, axis=0), rtol=1e-6, atol=1e-7)
+    assert np.array_equal(stats['count'], np.count_nonzero(~np.isnan(reference), axis=0))
+    assert np.isnan(stats['mean'][0, 0]) and stats['count'][0, 0] == 0
+
+    dates_out, history = cube.pixel_history(3, 2)
+    assert dates_out == dates
+    np.testing.assert_array_equal(history, cube.decode(cube.encode(layers[:, 3, 2])))
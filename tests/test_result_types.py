@@ -0,0 +1,54 @@
+"""
+Dict-style access and lazy images of result_types.AnalysisResult
+"""
+
+from materialized_views import load_views
+from result_types import AnalysisResult, export_dict
+from results_store import save_results
+
+
+def _result():
+    return AnalysisResult.from_dict({
+        'district': 'Jodhpur',
+        'analysis_date': '2024-06-10',
+        'current_week': {'start': '2024-06-03', 'end': '2024-06-10', 'ndvi_mean': 0.4},
+        'previous_week': {'ndvi_mean': 0.5},
+        'change': {'ndvi_change_mean': -0.1, 'vegetation_loss_area_hectares': 12.0},
+    })
+
+
+def test_dict_style_access():
+    result = _result()
+    assert result['current_week']['ndvi_mean'] == 0.4
+    assert result.get('status') == 'ok'
+    assert 'alert' not in result and result.get('alert') is None
+
+    result['alert'] = {'triggered': True, 'type': 'vegetation_loss'}
+    result['note'] = 'backfill'
+    assert result['alert']['triggered'] and 'alert' in result
+    assert export_dict(result)['note'] == 'backfill'
+
+
+def test_images_are_built_on_first_access():
+    built = []
+    result = _result()
+    result.images = lambda: built.append(1) or {'ndvi_change': 'image'}
+    assert 'images' in result and 'images' not in export_dict(result)
+    assert built == []
+    assert result['images']['ndvi_change'] == 'image'
+    assert result['images']['ndvi_change'] == 'image'
+    assert built == [1]
+
+
+def test_save_results_accepts_analysis_results(tmp_path):
+    result = _result()
+    result.images = lambda: 1 / 0  # Never built by saving
+    save_results({'Jodhpur': result}, tmp_path)
+    assert load_views(tmp_path)['latest']['Jodhpur']['current_week']['ndvi_mean'] == 0.4
+
+
+def test_results_are_slotted():
+    result = _result()
+    assert not hasattr(result, '__dict__') and not hasattr(result.current_week, '__dict__')
+    assert AnalysisResult('Jodhpur').images is None
+    assert AnalysisResult.from_dict(result.to_dict()) == result
@@ -0,0 +1,67 @@
+"""
+ETag revalidation and content coding of the results API
+"""
+
+import gzip
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from results_api import accepts_gzip, create_server, etag_matches
+from results_store import save_results
+
+
+def test_if_none_match_lists_weak_tags_and_wildcard():
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('"x", W/"a"', '"a"')
+    assert etag_matches(' * ', '"a"')
+    assert not etag_matches('"a-gzip"', '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_accept_encoding_quality():
+    assert accepts_gzip('gzip, deflate, br')
+    assert accepts_gzip('*')
+    assert not accepts_gzip('gzip;q=0, identity')
+    assert not accepts_gzip('br')
+    assert not accepts_gzip(None)
+
+
+@pytest.fixture
+def api(tmp_path):
+    districts = {f'District{i:02d}': {'district': f'District{i:02d}', 'analysis_date': '2024-06-10',
+                                      'current_week': {'ndvi_mean': 0.4}} for i in range(50)}
+    save_results(districts, tmp_path)
+    server = create_server('127.0.0.1', 0, tmp_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url, **headers):
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_gzip_and_identity_have_distinct_etags(api):
+    status, headers, body = _get(f'{api}/latest')
+    status_gz, headers_gz, body_gz = _get(f'{api}/latest', **{'Accept-Encoding': 'gzip'})
+    assert status == status_gz == 200
+    assert headers_gz['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(body_gz) == body
+    assert headers['ETag'] != headers_gz['ETag']
+
+    # A cached identity body must not be revalidated for a gzip request, and vice versa
+    assert _get(f'{api}/latest', **{'Accept-Encoding': 'gzip', 'If-None-Match': headers['ETag']})[0] == 200
+    assert _get(f'{api}/latest', **{'If-None-Match': headers_gz['ETag']})[0] == 200
+    assert _get(f'{api}/latest', **{'Accept-Encoding': 'gzip',
+                                    'If-None-Match': f'"other", W/{headers_gz["ETag"]}'})[0] == 304
+    assert _get(f'{api}/latest', **{'If-None-Match': '*'})[0] == 304
@@ -0,0 +1,83 @@
+"""
+Result files written by results_store.save_results
+"""
+
+import json
+import threading
+
+from materialized_views import load_series, load_views, rebuild_views
+from results_store import find_latest_result, list_result_files, save_results
+
+
+def _result(district, date, ndvi=0.4, alert=None):
+    result = {
+        'district': district,
+        'analysis_date': date,
+        'current_week': {'start': date, 'end': date, 'ndvi_mean': ndvi},
+        'previous_week': {'start': date, 'end': date, 'ndvi_mean': ndvi},
+        'change': {'ndvi_change_mean': 0.0, 'vegetation_loss_area_hectares': 0.0},
+    }
+    if alert:
+        result['alert'] = alert
+    return result
+
+
+def test_saves_in_the_same_second_keep_both_files(tmp_path):
+    first = save_results({'Jodhpur': _result('Jodhpur', '2024-06-10')}, tmp_path)
+    second = save_results({'Bikaner': _result('Bikaner', '2024-06-10', alert={'level': 'warning'})}, tmp_path)
+
+    assert first != second
+    assert len(list_result_files(tmp_path)) == 2
+    assert json.loads(first.read_text())['Jodhpur']['district'] == 'Jodhpur'
+    assert find_latest_result('Bikaner', tmp_path)['alert'] == {'level': 'warning'}
+    assert find_latest_result('Jodhpur', tmp_path) is not None
+
+
+
+def test_latest_result_is_the_latest_week_not_the_newest_file(tmp_path):
+    save_results({'Jodhpur': _result('Jodhpur', '2024-06-17', ndvi=0.5)}, tmp_path)
+    # A backfilled older week finishing after the current one
+    save_results({'Jodhpur': _result('Jodhpur', '2024-06-10', ndvi=0.3)}, tmp_path)
+
+    assert find_latest_result('Jodhpur', tmp_path)['analysis_date'] == '2024-06-17'
+
+
+def test_concurrent_saves_keep_every_district(tmp_path):
+    districts = [f'District{i:02d}' for i in range(16)]
+    barrier = threading.Barrier(len(districts))
+
+    def save(district):
+        barrier.wait()
+        save_results({district: _result(district, '2024-06-10', alert={'triggered': True, 'type': 'loss'})},
+                     tmp_path)
+
+    threads = [threading.Thread(target=save, args=(d,)) for d in districts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    views = load_views(tmp_path, rebuild_missing=False)
+    assert len(list_result_files(tmp_path)) == len(districts)
+    assert sorted(views['latest']) == districts
+    assert sorted(views['manifest']['districts']) == districts
+    assert views['manifest']['records'] == len(districts)
+    assert len(views['alerts']['active']) == len(districts)
+    assert not list(tmp_path.rglob('*.tmp'))
+
+
+def test_views_keep_the_latest_week(tmp_path):
+    save_results({'Jodhpur': _result('Jodhpur', '2024-06-17', ndvi=0.5)}, tmp_path)
+    save_results({'Jodhpur': _result('Jodhpur', '2024-06-10', ndvi=0.3)}, tmp_path)
+
+    views = load_views(tmp_path, rebuild_missing=False)
+    assert views['latest']['Jodhpur']['analysis_date'] == '2024-06-17'
+    assert [p['date'] for p in load_series('Jodhpur', tmp_path)['weekly']] == ['2024-06-10', '2024-06-17']
+
+    rebuild_views(tmp_path)
+    assert load_views(tmp_path)['latest']['Jodhpur']['analysis_date'] == '2024-06-17'
+
+
+def test_loading_views_without_results_writes_nothing(tmp_path):
+    assert load_views(tmp_path) is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,89 @@
+"""
+Windowed SAFE reading and granule mosaicking of safe_reader against NumPy
+"""
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+
+import safe_reader
+from safe_reader import aoi_grid, read_scenes
+
+CRS = 'EPSG:32643'
+SENSING = '20240105T053221'
+TOP = 2900000
+
+
+def _write_band(path, array, left, resolution):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with rasterio.open(path, 'w', driver='JP2OpenJPEG', width=array.shape[1], height=array.shape[0],
+                       count=1, dtype=array.dtype, crs=CRS, transform=from_origin(left, TOP, resolution, resolution),
+                       QUALITY=100, REVERSIBLE='YES') as dst:
+        dst.write(array, 1)
+
+
+def _product(directory, tile, left, bands, scl, offset=None):
+    """One granule: 10 m reflectance bands and a 20 m SCL band, optionally with BOA_ADD_OFFSET"""
+    safe = directory / f"S2A_MSIL2A_{SENSING}_N0510_R105_{tile}_20240105T080000.SAFE"
+    img = safe / 'GRANULE' / f"L2A_{tile}_A044000_{SENSING}" / 'IMG_DATA'
+    for band, array in bands.items():
+        _write_band(img / 'R10m' / f"{tile}_{SENSING}_{band}_10m.jp2", array, left, 10)
+    _write_band(img / 'R20m' / f"{tile}_{SENSING}_SCL_20m.jp2", scl, left, 20)
+    if offset is not None:
+        entries = ''.join(f'<BOA_ADD_OFFSET band_id="{i}">{offset}</BOA_ADD_OFFSET>' for i in range(13))
+        (safe / 'MTD_MSIL2A.xml').write_text(
+            '<n1:Level-2A_User_Product xmlns:n1="https://psd-14.sentinel2.eo.esa.int/PSD/User_Product_Level-2A.xsd">'
+            f'<General_Info><BOA_ADD_OFFSET_VALUES_LIST>{entries}</BOA_ADD_OFFSET_VALUES_LIST></General_Info>'
+            '</n1:Level-2A_User_Product>'
+        )
+
+
+def _granule(rng, left, tile, directory, offset=None):
+    bands = {band: rng.integers(500, 5000, size=(30, 40)).astype(np.uint16) for band in ('B04', 'B08')}
+    scl = rng.choice(np.array([4, 5, 8, 9], dtype=np.uint8), size=(15, 20))
+    _product(directory, tile, left, bands, scl, offset)
+    return left, bands, scl
+
+
+def _paste(grid, granules):
+    """Reference mosaic: first granule with SCL data wins, offsets applied, 0 outside"""
+    out = {band: np.zeros(grid.shape, dtype=np.uint16) for band in ('B4', 'B8')}
+    out['SCL'] = np.zeros(grid.shape, dtype=np.uint8)
+    rows, cols = np.indices(grid.shape)
+    x = grid.transform.c + (cols + 0.5) * 10
+    y = grid.transform.f - (rows + 0.5) * 10
+    for left, bands, scl, offset in granules:
+        r, c = np.floor((TOP - y) / 10).astype(int), np.floor((x - left) / 10).astype(int)
+        inside = (r >= 0) & (r < 30) & (c >= 0) & (c < 40)
+        take = inside & (out['SCL'] == 0)
+        out['SCL'][take] = scl[r[take] // 2, c[take] // 2]
+        for band, array in bands.items():
+            values = array[r[take], c[take]].astype(np.int32) + (offset or 0)
+            out[f"B{int(band[1:])}"][take] = np.clip(values, 0, None)
+    return out
+
+
+def test_mosaic_matches_numpy(tmp_path, monkeypatch):
+    monkeypatch.setattr(safe_reader, 'CACHE_DIR', tmp_path / 'cache')
+    rng = np.random.default_rng(0)
+    west = _granule(rng, 300000, 'T43RDM', tmp_path)
+    west[2][:, 15:] = 0  # No data over the overlap: filled from the east granule
+    _product(tmp_path, 'T43RDM', west[0], west[1], west[2])
+    east = _granule(rng, 300300, 'T43RDN', tmp_path, offset=-1000)
+
+    # AOI reaching past both granules, so part of the grid has no data at all
+    bbox = list(transform_bounds(CRS, 'EPSG:4326', 299950, TOP - 350, 300750, TOP + 40))
+    grid = aoi_grid(bbox, crs=CRS)
+    expected = _paste(grid, [west + (None,), east + (-1000,)])
+    assert (expected['SCL'] == 0).any() and (expected['B4'] == 0).any()
+
+    for _ in range(2):  # Decoded, then from the memory-mapped crop cache
+        scenes = list(read_scenes(tmp_path, bbox, '2024-01-01', '2024-01-08', bands=['B04', 'B08'], grid=grid))
+        assert len(scenes) == 1
+        assert set(scenes[0]) == {'B4', 'B8', 'SCL'}
+        for band, array in expected.items():
+            np.testing.assert_array_equal(scenes[0][band], array, err_msg=band)
+    assert list((tmp_path / 'cache').rglob('*.npy'))
+
+    assert list(read_scenes(tmp_path, bbox, '2024-01-08', '2024-01-15', grid=grid)) == []
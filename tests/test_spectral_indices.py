@@ -0,0 +1,47 @@
+"""
+Spectral index formulas on local rasters and as Earth Engine expressions
+"""
+
+import numpy as np
+
+from config import INDEX_CONFIG
+from spectral_indices import INDEX_DEFINITIONS, compute_index_arrays, index_expression
+
+
+def _bands(shape=(16, 12), seed=0):
+    rng = np.random.default_rng(seed)
+    bands = {band: rng.integers(1, 5000, size=shape).astype(np.uint16) for band in ('B2', 'B4', 'B8', 'B11')}
+    for band in bands.values():
+        band[0] = 0  # No-data row
+    bands['B8'][1, 0] = 0  # NDVI = -1, NDMI = -1
+    return bands
+
+
+def _reference(bands):
+    """The index formulas written out in NumPy, NaN where not finite"""
+    scale = np.float32(INDEX_CONFIG['reflectance_scale'])
+    blue, red, nir, swir1 = (bands[b].astype(np.float32) * scale for b in ('B2', 'B4', 'B8', 'B11'))
+    L = INDEX_CONFIG['savi_l']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        indices = {
+            'NDVI': (nir - red) / (nir + red),
+            'SAVI': np.float32(1 + L) * (nir - red) / (nir + red + np.float32(L)),
+            'NDMI': (nir - swir1) / (nir + swir1),
+            'EVI': np.float32(2.5) * (nir - red) / (nir + np.float32(6) * red - np.float32(7.5) * blue + np.float32(1)),
+        }
+    return {name: np.where(np.isfinite(values), values, np.nan) for name, values in indices.items()}
+
+
+def test_index_arrays_match_numpy():
+    bands = _bands()
+    result = compute_index_arrays(bands, list(INDEX_DEFINITIONS))
+    for name, expected in _reference(bands).items():
+        np.testing.assert_allclose(result[name], expected, rtol=1e-6, atol=1e-7, equal_nan=True, err_msg=name)
+    assert np.isnan(result['NDVI'][0]).all() and result['NDVI'][1, 0] == -1
+
+
+def test_earth_engine_expressions_are_rendered_from_the_formulas():
+    L = INDEX_CONFIG['savi_l']
+    assert index_expression('NDVI') == '((NIR - RED) / (NIR + RED))'
+    assert index_expression('SAVI') == f'(({1 + L!r} * (NIR - RED)) / ((NIR + RED) + {L!r}))'
+    assert index_expression('EVI') == '((2.5 * (NIR - RED)) / (((NIR + (6.0 * RED)) - (7.5 * BLUE)) + 1.0))'
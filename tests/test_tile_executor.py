@@ -0,0 +1,26 @@
+"""
+Serial and process-pool execution of tile_executor.TileExecutor
+"""
+
+import numpy as np
+
+from tile_executor import TileExecutor, _run_tile
+
+
+def _tile_sum(arrays, scale=1.0):
+    return {key: float(np.nansum(array)) * scale for key, array in arrays.items()}
+
+
+def test_pool_matches_serial():
+    rng = np.random.default_rng(0)
+    arrays = {'red': rng.random((64, 32)), 'nir': rng.random((64, 32)).astype(np.float32)}
+    arrays['red'][5, 5] = np.nan
+    with TileExecutor(workers=1, tile_rows=16) as serial, \
+            TileExecutor(workers=2, tile_rows=16, min_parallel_pixels=0) as pool:
+        expected = serial.map(_tile_sum, arrays, scale=2.0)
+        assert pool.map(_tile_sum, arrays, scale=2.0) == expected
+    assert np.isclose(sum(tile['red'] for tile in expected), np.nansum(arrays['red']) * 2.0)
+
+
+def test_tile_without_inputs():
+    assert _run_tile(_tile_sum, {}, (0, 0), {}) == {}
@@ -0,0 +1,110 @@
+"""
+Rollups and LTTB downsampling of trend_series against NumPy references
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from trend_series import build_trend, downsample, lttb_indices, period_key, rollup
+
+
+def _points(weeks=160, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64('2021-01-04') + 7 * np.arange(weeks)
+    values = 0.35 + 0.15 * np.sin(np.arange(weeks) * 2 * np.pi / 52) + rng.normal(0, 0.02, weeks)
+    values[40:43] -= 0.3  # Loss event the downsampled chart must keep
+    points = [{'date': str(d), 'ndvi_mean': float(v)} for d, v in zip(dates, values)]
+    for i in (5, 6, 90):
+        points[i]['ndvi_mean'] = None  # Weeks without imagery
+    return points
+
+
+def _reference_rollup(points, keys):
+    values = np.array([np.nan if p['ndvi_mean'] is None else p['ndvi_mean'] for p in points])
+    keys, values = np.asarray(keys)[~np.isnan(values)], values[~np.isnan(values)]
+    dates = np.array([p['date'] for p in points if p['ndvi_mean'] is not None])
+    unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    return [{
+        'period': unique[g],
+        'date': dates[first[g]],
+        'mean': values[inverse == g].mean(),
+        'min': values[inverse == g].min(),
+        'max': values[inverse == g].max(),
+        'count': int((inverse == g).sum()),
+    } for g in order]
+
+
+def test_rollups_match_numpy():
+    points = _points()
+    dates = np.array([p['date'] for p in points], dtype='datetime64[D]')
+    months = dates.astype('datetime64[M]').astype(int) % 12 + 1
+    years = dates.astype('datetime64[Y]').astype(int) + 1970
+    names = np.array(['winter'] * 3 + ['summer'] * 3 + ['monsoon'] * 4 + ['post_monsoon'] * 2)
+    seasons = [f"{y}-{names[m % 12]}" for y, m in zip(years + (months == 12), months)]
+    keys = {
+        'weekly': [p['date'] for p in points],
+        'monthly': [str(d) for d in dates.astype('datetime64[M]')],
+        'season': seasons,
+    }
+    assert period_key('2023-12-18', 'season') == '2024-winter'
+
+    for period, period_keys in keys.items():
+        rows = rollup(points, period)
+        expected = _reference_rollup(points, period_keys)
+        assert [(r['period'], r['date'], r['count']) for r in rows] == \
+            [(e['period'], e['date'], e['count']) for e in expected]
+        for row, ref in zip(rows, expected):
+            assert (row['mean'], row['min'], row['max']) == pytest.approx((ref['mean'], ref['min'], ref['max']))
+
+    with pytest.raises(ValueError):
+        rollup(points, 'daily')
+
+
+def _reference_lttb(x, y, threshold):
+    """Point-by-point LTTB (Steinarsson 2013)"""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = math.floor(i * every) + 1, math.floor((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(math.floor((i + 2) * every) + 1, n)
+        avg_x = sum(x[next_lo:next_hi]) / (next_hi - next_lo)
+        avg_y = sum(y[next_lo:next_hi]) / (next_hi - next_lo)
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+@pytest.mark.parametrize('n, threshold', [(160, 40), (157, 10), (1000, 3), (50, 49)])
+def test_lttb_matches_reference(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.cumsum(rng.integers(5, 10, n)).astype(float)
+    y = rng.normal(size=n)
+    assert lttb_indices(x, y, threshold).tolist() == _reference_lttb(x.tolist(), y.tolist(), threshold)
+
+
+def test_downsampled_trend_keeps_the_drop():
+    points = _points()
+    trend = build_trend(points, max_points=30)
+    assert trend['total'] == 157 and trend['downsampled']
+    assert len(trend['points']) == 30
+    kept = [row['mean'] for row in trend['points']]
+    assert min(kept) == min(p['ndvi_mean'] for p in points if p['ndvi_mean'] is not None)
+
+    rows = rollup(points)
+    assert downsample(rows, len(rows)) is rows
+    window = build_trend(points, 'monthly', start='2022-01-01', end='2022-12-31')
+    assert [row['period'] for row in window['points']] == [f"2022-{m:02d}" for m in range(1, 13)]
+    assert not window['downsampled']
+    with pytest.raises(ValueError):
+        lttb_indices(np.arange(5.0), np.arange(5.0), 2)